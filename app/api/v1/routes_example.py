@@ -1,8 +1,8 @@
-from fastapi import APIRouter
+from app.core.responses import BSONRouter
 from app.models.example_model import Example
 from app.services.example_service import create_example, get_all_examples
 
-router = APIRouter()
+router = BSONRouter()
 
 @router.post("/example")
 async def add_example(example: Example):
@@ -1,10 +1,17 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_CONCURRENCY
+from app.core.logger import obtener_logger
+import asyncio
 import bcrypt
+import time
 
 # Configuración para encriptar y verificar contraseñas
 # Usar bcrypt directamente para evitar problemas con passlib
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+logger = obtener_logger(__name__)
+
 def verificar_contraseña(plain_password, hashed_password):
     """
     Verifica una contraseña contra un hash usando bcrypt directamente.
@@ -32,10 +39,10 @@ def verificar_contraseña(plain_password, hashed_password):
                 return bcrypt.checkpw(plain_password, hashed_password)
             except Exception:
                 return False
-        print(f"Error verificando contraseña: {e}")
+        logger.warning("⚠️ [AUTH] Error verificando contraseña: %s", e)
         return False
     except Exception as e:
-        print(f"Error verificando contraseña: {e}")
+        logger.warning("⚠️ [AUTH] Error verificando contraseña: %s", e)
         return False
 
 def hashear_contraseña(password):
@@ -59,14 +66,93 @@ def hashear_contraseña(password):
             except UnicodeDecodeError:
                 # Si el último byte corta un carácter multibyte, quitar el último byte
                 password = password_bytes[:71].decode('utf-8', errors='ignore')
-            print(f"⚠️ [AUTH] Contraseña truncada de {len(password_bytes)} bytes a 72 bytes (límite de bcrypt)")
+            logger.warning("⚠️ [AUTH] Contraseña truncada de %s bytes a 72 bytes (límite de bcrypt)", len(password_bytes))
         
         return pwd_context.hash(password)
     except Exception as e:
-        print(f"Error hasheando contraseña: {e}")
+        logger.warning("⚠️ [AUTH] Error hasheando contraseña: %s", e)
         # Fallback a bcrypt directo con truncado
         if isinstance(password, str):
             password_bytes = password.encode('utf-8')[:72]
         else:
             password_bytes = password[:72]
         return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode('utf-8')
+
+# ============================================================================
+# EJECUCIÓN FUERA DEL EVENT LOOP
+# bcrypt tarda cientos de ms por verificación; ejecutarlo en el event loop
+# bloquea todas las demás peticiones (búsquedas, ventas) mientras dura.
+# ============================================================================
+
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_hash_limiter = asyncio.Semaphore(PASSWORD_HASH_MAX_CONCURRENCY)
+
+_hash_metricas = {
+    "en_cola": 0,
+    "en_cola_max": 0,
+    "en_proceso": 0,
+    "completadas": 0,
+    "espera_ms_total": 0.0,
+    "latencia_ms_total": 0.0,
+    "latencia_ms_max": 0.0,
+}
+
+async def _ejecutar_en_pool_hash(funcion, *args):
+    """
+    Ejecuta una función de bcrypt en el pool dedicado, limitando cuántas
+    corren a la vez. Registra profundidad de cola y latencias.
+    """
+    loop = asyncio.get_running_loop()
+    inicio = time.perf_counter()
+    _hash_metricas["en_cola"] += 1
+    _hash_metricas["en_cola_max"] = max(_hash_metricas["en_cola_max"], _hash_metricas["en_cola"])
+    en_cola = True
+    try:
+        async with _hash_limiter:
+            _hash_metricas["en_cola"] -= 1
+            en_cola = False
+            _hash_metricas["en_proceso"] += 1
+            inicio_proceso = time.perf_counter()
+            _hash_metricas["espera_ms_total"] += (inicio_proceso - inicio) * 1000
+            try:
+                return await loop.run_in_executor(_hash_executor, funcion, *args)
+            finally:
+                latencia_ms = (time.perf_counter() - inicio_proceso) * 1000
+                _hash_metricas["en_proceso"] -= 1
+                _hash_metricas["completadas"] += 1
+                _hash_metricas["latencia_ms_total"] += latencia_ms
+                _hash_metricas["latencia_ms_max"] = max(_hash_metricas["latencia_ms_max"], latencia_ms)
+    finally:
+        # Si la petición se canceló mientras esperaba turno, sale de la cola
+        if en_cola:
+            _hash_metricas["en_cola"] -= 1
+
+async def verificar_contraseña_async(plain_password, hashed_password):
+    """
+    Versión asíncrona de verificar_contraseña: corre en el pool de bcrypt.
+    """
+    return await _ejecutar_en_pool_hash(verificar_contraseña, plain_password, hashed_password)
+
+async def hashear_contraseña_async(password):
+    """
+    Versión asíncrona de hashear_contraseña: corre en el pool de bcrypt.
+    """
+    return await _ejecutar_en_pool_hash(hashear_contraseña, password)
+
+def estadisticas_hash_contraseñas() -> dict:
+    """Profundidad de cola y latencias del pool de bcrypt."""
+    completadas = _hash_metricas["completadas"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_concurrencia": PASSWORD_HASH_MAX_CONCURRENCY,
+        "en_cola": _hash_metricas["en_cola"],
+        "en_cola_max": _hash_metricas["en_cola_max"],
+        "en_proceso": _hash_metricas["en_proceso"],
+        "completadas": completadas,
+        "espera_ms_promedio": round(_hash_metricas["espera_ms_total"] / completadas, 2) if completadas else 0.0,
+        "latencia_ms_promedio": round(_hash_metricas["latencia_ms_total"] / completadas, 2) if completadas else 0.0,
+        "latencia_ms_max": round(_hash_metricas["latencia_ms_max"], 2),
+    }
@@ -14,4 +14,56 @@ ALGORITHM = os.getenv("ALGORITHM") or "HS256"
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY no está configurada. Por favor configura la variable de entorno SECRET_KEY")
 if not MONGO_URI:
-    raise ValueError("MONGO_URI no está configurada. Por favor configura la variable de entorno MONGO_URI")
\ No newline at end of file
+    raise ValueError("MONGO_URI no está configurada. Por favor configura la variable de entorno MONGO_URI")
+
+# Caché de usuarios autenticados (get_current_user)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS") or 60)
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES") or 1024)
+
+# Pool dedicado para bcrypt (login y cambio de contraseñas)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or 2)
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY") or PASSWORD_HASH_WORKERS)
+
+
+# Conexión a MongoDB (pool, compresión y timeouts)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE") or 100)
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE") or 5)
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS") or 300000)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS") or "zstd,snappy,zlib"
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS") or 5000)
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS") or 10000)
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS") or 30000)
+# Tiempo máximo por operación para toda la app (0 = sin límite)
+MONGO_DEFAULT_MAX_TIME_MS = int(os.getenv("MONGO_DEFAULT_MAX_TIME_MS") or 20000)
+# Tiempo máximo por clase de endpoint (app/db/consultas.py); 0 = usar MONGO_DEFAULT_MAX_TIME_MS
+MONGO_MAX_TIME_MS_BUSQUEDA = int(os.getenv("MONGO_MAX_TIME_MS_BUSQUEDA") or 3000)
+MONGO_MAX_TIME_MS_LISTADO = int(os.getenv("MONGO_MAX_TIME_MS_LISTADO") or 10000)
+MONGO_MAX_TIME_MS_REPORTE = int(os.getenv("MONGO_MAX_TIME_MS_REPORTE") or 60000)
+# Documentos por lote al exportar el catálogo en streaming (app/db/exportacion.py)
+MONGO_BATCH_SIZE_EXPORTACION = int(os.getenv("MONGO_BATCH_SIZE_EXPORTACION") or 1000)
+
+# Sincronización incremental de productos (/inventarios/cambios, app/db/sincronizacion.py)
+# Los cambios se entregan con este retraso, para no saltar escrituras que todavía no son visibles
+SYNC_MARGEN_SEGUNDOS = float(os.getenv("SYNC_MARGEN_SEGUNDOS") or 5)
+# Días que se guardan los productos eliminados; un token más viejo obliga a sincronizar desde cero
+SYNC_RETENCION_ELIMINADOS_DIAS = int(os.getenv("SYNC_RETENCION_ELIMINADOS_DIAS") or 30)
+
+# Logging estructurado (JSON por línea)
+LOG_LEVEL = os.getenv("LOG_LEVEL") or "INFO"
+# Niveles por módulo, ej: "app.routes.punto_venta=DEBUG,app.routes.auth=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS") or ""
+# Fracción de registros DEBUG que se escriben (1 = todos)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE") or 1)
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE") or 10000)
+
+# Presupuesto de consultas a Mongo por request (se registra una advertencia si se excede)
+MONGO_REQUEST_ROUNDTRIP_BUDGET = int(os.getenv("MONGO_REQUEST_ROUNDTRIP_BUDGET") or 25)
+
+# Índice de búsqueda de productos en memoria (trigramas por farmacia)
+SEARCH_INDEX_ENABLED = (os.getenv("SEARCH_INDEX_ENABLED") or "true").lower() in ("1", "true", "si", "yes")
+# Escuchar cambios de INVENTARIOS con change streams (requiere replica set / Atlas)
+SEARCH_INDEX_CHANGE_STREAM = (os.getenv("SEARCH_INDEX_CHANGE_STREAM") or "true").lower() in ("1", "true", "si", "yes")
+
+# Caché de productos por (farmacia, código) para el escaneo en caja (solo campos estáticos; el stock se lee siempre)
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS") or 30)
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES") or 5000)
@@ -1,12 +1,30 @@
+import copy
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from app.db.mongo import get_collection
-from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.config import SECRET_KEY, ALGORITHM, USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES
+from app.utils.ttl_cache import TTLCache
 
 # Configuración para obtener el token del header Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Caché de usuarios por "sub" del JWT (correo) para evitar una consulta a USUARIOS por request
+usuarios_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+def invalidar_usuario_cache(*correos: str):
+    """
+    Elimina del caché a los usuarios indicados (por correo).
+    Debe llamarse cada vez que se modifica o elimina un usuario.
+    """
+    for correo in correos:
+        if correo:
+            usuarios_cache.invalidate(correo)
+
+def estadisticas_cache_usuarios() -> dict:
+    """Retorna los contadores del caché de usuarios (hits = consultas a Mongo ahorradas)."""
+    return usuarios_cache.stats()
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -20,9 +38,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    usuarios = get_collection("USUARIOS")
-    usuario = await usuarios.find_one({"correo": correo})
+
+    usuario = usuarios_cache.get(correo)
     if usuario is None:
-        raise credentials_exception
-    usuario["_id"] = str(usuario["_id"])
-    return usuario
+        usuarios = get_collection("USUARIOS")
+        usuario = await usuarios.find_one({"correo": correo})
+        if usuario is None:
+            raise credentials_exception
+        usuario["_id"] = str(usuario["_id"])
+        usuarios_cache.set(correo, usuario)
+
+    # Copia para que los handlers puedan modificar el dict sin alterar el caché
+    return copy.deepcopy(usuario)
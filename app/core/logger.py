@@ -0,0 +1,173 @@
+"""
+Logging estructurado (JSON por línea) y no bloqueante.
+
+Los handlers de la app solo encolan el registro (QueueHandler); un hilo aparte
+(QueueListener) lo serializa y lo escribe en stdout, así el event loop no se
+bloquea escribiendo en consola.
+
+Uso:
+    from app.core.logger import obtener_logger
+    logger = obtener_logger(__name__)
+    logger.info("Venta creada", extra={"venta_id": venta_id})
+    logger.debug("Producto: %s", producto)   # se formatea solo si el nivel está activo
+"""
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import LOG_LEVEL, LOG_LEVELS, LOG_DEBUG_SAMPLE_RATE, LOG_QUEUE_MAX_SIZE
+
+# Atributos estándar de LogRecord; cualquier otro viene de `extra` y se agrega al JSON
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_descartados = 0
+
+
+class JSONFormatter(logging.Formatter):
+    """Serializa cada registro como un objeto JSON en una sola línea."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "modulo": record.name,
+            "msg": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_text:
+            datos["exc"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class MuestreoDebugFilter(logging.Filter):
+    """Deja pasar solo una fracción de los registros DEBUG (los de mayor volumen)."""
+
+    def __init__(self, tasa: float):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.tasa >= 1:
+            return True
+        return random.random() < self.tasa
+
+
+class _QueueHandlerNoBloqueante(QueueHandler):
+    """
+    Formatea el mensaje en el hilo que llama (los args pueden cambiar después)
+    pero deja la serialización JSON y la escritura al hilo del listener.
+    Si la cola está llena descarta el registro en lugar de bloquear.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global _descartados
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _descartados += 1
+
+
+class _SalidaSinFlush(logging.StreamHandler):
+    """StreamHandler que no hace flush por registro; lo hace el listener al vaciar la cola."""
+
+    def flush(self):
+        pass
+
+    def flush_real(self):
+        # Al cerrar el intérprete stdout puede estar cerrado: no hay dónde escribir
+        if getattr(self.stream, "closed", False):
+            return
+        try:
+            super().flush()
+        except ValueError:
+            pass
+
+
+class _ListenerCola(QueueListener):
+    """
+    QueueListener que escribe en lotes: hace flush solo cuando la cola queda vacía.
+    Al detenerse espera espacio para el centinela si la cola está llena.
+    """
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush_real()
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _parsear_niveles(config: str) -> Dict[str, str]:
+    """'app.routes.punto_venta=DEBUG,app.routes.auth=WARNING' -> dict"""
+    niveles = {}
+    for parte in config.split(","):
+        if "=" in parte:
+            modulo, nivel = parte.split("=", 1)
+            niveles[modulo.strip()] = nivel.strip().upper()
+    return niveles
+
+
+def configurar_logging() -> None:
+    """Configura el logger raíz de la app ("app") y arranca el hilo escritor. Idempotente."""
+    global _listener
+    if _listener is not None:
+        return
+
+    cola: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+    salida = _SalidaSinFlush(sys.stdout)
+    salida.setFormatter(JSONFormatter())
+
+    handler = _QueueHandlerNoBloqueante(cola)
+    handler.addFilter(MuestreoDebugFilter(LOG_DEBUG_SAMPLE_RATE))
+
+    raiz = logging.getLogger("app")
+    raiz.handlers = [handler]
+    raiz.setLevel(LOG_LEVEL.upper())
+    raiz.propagate = False
+    for modulo, nivel in _parsear_niveles(LOG_LEVELS).items():
+        logging.getLogger(modulo).setLevel(nivel)
+
+    _listener = _ListenerCola(cola, salida, respect_handler_level=False)
+    _listener.start()
+
+
+def detener_logging() -> None:
+    """Vacía la cola y detiene el hilo escritor (shutdown de la app). Idempotente."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush_real()
+
+
+def obtener_logger(nombre: str) -> logging.Logger:
+    return logging.getLogger(nombre)
+
+
+def estadisticas_logging() -> dict:
+    return {
+        "activo": _listener is not None,
+        "en_cola": _listener.queue.qsize() if _listener is not None else 0,
+        "descartados": _descartados,
+        "tasa_muestreo_debug": LOG_DEBUG_SAMPLE_RATE,
+    }
@@ -0,0 +1,216 @@
+"""
+Métricas HTTP por ruta en formato de texto de Prometheus.
+
+MetricsMiddleware (ASGI puro) mide cada request y la etiqueta con la plantilla
+de la ruta (ej: /inventarios/{id}/items), no con el path real, para que la
+cantidad de series no crezca con cada ID. También cuenta los comandos a Mongo
+de cada request (ver app/db/monitoring.py) y los devuelve en Server-Timing.
+"""
+import bisect
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import MONGO_REQUEST_ROUNDTRIP_BUDGET
+from app.core.logger import obtener_logger
+from app.db.monitoring import ComandosRequest, comandos_request
+
+logger = obtener_logger(__name__)
+
+RUTA_SIN_COINCIDENCIA = "__sin_ruta__"
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAMANO = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BUCKETS_COMANDOS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus (buckets + suma + conteo)."""
+
+    __slots__ = ("buckets", "conteos", "suma", "total")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.conteos):
+            self.conteos[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self) -> Iterable[Tuple[str, int]]:
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            yield _formatear_numero(limite), acumulado
+        yield "+Inf", self.total
+
+
+class RegistroMetricas:
+    """Contadores en memoria; se actualizan desde el event loop (un solo hilo)."""
+
+    def __init__(self):
+        self.en_curso = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latencias: Dict[Tuple[str, str], Histograma] = {}
+        self.tamanos: Dict[Tuple[str, str], Histograma] = {}
+        self.comandos_db: Dict[Tuple[str, str], Histograma] = {}
+        self.tiempos_db: Dict[Tuple[str, str], Histograma] = {}
+        self.sobre_presupuesto: Dict[Tuple[str, str], int] = {}
+
+    def registrar(self, metodo: str, ruta: str, status: int, duracion: float, tamano: int, db: ComandosRequest) -> None:
+        clave_status = (metodo, ruta, str(status))
+        self.requests[clave_status] = self.requests.get(clave_status, 0) + 1
+        clave = (metodo, ruta)
+        if clave not in self.latencias:
+            self.latencias[clave] = Histograma(BUCKETS_LATENCIA)
+            self.tamanos[clave] = Histograma(BUCKETS_TAMANO)
+            self.comandos_db[clave] = Histograma(BUCKETS_COMANDOS)
+            self.tiempos_db[clave] = Histograma(BUCKETS_LATENCIA)
+        self.latencias[clave].observar(duracion)
+        self.tamanos[clave].observar(tamano)
+        self.comandos_db[clave].observar(db.comandos)
+        self.tiempos_db[clave].observar(db.tiempo_ms / 1000)
+        if db.comandos > MONGO_REQUEST_ROUNDTRIP_BUDGET:
+            self.sobre_presupuesto[clave] = self.sobre_presupuesto.get(clave, 0) + 1
+
+
+registro = RegistroMetricas()
+
+
+def plantilla_ruta(scope: Scope) -> str:
+    """Plantilla de la ruta que resolvió el router (la agrega Starlette/FastAPI al scope)."""
+    ruta = scope.get("route")
+    path_format = getattr(ruta, "path_format", None) or getattr(ruta, "path", None)
+    return path_format or RUTA_SIN_COINCIDENCIA
+
+
+def _server_timing(db: ComandosRequest, duracion: float) -> bytes:
+    return f'db;dur={db.tiempo_ms:.1f};desc="{db.comandos} comandos", app;dur={duracion * 1000:.1f}'.encode()
+
+
+class MetricsMiddleware:
+    """
+    Mide latencia, código de estado, tamaño de respuesta y comandos a Mongo por
+    método + plantilla de ruta, y agrega el header Server-Timing.
+    Debe registrarse después (más adentro) que los middlewares que copian el scope,
+    para ver la ruta que asigna el router.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+        tamano = 0
+        db = ComandosRequest()
+        token = comandos_request.set(db)
+
+        async def send_con_metricas(message: Message):
+            nonlocal status, tamano
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(db, time.perf_counter() - inicio)))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                tamano += len(message.get("body", b""))
+            await send(message)
+
+        registro.en_curso += 1
+        try:
+            await self.app(scope, receive, send_con_metricas)
+        finally:
+            comandos_request.reset(token)
+            registro.en_curso -= 1
+            duracion = time.perf_counter() - inicio
+            ruta = plantilla_ruta(scope)
+            registro.registrar(scope["method"], ruta, status, duracion, tamano, db)
+            if db.comandos > MONGO_REQUEST_ROUNDTRIP_BUDGET:
+                logger.warning(
+                    "⚠️ [MONGO] %s %s hizo %s comandos a Mongo (presupuesto: %s, %.1f ms en BD)",
+                    scope["method"], ruta, db.comandos, MONGO_REQUEST_ROUNDTRIP_BUDGET, db.tiempo_ms,
+                    extra={"ruta": ruta, "comandos": db.comandos, "por_comando": db.por_comando, "db_ms": round(db.tiempo_ms, 1)}
+                )
+
+
+def _formatear_numero(valor: float) -> str:
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, int) or float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(**etiquetas: str) -> str:
+    return "{" + ",".join(f'{k}="{_escapar(str(v))}"' for k, v in etiquetas.items()) + "}"
+
+
+def _nombre_metrica(*partes: str) -> str:
+    """Convierte a un nombre válido de Prometheus ([a-zA-Z0-9_]): quita acentos/ñ."""
+    texto = "_".join(partes)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in texto).lower()
+
+
+def renderizar_prometheus(estadisticas: Dict[str, dict] = None) -> str:
+    """
+    Genera el texto de /metrics. `estadisticas` son los contadores internos de /stats
+    ({grupo: {clave: valor}}); los valores numéricos se publican como gauges yorbis_<grupo>_<clave>
+    y los diccionarios anidados como yorbis_<grupo>_<clave>{clave="..."}.
+    """
+    lineas: List[str] = [
+        "# HELP http_requests_in_flight Requests HTTP en curso.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {registro.en_curso}",
+        "# HELP http_requests_total Requests HTTP por método, ruta y código de estado.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (metodo, ruta, status), total in sorted(registro.requests.items()):
+        lineas.append(f"http_requests_total{_etiquetas(method=metodo, route=ruta, status=status)} {total}")
+
+    lineas.append("# HELP http_requests_over_db_budget_total Requests que superaron el presupuesto de comandos a Mongo.")
+    lineas.append("# TYPE http_requests_over_db_budget_total counter")
+    for (metodo, ruta), total in sorted(registro.sobre_presupuesto.items()):
+        lineas.append(f"http_requests_over_db_budget_total{_etiquetas(method=metodo, route=ruta)} {total}")
+
+    for nombre, ayuda, histogramas in (
+        ("http_request_duration_seconds", "Latencia de los requests HTTP en segundos.", registro.latencias),
+        ("http_response_size_bytes", "Tamaño del cuerpo de la respuesta en bytes.", registro.tamanos),
+        ("http_request_db_commands", "Comandos a Mongo por request.", registro.comandos_db),
+        ("http_request_db_seconds", "Tiempo en Mongo por request en segundos.", registro.tiempos_db),
+    ):
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} histogram")
+        for (metodo, ruta), histograma in sorted(histogramas.items()):
+            for limite, acumulado in histograma.acumulados():
+                lineas.append(f"{nombre}_bucket{_etiquetas(method=metodo, route=ruta, le=limite)} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas(method=metodo, route=ruta)} {_formatear_numero(histograma.suma)}")
+            lineas.append(f"{nombre}_count{_etiquetas(method=metodo, route=ruta)} {histograma.total}")
+
+    for grupo, valores in (estadisticas or {}).items():
+        for clave, valor in valores.items():
+            nombre = _nombre_metrica("yorbis", grupo, clave)
+            if isinstance(valor, (int, float)):
+                lineas.append(f"# TYPE {nombre} gauge")
+                lineas.append(f"{nombre} {_formatear_numero(valor)}")
+            elif isinstance(valor, dict):
+                lineas.append(f"# TYPE {nombre} gauge")
+                for subclave, subvalor in sorted(valor.items()):
+                    if isinstance(subvalor, (int, float)):
+                        lineas.append(f"{nombre}{_etiquetas(clave=subclave)} {_formatear_numero(subvalor)}")
+
+    return "\n".join(lineas) + "\n"
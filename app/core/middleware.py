@@ -0,0 +1,55 @@
+"""
+Middlewares ASGI propios de la aplicación.
+"""
+import re
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.logger import obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Patrón precompilado: dos o más barras seguidas
+_BARRAS_REPETIDAS = re.compile(r"/{2,}")
+
+
+def normalizar_path(path: str) -> str:
+    """
+    Elimina dobles barras y la barra final (excepto si el path es solo /).
+    Ejemplo: /inventarios//items/ -> /inventarios/items
+    """
+    normalized_path = _BARRAS_REPETIDAS.sub("/", path)
+    if normalized_path != "/" and normalized_path.endswith("/"):
+        normalized_path = normalized_path.rstrip("/") or "/"
+    return normalized_path
+
+
+class URLNormalizeMiddleware:
+    """
+    Middleware ASGI que normaliza las URLs eliminando dobles barras.
+    Soluciona el problema de /inventarios//items/{item_id} -> /inventarios/items/{item_id}
+
+    Si el path no tiene // ni barra final se pasa la llamada directo a la app,
+    sin copiar el scope ni envolver receive/send.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        # Camino rápido: la gran mayoría de los requests no necesita normalizarse
+        if "//" not in path and (path == "/" or not path.endswith("/")):
+            await self.app(scope, receive, send)
+            return
+
+        normalized_path = normalizar_path(path)
+        if normalized_path != path:
+            logger.debug("🔄 [MIDDLEWARE] Normalizando URL: %s -> %s", path, normalized_path)
+            scope = dict(scope)
+            scope["path"] = normalized_path
+            scope["raw_path"] = normalized_path.encode()
+
+        await self.app(scope, receive, send)
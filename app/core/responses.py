@@ -0,0 +1,89 @@
+"""
+Respuesta JSON basada en orjson que entiende tipos de BSON.
+
+Los handlers pueden devolver documentos de Mongo tal cual (con ObjectId,
+datetime o Decimal128, también anidados): se serializan en un solo paso,
+sin recorrer la estructura con jsonable_encoder.
+"""
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any, Callable
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import APIRouter
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+_OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def bson_default(valor: Any) -> Any:
+    """Convierte los tipos que orjson no conoce (orjson ya maneja datetime/date/UUID)."""
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, Decimal128):
+        return float(valor.to_decimal())
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, BaseModel):
+        return valor.model_dump()
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", errors="replace")
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def dumps_json(contenido: Any) -> bytes:
+    return orjson.dumps(contenido, default=bson_default, option=_OPCIONES_ORJSON)
+
+
+class BSONJSONResponse(JSONResponse):
+    """Respuesta por defecto de la app (ver app/main.py)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def _responder_directo(endpoint: Callable, status_code: int) -> Callable:
+    """
+    Envuelve el endpoint para que devuelva un BSONJSONResponse ya armado.
+    FastAPI no pasa por jsonable_encoder cuando el endpoint devuelve un Response.
+    """
+    @functools.wraps(endpoint)
+    async def envoltura(*args, **kwargs):
+        resultado = await endpoint(*args, **kwargs)
+        if isinstance(resultado, Response):
+            return resultado
+        return BSONJSONResponse(resultado, status_code=status_code)
+
+    return envoltura
+
+
+def _es_default(valor: Any) -> bool:
+    return valor is None or isinstance(valor, DefaultPlaceholder)
+
+
+class BSONRouter(APIRouter):
+    """
+    APIRouter cuyos endpoints async devuelven documentos crudos serializados con
+    BSONJSONResponse. Si la ruta declara response_model, response_class o una
+    anotación de retorno, se mantiene el flujo normal de FastAPI.
+    """
+
+    def add_api_route(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        if (
+            inspect.iscoroutinefunction(endpoint)
+            and _es_default(kwargs.get("response_model"))
+            and _es_default(kwargs.get("response_class"))
+            and inspect.signature(endpoint).return_annotation is inspect.Signature.empty
+        ):
+            endpoint = _responder_directo(endpoint, kwargs.get("status_code") or 200)
+        super().add_api_route(path, endpoint, **kwargs)
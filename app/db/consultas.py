@@ -0,0 +1,107 @@
+"""
+Consultas acotadas: tiempo máximo por clase de endpoint y cancelación cuando
+el cliente se desconecta.
+
+Sin esto una búsqueda o un listado sigue corriendo en Mongo aunque el cajero
+ya se haya ido de la pantalla. ejecutar_consulta() corre la operación como
+tarea dentro de pymongo.timeout() (el driver manda maxTimeMS en cada comando
+según el tiempo que queda) y en paralelo vigila request.is_disconnected():
+si el cliente se va, cancela la tarea y cierra el cursor (killCursors).
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+import pymongo
+from fastapi import HTTPException, Request
+from pymongo.errors import PyMongoError
+from app.core.config import MONGO_MAX_TIME_MS_BUSQUEDA, MONGO_MAX_TIME_MS_LISTADO, MONGO_MAX_TIME_MS_REPORTE
+from app.core.logger import obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Tiempo máximo (ms) por clase de endpoint; 0 = el timeoutMS general del cliente
+PRESUPUESTOS_MS: Dict[str, int] = {
+    "busqueda": MONGO_MAX_TIME_MS_BUSQUEDA,
+    "listado": MONGO_MAX_TIME_MS_LISTADO,
+    "reporte": MONGO_MAX_TIME_MS_REPORTE,
+}
+# Cada cuánto se pregunta si el cliente sigue conectado
+INTERVALO_DESCONEXION = 0.25
+
+_contadores: Dict[str, Dict[str, int]] = {
+    clase: {"consultas": 0, "cortadas_por_tiempo": 0, "canceladas_por_desconexion": 0}
+    for clase in PRESUPUESTOS_MS
+}
+
+
+class ConsultaExcedioTiempo(HTTPException):
+    def __init__(self, clase: str):
+        super().__init__(status_code=504, detail=f"La consulta excedió el tiempo máximo ({clase})")
+
+
+class ClienteDesconectado(HTTPException):
+    """Nadie lee esta respuesta; el 499 queda en los logs y métricas de acceso."""
+
+    def __init__(self):
+        super().__init__(status_code=499, detail="El cliente cerró la conexión")
+
+
+async def _esperar_desconexion(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(INTERVALO_DESCONEXION)
+
+
+async def ejecutar_consulta(
+    clase: str,
+    operacion: Awaitable,
+    request: Optional[Request] = None,
+    cursor: Any = None,
+) -> Any:
+    """
+    Espera `operacion` (una corutina que consulta Mongo) con el tiempo máximo de
+    `clase` ("busqueda", "listado" o "reporte"). Con `request`, si el cliente se
+    desconecta antes se cancela y se cierra `cursor` (si se pasó). Lanza
+    ConsultaExcedioTiempo (504) o ClienteDesconectado (499).
+    """
+    contadores = _contadores[clase]
+    contadores["consultas"] += 1
+    presupuesto_ms = PRESUPUESTOS_MS[clase]
+    # La tarea copia el contexto al crearse: hereda el deadline de pymongo.timeout()
+    if presupuesto_ms > 0:
+        with pymongo.timeout(presupuesto_ms / 1000):
+            tarea = asyncio.ensure_future(operacion)
+    else:
+        tarea = asyncio.ensure_future(operacion)
+
+    vigilante = asyncio.ensure_future(_esperar_desconexion(request)) if request is not None else None
+    try:
+        if vigilante is not None:
+            await asyncio.wait({tarea, vigilante}, return_when=asyncio.FIRST_COMPLETED)
+            if not tarea.done():
+                tarea.cancel()
+                contadores["canceladas_por_desconexion"] += 1
+                logger.info("🔌 [CONSULTAS] Cliente desconectado, se cancela la consulta (%s)", clase)
+                if cursor is not None:
+                    await cursor.close()
+                raise ClienteDesconectado()
+        return await tarea
+    except PyMongoError as e:
+        if e.timeout:
+            contadores["cortadas_por_tiempo"] += 1
+            logger.warning("⏱️ [CONSULTAS] Consulta cortada por tiempo máximo (%s, %s ms): %s", clase, presupuesto_ms, e)
+            raise ConsultaExcedioTiempo(clase) from e
+        raise
+    finally:
+        if vigilante is not None:
+            vigilante.cancel()
+        if not tarea.done():
+            # El request mismo fue cancelado: no dejar la consulta corriendo
+            tarea.cancel()
+
+
+def estadisticas_consultas() -> dict:
+    """{contador: {clase: valor}} (en /metrics: yorbis_consultas_<contador>{clave="<clase>"})."""
+    estadisticas = {"max_time_ms": dict(PRESUPUESTOS_MS)}
+    for clase, contadores in _contadores.items():
+        for nombre, valor in contadores.items():
+            estadisticas.setdefault(nombre, {})[clase] = valor
+    return estadisticas
@@ -0,0 +1,69 @@
+"""
+Exportación en streaming: un cursor de Motor se serializa documento por
+documento hacia la respuesta, sin to_list().
+
+En memoria solo queda un lote del cursor (batch_size) y un fragmento de la
+respuesta (TAMANO_FRAGMENTO); el resto ya se envió. Así el catálogo completo
+cuesta lo mismo en el servidor con 1.000 productos que con 200.000. Si el
+cliente se desconecta, Starlette cancela el generador y el cursor se cierra
+(killCursors) en el finally.
+"""
+import time
+from typing import Any, AsyncIterator, Callable
+import anyio
+from starlette.responses import StreamingResponse
+from app.core.config import MONGO_BATCH_SIZE_EXPORTACION
+from app.core.logger import obtener_logger
+from app.core.responses import dumps_json
+
+logger = obtener_logger(__name__)
+
+# Bytes que se juntan antes de cada envío (evita un send por documento)
+TAMANO_FRAGMENTO = 64 * 1024
+TIPOS_CONTENIDO = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+async def fragmentos_json(
+    cursor,
+    formatear: Callable[[dict], Any],
+    formato: str = "ndjson",
+    tamano_fragmento: int = TAMANO_FRAGMENTO,
+) -> AsyncIterator[bytes]:
+    """
+    Recorre `cursor` y entrega bytes listos para enviar: una línea JSON por
+    documento ("ndjson") o un único array JSON ("json"). Siempre cierra el cursor.
+    """
+    es_array = formato == "json"
+    partes = [b"["] if es_array else []
+    tamano = 0
+    documentos = 0
+    inicio = time.perf_counter()
+    try:
+        async for documento in cursor:
+            fila = dumps_json(formatear(documento))
+            if es_array:
+                if documentos:
+                    partes.append(b",")
+            else:
+                fila += b"\n"
+            partes.append(fila)
+            tamano += len(fila)
+            documentos += 1
+            if tamano >= tamano_fragmento:
+                yield b"".join(partes)
+                partes, tamano = [], 0
+        if es_array:
+            partes.append(b"]")
+        if partes:
+            yield b"".join(partes)
+        logger.info("📤 [EXPORTACION] %s documentos exportados (%s) en %.2f s", documentos, formato, time.perf_counter() - inicio)
+    finally:
+        # Protegido de la cancelación: si el cliente se fue, igual se libera el cursor en Mongo
+        with anyio.CancelScope(shield=True):
+            await cursor.close()
+
+
+def respuesta_streaming(cursor, formatear: Callable[[dict], Any], formato: str = "ndjson") -> StreamingResponse:
+    """StreamingResponse que exporta `cursor` (ver fragmentos_json)."""
+    cursor.batch_size(MONGO_BATCH_SIZE_EXPORTACION)
+    return StreamingResponse(fragmentos_json(cursor, formatear, formato), media_type=TIPOS_CONTENIDO[formato])
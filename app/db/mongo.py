@@ -1,18 +1,144 @@
+from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
-from app.core.config import MONGO_URI, DATABASE_NAME
+from app.core.config import (
+    MONGO_URI,
+    DATABASE_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_COMPRESSORS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_DEFAULT_MAX_TIME_MS,
+)
+from app.db.monitoring import PoolStatsListener, ComandosListener
+from app.core.logger import obtener_logger
 import certifi
+import pymongo
 
-client = AsyncIOMotorClient(MONGO_URI,tlsCAFile=certifi.where())
-db = client[DATABASE_NAME or "ferreteria_los_puentes"]
+# El cliente se crea en el lifespan de la app (conectar_mongo) y se cierra al apagar.
+# Si se usa antes (scripts, tests sin lifespan) se crea bajo demanda.
+logger = obtener_logger(__name__)
+client: Optional[AsyncIOMotorClient] = None
+pool_stats = PoolStatsListener()
+comandos_stats = ComandosListener()
 
 
-def get_collection(nombre: str) -> AsyncIOMotorCollection:
-    return db[nombre]
+def _compresores_disponibles(configurados: str) -> List[str]:
+    """Filtra los compresores configurados según las librerías instaladas (zlib siempre está)."""
+    disponibles = []
+    for nombre in [c.strip().lower() for c in configurados.split(",") if c.strip()]:
+        try:
+            if nombre == "zstd":
+                import zstandard  # noqa: F401
+            elif nombre == "snappy":
+                import snappy  # noqa: F401
+            elif nombre != "zlib":
+                continue
+        except ImportError:
+            continue
+        disponibles.append(nombre)
+    return disponibles
+
+
+def _requiere_tls(uri: str) -> bool:
+    """Atlas (mongodb+srv) usa TLS; un mongod local normalmente no."""
+    uri = (uri or "").lower()
+    return uri.startswith("mongodb+srv://") or "tls=true" in uri or "ssl=true" in uri
+
+
+def opciones_cliente() -> dict:
+    """Opciones del pool/timeouts tomadas de las variables de entorno."""
+    opciones = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "event_listeners": [pool_stats, comandos_stats],
+    }
+    if _requiere_tls(MONGO_URI):
+        # tlsCAFile implica tls=True en pymongo: solo se pasa si la URI ya usa TLS
+        opciones["tlsCAFile"] = certifi.where()
+    compresores = _compresores_disponibles(MONGO_COMPRESSORS)
+    if compresores:
+        opciones["compressors"] = ",".join(compresores)
+    if MONGO_DEFAULT_MAX_TIME_MS > 0:
+        # timeoutMS: pymongo deriva el maxTimeMS de cada operación a partir de este límite
+        opciones["timeoutMS"] = MONGO_DEFAULT_MAX_TIME_MS
+    return opciones
+
+
+def _crear_cliente() -> AsyncIOMotorClient:
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(MONGO_URI, **opciones_cliente())
+    return client
+
+
+async def conectar_mongo():
+    """Crea el cliente y hace ping para abrir las primeras conexiones del pool."""
+    cliente = _crear_cliente()
+    try:
+        # Con timeoutMS activo el driver ignora serverSelectionTimeoutMS; se acota el ping a mano
+        with pymongo.timeout(MONGO_SERVER_SELECTION_TIMEOUT_MS / 1000):
+            await cliente.admin.command("ping")
+        logger.info("✅ [MONGO] Conectado (pool %s-%s, compresores: %s)", MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE, opciones_cliente().get("compressors", "ninguno"))
+    except Exception as e:
+        # No se detiene el arranque: el driver reintenta en la siguiente operación
+        logger.error("❌ [MONGO] No se pudo hacer ping al iniciar: %s", e)
+
+
+def cerrar_mongo():
+    """Cierra el cliente y sus conexiones (shutdown de la app)."""
+    global client
+    if client is not None:
+        client.close()
+        client = None
+        logger.info("🔌 [MONGO] Conexión cerrada")
 
-def get_database() -> AsyncIOMotorDatabase:
-    """Obtiene la instancia de la base de datos para usar en transacciones"""
-    return db
 
 def get_client() -> AsyncIOMotorClient:
     """Obtiene el cliente de MongoDB para usar en transacciones"""
-    return client
+    return _crear_cliente()
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Obtiene la instancia de la base de datos para usar en transacciones"""
+    return get_client()[DATABASE_NAME or "ferreteria_los_puentes"]
+
+
+def get_collection(nombre: str) -> AsyncIOMotorCollection:
+    return get_database()[nombre]
+
+
+def estadisticas_pool() -> dict:
+    """Contadores del pool de conexiones (espera de checkout, conexiones en uso)."""
+    return {
+        "max_pool": MONGO_MAX_POOL_SIZE,
+        "min_pool": MONGO_MIN_POOL_SIZE,
+        **pool_stats.stats(),
+    }
+
+
+def estadisticas_comandos() -> dict:
+    """Comandos enviados a Mongo por tipo desde que arrancó el proceso."""
+    return comandos_stats.stats()
+
+
+class _DatabaseProxy:
+    """
+    Mantiene compatibilidad con `from app.db.mongo import db`:
+    resuelve la base de datos del cliente actual en cada acceso.
+    """
+
+    def __getitem__(self, nombre: str) -> AsyncIOMotorCollection:
+        return get_collection(nombre)
+
+    def __getattr__(self, nombre: str):
+        return getattr(get_database(), nombre)
+
+
+db = _DatabaseProxy()
@@ -0,0 +1,156 @@
+"""
+Listeners de pymongo para medir el uso del pool de conexiones y los comandos
+que hace cada request.
+
+Motor ejecuta pymongo en hilos del executor (copiando el contexto del task),
+por eso los contadores se protegen con un lock y el acumulador por request
+viaja en una ContextVar.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from pymongo import monitoring
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Cuenta conexiones abiertas/en uso y el tiempo de espera para obtener
+    una conexión del pool (checkout).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkouts_fallidos = 0
+        self.espera_ms_total = 0.0
+        self.espera_ms_max = 0.0
+        self.conexiones_abiertas = 0
+        self.conexiones_en_uso = 0
+        self.conexiones_creadas = 0
+        self.conexiones_cerradas = 0
+        self.pools_limpiados = 0
+
+    def _espera_ms(self, event) -> float:
+        # pymongo >= 4.7 trae la duración en el evento; si no, se mide desde checkout_started
+        duracion = getattr(event, "duration", None)
+        if duracion is not None:
+            return duracion * 1000
+        inicio = getattr(self._local, "inicio", None)
+        return (time.perf_counter() - inicio) * 1000 if inicio is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        espera_ms = self._espera_ms(event)
+        with self._lock:
+            self.checkouts += 1
+            self.conexiones_en_uso += 1
+            self.espera_ms_total += espera_ms
+            self.espera_ms_max = max(self.espera_ms_max, espera_ms)
+
+    def connection_check_out_failed(self, event):
+        espera_ms = self._espera_ms(event)
+        with self._lock:
+            self.checkouts_fallidos += 1
+            self.espera_ms_max = max(self.espera_ms_max, espera_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.conexiones_en_uso = max(self.conexiones_en_uso - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.conexiones_creadas += 1
+            self.conexiones_abiertas += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.conexiones_cerradas += 1
+            self.conexiones_abiertas = max(self.conexiones_abiertas - 1, 0)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_limpiados += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "conexiones_abiertas": self.conexiones_abiertas,
+                "conexiones_en_uso": self.conexiones_en_uso,
+                "conexiones_creadas": self.conexiones_creadas,
+                "conexiones_cerradas": self.conexiones_cerradas,
+                "checkouts": self.checkouts,
+                "checkouts_fallidos": self.checkouts_fallidos,
+                "espera_ms_promedio": round(self.espera_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "espera_ms_max": round(self.espera_ms_max, 3),
+                "pools_limpiados": self.pools_limpiados,
+            }
+
+
+class ComandosRequest:
+    """Acumulador de comandos Mongo de un request (cantidad y tiempo en la BD)."""
+
+    __slots__ = ("_lock", "comandos", "tiempo_ms", "por_comando")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.comandos = 0
+        self.tiempo_ms = 0.0
+        self.por_comando: Dict[str, int] = {}
+
+    def agregar(self, nombre: str, duracion_ms: float) -> None:
+        with self._lock:
+            self.comandos += 1
+            self.tiempo_ms += duracion_ms
+            self.por_comando[nombre] = self.por_comando.get(nombre, 0) + 1
+
+
+# Se asigna al iniciar cada request (MetricsMiddleware); None fuera de un request
+comandos_request: ContextVar[Optional[ComandosRequest]] = ContextVar("comandos_request", default=None)
+
+
+class ComandosListener(monitoring.CommandListener):
+    """Suma cada comando al acumulador del request actual y a los totales del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totales: Dict[str, int] = {}
+        self.fallidos = 0
+
+    def _registrar(self, event, fallido: bool = False):
+        duracion_ms = event.duration_micros / 1000
+        acumulador = comandos_request.get()
+        if acumulador is not None:
+            acumulador.agregar(event.command_name, duracion_ms)
+        with self._lock:
+            self.totales[event.command_name] = self.totales.get(event.command_name, 0) + 1
+            if fallido:
+                self.fallidos += 1
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._registrar(event)
+
+    def failed(self, event):
+        self._registrar(event, fallido=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"por_comando": dict(self.totales), "fallidos": self.fallidos}
@@ -0,0 +1,71 @@
+"""
+Paginación por cursor (keyset) sobre (nombre, _id).
+
+En vez de skip(n), que obliga a Mongo a recorrer las n entradas anteriores del
+índice, cada página pide "los siguientes después de (nombre, _id) del último
+documento". El costo es el mismo en la página 1 que en la 200 y las páginas no
+se corren si se insertan productos mientras el usuario navega.
+
+El cursor que recibe el frontend es opaco: (nombre, _id) en BSON y base64 url.
+Índice: farmacia_nombre_id_estado_index (create_indexes.py): farmacia por
+igualdad, (nombre, _id) en orden y estado al final para descartar inactivos
+sin leer el documento.
+"""
+import base64
+import binascii
+from typing import Any, List, Optional, Tuple
+import bson
+from bson.errors import BSONError
+
+ORDEN_CURSOR = [("nombre", 1), ("_id", 1)]
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(documento: dict) -> str:
+    datos = bson.encode({"n": documento.get("nombre"), "i": documento["_id"]})
+    return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Any, Any]:
+    """(nombre, _id) del último documento de la página anterior."""
+    try:
+        datos = bson.decode(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datos["n"], datos["i"]
+    except (BSONError, binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise CursorInvalido(f"Cursor de paginación inválido: {cursor!r}") from e
+
+
+def filtro_despues_de(nombre: Any, _id: Any) -> dict:
+    """
+    Documentos posteriores a (nombre, _id) en el orden (nombre, _id). El rango
+    sobre nombre va arriba del $or para que sea un solo recorrido del índice.
+    """
+    if nombre is None:
+        # null/ausente ordena antes que cualquier texto
+        return {"$or": [{"nombre": None, "_id": {"$gt": _id}}, {"nombre": {"$type": "string"}}]}
+    return {"nombre": {"$gte": nombre}, "$or": [{"nombre": {"$gt": nombre}}, {"_id": {"$gt": _id}}]}
+
+
+async def pagina_por_cursor(
+    coleccion,
+    filtro: dict,
+    proyeccion: dict,
+    limite: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Una página de `limite` documentos ordenados por (nombre, _id) desde `cursor`
+    ("" o None = primera página). Retorna (documentos, next_cursor); next_cursor
+    es None en la última página. Lanza CursorInvalido.
+    """
+    if cursor:
+        filtro = {"$and": [filtro, filtro_despues_de(*decodificar_cursor(cursor))]}
+    # Se pide uno de más para saber si hay otra página sin un conteo
+    documentos = await coleccion.find(filtro, projection=proyeccion).sort(ORDEN_CURSOR).limit(limite + 1).to_list(length=limite + 1)
+    if len(documentos) <= limite:
+        return documentos, None
+    documentos = documentos[:limite]
+    return documentos, codificar_cursor(documentos[-1])
@@ -0,0 +1,149 @@
+"""
+Sincronización incremental de productos para las terminales del punto de venta.
+
+Cada escritura en INVENTARIOS pone updatedAt (datetime BSON en UTC, ver
+marca_actualizacion()) y los borrados dejan una lápida en
+INVENTARIOS_ELIMINADOS. cambios_desde() devuelve lo que cambió después del
+token de la terminal, en orden (updatedAt, _id), junto con un token nuevo: la
+terminal guarda los productos en su caché local y solo pide la diferencia.
+
+Los cambios se entregan hasta ahora - SYNC_MARGEN_SEGUNDOS (el horizonte).
+updatedAt se calcula antes de escribir y una venta dentro de una transacción
+se vuelve visible recién al confirmarse; sin el margen el token podría pasar
+por encima de ese cambio y la terminal no lo vería nunca.
+
+Índices: farmacia_updatedAt_id_index en ambas colecciones y un TTL sobre
+INVENTARIOS_ELIMINADOS.updatedAt (create_indexes.py).
+"""
+import asyncio
+import base64
+import binascii
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+import bson
+from bson.errors import BSONError
+from app.core.config import SYNC_MARGEN_SEGUNDOS, SYNC_RETENCION_ELIMINADOS_DIAS
+from app.db.mongo import get_collection
+from app.search.formato import formatear_item_inventario
+
+COLECCION_ELIMINADOS = "INVENTARIOS_ELIMINADOS"
+ORDEN_CAMBIOS = [("updatedAt", 1), ("_id", 1)]
+PROYECCION_CAMBIOS = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
+    "precio_venta": 1, "precio": 1, "marca": 1,
+    "cantidad": 1,
+    "farmacia": 1, "costo": 1, "estado": 1,
+    "utilidad": 1, "porcentaje_utilidad": 1, "updatedAt": 1,
+}
+
+
+class TokenInvalido(ValueError):
+    pass
+
+
+class TokenVencido(ValueError):
+    """El token es anterior a la retención de eliminados: hay que sincronizar desde cero."""
+
+
+def ahora_utc() -> datetime:
+    """UTC sin zona horaria, igual que los datetime que devuelve pymongo."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def marca_actualizacion() -> dict:
+    """Campos que toda escritura en INVENTARIOS agrega a su $set (o al documento nuevo)."""
+    return {"updatedAt": ahora_utc()}
+
+
+async def registrar_eliminado(producto: dict) -> None:
+    """Deja la lápida de un producto borrado de INVENTARIOS (necesita _id y farmacia)."""
+    await get_collection(COLECCION_ELIMINADOS).update_one(
+        {"_id": producto["_id"]},
+        {"$set": {"farmacia": producto.get("farmacia"), **marca_actualizacion()}},
+        upsert=True
+    )
+
+
+def codificar_token(updated_at: Optional[datetime], _id: Any, horizonte: datetime) -> str:
+    """
+    Posición en (updatedAt, _id) (sin _id: "todo lo posterior a updated_at") y el
+    horizonte de la respuesta que lo emitió.
+    """
+    datos = bson.encode({"t": updated_at, "i": _id, "h": horizonte})
+    return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+
+def decodificar_token(token: str) -> Tuple[Optional[datetime], Any, datetime]:
+    try:
+        datos = bson.decode(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        updated_at, _id, horizonte = datos["t"], datos["i"], datos["h"]
+    except (BSONError, binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise TokenInvalido(f"Token de sincronización inválido: {token!r}") from e
+    valido = isinstance(horizonte, datetime) and (isinstance(updated_at, datetime) or updated_at is None and _id is not None)
+    if not valido:
+        raise TokenInvalido(f"Token de sincronización inválido: {token!r}")
+    return updated_at, _id, horizonte
+
+
+def filtro_despues_de(updated_at: Optional[datetime], _id: Any) -> dict:
+    """Documentos posteriores a la posición (updatedAt, _id) del token."""
+    if _id is None:
+        return {"updatedAt": {"$gt": updated_at}}
+    if updated_at is None:
+        # Productos sin updatedAt (anteriores a migrar_updated_at.py): ordenan antes que cualquier fecha
+        return {"$or": [{"updatedAt": None, "_id": {"$gt": _id}}, {"updatedAt": {"$type": "date"}}]}
+    return {"updatedAt": {"$gte": updated_at}, "$or": [{"updatedAt": {"$gt": updated_at}}, {"_id": {"$gt": _id}}]}
+
+
+def _orden(documento: dict) -> tuple:
+    updated_at = documento.get("updatedAt")
+    return (0, datetime.min, documento["_id"]) if updated_at is None else (1, updated_at, documento["_id"])
+
+
+async def cambios_desde(farmacia: Optional[str], token: Optional[str], limite: int) -> dict:
+    """
+    Hasta `limite` cambios posteriores a `token` (None o "" = catálogo completo):
+    {"productos": [...], "eliminados": [ids], "token": "...", "hay_mas": bool}.
+    Los productos desactivados y los borrados van en "eliminados".
+    Lanza TokenInvalido o TokenVencido.
+    """
+    ahora = ahora_utc()
+    horizonte = ahora - timedelta(seconds=SYNC_MARGEN_SEGUNDOS)
+    filtros: List[dict] = [{"updatedAt": {"$not": {"$gt": horizonte}}}]
+    if farmacia:
+        filtros.insert(0, {"farmacia": farmacia})
+    posicion: Optional[datetime] = None
+    if token:
+        posicion, _id, emitido = decodificar_token(token)
+        # Lo que la terminal tiene en caché se borró después de `emitido`: esas lápidas tienen que seguir guardadas
+        if emitido < ahora - timedelta(days=SYNC_RETENCION_ELIMINADOS_DIAS):
+            raise TokenVencido("El token es más viejo que la retención de eliminados; sincronizar desde cero")
+        filtros.append(filtro_despues_de(posicion, _id))
+    filtro = {"$and": filtros}
+
+    # Un lote de más en cada colección alcanza para saber si queda algo después de los `limite` primeros
+    productos, lapidas = await asyncio.gather(
+        get_collection("INVENTARIOS").find(filtro, projection=PROYECCION_CAMBIOS).sort(ORDEN_CAMBIOS).limit(limite + 1).to_list(length=limite + 1),
+        get_collection(COLECCION_ELIMINADOS).find(filtro).sort(ORDEN_CAMBIOS).limit(limite + 1).to_list(length=limite + 1),
+    )
+    for lapida in lapidas:
+        lapida["estado"] = "eliminado"
+    cambios = list(heapq.merge(productos, lapidas, key=_orden))
+    hay_mas = len(cambios) > limite
+    cambios = cambios[:limite]
+
+    if hay_mas:
+        ultimo = cambios[-1]
+        nuevo_token = codificar_token(ultimo.get("updatedAt"), ultimo["_id"], horizonte)
+    else:
+        # Al día: todo lo anterior al horizonte ya se entregó
+        hasta = max(horizonte, posicion) if posicion else horizonte
+        nuevo_token = codificar_token(hasta, None, horizonte)
+
+    return {
+        "productos": [formatear_item_inventario(c) for c in cambios if c.get("estado") not in ("inactivo", "eliminado")],
+        "eliminados": [str(c["_id"]) for c in cambios if c.get("estado") in ("inactivo", "eliminado")],
+        "token": nuevo_token,
+        "hay_mas": hay_mas,
+    }
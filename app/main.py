@@ -1,10 +1,8 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
 from app.api.v1.routes_example import router as example_router
 from app.routes import auth, metas
 from app.routes.pagoscpp import router as pagoscpp_router
@@ -14,43 +12,48 @@ from app.routes.compras import router as compras_router
 from app.routes.productos import router as productos_router
 from app.routes.punto_venta import router as punto_venta_router
 from app.routes.clientes import router as clientes_router
-import re
+from app.core.get_current_user import estadisticas_cache_usuarios
+from app.core.auth import estadisticas_hash_contraseñas
+from app.core.middleware import URLNormalizeMiddleware
+from app.core.metrics import MetricsMiddleware, renderizar_prometheus
+from app.core.responses import BSONJSONResponse
+from app.db.mongo import conectar_mongo, cerrar_mongo, estadisticas_pool, estadisticas_comandos
+from app.db.consultas import estadisticas_consultas
+from app.core.logger import configurar_logging, detener_logging, estadisticas_logging, obtener_logger
+from app.search.indice_productos import indice_productos, estadisticas_indice_productos
+from app.search.cache_codigos import estadisticas_cache_codigos
+from app.search.buscador import estadisticas_autocompletado
+from contextlib import asynccontextmanager
+
+configurar_logging()
+logger = obtener_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El hilo de logging se detiene en el shutdown; si la app vuelve a arrancar se reinicia
+    configurar_logging()
+    # Crear el cliente de MongoDB y calentar el pool antes de recibir tráfico
+    await conectar_mongo()
+    # Índice de búsqueda de productos: se construye en segundo plano
+    indice_productos.iniciar()
+    yield
+    await indice_productos.detener()
+    cerrar_mongo()
+    detener_logging()
 
 
 app = FastAPI(
     title="Backend Yorbis API",
     description="API para Ferretería Los Puentes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=BSONJSONResponse
 )
 
-# Middleware para normalizar URLs (eliminar dobles barras)
-class URLNormalizeMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware que normaliza las URLs eliminando dobles barras.
-    Soluciona el problema de /inventarios//items/{item_id} -> /inventarios/items/{item_id}
-    """
-    async def dispatch(self, request: Request, call_next):
-        # Obtener la URL original
-        path = request.url.path
-        
-        # Normalizar: eliminar dobles barras
-        normalized_path = re.sub(r'/+', '/', path)
-        # Asegurar que no termine con / (excepto si es solo /)
-        if normalized_path != '/' and normalized_path.endswith('/'):
-            normalized_path = normalized_path.rstrip('/')
-        
-        # Si la URL cambió, actualizar el scope del request
-        if normalized_path != path:
-            print(f"🔄 [MIDDLEWARE] Normalizando URL: {path} -> {normalized_path}")
-            # Actualizar el scope del request original
-            request.scope["path"] = normalized_path
-            request.scope["raw_path"] = normalized_path.encode()
-            # Actualizar también el path_info si existe
-            if "path_info" in request.scope:
-                request.scope["path_info"] = normalized_path
-        
-        response = await call_next(request)
-        return response
+# Métricas por ruta: se agrega primero para quedar dentro de la normalización de URLs
+# y ver la plantilla de ruta que asigna el router
+app.add_middleware(MetricsMiddleware)
 
 # Agregar middleware de normalización de URLs (antes de CORS)
 app.add_middleware(URLNormalizeMiddleware)
@@ -81,9 +84,8 @@ async def global_exception_handler(request: Request, exc: Exception):
     Manejador global de excepciones que asegura que los headers CORS
     se envíen incluso cuando hay errores 500.
     """
-    import traceback
     error_detail = str(exc)
-    traceback.print_exc()
+    logger.error("❌ Error no controlado en %s %s: %s", request.method, request.url.path, error_detail, exc_info=exc)
     
     # Determinar el código de estado
     status_code = 500
@@ -117,6 +119,37 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+def estadisticas_internas() -> dict:
+    return {
+        "cache_usuarios": estadisticas_cache_usuarios(),
+        "hash_contraseñas": estadisticas_hash_contraseñas(),
+        "mongo_pool": estadisticas_pool(),
+        "mongo_comandos": estadisticas_comandos(),
+        "consultas": estadisticas_consultas(),
+        "logging": estadisticas_logging(),
+        "indice_busqueda": estadisticas_indice_productos(),
+        "cache_codigos": estadisticas_cache_codigos(),
+        "autocompletado": estadisticas_autocompletado()
+    }
+
+@app.get("/stats")
+async def stats():
+    """
+    Contadores internos del proceso (cachés, colas, pools).
+    """
+    return estadisticas_internas()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métricas por ruta (latencia, códigos de estado, tamaño de respuesta) y
+    contadores internos en formato de texto de Prometheus.
+    """
+    return PlainTextResponse(
+        renderizar_prometheus(estadisticas_internas()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 
 app.include_router(example_router, prefix="/api/v1")
 app.include_router(auth.router)
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Body, Query, Depends
+from fastapi import HTTPException, Body, Query, Depends
+from app.core.responses import BSONRouter
 from app.schemas.auth import LoginInput, Cuadre
 from app.services.users_service import login_y_token
 from app.db.mongo import get_collection  # tu helper para acceder a la colección
+from app.db.consultas import ejecutar_consulta
+from app.db.paginacion import CursorInvalido, pagina_por_cursor
+from app.db.exportacion import respuesta_streaming
+from app.db.sincronizacion import TokenInvalido, TokenVencido, cambios_desde, marca_actualizacion, registrar_eliminado
+from app.core.logger import obtener_logger
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime, timedelta
@@ -9,7 +15,15 @@ import pytz
 from pydantic import BaseModel
 from typing import List, Optional
 from fastapi import Depends
-from app.core.get_current_user import get_current_user
+from app.core.get_current_user import get_current_user, invalidar_usuario_cache
+from app.search.indice_productos import indice_productos
+from app.search.buscador import buscar_modal_inventario
+from app.search.formato import con_stock_legado, formatear_item_inventario, normalizar_stock, stock_disponible
+from app.services.existencias_service import cargar_existencia
+from app.services.lotes_service import adjuntar_lotes, eliminar_lotes, lotes_por_vencer, reemplazar_lotes
+from app.services.precios_service import CAMPOS_PRECIO, aplicar_precios, calcular_precios
+from app.search.cache_codigos import cache_codigos
+from app.search.normalizacion import CAMPOS_NORMALIZADOS, CAMPOS_ORIGEN, claves_busqueda
 import os
 import boto3
 from botocore.config import Config
@@ -36,7 +50,8 @@ s3_client = boto3.client(
     config=Config(signature_version="s3v4")
 )
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 class Gasto(BaseModel):
     monto: float
@@ -128,10 +143,10 @@ async def obtener_usuarios_modificar(usuario_actual: dict = Depends(get_current_
                 del usuario["contraseña"]
             usuarios_limpios.append(usuario)
         
-        print(f"✅ [USUARIOS] Retornando {len(usuarios_limpios)} usuarios")
+        logger.debug("✅ [USUARIOS] Retornando %s usuarios", len(usuarios_limpios))
         return usuarios_limpios
     except Exception as e:
-        print(f"❌ [USUARIOS] Error obteniendo usuarios: {e}")
+        logger.error("❌ [USUARIOS] Error obteniendo usuarios: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/modificar-usuarios/me")
@@ -193,10 +208,9 @@ async def crear_usuario_nuevo(
     Requiere autenticación.
     """
     try:
-        from passlib.context import CryptContext
+        from app.core.auth import hashear_contraseña_async
         
         collection = get_collection("USUARIOS")
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         
         # Validar campos requeridos
         correo = usuario_data.get("correo", "").strip().lower()
@@ -213,7 +227,7 @@ async def crear_usuario_nuevo(
             raise HTTPException(status_code=400, detail=f"Ya existe un usuario con el correo '{correo}'")
         
         # Hashear contraseña
-        contraseña_hash = pwd_context.hash(contraseña)
+        contraseña_hash = await hashear_contraseña_async(contraseña)
         
         # Crear nuevo usuario
         nuevo_usuario = {
@@ -237,7 +251,7 @@ async def crear_usuario_nuevo(
         if "contraseña" in usuario_creado:
             del usuario_creado["contraseña"]
         
-        print(f"✅ [USUARIOS] Usuario creado: {correo} - ID: {usuario_id}")
+        logger.info("✅ [USUARIOS] Usuario creado: %s - ID: %s", correo, usuario_id)
         
         return {
             "message": "Usuario creado exitosamente",
@@ -248,7 +262,7 @@ async def crear_usuario_nuevo(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [USUARIOS] Error creando usuario: {e}")
+        logger.error("❌ [USUARIOS] Error creando usuario: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/modificar-usuarios/{usuario_id}")
@@ -262,10 +276,7 @@ async def actualizar_usuario(
     Requiere autenticación.
     """
     try:
-        from passlib.context import CryptContext
-        
         collection = get_collection("USUARIOS")
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         
         try:
             usuario_object_id = ObjectId(usuario_id)
@@ -302,9 +313,9 @@ async def actualizar_usuario(
                 )
             
             # Usar la función hashear_contraseña que maneja el truncado automáticamente
-            from app.core.auth import hashear_contraseña
+            from app.core.auth import hashear_contraseña_async
             try:
-                contraseña_hash = hashear_contraseña(contraseña_plana)
+                contraseña_hash = await hashear_contraseña_async(contraseña_plana)
                 update_data["contraseña"] = contraseña_hash
             except Exception as e:
                 raise HTTPException(
@@ -329,6 +340,7 @@ async def actualizar_usuario(
             {"_id": usuario_object_id},
             {"$set": update_data}
         )
+        invalidar_usuario_cache(usuario_existente.get("correo"), update_data.get("correo"))
         
         # Obtener usuario actualizado
         usuario_actualizado = await collection.find_one({"_id": usuario_object_id})
@@ -339,7 +351,7 @@ async def actualizar_usuario(
         if "contraseña" in usuario_actualizado:
             del usuario_actualizado["contraseña"]
         
-        print(f"✅ [USUARIOS] Usuario actualizado: {usuario_id}")
+        logger.info("✅ [USUARIOS] Usuario actualizado: %s", usuario_id)
         
         return {
             "message": "Usuario actualizado exitosamente",
@@ -349,7 +361,7 @@ async def actualizar_usuario(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [USUARIOS] Error actualizando usuario: {e}")
+        logger.error("❌ [USUARIOS] Error actualizando usuario: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/modificar-usuarios/{usuario_id}/permisos")
@@ -388,6 +400,7 @@ async def actualizar_permisos_usuario(
                 }
             }
         )
+        invalidar_usuario_cache(usuario_existente.get("correo"))
         
         # Obtener usuario actualizado
         usuario_actualizado = await collection.find_one({"_id": usuario_object_id})
@@ -398,7 +411,7 @@ async def actualizar_permisos_usuario(
         if "contraseña" in usuario_actualizado:
             del usuario_actualizado["contraseña"]
         
-        print(f"✅ [USUARIOS] Permisos actualizados para usuario: {usuario_id}")
+        logger.info("✅ [USUARIOS] Permisos actualizados para usuario: %s", usuario_id)
         
         return {
             "message": "Permisos actualizados exitosamente",
@@ -408,7 +421,7 @@ async def actualizar_permisos_usuario(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [USUARIOS] Error actualizando permisos: {e}")
+        logger.error("❌ [USUARIOS] Error actualizando permisos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/modificar-usuarios/{usuario_id}")
@@ -444,8 +457,9 @@ async def eliminar_usuario(
                 }
             }
         )
+        invalidar_usuario_cache(usuario_existente.get("correo"))
         
-        print(f"✅ [USUARIOS] Usuario marcado como inactivo: {usuario_id}")
+        logger.info("✅ [USUARIOS] Usuario marcado como inactivo: %s", usuario_id)
         
         return {
             "message": "Usuario eliminado exitosamente",
@@ -455,7 +469,7 @@ async def eliminar_usuario(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [USUARIOS] Error eliminando usuario: {e}")
+        logger.error("❌ [USUARIOS] Error eliminando usuario: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -492,24 +506,24 @@ async def get_my_user_info(usuario_actual: dict = Depends(get_current_user)):
 @router.post("/auth/login")
 async def login_user(data: LoginInput):
     try:
-        print(f"[LOGIN] Intento de login - Correo: {data.correo}")
+        logger.debug("[LOGIN] Intento de login - Correo: %s", data.correo)
         
         # Limpiar datos de entrada
         correo = data.correo.strip().lower() if data.correo else ""
         contraseña = data.contraseña.strip() if data.contraseña else ""
         
         if not correo or not contraseña:
-            print(f"[LOGIN] Correo o contraseña vacíos")
+            logger.debug("[LOGIN] Correo o contraseña vacíos")
             raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
         
         result = await login_y_token(correo, contraseña, return_user=True)
         if result is None:
-            print(f"[LOGIN] login_y_token retornó None")
+            logger.debug("[LOGIN] login_y_token retornó None")
             raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
         
         usuario, token = result
         if not token or not usuario:
-            print(f"[LOGIN] Token o usuario faltante")
+            logger.debug("[LOGIN] Token o usuario faltante")
             raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
         
         # El usuario debe ser un dict con el campo 'farmacias'
@@ -524,8 +538,8 @@ async def login_user(data: LoginInput):
         if "contraseña" in usuario_respuesta:
             del usuario_respuesta["contraseña"]
         
-        print(f"[LOGIN] Login exitoso para: {correo}")
-        print(f"[LOGIN] Permisos del usuario: {len(usuario_respuesta.get('permisos', []))}")
+        logger.debug("[LOGIN] Login exitoso para: %s", correo)
+        logger.debug("[LOGIN] Permisos del usuario: %s", len(usuario_respuesta.get('permisos', [])))
         
         return {
             "access_token": token,
@@ -535,9 +549,7 @@ async def login_user(data: LoginInput):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[LOGIN] Error en login: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[LOGIN] Error en login: %s", str(e))
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @router.get("/cuadres")
@@ -559,7 +571,6 @@ async def obtener_cuadres(
                     filtro["dia"] = {"$gte": fechaInicio, "$lte": fechaFin}
                 docs = await collection.find(filtro).to_list(length=None)
                 for r in docs:
-                    r["_id"] = str(r["_id"])
                     r["codigoFarmacia"] = nombre.replace("CUADRES-", "")
                 cuadres.extend(docs)
     else:
@@ -570,7 +581,6 @@ async def obtener_cuadres(
             filtro["dia"] = {"$gte": fechaInicio, "$lte": fechaFin}
         docs = await collection.find(filtro).to_list(length=None)
         for r in docs:
-            r["_id"] = str(r["_id"])
             r["codigoFarmacia"] = farmacia
         cuadres.extend(docs)
     return cuadres
@@ -585,7 +595,6 @@ async def obtener_todos_los_cuadres():
             collection = db[nombre]
             docs = await collection.find({}).to_list(length=None)
             for r in docs:
-                r["_id"] = str(r["_id"])
                 # Extraer el código de farmacia del nombre de la colección
                 r["codigoFarmacia"] = nombre.replace("CUADRES-", "")
             cuadres.extend(docs)
@@ -596,8 +605,6 @@ async def obtener_cuadres_farmacia(farmacia_id: str):
     try:
         collection = get_collection(f"CUADRES-{farmacia_id}")
         resultados = await collection.find({}).to_list(1000)
-        for r in resultados:
-            r["_id"] = str(r["_id"])
         return resultados
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -795,8 +802,6 @@ async def obtener_gastos(
         if estado:
             filtro["estado"] = estado
         resultados = await collection.find(filtro).to_list(1000)
-        for r in resultados:
-            r["_id"] = str(r["_id"])
         return resultados
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -865,7 +870,7 @@ async def crear_cajero(cajero: dict = Body(...)):
 async def actualizar_cajero(cajero_id: str, cajero: dict = Body(...)):
     try:
         collection = get_collection("CAJERO")
-        print(f"Actualizando cajero con ID: {cajero_id} con datos: {cajero}")
+        logger.debug("Actualizando cajero con ID: %s con datos: %s", cajero_id, cajero)
 
         # Convert _id to ObjectId
         try:
@@ -902,7 +907,7 @@ async def actualizar_cajero(cajero_id: str, cajero: dict = Body(...)):
             {"_id": ObjectId(cajero_id)},
             {"$set": mapped_cajero}
         )
-        print(f"Resultado de la actualización: {result.raw_result}")
+        logger.debug("Resultado de la actualización: %s", result.raw_result)
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Cajero no encontrado o sin cambios")
         return {"message": "Cajero actualizado exitosamente"}
@@ -1107,12 +1112,11 @@ async def agregar_cuenta_por_pagar(cuenta: CuentaPorPagar,usuario: dict = Depend
 
 @router.get("/cuentas-por-pagar")
 async def listar_cuentas_por_pagar(usuario: dict = Depends(get_current_user)):
-    print(usuario)
+    logger.debug("%s", usuario)
     try:
         collection = get_collection("CUENTAS_POR_PAGAR")
         cuentas = await collection.find({}).to_list(length=None)
         for c in cuentas:
-            c["_id"] = str(c["_id"])
             if isinstance(c["fechaEmision"], datetime):
                 c["fechaEmision"] = c["fechaEmision"].strftime("%Y-%m-%d")
             if "fechaRecepcion" in c and isinstance(c["fechaRecepcion"], datetime):
@@ -1148,15 +1152,19 @@ async def actualizar_estatus_cuenta_por_pagar(id: str, data: dict = Body(...)):
 
 @router.post("/inventarios")
 async def agregar_inventario(data: Inventario, usuario: dict = Depends(get_current_user)):
-    print(f"Usuario actual: {usuario}")
-    print(f"Datos del inventario: {data}")
+    logger.debug("Usuario actual: %s", usuario)
+    logger.debug("Datos del inventario: %s", data)
     try:
         collection = get_collection("INVENTARIOS")
         inventario_dict = data.dict()
         inventario_dict["usuarioCorreo"] = usuario.get("usuarioCorreo", data.usuarioCorreo)
         inventario_dict["fecha"] = datetime.now().strftime("%Y-%m-%d")
         inventario_dict["estado"] = "activo"  # Siempre activo al crear
+        aplicar_precios(inventario_dict)
+        inventario_dict.update(marca_actualizacion())
         result = await collection.insert_one(inventario_dict)
+        indice_productos.actualizar_documento(inventario_dict)
+        cache_codigos.invalidar_productos(inventario_dict)
         return {"message": "Inventario registrado exitosamente", "id": str(result.inserted_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1184,7 +1192,7 @@ async def listar_inventarios(
         # OPTIMIZACIÓN: Usar proyección y límite
         limit = min(limit or 500, 1000)  # Máximo 1000
         
-        print(f"🔍 [INVENTARIOS] Listando inventarios - farmacia: {farmacia}, limit: {limit}")
+        logger.debug("🔍 [INVENTARIOS] Listando inventarios - farmacia: %s, limit: %s", farmacia, limit)
         
         inventarios = await collection.find(
             filtro,
@@ -1196,29 +1204,7 @@ async def listar_inventarios(
                 "utilidad": 1, "porcentaje_utilidad": 1
             }
         ).sort("nombre", 1).limit(limit).to_list(length=limit)
-        
-        for inv in inventarios:
-            inv["_id"] = str(inv["_id"])
-            if "productoId" in inv and isinstance(inv["productoId"], ObjectId):
-                inv["productoId"] = str(inv["productoId"])
-            
-            # Calcular utilidad si no existe
-            costo = float(inv.get("costo", 0))
-            precio_venta = float(inv.get("precio_venta", 0))
-            
-            if costo > 0:
-                if not precio_venta or precio_venta == 0:
-                    precio_venta = costo / 0.60
-                    inv["precio_venta"] = round(precio_venta, 2)
-                
-                if "utilidad" not in inv or not inv.get("utilidad"):
-                    utilidad = precio_venta - costo
-                    inv["utilidad"] = round(utilidad, 2)
-                    inv["porcentaje_utilidad"] = 40.0
-                elif "porcentaje_utilidad" not in inv:
-                    inv["porcentaje_utilidad"] = 40.0
-        
-        return inventarios
+        return await adjuntar_lotes(inventarios)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1229,9 +1215,11 @@ async def actualizar_estado_inventario(id: str, data: dict = Body(...), usuario:
         if not nuevo_estado:
             raise HTTPException(status_code=400, detail="Falta el campo 'estado'")
         collection = get_collection("INVENTARIOS")
-        result = await collection.update_one({"_id": ObjectId(id)}, {"$set": {"estado": nuevo_estado}})
+        result = await collection.update_one({"_id": ObjectId(id)}, {"$set": {"estado": nuevo_estado, **marca_actualizacion()}})
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Inventario no encontrado o sin cambios")
+        cache_codigos.invalidar_productos(await collection.find_one({"_id": ObjectId(id)}, projection={"farmacia": 1, "codigo": 1}))
+        await indice_productos.refrescar(ObjectId(id))
         return {"message": f"Estado actualizado a {nuevo_estado}"}
     except InvalidId:
         raise HTTPException(status_code=400, detail="ID inválido")
@@ -1241,9 +1229,11 @@ async def actualizar_estado_inventario(id: str, data: dict = Body(...), usuario:
 # IMPORTANTE: Ruta específica sin ID debe ir ANTES de la ruta con {id}
 @router.get("/inventarios/items")
 async def obtener_items_inventario_sin_id(
+    request: Request,
     farmacia: Optional[str] = Query(None, description="Filtrar por farmacia"),
     limit: Optional[int] = Query(50, description="Límite de resultados (máximo 100, por defecto 50)"),
-    skip: Optional[int] = Query(0, description="Número de resultados a saltar (para paginación)"),
+    skip: Optional[int] = Query(0, description="Número de resultados a saltar (paginación antigua; usar cursor)"),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página, luego el next_cursor recibido"),
     usuario: dict = Depends(get_current_user)
 ):
     """
@@ -1253,25 +1243,29 @@ async def obtener_items_inventario_sin_id(
     OPTIMIZACIONES APLICADAS:
     - Proyección mínima (solo campos esenciales)
     - Solo productos activos
-    - Paginación (limit y skip)
+    - Paginación por cursor (keyset sobre nombre + _id): la página 200 cuesta lo mismo que la 1
+    - Paginación antigua con skip (se mantiene por compatibilidad)
     - Límite inicial reducido a 50 para carga rápida
     - Usa índice en estado + nombre para ordenamiento rápido
     - Procesamiento mínimo
+    - Tiempo máximo de listado; si el cliente se desconecta se cancela y se cierra el cursor
     
     Parámetros:
     - farmacia: ID de la farmacia (opcional)
     - limit: Límite de resultados (máximo 100, por defecto 50)
-    - skip: Número de resultados a saltar (para paginación, por defecto 0)
+    - skip: Número de resultados a saltar (paginación antigua, por defecto 0)
+    - cursor: Si se envía (vacío en la primera página), responde {"items": [...], "next_cursor": "..."};
+      next_cursor es null en la última página. Sin cursor responde el array de siempre.
     """
     try:
         collection = get_collection("INVENTARIOS")
         
         # OPTIMIZACIÓN: Proyección mínima (solo campos esenciales)
-        # IMPORTANTE: Incluir existencia y stock para sincronización con punto de venta
+        # existencia y stock se calculan desde cantidad al formatear
         proyeccion_minima = {
             "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
             "precio_venta": 1, "precio": 1, "marca": 1, 
-            "cantidad": 1, "existencia": 1, "stock": 1,  # Campos de stock
+            "cantidad": 1,  # Campo de stock
             "farmacia": 1, "costo": 1, "estado": 1, 
             "utilidad": 1, "porcentaje_utilidad": 1
         }
@@ -1287,68 +1281,29 @@ async def obtener_items_inventario_sin_id(
         limit_val = min(limit or 100, 500)  # Por defecto 100, máximo 500
         skip_val = max(skip or 0, 0)
         
-        print(f"🔍 [INVENTARIOS] Obteniendo items (sin ID - PAGINADO) - limit: {limit_val}, skip: {skip_val}, farmacia: {farmacia}")
+        logger.debug("🔍 [INVENTARIOS] Obteniendo items (sin ID - PAGINADO) - limit: %s, skip: %s, farmacia: %s", limit_val, skip_val, farmacia)
         
         # OPTIMIZACIÓN MÁXIMA: Proyección mínima, solo activos, paginación, límite reducido
         # Usa índice compuesto (farmacia + estado + nombre) para ordenamiento ultra rápido
         # Este índice cubre exactamente la consulta: filtro por farmacia + estado + orden por nombre
-        inventarios = await collection.find(
+        if cursor is not None:
+            # Keyset sobre (nombre, _id) con farmacia_nombre_id_estado_index (app/db/paginacion.py)
+            try:
+                inventarios, next_cursor = await ejecutar_consulta(
+                    "listado", pagina_por_cursor(collection, filtro, proyeccion_minima, limit_val, cursor), request
+                )
+            except CursorInvalido as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {"items": [formatear_item_inventario(inv) for inv in inventarios], "next_cursor": next_cursor}
+        
+        cursor_mongo = collection.find(
             filtro,
             projection=proyeccion_minima
-        ).sort("nombre", 1).skip(skip_val).limit(limit_val).to_list(length=limit_val)
+        ).sort("nombre", 1).skip(skip_val).limit(limit_val)
+        inventarios = await ejecutar_consulta("listado", cursor_mongo.to_list(length=limit_val), request, cursor_mongo)
         
         # OPTIMIZACIÓN: Procesamiento rápido y mínimo
-        resultados = []
-        for inv in inventarios:
-            # Convertir _id a string
-            inv_id = str(inv["_id"])
-            
-            # Calcular valores si no existen (procesamiento mínimo)
-            costo = float(inv.get("costo", 0))
-            precio_venta = float(inv.get("precio_venta") or inv.get("precio", 0))
-            
-            # Calcular precio_venta y utilidad si no están definidos
-            if costo > 0 and (precio_venta == 0 or "precio_venta" not in inv):
-                precio_venta = costo / 0.60  # 40% de utilidad
-            
-            utilidad = precio_venta - costo if precio_venta > 0 and costo > 0 else float(inv.get("utilidad", 0))
-            porcentaje_utilidad = float(inv.get("porcentaje_utilidad", 40.0)) if utilidad > 0 else 0.0
-            
-            # Obtener valores de stock (prioridad: existencia > cantidad > stock)
-            # IMPORTANTE: Usar misma lógica que punto de venta para sincronización
-            existencia = float(inv.get("existencia", 0))
-            cantidad_val = float(inv.get("cantidad", 0))
-            stock_val = float(inv.get("stock", 0))
-            
-            # Usar existencia como campo principal (igual que punto de venta)
-            if existencia > 0:
-                stock_disponible = existencia
-            elif cantidad_val > 0:
-                stock_disponible = cantidad_val
-            else:
-                stock_disponible = stock_val if stock_val > 0 else 0
-            
-            # Construir resultado optimizado
-            resultado = {
-                "_id": inv_id,
-                "id": inv_id,
-                "codigo": inv.get("codigo", ""),
-                "nombre": inv.get("nombre", ""),
-                "descripcion": inv.get("descripcion", ""),
-                "marca": inv.get("marca", ""),
-                "cantidad": float(stock_disponible),      # Usar existencia como valor
-                "existencia": float(stock_disponible),    # Campo principal
-                "stock": float(stock_disponible),         # Compatibilidad
-                "costo": round(costo, 2),
-                "precio_venta": round(precio_venta, 2),
-                "precio": round(precio_venta, 2),
-                "utilidad": round(utilidad, 2),
-                "porcentaje_utilidad": round(porcentaje_utilidad, 2),
-                "farmacia": inv.get("farmacia", ""),
-                "estado": inv.get("estado", "activo")
-            }
-            
-            resultados.append(resultado)
+        resultados = [formatear_item_inventario(inv) for inv in inventarios]
         
         # OPTIMIZACIÓN CRÍTICA: NO contar total para carga más rápida
         # El conteo puede ser muy lento con muchos productos (puede tomar varios segundos)
@@ -1357,23 +1312,121 @@ async def obtener_items_inventario_sin_id(
         # if skip_val == 0:
         #     total_count = await collection.count_documents(filtro)
         
-        print(f"✅ [INVENTARIOS] Retornando {len(resultados)} items (PAGINADO - sin ID) - Carga optimizada (sin conteo)")
+        logger.debug("✅ [INVENTARIOS] Retornando %s items (PAGINADO - sin ID) - Carga optimizada (sin conteo)", len(resultados))
         
         # IMPORTANTE: Retornar array directo para compatibilidad con frontend
         # Si el frontend necesita paginación, puede usar los parámetros limit y skip
         return resultados
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error obteniendo items: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error obteniendo items: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/inventarios/stream")
+async def exportar_items_inventario(
+    farmacia: Optional[str] = Query(None, description="Filtrar por farmacia"),
+    formato: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson (una línea por producto) o json (array)"),
+    usuario: dict = Depends(get_current_user)
+):
+    """
+    Exporta el catálogo completo (productos activos) en streaming, para las
+    cachés offline del punto de venta. Mismos campos que /inventarios/items.
+
+    - Sin límite ni paginación: los documentos se envían a medida que llegan
+      de Mongo (lotes de MONGO_BATCH_SIZE_EXPORTACION), la memoria del
+      servidor no crece con el tamaño del catálogo
+    - formato=ndjson (por defecto): un JSON por línea, application/x-ndjson
+    - formato=json: un solo array JSON enviado por partes
+    - Sin orden: se entrega en el orden natural de la consulta
+    """
+    try:
+        collection = get_collection("INVENTARIOS")
+        filtro = {"estado": {"$ne": "inactivo"}}
+        if farmacia and farmacia.strip():
+            filtro["farmacia"] = farmacia.strip()
+        proyeccion = {
+            "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
+            "precio_venta": 1, "precio": 1, "marca": 1,
+            "cantidad": 1,
+            "farmacia": 1, "costo": 1, "estado": 1,
+            "utilidad": 1, "porcentaje_utilidad": 1
+        }
+        logger.debug("📤 [INVENTARIOS] Exportando catálogo - farmacia: %s, formato: %s", farmacia, formato)
+        return respuesta_streaming(collection.find(filtro, projection=proyeccion), formatear_item_inventario, formato)
+    except Exception as e:
+        logger.exception("❌ [INVENTARIOS] Error exportando catálogo: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/inventarios/cambios")
+async def obtener_cambios_inventario(
+    request: Request,
+    farmacia: Optional[str] = Query(None, description="Filtrar por farmacia"),
+    desde: Optional[str] = Query(None, description="Token de la sincronización anterior (vacío = catálogo completo)"),
+    limite: int = Query(500, ge=1, le=2000, description="Cambios por respuesta"),
+    usuario: dict = Depends(get_current_user)
+):
+    """
+    Sincronización incremental para las cachés locales del punto de venta:
+    productos creados, modificados, desactivados o eliminados después de `desde`.
+
+    Response:
+    {
+      "productos": [...],     // creados o modificados (mismos campos que /inventarios/items)
+      "eliminados": ["..."],  // ids desactivados o eliminados: quitarlos de la caché
+      "token": "...",         // enviar como `desde` en la próxima llamada
+      "hay_mas": false        // true: llamar de nuevo enseguida con el token
+    }
+
+    Token inválido: 400. Token más viejo que SYNC_RETENCION_ELIMINADOS_DIAS: 410
+    (borrar la caché y sincronizar desde cero sin `desde`).
+    """
+    try:
+        farmacia_clean = farmacia.strip() if farmacia and farmacia.strip() else None
+        logger.debug("🔄 [INVENTARIOS] Cambios - farmacia: %s, desde: %s, limite: %s", farmacia_clean, desde, limite)
+        return await ejecutar_consulta("listado", cambios_desde(farmacia_clean, desde, limite), request)
+    except TokenInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TokenVencido as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ [INVENTARIOS] Error obteniendo cambios: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/inventarios/lotes/por-vencer")
+async def obtener_lotes_por_vencer(
+    request: Request,
+    farmacia: str = Query(..., description="ID de la farmacia"),
+    dias: int = Query(30, ge=0, le=3650, description="Vencen dentro de estos días (incluye los ya vencidos)"),
+    limite: int = Query(500, ge=1, le=5000, description="Máximo de lotes"),
+    usuario: dict = Depends(get_current_user)
+):
+    """
+    Reporte de lotes con existencia que vencen en los próximos `dias` días,
+    del más próximo al más lejano (índice farmacia_vencimiento_index).
+
+    Response: [{"producto_id", "codigo", "nombre", "lote", "fecha_vencimiento",
+    "dias_restantes", "vencido", "cantidad", "costo", "valor"}]
+    """
+    try:
+        farmacia_clean = farmacia.strip()
+        logger.debug("📅 [INVENTARIOS] Lotes por vencer - farmacia: %s, dias: %s, limite: %s", farmacia_clean, dias, limite)
+        return await ejecutar_consulta("reporte", lotes_por_vencer(farmacia_clean, dias, limite), request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ [INVENTARIOS] Error obteniendo lotes por vencer: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/inventarios/{id}/items")
 async def obtener_items_inventario(
     id: str,
     limit: Optional[int] = Query(50, description="Límite de resultados (máximo 100, por defecto 50)"),
-    skip: Optional[int] = Query(0, description="Número de resultados a saltar (para paginación)"),
+    skip: Optional[int] = Query(0, description="Número de resultados a saltar (paginación antigua; usar cursor)"),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página, luego el next_cursor recibido"),
     usuario: dict = Depends(get_current_user)
 ):
     """
@@ -1384,20 +1437,23 @@ async def obtener_items_inventario(
     
     OPTIMIZACIONES APLICADAS:
     - Proyección mínima (solo campos esenciales)
-    - Paginación (limit y skip)
+    - Paginación por cursor (keyset sobre nombre + _id) o con skip (compatibilidad)
     - Uso eficiente de índices
     - Procesamiento rápido de resultados
     - Límite inicial reducido a 50 para carga rápida
+    
+    Con `cursor` (vacío en la primera página) responde {"items": [...], "next_cursor": "..."};
+    sin cursor responde el array de siempre.
     """
     try:
         collection = get_collection("INVENTARIOS")
         
         # OPTIMIZACIÓN: Proyección mínima (solo campos esenciales)
-        # IMPORTANTE: Incluir existencia y stock para sincronización con punto de venta
+        # existencia y stock se calculan desde cantidad al formatear
         proyeccion_minima = {
             "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
             "precio_venta": 1, "precio": 1, "marca": 1, 
-            "cantidad": 1, "existencia": 1, "stock": 1,  # Campos de stock
+            "cantidad": 1,  # Campo de stock
             "farmacia": 1, "costo": 1, "estado": 1, 
             "utilidad": 1, "porcentaje_utilidad": 1
         }
@@ -1405,6 +1461,7 @@ async def obtener_items_inventario(
         # Limitar el límite a máximo 100 para velocidad
         limit_val = min(limit or 50, 100)
         skip_val = max(skip or 0, 0)
+        next_cursor = None
         
         # Intentar primero como ObjectId (inventario específico) - MÁS RÁPIDO
         try:
@@ -1420,63 +1477,20 @@ async def obtener_items_inventario(
         except (InvalidId, ValueError):
             # Si no es un ObjectId válido, tratar como ID de farmacia
             # OPTIMIZACIÓN: Buscar directamente por farmacia (usa índice) con paginación
-            inventarios = await collection.find(
-                {"farmacia": id.strip(), "estado": {"$ne": "inactivo"}},
-                projection=proyeccion_minima
-            ).sort("nombre", 1).skip(skip_val).limit(limit_val).to_list(length=limit_val)
+            filtro = {"farmacia": id.strip(), "estado": {"$ne": "inactivo"}}
+            if cursor is not None:
+                try:
+                    inventarios, next_cursor = await pagina_por_cursor(collection, filtro, proyeccion_minima, limit_val, cursor)
+                except CursorInvalido as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            else:
+                inventarios = await collection.find(
+                    filtro,
+                    projection=proyeccion_minima
+                ).sort("nombre", 1).skip(skip_val).limit(limit_val).to_list(length=limit_val)
         
         # OPTIMIZACIÓN: Procesamiento rápido y mínimo
-        resultados = []
-        for inv in inventarios:
-            # Convertir _id a string
-            inv_id = str(inv["_id"])
-            
-            # Calcular valores si no existen (procesamiento mínimo)
-            costo = float(inv.get("costo", 0))
-            precio_venta = float(inv.get("precio_venta") or inv.get("precio", 0))
-            
-            # Calcular precio_venta y utilidad si no están definidos
-            if costo > 0 and (precio_venta == 0 or "precio_venta" not in inv):
-                precio_venta = costo / 0.60  # 40% de utilidad
-            
-            utilidad = precio_venta - costo if precio_venta > 0 and costo > 0 else float(inv.get("utilidad", 0))
-            porcentaje_utilidad = float(inv.get("porcentaje_utilidad", 40.0)) if utilidad > 0 else 0.0
-            
-            # Obtener valores de stock (prioridad: existencia > cantidad > stock)
-            # IMPORTANTE: Usar misma lógica que punto de venta para sincronización
-            existencia = float(inv.get("existencia", 0))
-            cantidad_val = float(inv.get("cantidad", 0))
-            stock_val = float(inv.get("stock", 0))
-            
-            # Usar existencia como campo principal (igual que punto de venta)
-            if existencia > 0:
-                stock_disponible = existencia
-            elif cantidad_val > 0:
-                stock_disponible = cantidad_val
-            else:
-                stock_disponible = stock_val if stock_val > 0 else 0
-            
-            # Construir resultado optimizado
-            resultado = {
-                "_id": inv_id,
-                "id": inv_id,
-                "codigo": inv.get("codigo", ""),
-                "nombre": inv.get("nombre", ""),
-                "descripcion": inv.get("descripcion", ""),
-                "marca": inv.get("marca", ""),
-                "cantidad": float(stock_disponible),      # Usar existencia como valor
-                "existencia": float(stock_disponible),    # Campo principal
-                "stock": float(stock_disponible),         # Compatibilidad
-                "costo": round(costo, 2),
-                "precio_venta": round(precio_venta, 2),
-                "precio": round(precio_venta, 2),
-                "utilidad": round(utilidad, 2),
-                "porcentaje_utilidad": round(porcentaje_utilidad, 2),
-                "farmacia": inv.get("farmacia", ""),
-                "estado": inv.get("estado", "activo")
-            }
-            
-            resultados.append(resultado)
+        resultados = [formatear_item_inventario(inv) for inv in inventarios]
         
         # OPTIMIZACIÓN CRÍTICA: NO contar total para carga más rápida
         # El conteo puede ser muy lento con muchos productos (puede tomar varios segundos)
@@ -1488,17 +1502,81 @@ async def obtener_items_inventario(
         #     if skip_val == 0:
         #         total_count = await collection.count_documents({"farmacia": id.strip(), "estado": {"$ne": "inactivo"}})
         
-        print(f"✅ [INVENTARIOS] Retornando {len(resultados)} items (PAGINADO - con ID) - Carga optimizada (sin conteo)")
+        logger.debug("✅ [INVENTARIOS] Retornando %s items (PAGINADO - con ID) - Carga optimizada (sin conteo)", len(resultados))
         
+        if cursor is not None:
+            return {"items": resultados, "next_cursor": next_cursor}
         # IMPORTANTE: Retornar array directo para compatibilidad con frontend
         return resultados
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error obteniendo items: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error obteniendo items: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Debe declararse antes de /inventarios/{id}: las rutas se resuelven en orden y "buscar" se tomaría como id
+@router.get("/inventarios/buscar")
+async def buscar_productos_inventario_modal(
+    request: Request,
+    q: Optional[str] = Query(None, description="Término de búsqueda (código, nombre, descripción)"),
+    farmacia: Optional[str] = Query(None, description="ID de la farmacia"),
+    limit: Optional[int] = Query(50, description="Límite de resultados (máximo 50)"),
+    usuario: dict = Depends(get_current_user)
+):
+    """
+    Búsqueda ULTRA RÁPIDA de productos en inventario para modal de carga masiva.
+    Optimizado para responder en menos de 5 segundos.
+    
+    OPTIMIZACIONES:
+    - Búsqueda exacta por código primero (instantánea con índice)
+    - Búsqueda por prefijo en código y nombre (campos indexados)
+    - Búsqueda parcial en descripción si no hay resultados
+    - Los tres niveles en UNA sola consulta ($unionWith) en lugar de 3 seguidas
+    - Proyección mínima (solo campos esenciales)
+    - Límite máximo de 50 resultados
+    - Solo productos activos
+    - Sin procesamiento pesado
+    
+    Parámetros:
+    - q: Término de búsqueda (código, nombre o descripción) - opcional
+    - farmacia: ID de la farmacia (opcional)
+    - limit: Límite de resultados (máximo 50, por defecto 50)
+    
+    Response: Array de productos con campos mínimos
+    """
+    try:
+        # Manejar parámetro q que puede ser None o string vacío
+        if q is None:
+            return []
+        query_term = str(q).strip() if q else ""
+        if not query_term:
+            return []
+        
+        # Limitar el límite a máximo 50 para velocidad
+        limit = min(limit or 50, 50)
+        
+        logger.debug("🔍 [INVENTARIOS-MODAL] Búsqueda rápida: '%s' (límite: %s)", query_term, limit)
+        
+        collection = get_collection("INVENTARIOS")
+        
+        # Código exacto, prefijo de nombre y coincidencias parciales en un solo aggregate (app/search/buscador.py)
+        resultados = await ejecutar_consulta("busqueda", buscar_modal_inventario(
+            collection,
+            query_term,
+            farmacia.strip() if farmacia and farmacia.strip() else None,
+            limit
+        ), request)
+        
+        logger.debug("✅ [INVENTARIOS-MODAL] Búsqueda completada: %s resultados en <5s", len(resultados))
+        return resultados
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ [INVENTARIOS-MODAL] Error en búsqueda: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al buscar productos: {str(e)}")
+
 @router.get("/inventarios/{id}")
 async def obtener_inventario(id: str, usuario: dict = Depends(get_current_user)):
     """
@@ -1516,27 +1594,8 @@ async def obtener_inventario(id: str, usuario: dict = Depends(get_current_user))
         if not inventario:
             raise HTTPException(status_code=404, detail="Inventario no encontrado")
         
-        inventario["_id"] = str(inventario["_id"])
-        if "productoId" in inventario and isinstance(inventario["productoId"], ObjectId):
-            inventario["productoId"] = str(inventario["productoId"])
-        
-        # Calcular utilidad si no existe
-        costo = float(inventario.get("costo", 0))
-        precio_venta = float(inventario.get("precio_venta", 0))
-        
-        if costo > 0:
-            if not precio_venta or precio_venta == 0:
-                precio_venta = costo / 0.60
-                inventario["precio_venta"] = round(precio_venta, 2)
-            
-            if "utilidad" not in inventario or not inventario.get("utilidad"):
-                utilidad = precio_venta - costo
-                inventario["utilidad"] = round(utilidad, 2)
-                inventario["porcentaje_utilidad"] = 40.0
-            elif "porcentaje_utilidad" not in inventario:
-                inventario["porcentaje_utilidad"] = 40.0
-        
-        return inventario
+        await adjuntar_lotes([inventario])
+        return con_stock_legado(inventario)
     except HTTPException:
         raise
     except Exception as e:
@@ -1554,7 +1613,7 @@ async def eliminar_item_inventario(
     El {item_id} es el ID del item a eliminar (puede tener formato especial como "id_codigo").
     """
     try:
-        print(f"🗑️ [INVENTARIOS] Eliminando item: {item_id} de inventario: {id}")
+        logger.debug("🗑️ [INVENTARIOS] Eliminando item: %s de inventario: %s", item_id, id)
         collection = get_collection("INVENTARIOS")
         
         # El item_id puede venir en formato "id_codigo" o solo "id"
@@ -1577,11 +1636,15 @@ async def eliminar_item_inventario(
                 if id and id.strip():
                     filtro["farmacia"] = id.strip()
             
-            resultado = await collection.delete_one(filtro)
-            if resultado.deleted_count == 0:
+            eliminado = await collection.find_one_and_delete(filtro, projection={"_id": 1, "farmacia": 1, "codigo": 1})
+            if eliminado is None:
                 raise HTTPException(status_code=404, detail="Item de inventario no encontrado")
+            indice_productos.eliminar(eliminado["_id"])
+            cache_codigos.invalidar_productos(eliminado)
+            await registrar_eliminado(eliminado)
+            await eliminar_lotes(eliminado["_id"])
             
-            print(f"✅ [INVENTARIOS] Item eliminado por código: {item_id}")
+            logger.info("✅ [INVENTARIOS] Item eliminado por código: %s", item_id)
             return {"message": "Item de inventario eliminado exitosamente", "id": item_id}
         
         # Buscar y eliminar por ObjectId
@@ -1602,16 +1665,18 @@ async def eliminar_item_inventario(
         
         if resultado.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Item de inventario no encontrado")
+        indice_productos.eliminar(item_object_id)
+        cache_codigos.invalidar_productos(item)
+        await registrar_eliminado(item)
+        await eliminar_lotes(item["_id"])
         
-        print(f"✅ [INVENTARIOS] Item eliminado: {item_id_real}")
+        logger.info("✅ [INVENTARIOS] Item eliminado: %s", item_id_real)
         return {"message": "Item de inventario eliminado exitosamente", "id": item_id_real}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error eliminando item: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error eliminando item: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 async def _actualizar_item_inventario_internal(
@@ -1626,7 +1691,7 @@ async def _actualizar_item_inventario_internal(
     collection = get_collection("INVENTARIOS")
     
     # DEBUG: Log de datos recibidos
-    print(f"📝 [INVENTARIOS] Datos recibidos para actualizar item {item_id}: {data}")
+    logger.debug("📝 [INVENTARIOS] Datos recibidos para actualizar item %s: %s", item_id, data)
     
     # El item_id puede venir en formato "id_codigo" o solo "id"
     item_id_real = item_id.split("_")[0] if "_" in item_id else item_id
@@ -1641,11 +1706,11 @@ async def _actualizar_item_inventario_internal(
             inventario = await collection.find_one({"_id": inventario_object_id})
             if inventario:
                 farmacia_id = inventario.get("farmacia")
-                print(f"🔍 [INVENTARIOS] ID de inventario detectado, farmacia encontrada: {farmacia_id}")
+                logger.debug("🔍 [INVENTARIOS] ID de inventario detectado, farmacia encontrada: %s", farmacia_id)
         except (InvalidId, ValueError):
             # Si no es ObjectId, asumir que es el ID de la farmacia directamente
             farmacia_id = id_clean
-            print(f"🔍 [INVENTARIOS] ID de farmacia detectado: {farmacia_id}")
+            logger.debug("🔍 [INVENTARIOS] ID de farmacia detectado: %s", farmacia_id)
     
     try:
         item_object_id = ObjectId(item_id_real)
@@ -1661,7 +1726,7 @@ async def _actualizar_item_inventario_internal(
             if farmacia_id:
                 filtro["farmacia"] = farmacia_id
         
-        print(f"🔍 [INVENTARIOS] Buscando item por código con filtro: {filtro}")
+        logger.debug("🔍 [INVENTARIOS] Buscando item por código con filtro: %s", filtro)
         
         # Buscar el item
         item = await collection.find_one(filtro)
@@ -1669,14 +1734,14 @@ async def _actualizar_item_inventario_internal(
             # Si no se encuentra con filtro de farmacia, intentar sin filtro
             if farmacia_id:
                 filtro_sin_farmacia = {"codigo": item_id if not "_" in item_id else "_".join(item_id.split("_")[1:])}
-                print(f"🔍 [INVENTARIOS] No encontrado con filtro de farmacia, intentando sin filtro: {filtro_sin_farmacia}")
+                logger.debug("🔍 [INVENTARIOS] No encontrado con filtro de farmacia, intentando sin filtro: %s", filtro_sin_farmacia)
                 item = await collection.find_one(filtro_sin_farmacia)
             
             if not item:
                 raise HTTPException(status_code=404, detail=f"Item de inventario no encontrado (código: {item_id}, farmacia: {farmacia_id})")
         
         item_object_id = item["_id"]
-        print(f"✅ [INVENTARIOS] Item encontrado: {item_object_id}")
+        logger.debug("✅ [INVENTARIOS] Item encontrado: %s", item_object_id)
     
     # No permitir actualizar el _id
     if "_id" in data:
@@ -1687,62 +1752,30 @@ async def _actualizar_item_inventario_internal(
     if not item_actual:
         raise HTTPException(status_code=404, detail="Item de inventario no encontrado")
     
-    costo_actual = float(item_actual.get("costo", 0)) if item_actual else 0
-    precio_venta_actual = float(item_actual.get("precio_venta", 0)) if item_actual else 0
+    logger.debug("📊 [INVENTARIOS] Valores actuales - Costo: %s, Precio venta: %s", item_actual.get("costo", 0), item_actual.get("precio_venta", 0))
     
-    print(f"📊 [INVENTARIOS] Valores actuales - Costo: {costo_actual}, Precio venta: {precio_venta_actual}")
+    # Precios finales con las reglas de precios_service: si cambia el costo sin
+    # precio se recalcula con el porcentaje; lo que no venga se toma del actual
+    aplicar_precios(data, item_actual)
     
-    # Si se actualiza el costo, recalcular precio_venta y utilidad con 40%
-    if "costo" in data:
-        nuevo_costo = float(data["costo"])
-        # Si no viene precio_venta explícito, calcular con 40% de utilidad
-        if "precio_venta" not in data or not data.get("precio_venta"):
-            data["precio_venta"] = nuevo_costo / 0.60
-            data["utilidad"] = round(data["precio_venta"] - nuevo_costo, 2)
-            data["porcentaje_utilidad"] = 40.0
-        else:
-            # Si viene precio_venta, calcular utilidad basada en ese precio
-            nuevo_precio_venta = float(data["precio_venta"])
-            data["utilidad"] = round(nuevo_precio_venta - nuevo_costo, 2)
-            if nuevo_costo > 0:
-                data["porcentaje_utilidad"] = round((data["utilidad"] / nuevo_costo) * 100, 2)
-            else:
-                data["porcentaje_utilidad"] = 0.0
+    # existencia/stock del cliente se guardan como cantidad
+    normalizar_stock(data)
+    # Los lotes van en su colección (LOTES), no en el producto
+    lotes = data.pop("lotes", None)
     
-    # Si solo se actualiza precio_venta (sin costo), recalcular utilidad
-    elif "precio_venta" in data and "costo" not in data:
-        nuevo_precio_venta = float(data["precio_venta"])
-        print(f"💰 [INVENTARIOS] Actualizando precio_venta: {precio_venta_actual} -> {nuevo_precio_venta}")
-        if costo_actual > 0:
-            data["utilidad"] = round(nuevo_precio_venta - costo_actual, 2)
-            data["porcentaje_utilidad"] = round((data["utilidad"] / costo_actual) * 100, 2)
-        else:
-            data["utilidad"] = 0.0
-            data["porcentaje_utilidad"] = 0.0
-        # Asegurar que también se actualice el campo "precio" si existe
-        if "precio" not in data:
-            data["precio"] = nuevo_precio_venta
-    
-    # Si no se actualiza ni costo ni precio_venta, pero faltan campos de utilidad, calcularlos
-    elif "costo" not in data and "precio_venta" not in data:
-        if costo_actual > 0 and precio_venta_actual > 0:
-            # Recalcular utilidad con los valores actuales
-            utilidad_calculada = precio_venta_actual - costo_actual
-            porcentaje_calculado = (utilidad_calculada / costo_actual) * 100 if costo_actual > 0 else 0
-            data["utilidad"] = round(utilidad_calculada, 2)
-            data["porcentaje_utilidad"] = round(porcentaje_calculado, 2)
-        elif costo_actual > 0 and (not precio_venta_actual or precio_venta_actual == 0):
-            # Si hay costo pero no precio_venta, calcular con 40%
-            data["precio_venta"] = costo_actual / 0.60
-            data["utilidad"] = round(data["precio_venta"] - costo_actual, 2)
-            data["porcentaje_utilidad"] = 40.0
+    # Claves de búsqueda normalizadas: las calcula el backend, nunca el cliente
+    for campo in CAMPOS_NORMALIZADOS:
+        data.pop(campo, None)
+    if any(campo in data for campo in CAMPOS_ORIGEN):
+        data.update(claves_busqueda({**item_actual, **data}))
     
     # Agregar información de actualización
     data["usuarioActualizacion"] = usuario.get("correo", "unknown")
     data["fechaActualizacion"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    data.update(marca_actualizacion())
     
     # DEBUG: Log de datos que se van a guardar
-    print(f"💾 [INVENTARIOS] Guardando datos: {data}")
+    logger.debug("💾 [INVENTARIOS] Guardando datos: %s", data)
     
     resultado = await collection.update_one(
         {"_id": item_object_id},
@@ -1752,18 +1785,21 @@ async def _actualizar_item_inventario_internal(
     if resultado.modified_count == 0:
         raise HTTPException(status_code=404, detail="Item de inventario no encontrado o sin cambios")
     
-    print(f"✅ [INVENTARIOS] Item actualizado exitosamente. Modified count: {resultado.modified_count}")
+    logger.debug("✅ [INVENTARIOS] Item actualizado exitosamente. Modified count: %s", resultado.modified_count)
+    
+    if lotes is not None:
+        await reemplazar_lotes(item_actual, lotes)
     
     # Obtener el item actualizado
     item_actualizado = await collection.find_one({"_id": item_object_id})
-    item_actualizado["_id"] = str(item_actualizado["_id"])
-    if "productoId" in item_actualizado and isinstance(item_actualizado["productoId"], ObjectId):
-        item_actualizado["productoId"] = str(item_actualizado["productoId"])
+    indice_productos.actualizar_documento(item_actualizado)
+    cache_codigos.invalidar_productos(item_actual, item_actualizado)
     
-    print(f"✅ [INVENTARIOS] Item actualizado: {item_id_real}")
+    logger.info("✅ [INVENTARIOS] Item actualizado: %s", item_id_real)
+    await adjuntar_lotes([item_actualizado])
     return {
         "message": "Item de inventario actualizado exitosamente",
-        "item": item_actualizado
+        "item": con_stock_legado(item_actualizado)
     }
 
 # IMPORTANTE: Las rutas más específicas deben ir ANTES que las más generales
@@ -1782,16 +1818,14 @@ async def actualizar_item_inventario_sin_id(
     (después de normalización del middleware: /inventarios//items/{item_id} -> /inventarios/items/{item_id})
     """
     try:
-        print(f"✏️ [INVENTARIOS] Actualizando item: {item_id} (sin ID de farmacia - ruta específica)")
+        logger.debug("✏️ [INVENTARIOS] Actualizando item: %s (sin ID de farmacia - ruta específica)", item_id)
         
         return await _actualizar_item_inventario_internal(item_id, data, "", usuario)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error actualizando item: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error actualizando item: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/inventarios/{id}/items/{item_id}")
@@ -1811,16 +1845,14 @@ async def actualizar_item_inventario(
     try:
         # Manejar caso cuando id está vacío (doble barra //)
         id_clean = id.strip() if id else ""
-        print(f"✏️ [INVENTARIOS] Actualizando item: {item_id} de inventario: '{id_clean}' (vacío: {not id_clean})")
+        logger.debug("✏️ [INVENTARIOS] Actualizando item: %s de inventario: '%s' (vacío: %s)", item_id, id_clean, not id_clean)
         
         return await _actualizar_item_inventario_internal(item_id, data, id_clean, usuario)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error actualizando item: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error actualizando item: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/inventarios/{inventario_id}/items/{item_id}")
@@ -1846,7 +1878,7 @@ async def eliminar_item_inventario_por_id(
         # Limpiar inventario_id si está vacío
         inventario_id_clean = inventario_id.strip() if inventario_id else ""
         
-        print(f"🗑️ [INVENTARIOS] Eliminando item por ID: {item_id} (sin restricciones de farmacia)")
+        logger.debug("🗑️ [INVENTARIOS] Eliminando item por ID: %s (sin restricciones de farmacia)", item_id)
         
         # Validar que item_id sea un ObjectId válido
         try:
@@ -1872,7 +1904,7 @@ async def eliminar_item_inventario_por_id(
         nombre_item = item.get("nombre", "N/A")
         farmacia_item = item.get("farmacia", "N/A")
         
-        print(f"   Item encontrado: {codigo_item} - {nombre_item} (Farmacia: {farmacia_item}) - Eliminando sin restricciones")
+        logger.debug("   Item encontrado: %s - %s (Farmacia: %s) - Eliminando sin restricciones", codigo_item, nombre_item, farmacia_item)
         
         # Eliminar el item
         resultado = await collection.delete_one({"_id": item_object_id})
@@ -1882,8 +1914,12 @@ async def eliminar_item_inventario_por_id(
                 status_code=500,
                 detail="No se pudo eliminar el item (deleted_count = 0)"
             )
+        indice_productos.eliminar(item_object_id)
+        cache_codigos.invalidar_productos(item)
+        await registrar_eliminado(item)
+        await eliminar_lotes(item["_id"])
         
-        print(f"✅ [INVENTARIOS] Item eliminado exitosamente: {item_id} ({codigo_item})")
+        logger.info("✅ [INVENTARIOS] Item eliminado exitosamente: %s (%s)", item_id, codigo_item)
         
         return {
             "message": "Item eliminado exitosamente",
@@ -1896,9 +1932,7 @@ async def eliminar_item_inventario_por_id(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error eliminando item por ID: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error eliminando item por ID: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/inventarios/{inventario_id}/items/codigo/{codigo}")
@@ -1924,7 +1958,7 @@ async def eliminar_item_inventario_por_codigo(
         # Limpiar inventario_id si está vacío
         inventario_id_clean = inventario_id.strip() if inventario_id else ""
         
-        print(f"🗑️ [INVENTARIOS] Eliminando item por código: {codigo} (sin restricciones de farmacia)")
+        logger.debug("🗑️ [INVENTARIOS] Eliminando item por código: %s (sin restricciones de farmacia)", codigo)
         
         # IMPORTANTE: Buscar el producto por código SIN filtrar por farmacia
         # Esto permite eliminar cualquier producto sin importar a qué farmacia pertenezca
@@ -1947,7 +1981,7 @@ async def eliminar_item_inventario_por_codigo(
         nombre_item = item.get("nombre", "N/A")
         farmacia_item = item.get("farmacia", "N/A")
         
-        print(f"   Item encontrado: {codigo_item} - {nombre_item} (ID: {item_id}, Farmacia: {farmacia_item})")
+        logger.debug("   Item encontrado: %s - %s (ID: %s, Farmacia: %s)", codigo_item, nombre_item, item_id, farmacia_item)
         
         # Eliminar el item
         resultado = await collection.delete_one({"_id": item["_id"]})
@@ -1957,8 +1991,12 @@ async def eliminar_item_inventario_por_codigo(
                 status_code=500,
                 detail="No se pudo eliminar el item (deleted_count = 0)"
             )
+        indice_productos.eliminar(item["_id"])
+        cache_codigos.invalidar_productos(item)
+        await registrar_eliminado(item)
+        await eliminar_lotes(item["_id"])
         
-        print(f"✅ [INVENTARIOS] Item eliminado exitosamente por código: {codigo} (ID: {item_id})")
+        logger.info("✅ [INVENTARIOS] Item eliminado exitosamente por código: %s (ID: %s)", codigo, item_id)
         
         return {
             "message": "Item eliminado exitosamente",
@@ -1971,183 +2009,9 @@ async def eliminar_item_inventario_por_codigo(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error eliminando item por código: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error eliminando item por código: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/inventarios/buscar")
-async def buscar_productos_inventario_modal(
-    q: Optional[str] = Query(None, description="Término de búsqueda (código, nombre, descripción)"),
-    farmacia: Optional[str] = Query(None, description="ID de la farmacia"),
-    limit: Optional[int] = Query(50, description="Límite de resultados (máximo 50)"),
-    usuario: dict = Depends(get_current_user)
-):
-    """
-    Búsqueda ULTRA RÁPIDA de productos en inventario para modal de carga masiva.
-    Optimizado para responder en menos de 5 segundos.
-    
-    OPTIMIZACIONES:
-    - Búsqueda exacta por código primero (instantánea con índice)
-    - Búsqueda por prefijo en código y nombre (campos indexados)
-    - Búsqueda parcial en descripción si no hay resultados
-    - Proyección mínima (solo campos esenciales)
-    - Límite máximo de 50 resultados
-    - Solo productos activos
-    - Sin procesamiento pesado
-    
-    Parámetros:
-    - q: Término de búsqueda (código, nombre o descripción) - opcional
-    - farmacia: ID de la farmacia (opcional)
-    - limit: Límite de resultados (máximo 50, por defecto 50)
-    
-    Response: Array de productos con campos mínimos
-    """
-    try:
-        # Manejar parámetro q que puede ser None o string vacío
-        if q is None:
-            return []
-        query_term = str(q).strip() if q else ""
-        if not query_term:
-            return []
-        
-        # Limitar el límite a máximo 50 para velocidad
-        limit = min(limit or 50, 50)
-        
-        print(f"🔍 [INVENTARIOS-MODAL] Búsqueda rápida: '{query_term}' (límite: {limit})")
-        
-        collection = get_collection("INVENTARIOS")
-        
-        # Construir filtro base (solo activos)
-        filtro = {"estado": {"$ne": "inactivo"}}
-        
-        # Filtrar por farmacia si se especifica
-        if farmacia and farmacia.strip():
-            filtro["farmacia"] = farmacia.strip()
-        
-        # PROYECCIÓN MÍNIMA (solo campos esenciales para el modal)
-        # IMPORTANTE: Incluir "cantidad" para mostrar existencia actualizada
-        proyeccion_minima = {
-            "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
-            "cantidad": 1, "costo": 1, "precio_venta": 1, "precio": 1,
-            "farmacia": 1, "marca": 1, "utilidad": 1, "porcentaje_utilidad": 1
-        }
-        
-        # OPTIMIZACIÓN 1: Búsqueda exacta por código primero (MUY RÁPIDA con índice)
-        # IMPORTANTE: Consultar directamente de la BD sin caché para obtener datos actualizados
-        codigo_filtro = {**filtro, "codigo": query_term.upper()}
-        producto_exacto = await collection.find_one(
-            codigo_filtro,
-            projection=proyeccion_minima
-        )
-        
-        # Si no encontramos por código exacto, buscar por nombre/descripción
-        if not producto_exacto:
-            # Buscar también por nombre exacto (sin regex para más velocidad)
-            nombre_filtro = {**filtro, "nombre": {"$regex": f"^{re.escape(query_term)}", "$options": "i"}}
-            producto_exacto = await collection.find_one(
-                nombre_filtro,
-                projection=proyeccion_minima
-            )
-        
-        resultados = []
-        
-        if producto_exacto:
-            # Si encontramos coincidencia exacta, agregarla primero
-            producto_exacto["_id"] = str(producto_exacto["_id"])
-            # Calcular valores si faltan
-            costo = float(producto_exacto.get("costo", 0))
-            precio_venta = float(producto_exacto.get("precio_venta") or producto_exacto.get("precio", 0))
-            if costo > 0 and precio_venta == 0:
-                precio_venta = costo / 0.60
-            utilidad = precio_venta - costo if precio_venta > 0 and costo > 0 else float(producto_exacto.get("utilidad", 0))
-            porcentaje_utilidad = float(producto_exacto.get("porcentaje_utilidad", 40.0)) if utilidad > 0 else 0.0
-            
-            # IMPORTANTE: Obtener cantidad directamente de la BD (sin redondeo para mostrar valor exacto)
-            cantidad_actual_exacto = float(producto_exacto.get("cantidad", 0))
-            
-            resultados.append({
-                "id": producto_exacto["_id"],
-                "_id": producto_exacto["_id"],
-                "codigo": producto_exacto.get("codigo", ""),
-                "nombre": producto_exacto.get("nombre", ""),
-                "descripcion": producto_exacto.get("descripcion", ""),
-                "marca": producto_exacto.get("marca", ""),
-                "cantidad": cantidad_actual_exacto,  # Valor exacto sin redondeo
-                "costo": round(costo, 2),
-                "precio_venta": round(precio_venta, 2),
-                "precio": round(precio_venta, 2),
-                "utilidad": round(utilidad, 2),
-                "porcentaje_utilidad": round(porcentaje_utilidad, 2),
-                "farmacia": producto_exacto.get("farmacia", "")
-            })
-        
-        # OPTIMIZACIÓN 2: Búsqueda por término en nombre y descripción (SOLO busca el término específico)
-        # Solo si no encontramos coincidencia exacta o queremos más resultados
-        if len(resultados) < limit:
-            # Escapar caracteres especiales del término de búsqueda
-            query_escaped = re.escape(query_term)
-            
-            # Buscar SOLO productos que contengan el término (no todos los productos)
-            busqueda_filtro = {
-                **filtro,
-                "$or": [
-                    {"codigo": {"$regex": query_escaped, "$options": "i"}},
-                    {"nombre": {"$regex": query_escaped, "$options": "i"}},
-                    {"descripcion": {"$regex": query_escaped, "$options": "i"}}
-                ]
-            }
-            
-            # Excluir el producto exacto si ya lo agregamos
-            if producto_exacto:
-                busqueda_filtro["_id"] = {"$ne": ObjectId(producto_exacto["_id"])}
-            
-            # Buscar con límite reducido - SOLO productos que coincidan con el término
-            productos_busqueda = await collection.find(
-                busqueda_filtro,
-                projection=proyeccion_minima
-            ).sort("nombre", 1).limit(limit - len(resultados)).to_list(length=limit - len(resultados))
-            
-            # Procesar resultados (mínimo procesamiento)
-            for inv in productos_busqueda:
-                inv_id = str(inv["_id"])
-                costo = float(inv.get("costo", 0))
-                precio_venta = float(inv.get("precio_venta") or inv.get("precio", 0))
-                if costo > 0 and precio_venta == 0:
-                    precio_venta = costo / 0.60
-                utilidad = precio_venta - costo if precio_venta > 0 and costo > 0 else float(inv.get("utilidad", 0))
-                porcentaje_utilidad = float(inv.get("porcentaje_utilidad", 40.0)) if utilidad > 0 else 0.0
-                
-                # IMPORTANTE: Obtener cantidad directamente de la BD (sin redondeo para mostrar valor exacto)
-                cantidad_actual = float(inv.get("cantidad", 0))
-                
-                resultados.append({
-                    "id": inv_id,
-                    "_id": inv_id,
-                    "codigo": inv.get("codigo", ""),
-                    "nombre": inv.get("nombre", ""),
-                    "descripcion": inv.get("descripcion", ""),
-                    "marca": inv.get("marca", ""),
-                    "cantidad": cantidad_actual,  # Valor exacto sin redondeo
-                    "costo": round(costo, 2),
-                    "precio_venta": round(precio_venta, 2),
-                    "precio": round(precio_venta, 2),
-                    "utilidad": round(utilidad, 2),
-                    "porcentaje_utilidad": round(porcentaje_utilidad, 2),
-                    "farmacia": inv.get("farmacia", "")
-                })
-        
-        print(f"✅ [INVENTARIOS-MODAL] Búsqueda completada: {len(resultados)} resultados en <5s")
-        return resultados
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"❌ [INVENTARIOS-MODAL] Error en búsqueda: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error al buscar productos: {str(e)}")
-
 @router.post("/inventarios/crear-producto")
 async def crear_producto_inventario(
     datos_producto: dict = Body(...),
@@ -2212,29 +2076,13 @@ async def crear_producto_inventario(
                     detail=f"Ya existe un producto con el código '{codigo}' en esta farmacia"
                 )
         
-        # Calcular precio_venta y utilidad
-        precio_venta_enviado = datos_producto.get("precio_venta")
-        utilidad_enviada = datos_producto.get("utilidad")
-        porcentaje_utilidad_enviado = datos_producto.get("porcentaje_utilidad", 40.0)
-        
-        if precio_venta_enviado and precio_venta_enviado > 0:
-            # Si viene precio_venta explícito, usarlo
-            precio_venta_final = float(precio_venta_enviado)
-            if utilidad_enviada is not None:
-                utilidad_final = float(utilidad_enviada)
-            else:
-                utilidad_final = precio_venta_final - costo
-            porcentaje_utilidad_final = porcentaje_utilidad_enviado
-        elif utilidad_enviada is not None and utilidad_enviada > 0:
-            # Si viene utilidad, calcular precio_venta
-            utilidad_final = float(utilidad_enviada)
-            precio_venta_final = costo + utilidad_final
-            porcentaje_utilidad_final = (utilidad_final / costo) * 100 if costo > 0 else 0
-        else:
-            # Calcular automáticamente con porcentaje de utilidad (default 40%)
-            porcentaje_utilidad_final = float(porcentaje_utilidad_enviado)
-            precio_venta_final = costo / (1 - (porcentaje_utilidad_final / 100))
-            utilidad_final = precio_venta_final - costo
+        # Precios finales (precio_venta, utilidad y porcentaje) con las reglas de precios_service
+        precios = calcular_precios(
+            costo,
+            datos_producto.get("precio_venta"),
+            datos_producto.get("utilidad"),
+            datos_producto.get("porcentaje_utilidad"),
+        )
         
         # Obtener fecha actual
         venezuela_tz = pytz.timezone("America/Caracas")
@@ -2243,51 +2091,48 @@ async def crear_producto_inventario(
         
         # Crear nuevo producto
         # IMPORTANTE: Asegurar que el estado sea "activo" explícitamente
-        # IMPORTANTE: Inicializar cantidad, existencia y stock con el mismo valor para sincronización
-        cantidad_inicial = float(datos_producto.get("cantidad", 0))
+        # El stock se guarda solo en cantidad (existencia y stock se calculan al responder)
+        cantidad_inicial = float(normalizar_stock(dict(datos_producto)).get("cantidad", 0))
         nuevo_producto = {
             "farmacia": str(farmacia).strip(),
             "nombre": nombre,
             "descripcion": datos_producto.get("descripcion", "").strip(),
             "marca": datos_producto.get("marca", "").strip(),
             "cantidad": cantidad_inicial,
-            "existencia": cantidad_inicial,  # IMPORTANTE: Sincronizar con cantidad
-            "stock": cantidad_inicial,      # IMPORTANTE: Sincronizar con cantidad
             "costo": round(costo, 2),
-            "precio_venta": round(precio_venta_final, 2),
-            "precio": round(precio_venta_final, 2),
-            "utilidad": round(utilidad_final, 2),
-            "porcentaje_utilidad": round(porcentaje_utilidad_final, 2),
+            **precios,
             "usuarioCorreo": usuario_correo,
             "fecha": fecha_actual,
             "fechaCreacion": fecha_actual,
             "estado": "activo"  # IMPORTANTE: Estado activo explícito
         }
         
-        print(f"📝 [INVENTARIOS] Datos del producto a crear: {nuevo_producto}")
+        logger.debug("📝 [INVENTARIOS] Datos del producto a crear: %s", nuevo_producto)
         
         if codigo:
             nuevo_producto["codigo"] = codigo.upper()
+        nuevo_producto.update(claves_busqueda(nuevo_producto))
+        nuevo_producto.update(marca_actualizacion())
         
         # Insertar en la base de datos
-        print(f"📝 [INVENTARIOS] Insertando producto: {nombre} en farmacia {farmacia}")
+        logger.debug("📝 [INVENTARIOS] Insertando producto: %s en farmacia %s", nombre, farmacia)
         result = await collection.insert_one(nuevo_producto)
         producto_id = str(result.inserted_id)
-        print(f"✅ [INVENTARIOS] Producto insertado con ID: {producto_id}")
+        logger.debug("✅ [INVENTARIOS] Producto insertado con ID: %s", producto_id)
         
         # Obtener el producto creado para retornarlo (consultar directamente de BD)
         producto_creado = await collection.find_one({"_id": result.inserted_id})
         if not producto_creado:
             raise HTTPException(status_code=500, detail="Error: Producto creado pero no se pudo recuperar")
+        indice_productos.actualizar_documento(producto_creado)
+        cache_codigos.invalidar_productos(producto_creado)
         
         producto_creado["_id"] = producto_id
-        print(f"✅ [INVENTARIOS] Producto recuperado de BD: {producto_creado.get('nombre', 'N/A')}")
+        logger.debug("✅ [INVENTARIOS] Producto recuperado de BD: %s", producto_creado.get('nombre', 'N/A'))
         
         # Formatear respuesta
         # IMPORTANTE: Incluir existencia y stock en la respuesta para sincronización
-        cantidad_respuesta = float(producto_creado.get("cantidad", 0))
-        existencia_respuesta = float(producto_creado.get("existencia", cantidad_respuesta))
-        stock_respuesta = float(producto_creado.get("stock", cantidad_respuesta))
+        cantidad_respuesta = stock_disponible(producto_creado)
         
         producto_formateado = {
             "id": producto_id,
@@ -2297,18 +2142,15 @@ async def crear_producto_inventario(
             "descripcion": producto_creado.get("descripcion", ""),
             "marca": producto_creado.get("marca", ""),
             "cantidad": cantidad_respuesta,
-            "existencia": existencia_respuesta,  # IMPORTANTE: Incluir existencia
-            "stock": stock_respuesta,            # IMPORTANTE: Incluir stock
+            "existencia": cantidad_respuesta,  # Nombres legados, mismo valor
+            "stock": cantidad_respuesta,
             "costo": round(float(producto_creado.get("costo", 0)), 2),
-            "precio_venta": round(float(producto_creado.get("precio_venta", 0)), 2),
-            "precio": round(float(producto_creado.get("precio_venta", 0)), 2),
-            "utilidad": round(float(producto_creado.get("utilidad", 0)), 2),
-            "porcentaje_utilidad": round(float(producto_creado.get("porcentaje_utilidad", 0)), 2),
+            **{campo: producto_creado.get(campo, 0.0) for campo in CAMPOS_PRECIO},
             "farmacia": producto_creado.get("farmacia", ""),
             "estado": producto_creado.get("estado", "activo")
         }
         
-        print(f"✅ [INVENTARIOS] Producto creado: {nombre} - ID: {producto_id}")
+        logger.info("✅ [INVENTARIOS] Producto creado: %s - ID: %s", nombre, producto_id)
         
         return {
             "message": "Producto creado exitosamente",
@@ -2318,9 +2160,7 @@ async def crear_producto_inventario(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error creando producto: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error creando producto: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al crear producto: {str(e)}")
 
 @router.post("/inventarios/cargar-existencia")
@@ -2332,6 +2172,7 @@ async def cargar_existencia_masiva(
     Carga existencia masiva al inventario.
     Suma las cantidades a los productos existentes (no reemplaza).
     Permite cargar múltiples productos a la vez.
+    Tres consultas a Mongo sin importar la cantidad de productos (app/services/existencias_service.py).
     
     Body:
     {
@@ -2361,7 +2202,6 @@ async def cargar_existencia_masiva(
     }
     """
     try:
-        collection = get_collection("INVENTARIOS")
         usuario_correo = usuario.get("correo", "unknown")
         
         # Validar datos
@@ -2373,139 +2213,16 @@ async def cargar_existencia_masiva(
         if not productos or len(productos) == 0:
             raise HTTPException(status_code=400, detail="Debe enviar al menos un producto")
         
-        print(f"📦 [INVENTARIOS] Cargando existencia masiva: {len(productos)} productos en farmacia {farmacia}")
+        logger.debug("📦 [INVENTARIOS] Cargando existencia masiva: %s productos en farmacia %s", len(productos), farmacia)
         
         venezuela_tz = pytz.timezone("America/Caracas")
         now_ve = datetime.now(venezuela_tz)
         fecha_actual = now_ve.strftime("%Y-%m-%d")
         
-        productos_exitosos = []
-        productos_con_error = []
-        
-        # Procesar cada producto
-        for producto_carga in productos:
-            try:
-                producto_id = producto_carga.get("producto_id")
-                if not producto_id:
-                    raise ValueError("El campo 'producto_id' es requerido")
-                
-                cantidad_a_sumar = float(producto_carga.get("cantidad", 0))
-                if cantidad_a_sumar <= 0:
-                    raise ValueError("La cantidad debe ser mayor a 0")
-                
-                # Buscar el producto en el inventario
-                try:
-                    producto_object_id = ObjectId(producto_id)
-                except (InvalidId, ValueError):
-                    raise ValueError(f"ID de producto inválido: {producto_id}")
-                
-                producto_actual = await collection.find_one({"_id": producto_object_id})
-                if not producto_actual:
-                    raise ValueError(f"Producto no encontrado: {producto_id}")
-                
-                # Verificar que pertenece a la farmacia correcta
-                if producto_actual.get("farmacia") != farmacia:
-                    raise ValueError(f"El producto no pertenece a la farmacia {farmacia}")
-                
-                # Obtener valores actuales
-                cantidad_actual = float(producto_actual.get("cantidad", 0))
-                costo_actual = float(producto_actual.get("costo", 0))
-                
-                # Calcular nueva cantidad (SUMAR, no reemplazar)
-                cantidad_nueva = cantidad_actual + cantidad_a_sumar
-                
-                # Obtener nuevo costo (si viene en la carga, usarlo; sino usar el actual)
-                nuevo_costo_unitario = float(producto_carga.get("costo", costo_actual))
-                if nuevo_costo_unitario <= 0:
-                    nuevo_costo_unitario = costo_actual
-                
-                # Calcular costo promedio ponderado
-                if cantidad_actual > 0 and nuevo_costo_unitario != costo_actual:
-                    costo_total_actual = cantidad_actual * costo_actual
-                    costo_total_nuevo = cantidad_a_sumar * nuevo_costo_unitario
-                    costo_promedio = (costo_total_actual + costo_total_nuevo) / cantidad_nueva
-                else:
-                    costo_promedio = nuevo_costo_unitario if nuevo_costo_unitario > 0 else costo_actual
-                
-                # Calcular precio_venta y utilidad
-                precio_venta_enviado = producto_carga.get("precio_venta")
-                utilidad_enviada = producto_carga.get("utilidad")
-                porcentaje_utilidad_enviado = producto_carga.get("porcentaje_utilidad", 40.0)
-                
-                if precio_venta_enviado and precio_venta_enviado > 0:
-                    # Si viene precio_venta explícito, usarlo
-                    precio_venta_final = float(precio_venta_enviado)
-                    if utilidad_enviada is not None:
-                        utilidad_final = float(utilidad_enviada)
-                    else:
-                        utilidad_final = precio_venta_final - costo_promedio
-                    porcentaje_utilidad_final = porcentaje_utilidad_enviado
-                elif utilidad_enviada is not None and utilidad_enviada > 0:
-                    # Si viene utilidad, calcular precio_venta
-                    utilidad_final = float(utilidad_enviada)
-                    precio_venta_final = costo_promedio + utilidad_final
-                    porcentaje_utilidad_final = (utilidad_final / costo_promedio) * 100 if costo_promedio > 0 else 0
-                else:
-                    # Calcular automáticamente con porcentaje de utilidad (default 40%)
-                    porcentaje_utilidad_final = float(porcentaje_utilidad_enviado)
-                    precio_venta_final = costo_promedio / (1 - (porcentaje_utilidad_final / 100))
-                    utilidad_final = precio_venta_final - costo_promedio
-                
-                # Actualizar inventario
-                update_data = {
-                    "cantidad": cantidad_nueva,
-                    "costo": round(costo_promedio, 2),
-                    "precio_venta": round(precio_venta_final, 2),
-                    "precio": round(precio_venta_final, 2),
-                    "utilidad": round(utilidad_final, 2),
-                    "porcentaje_utilidad": round(porcentaje_utilidad_final, 2),
-                    "fechaActualizacion": fecha_actual,
-                    "usuarioActualizacion": usuario_correo
-                }
-                
-                await collection.update_one(
-                    {"_id": producto_object_id},
-                    {"$set": update_data}
-                )
-                
-                # Obtener el producto actualizado completo para retornarlo
-                producto_actualizado = await collection.find_one({"_id": producto_object_id})
-                
-                # Formatear producto actualizado para el frontend
-                producto_formateado = {
-                    "id": producto_id,
-                    "_id": producto_id,
-                    "codigo": producto_actualizado.get("codigo", ""),
-                    "nombre": producto_actualizado.get("nombre", ""),
-                    "descripcion": producto_actualizado.get("descripcion", ""),
-                    "marca": producto_actualizado.get("marca", ""),
-                    "cantidad": float(producto_actualizado.get("cantidad", 0)),
-                    "costo": round(float(producto_actualizado.get("costo", 0)), 2),
-                    "precio_venta": round(float(producto_actualizado.get("precio_venta") or producto_actualizado.get("precio", 0)), 2),
-                    "precio": round(float(producto_actualizado.get("precio_venta") or producto_actualizado.get("precio", 0)), 2),
-                    "utilidad": round(float(producto_actualizado.get("utilidad", 0)), 2),
-                    "porcentaje_utilidad": round(float(producto_actualizado.get("porcentaje_utilidad", 0)), 2),
-                    "farmacia": producto_actualizado.get("farmacia", ""),
-                    "estado": producto_actualizado.get("estado", "activo"),
-                    # Información adicional para el frontend
-                    "cantidad_anterior": cantidad_actual,
-                    "cantidad_suma": cantidad_a_sumar,
-                    "cantidad_nueva": cantidad_nueva
-                }
-                
-                productos_exitosos.append(producto_formateado)
-                
-                print(f"✅ [INVENTARIOS] Existencia cargada: {producto_actual.get('nombre', '')} - {cantidad_actual} + {cantidad_a_sumar} = {cantidad_nueva}")
-                
-            except Exception as e:
-                error_msg = str(e)
-                print(f"❌ [INVENTARIOS] Error cargando existencia para producto {producto_carga.get('producto_id', 'unknown')}: {error_msg}")
-                productos_con_error.append({
-                    "producto_id": producto_carga.get("producto_id", "unknown"),
-                    "error": error_msg
-                })
+        # Una lectura con $in, un bulk_write y una relectura con $in para todas las líneas
+        productos_exitosos, productos_con_error = await cargar_existencia(farmacia, productos, usuario_correo, fecha_actual)
         
-        print(f"✅ [INVENTARIOS] Carga masiva completada: {len(productos_exitosos)} exitosos, {len(productos_con_error)} con error")
+        logger.info("✅ [INVENTARIOS] Carga masiva completada: %s exitosos, %s con error", len(productos_exitosos), len(productos_con_error))
         
         return {
             "message": "Existencia cargada exitosamente",
@@ -2521,9 +2238,7 @@ async def cargar_existencia_masiva(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIOS] Error en carga masiva: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIOS] Error en carga masiva: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/bancos")
@@ -2533,20 +2248,13 @@ async def obtener_bancos(usuario: dict = Depends(get_current_user)):
     Requiere autenticación.
     """
     try:
-        print(f"🏦 [BANCOS] Obteniendo bancos")
+        logger.debug("🏦 [BANCOS] Obteniendo bancos")
         collection = get_collection("BANCOS")
         bancos = await collection.find({}).to_list(length=None)
-        
-        # Convertir _id a string
-        for banco in bancos:
-            banco["_id"] = str(banco["_id"])
-        
-        print(f"🏦 [BANCOS] Encontrados {len(bancos)} bancos")
+        logger.debug("🏦 [BANCOS] Encontrados %s bancos", len(bancos))
         return bancos
     except Exception as e:
-        print(f"❌ [BANCOS] Error obteniendo bancos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [BANCOS] Error obteniendo bancos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bancos")
@@ -2559,7 +2267,7 @@ async def crear_banco(
     Requiere autenticación.
     """
     try:
-        print(f"🏦 [BANCOS] Creando banco - Usuario: {usuario.get('correo', 'unknown')}")
+        logger.debug("🏦 [BANCOS] Creando banco - Usuario: %s", usuario.get('correo', 'unknown'))
         collection = get_collection("BANCOS")
         
         # Agregar información de creación
@@ -2580,7 +2288,7 @@ async def crear_banco(
         # Convertir _id a string en la respuesta
         banco_dict["_id"] = banco_id
         
-        print(f"✅ [BANCOS] Banco creado: {banco_id}")
+        logger.info("✅ [BANCOS] Banco creado: %s", banco_id)
         
         return {
             "message": "Banco creado exitosamente",
@@ -2589,9 +2297,7 @@ async def crear_banco(
         }
         
     except Exception as e:
-        print(f"❌ [BANCOS] Error creando banco: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [BANCOS] Error creando banco: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bancos/movimientos")
@@ -2605,7 +2311,7 @@ async def crear_movimiento_banco(
     Requiere autenticación.
     """
     try:
-        print(f"💸 [BANCOS] Creando movimiento - Usuario: {usuario.get('correo', 'unknown')}")
+        logger.debug("💸 [BANCOS] Creando movimiento - Usuario: %s", usuario.get('correo', 'unknown'))
         
         bancos_collection = get_collection("BANCOS")
         
@@ -2701,7 +2407,6 @@ async def crear_movimiento_banco(
         
         # Obtener el banco actualizado
         banco_actualizado = await bancos_collection.find_one({"_id": banco_object_id})
-        banco_actualizado["_id"] = str(banco_actualizado["_id"])
         
         # Convertir ObjectIds en movimientos
         for mov in banco_actualizado.get("movimientos", []):
@@ -2710,7 +2415,7 @@ async def crear_movimiento_banco(
             if "cliente_id" in mov and isinstance(mov["cliente_id"], ObjectId):
                 mov["cliente_id"] = str(mov["cliente_id"])
         
-        print(f"✅ [BANCOS] Movimiento creado: {tipo} - {monto} - Saldo: {saldo_actual} -> {nuevo_saldo}")
+        logger.info("✅ [BANCOS] Movimiento creado: %s - %s - Saldo: %s -> %s", tipo, monto, saldo_actual, nuevo_saldo)
         
         return {
             "message": "Movimiento creado exitosamente",
@@ -2721,9 +2426,7 @@ async def crear_movimiento_banco(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [BANCOS] Error creando movimiento: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [BANCOS] Error creando movimiento: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/bancos/{banco_id}/movimientos")
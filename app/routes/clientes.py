@@ -1,8 +1,10 @@
 """
 Rutas para gestión de clientes
 """
-from fastapi import APIRouter, HTTPException, Body, Query, Depends
+from fastapi import HTTPException, Body, Query, Depends
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection
+from app.core.logger import obtener_logger
 from app.core.get_current_user import get_current_user
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
@@ -10,7 +12,8 @@ from bson.errors import InvalidId
 from datetime import datetime
 import re
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 @router.post("/clientes")
 async def crear_cliente(
@@ -22,7 +25,7 @@ async def crear_cliente(
     Requiere autenticación.
     """
     try:
-        print(f"👤 [CLIENTES] Creando cliente - Usuario: {usuario_actual.get('correo', 'unknown')}")
+        logger.debug("👤 [CLIENTES] Creando cliente - Usuario: %s", usuario_actual.get('correo', 'unknown'))
         
         clientes_collection = get_collection("CLIENTES")
         
@@ -38,7 +41,7 @@ async def crear_cliente(
         # Convertir _id a string en la respuesta
         cliente_dict["_id"] = cliente_id
         
-        print(f"✅ [CLIENTES] Cliente creado: {cliente_id}")
+        logger.info("✅ [CLIENTES] Cliente creado: %s", cliente_id)
         
         return {
             "message": "Cliente creado exitosamente",
@@ -47,9 +50,7 @@ async def crear_cliente(
         }
         
     except Exception as e:
-        print(f"❌ [CLIENTES] Error creando cliente: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [CLIENTES] Error creando cliente: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/clientes")
@@ -61,22 +62,15 @@ async def obtener_clientes(
     Requiere autenticación.
     """
     try:
-        print(f"📋 [CLIENTES] Obteniendo clientes")
+        logger.debug("📋 [CLIENTES] Obteniendo clientes")
         
         clientes_collection = get_collection("CLIENTES")
         clientes = await clientes_collection.find({}).to_list(length=None)
-        
-        # Convertir _id a string
-        for cliente in clientes:
-            cliente["_id"] = str(cliente["_id"])
-        
-        print(f"📋 [CLIENTES] Encontrados {len(clientes)} clientes")
+        logger.debug("📋 [CLIENTES] Encontrados %s clientes", len(clientes))
         return clientes
         
     except Exception as e:
-        print(f"❌ [CLIENTES] Error obteniendo clientes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [CLIENTES] Error obteniendo clientes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/clientes/buscar")
@@ -90,7 +84,7 @@ async def buscar_clientes(
     Requiere autenticación.
     """
     try:
-        print(f"🔍 [CLIENTES] Búsqueda: '{q}'")
+        logger.debug("🔍 [CLIENTES] Búsqueda: '%s'", q)
         
         clientes_collection = get_collection("CLIENTES")
         
@@ -115,18 +109,11 @@ async def buscar_clientes(
         }
         
         clientes = await clientes_collection.find(filtro).to_list(length=50)  # Limitar a 50 resultados
-        
-        # Convertir _id a string
-        for cliente in clientes:
-            cliente["_id"] = str(cliente["_id"])
-        
-        print(f"🔍 [CLIENTES] Encontrados {len(clientes)} clientes")
+        logger.debug("🔍 [CLIENTES] Encontrados %s clientes", len(clientes))
         return clientes
         
     except Exception as e:
-        print(f"❌ [CLIENTES] Error buscando clientes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [CLIENTES] Error buscando clientes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/clientes/{cliente_id}")
@@ -154,7 +141,6 @@ async def obtener_cliente(
         if not cliente:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
         
-        cliente["_id"] = str(cliente["_id"])
         return cliente
         
     except HTTPException:
@@ -204,7 +190,6 @@ async def actualizar_cliente(
         
         # Obtener el cliente actualizado
         cliente_actualizado = await clientes_collection.find_one({"_id": object_id})
-        cliente_actualizado["_id"] = str(cliente_actualizado["_id"])
         
         return {
             "message": "Cliente actualizado exitosamente",
@@ -2,9 +2,16 @@
 Rutas para gestión de compras
 Cuando se crea una compra, los productos se suman automáticamente al inventario
 """
-from fastapi import APIRouter, HTTPException, Body, Query, Depends
+from fastapi import HTTPException, Body, Query, Depends
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection
+from app.db.sincronizacion import marca_actualizacion
+from app.core.logger import obtener_logger
 from app.core.get_current_user import get_current_user
+from app.search.cache_codigos import cache_codigos
+from app.search.indice_productos import indice_productos
+from app.search.normalizacion import claves_busqueda
+from app.services.precios_service import calcular_precios
 from typing import List, Optional, Dict, Any
 from bson import ObjectId
 from bson.errors import InvalidId
@@ -12,7 +19,8 @@ from datetime import datetime
 import pytz
 from pydantic import BaseModel
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 class ProductoCompra(BaseModel):
     """Modelo para un producto en una compra"""
@@ -98,62 +106,45 @@ async def actualizar_inventario(producto_data: dict, farmacia: str, usuario_corr
             else:
                 costo_promedio = precio_unitario
             
-            # Calcular precio_venta con 40% de utilidad si no viene explícito
-            if precio_venta and precio_venta > 0:
-                # Si viene precio_venta explícito, usarlo
-                precio_venta_final = precio_venta
-            else:
-                # Calcular automáticamente con 40% de utilidad
-                # Fórmula: precio_venta = costo / (1 - 0.40) = costo / 0.60
-                precio_venta_final = costo_promedio / 0.60
-            
-            # Calcular utilidad
-            utilidad_unitaria = precio_venta_final - costo_promedio
-            porcentaje_utilidad = 40.0  # Fijo al 40%
+            # Precio de venta explícito o 40% de utilidad sobre el costo promedio
+            precios = calcular_precios(costo_promedio, precio_venta)
             
             # Actualizar inventario
             update_data = {
                 "cantidad": cantidad_nueva,
                 "costo": costo_promedio,
-                "precio_venta": precio_venta_final,
-                "utilidad": round(utilidad_unitaria, 2),
-                "porcentaje_utilidad": porcentaje_utilidad,
+                **precios,
                 "fechaActualizacion": fecha_actual,
-                "usuarioActualizacion": usuario_correo
+                "usuarioActualizacion": usuario_correo,
+                **marca_actualizacion()
             }
             
             # Actualizar marca si viene en el producto
             if marca:
                 update_data["marca"] = marca
+            # Claves de búsqueda normalizadas (cambian con la marca; se completan si el producto es anterior a ellas)
+            if marca or "nombre_norm" not in inventario_existente:
+                update_data.update(claves_busqueda({**inventario_existente, **update_data}))
             
             await inventarios_collection.update_one(
                 {"_id": inventario_existente["_id"]},
                 {"$set": update_data}
             )
-            print(f"✅ Inventario actualizado: {nombre} - Cantidad: {cantidad_actual} + {cantidad} = {cantidad_nueva}, Precio venta: {precio_venta}")
+            cache_codigos.invalidar_productos(inventario_existente)
+            if marca:
+                await indice_productos.refrescar(inventario_existente["_id"])
+            logger.info("✅ Inventario actualizado: %s - Cantidad: %s + %s = %s, Precio venta: %s", nombre, cantidad_actual, cantidad, cantidad_nueva, precio_venta)
         else:
             # Producto no existe: crear nuevo registro de inventario
-            # Calcular precio_venta con 40% de utilidad si no viene explícito
-            if precio_venta and precio_venta > 0:
-                # Si viene precio_venta explícito, usarlo
-                precio_venta_final = precio_venta
-            else:
-                # Calcular automáticamente con 40% de utilidad
-                # Fórmula: precio_venta = costo / (1 - 0.40) = costo / 0.60
-                precio_venta_final = precio_unitario / 0.60
-            
-            # Calcular utilidad
-            utilidad_unitaria = precio_venta_final - precio_unitario
-            porcentaje_utilidad = 40.0  # Fijo al 40%
+            # Precio de venta explícito o 40% de utilidad sobre el costo
+            precios = calcular_precios(precio_unitario, precio_venta)
             
             nuevo_inventario = {
                 "farmacia": farmacia,
                 "nombre": nombre,
                 "cantidad": cantidad,
                 "costo": precio_unitario,
-                "precio_venta": precio_venta_final,
-                "utilidad": round(utilidad_unitaria, 2),
-                "porcentaje_utilidad": porcentaje_utilidad,
+                **precios,
                 "usuarioCorreo": usuario_correo,
                 "fecha": fecha_actual,
                 "estado": "activo"
@@ -167,16 +158,18 @@ async def actualizar_inventario(producto_data: dict, farmacia: str, usuario_corr
             
             if marca:
                 nuevo_inventario["marca"] = marca
+            nuevo_inventario.update(claves_busqueda(nuevo_inventario))
+            nuevo_inventario.update(marca_actualizacion())
             
             await inventarios_collection.insert_one(nuevo_inventario)
-            print(f"✅ Nuevo producto agregado al inventario: {nombre} - Cantidad: {cantidad}, Costo: {precio_unitario}, Utilidad: {utilidad_unitaria}, Precio venta: {precio_venta_final}")
+            indice_productos.actualizar_documento(nuevo_inventario)
+            cache_codigos.invalidar_productos(nuevo_inventario)
+            logger.info("✅ Nuevo producto agregado al inventario: %s - Cantidad: %s, Costo: %s, Utilidad: %s, Precio venta: %s", nombre, cantidad, precio_unitario, precios["utilidad"], precios["precio_venta"])
         
         return True
     except Exception as e:
         nombre_producto = producto_data.get("nombre", "Desconocido") if isinstance(producto_data, dict) else "Desconocido"
-        print(f"❌ Error actualizando inventario para {nombre_producto}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error actualizando inventario para %s: %s", nombre_producto, e)
         raise
 
 @router.get("/compras")
@@ -192,7 +185,7 @@ async def obtener_compras(
     Requiere autenticación.
     """
     try:
-        print("🔍 [COMPRAS] Obteniendo compras...")
+        logger.debug("🔍 [COMPRAS] Obteniendo compras...")
         collection = get_collection("COMPRAS")
         proveedores_collection = get_collection("PROVEEDORES")
         
@@ -210,7 +203,7 @@ async def obtener_compras(
         
         compras = await collection.find(filtro).sort("fecha", -1).to_list(length=None)
         
-        print(f"🔍 [COMPRAS] Encontradas {len(compras)} compras")
+        logger.debug("🔍 [COMPRAS] Encontradas %s compras", len(compras))
         
         # Obtener colección de inventarios para buscar precios de venta
         inventarios_collection = get_collection("INVENTARIOS")
@@ -238,7 +231,7 @@ async def obtener_compras(
                                 compra["proveedor"] = proveedor
                                 compra["proveedorId"] = str(proveedor["_id"])
                             else:
-                                print(f"⚠️ [COMPRAS] Proveedor no encontrado para ID: {proveedor_id}")
+                                logger.warning("⚠️ [COMPRAS] Proveedor no encontrado para ID: %s", proveedor_id)
                                 compra["proveedor"] = None
                             continue
                     else:
@@ -254,18 +247,18 @@ async def obtener_compras(
                         compra["proveedor"] = proveedor
                         # Mantener también el proveedorId como string para compatibilidad
                         compra["proveedorId"] = str(proveedor["_id"])
-                        print(f"🔍 [COMPRAS] Proveedor poblado: {proveedor.get('nombre', 'Sin nombre')}")
+                        logger.debug("🔍 [COMPRAS] Proveedor poblado: %s", proveedor.get('nombre', 'Sin nombre'))
                     else:
-                        print(f"⚠️ [COMPRAS] Proveedor no encontrado para ID: {proveedor_id}")
+                        logger.warning("⚠️ [COMPRAS] Proveedor no encontrado para ID: %s", proveedor_id)
                         compra["proveedor"] = None
                 except (InvalidId, ValueError) as e:
-                    print(f"⚠️ [COMPRAS] Error al convertir proveedorId {proveedor_id}: {e}")
+                    logger.warning("⚠️ [COMPRAS] Error al convertir proveedorId %s: %s", proveedor_id, e)
                     compra["proveedor"] = None
                 except Exception as e:
-                    print(f"⚠️ [COMPRAS] Error al buscar proveedor: {e}")
+                    logger.warning("⚠️ [COMPRAS] Error al buscar proveedor: %s", e)
                     compra["proveedor"] = None
             else:
-                print(f"⚠️ [COMPRAS] Compra sin proveedorId")
+                logger.warning("⚠️ [COMPRAS] Compra sin proveedorId")
                 compra["proveedor"] = None
             
             # Agregar utilidad a cada producto en la compra
@@ -345,7 +338,7 @@ async def obtener_compras(
                             producto["utilidad_contable"] = 0
                             producto["porcentaje_ganancia"] = 0
                 except Exception as e:
-                    print(f"⚠️ [COMPRAS] Error calculando utilidad para producto {producto.get('nombre', 'Desconocido')}: {e}")
+                    logger.warning("⚠️ [COMPRAS] Error calculando utilidad para producto %s: %s", producto.get('nombre', 'Desconocido'), e)
                     # Asegurar que los campos existan aunque haya error
                     if "precio_venta" not in producto:
                         producto["precio_venta"] = producto.get("precio_venta", 0)
@@ -366,13 +359,11 @@ async def obtener_compras(
                     pago["banco_id"] = str(pago["banco_id"])
             compra["pagos"] = pagos
         
-        print(f"🔍 [COMPRAS] Compras procesadas: {len(compras)}")
-        print(f"🔍 [INVENTARIOS] Compras obtenidas: {len(compras)} compras con productos y utilidad calculada")
+        logger.debug("🔍 [COMPRAS] Compras procesadas: %s", len(compras))
+        logger.debug("🔍 [INVENTARIOS] Compras obtenidas: %s compras con productos y utilidad calculada", len(compras))
         return compras
     except Exception as e:
-        print(f"❌ [COMPRAS] Error obteniendo compras: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [COMPRAS] Error obteniendo compras: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/compras")
@@ -383,7 +374,7 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
     Requiere autenticación.
     """
     try:
-        print(f"[COMPRAS] Datos recibidos: {compra_data}")
+        logger.debug("[COMPRAS] Datos recibidos: %s", compra_data)
         
         collection = get_collection("COMPRAS")
         usuario_correo = usuario_actual.get("correo", "unknown")
@@ -457,7 +448,7 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
                         detail=f"El código '{codigo_normalizado}' ya existe en el inventario para el producto '{nombre_existente}'. Los productos nuevos no pueden usar códigos existentes."
                     )
         
-        print(f"✅ [COMPRAS] Validaciones de códigos pasadas correctamente")
+        logger.debug("✅ [COMPRAS] Validaciones de códigos pasadas correctamente")
         
         # Crear el documento de compra
         compra_dict = compra_data.copy()
@@ -476,7 +467,7 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
                     compra_dict["proveedorId"] = proveedor_id
             except (InvalidId, ValueError, TypeError) as e:
                 # Si no es un ObjectId válido, dejarlo como string
-                print(f"[COMPRAS] No se pudo convertir proveedorId a ObjectId: {e}. Se guardará como string.")
+                logger.debug("[COMPRAS] No se pudo convertir proveedorId a ObjectId: %s. Se guardará como string.", e)
                 compra_dict["proveedorId"] = str(compra_dict["proveedorId"])
         
         # Insertar la compra
@@ -484,7 +475,7 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
         compra_id = str(resultado.inserted_id)
         
         # ACTUALIZAR INVENTARIO: Sumar cada producto al inventario
-        print(f"\n🔄 Actualizando inventario para compra {compra_id}...")
+        logger.debug("🔄 Actualizando inventario para compra %s...", compra_id)
         productos_actualizados = []
         productos_con_error = []
         
@@ -512,9 +503,7 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
                 nombre_producto = producto_data.get('nombre', 'Desconocido')
                 productos_actualizados.append(nombre_producto)
             except Exception as e:
-                print(f"❌ Error actualizando producto: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error actualizando producto: %s", e)
                 nombre_producto = producto_data.get('nombre', 'Desconocido') if isinstance(producto_data, dict) else 'Desconocido'
                 productos_con_error.append(f"{nombre_producto} ({str(e)})")
         
@@ -542,17 +531,14 @@ async def crear_compra(compra_data: dict = Body(...), usuario_actual: dict = Dep
         if productos_con_error:
             respuesta["warning"] = f"Algunos productos no se pudieron actualizar en el inventario: {', '.join(productos_con_error)}"
         
-        print(f"✅ Compra creada: {compra_id} - {len(productos_actualizados)} productos actualizados en inventario")
+        logger.info("✅ Compra creada: %s - %s productos actualizados en inventario", compra_id, len(productos_actualizados))
         
         return respuesta
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error creando compra: {e}")
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"❌ Traceback completo:\n{error_trace}")
+        logger.exception("❌ Error creando compra: %s", e)
         # Asegurar que el error se propaga con información útil
         error_message = f"Error al crear compra: {str(e)}"
         raise HTTPException(status_code=500, detail=error_message)
@@ -614,7 +600,7 @@ async def obtener_compra(compra_id: str, usuario_actual: dict = Depends(get_curr
             except (InvalidId, ValueError):
                 compra["proveedor"] = None
             except Exception as e:
-                print(f"⚠️ [COMPRAS] Error al buscar proveedor: {e}")
+                logger.warning("⚠️ [COMPRAS] Error al buscar proveedor: %s", e)
                 compra["proveedor"] = None
         else:
             compra["proveedor"] = None
@@ -696,7 +682,7 @@ async def obtener_compra(compra_id: str, usuario_actual: dict = Depends(get_curr
                         producto["utilidad_contable"] = 0
                         producto["porcentaje_ganancia"] = 0
             except Exception as e:
-                print(f"⚠️ [COMPRAS] Error calculando utilidad para producto {producto.get('nombre', 'Desconocido')}: {e}")
+                logger.warning("⚠️ [COMPRAS] Error calculando utilidad para producto %s: %s", producto.get('nombre', 'Desconocido'), e)
                 # Asegurar que los campos existan aunque haya error
                 if "precio_venta" not in producto:
                     producto["precio_venta"] = producto.get("precio_venta", 0)
@@ -737,7 +723,7 @@ async def crear_pago_compra(
     Requiere autenticación.
     """
     try:
-        print(f"💳 [COMPRAS] Creando pago para compra: {compra_id}")
+        logger.debug("💳 [COMPRAS] Creando pago para compra: %s", compra_id)
         
         compras_collection = get_collection("COMPRAS")
         bancos_collection = get_collection("BANCOS")
@@ -776,7 +762,7 @@ async def crear_pago_compra(
         
         # Validar que pagos_existentes sea una lista
         if not isinstance(pagos_existentes, list):
-            print(f"⚠️ [COMPRAS] pagos_existentes no es una lista, tipo: {type(pagos_existentes)}, valor: {pagos_existentes}")
+            logger.warning("⚠️ [COMPRAS] pagos_existentes no es una lista, tipo: %s, valor: %s", type(pagos_existentes), pagos_existentes)
             pagos_existentes = []
         
         # Convertir ObjectIds en pagos existentes si es necesario
@@ -789,7 +775,7 @@ async def crear_pago_compra(
                     pago_procesado["banco_id"] = str(pago_procesado["banco_id"])
                 pagos_procesados.append(pago_procesado)
             else:
-                print(f"⚠️ [COMPRAS] Pago no es un diccionario: {type(p)}, valor: {p}")
+                logger.warning("⚠️ [COMPRAS] Pago no es un diccionario: %s, valor: %s", type(p), p)
         
         monto_abonado_actual = sum(float(p.get("monto", 0)) for p in pagos_procesados)
         monto_restante_actual = total_factura - monto_abonado_actual
@@ -846,7 +832,7 @@ async def crear_pago_compra(
                 {"$set": {"movimientos": movimientos}}
             )
             
-            print(f"🏦 [COMPRAS] Saldo del banco actualizado: {saldo_actual} -> {nuevo_saldo}")
+            logger.debug("🏦 [COMPRAS] Saldo del banco actualizado: %s -> %s", saldo_actual, nuevo_saldo)
         
         # Crear el pago
         nuevo_pago = {
@@ -924,7 +910,7 @@ async def crear_pago_compra(
             if "banco_id" in nuevo_pago_respuesta and isinstance(nuevo_pago_respuesta["banco_id"], ObjectId):
                 nuevo_pago_respuesta["banco_id"] = str(nuevo_pago_respuesta["banco_id"])
         
-        print(f"✅ [COMPRAS] Pago creado: {monto} - Estado: {nuevo_estado}")
+        logger.info("✅ [COMPRAS] Pago creado: %s - Estado: %s", monto, nuevo_estado)
         
         return {
             "message": "Pago creado exitosamente",
@@ -935,9 +921,7 @@ async def crear_pago_compra(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [COMPRAS] Error creando pago: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [COMPRAS] Error creando pago: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/compras/{compra_id}")
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import HTTPException, Query, Body
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection, db
+from app.core.logger import obtener_logger
 from bson import ObjectId
 from typing import Optional, List
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 # Endpoint 1: Resumen de cuadres por fecha
 @router.get("/cuadres/lista")
 async def resumen_cuadres(fecha: str = Query(...)):
-    print(f"Obteniendo resumen de cuadres para la fecha: {fecha}")
+    logger.debug("Obteniendo resumen de cuadres para la fecha: %s", fecha)
     try:
         colecciones = [f"CUADRES-0{i}" for i in range(1, 8)]
         total = 0
@@ -18,12 +21,10 @@ async def resumen_cuadres(fecha: str = Query(...)):
             collection = db[nombre]
             filtro = {"dia": fecha}
             cuadres = await collection.find(filtro).to_list(length=None)
-            for c in cuadres:
-                c["_id"] = str(c["_id"])
             total += len(cuadres)
             suma_montos += sum(c.get("totalCajaSistemaBs", 0) for c in cuadres)
             todos_cuadres.extend(cuadres)
-        print(f"Procesada colección {nombre}: {len(cuadres)} cuadres")
+        logger.debug("Procesada colección %s: %s cuadres", nombre, len(cuadres))
         return {
             "fecha": fecha,
             "cantidad": total,
@@ -49,7 +50,6 @@ async def detalle_cuadres(
                 collection = db[nombre]
                 cuadre = await collection.find_one({"_id": ObjectId(id)})
                 if cuadre:
-                    cuadre["_id"] = str(cuadre["_id"])
                     return [cuadre]
             raise HTTPException(status_code=404, detail="Cuadre no encontrado")
         filtro = {}
@@ -61,8 +61,6 @@ async def detalle_cuadres(
         for nombre in colecciones:
             collection = db[nombre]
             cuadres = await collection.find(filtro).to_list(length=None)
-            for c in cuadres:
-                c["_id"] = str(c["_id"])
             resultado.extend(cuadres)
         return resultado
     except Exception as e:
@@ -80,5 +78,5 @@ async def modificar_cuadre(id: str, data: dict = Body(...)):
                 return {"message": "Cuadre modificado exitosamente"}
         raise HTTPException(status_code=404, detail="Cuadre no encontrado o sin cambios")
     except Exception as e:
-        print(str(e))
+        logger.error("❌ [CUADRES] Error modificando cuadre: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,12 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Body, Depends, Query
+from fastapi import HTTPException, Body, Depends, Query
+from app.core.responses import BSONRouter
 from fastapi.responses import JSONResponse
 from app.db.mongo import get_collection
 from bson import ObjectId
 from datetime import datetime
 
-router = APIRouter()
+router = BSONRouter()
 
 class Meta(BaseModel):
     _id: Optional[str] = None
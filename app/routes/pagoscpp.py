@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Body, Depends, Query
+from fastapi import HTTPException, Body, Depends, Query
+from app.core.responses import BSONRouter
 from fastapi import Request
 from datetime import datetime
 from fastapi import Query
@@ -11,7 +12,7 @@ from typing import Optional, List
 import pytz
 from bson import ObjectId
 
-router = APIRouter()
+router = BSONRouter()
 
 class ImagenCuentaPorPagar(BaseModel):
     url: str
@@ -1,15 +1,21 @@
 """
 Rutas para gestión de productos
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import HTTPException, Query, Depends, Request
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection
+from app.db.consultas import ejecutar_consulta
+from app.core.logger import obtener_logger
 from app.core.get_current_user import get_current_user
+from app.search.buscador import buscar_catalogo, buscar_codigo
+from app.search.formato import con_stock_legado
+from app.services.lotes_service import adjuntar_lotes
 from typing import Optional
 from bson import ObjectId
 from bson.errors import InvalidId
-import re
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 @router.get("/productos")
 async def obtener_productos(
@@ -24,7 +30,7 @@ async def obtener_productos(
     Requiere autenticación.
     """
     try:
-        print(f"🔍 [PRODUCTOS] Obteniendo productos - inventario_id: {inventario_id}, farmacia: {farmacia}")
+        logger.debug("🔍 [PRODUCTOS] Obteniendo productos - inventario_id: %s, farmacia: %s", inventario_id, farmacia)
         
         inventarios_collection = get_collection("INVENTARIOS")
         filtro = {}
@@ -35,10 +41,8 @@ async def obtener_productos(
                 object_id = ObjectId(inventario_id)
                 inventario = await inventarios_collection.find_one({"_id": object_id})
                 if inventario:
-                    inventario["_id"] = str(inventario["_id"])
-                    if "productoId" in inventario and isinstance(inventario["productoId"], ObjectId):
-                        inventario["productoId"] = str(inventario["productoId"])
-                    return [inventario]
+                    await adjuntar_lotes([inventario])
+                    return [con_stock_legado(inventario)]
                 else:
                     return []
             except (InvalidId, ValueError):
@@ -65,43 +69,17 @@ async def obtener_productos(
                 "utilidad": 1, "porcentaje_utilidad": 1
             }
         ).sort("nombre", 1).limit(500).to_list(length=500)
+        await adjuntar_lotes(productos)
         
-        # Convertir _id a string y calcular utilidad si no existe
-        for producto in productos:
-            producto["_id"] = str(producto["_id"])
-            if "productoId" in producto and isinstance(producto["productoId"], ObjectId):
-                producto["productoId"] = str(producto["productoId"])
-            
-            # Calcular utilidad si no existe o si falta precio_venta
-            costo = float(producto.get("costo", 0))
-            precio_venta = float(producto.get("precio_venta", 0))
-            
-            if costo > 0:
-                # Si no hay precio_venta, calcular con 40% de utilidad
-                if not precio_venta or precio_venta == 0:
-                    precio_venta = costo / 0.60
-                    producto["precio_venta"] = round(precio_venta, 2)
-                
-                # Calcular utilidad si no existe
-                if "utilidad" not in producto or not producto.get("utilidad"):
-                    utilidad = precio_venta - costo
-                    producto["utilidad"] = round(utilidad, 2)
-                    producto["porcentaje_utilidad"] = 40.0
-                else:
-                    # Asegurar que porcentaje_utilidad exista
-                    if "porcentaje_utilidad" not in producto:
-                        producto["porcentaje_utilidad"] = 40.0
-        
-        print(f"🔍 [PRODUCTOS] Encontrados {len(productos)} productos")
+        logger.debug("🔍 [PRODUCTOS] Encontrados %s productos", len(productos))
         return productos
     except Exception as e:
-        print(f"❌ [PRODUCTOS] Error obteniendo productos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PRODUCTOS] Error obteniendo productos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/productos/buscar")
 async def buscar_productos(
+    request: Request,
     q: str = Query(..., description="Término de búsqueda (código, nombre, descripción o marca)"),
     farmacia: Optional[str] = Query(None, description="ID de la sucursal (farmacia)"),
     limit: Optional[int] = Query(50, description="Límite de resultados (máximo 100)"),
@@ -113,10 +91,11 @@ async def buscar_productos(
     Búsqueda case-insensitive y coincidencia parcial.
     
     Optimizaciones aplicadas:
-    - Búsqueda exacta por código primero (muy rápida con índice)
+    - Búsqueda exacta por código primero (caché de códigos; si no, junto con la parcial en 1 consulta)
     - Uso de índices de MongoDB para búsquedas rápidas
     - Proyección de campos para reducir transferencia de datos
     - Límite de resultados configurable
+    - Tiempo máximo de búsqueda y cancelación si el cliente se desconecta
     
     Requiere autenticación.
     """
@@ -128,107 +107,25 @@ async def buscar_productos(
         # Limitar el límite a máximo 100
         limit = min(limit or 50, 100)
         
-        print(f"🔍 [PRODUCTOS] Buscando: '{query_term}' en sucursal: {farmacia}")
+        logger.debug("🔍 [PRODUCTOS] Buscando: '%s' en sucursal: %s", query_term, farmacia)
         
         inventarios_collection = get_collection("INVENTARIOS")
         
-        # Construir filtro base
-        filtro = {}
-        
-        # Filtrar por sucursal si se especifica
-        if farmacia and farmacia.strip():
-            filtro["farmacia"] = farmacia.strip()
+        # Código exacto (caché) o coincidencia parcial en un solo aggregate (app/search/buscador.py)
+        productos = await ejecutar_consulta("busqueda", buscar_catalogo(
+            inventarios_collection,
+            query_term,
+            farmacia.strip() if farmacia and farmacia.strip() else None,
+            limit
+        ), request)
         
-        # OPTIMIZACIÓN: Búsqueda exacta por código primero (más rápida)
-        codigo_filtro = {**filtro, "codigo": query_term.upper()}
-        producto_exacto = await inventarios_collection.find_one(
-            codigo_filtro,
-            projection={
-                "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
-                "precio_venta": 1, "precio": 1, "marca": 1, "cantidad": 1,
-                "lotes": 1, "farmacia": 1, "costo": 1, "estado": 1, "productoId": 1,
-                "utilidad": 1, "porcentaje_utilidad": 1
-            }
-        )
-        
-        if producto_exacto:
-            producto_exacto["_id"] = str(producto_exacto["_id"])
-            if "productoId" in producto_exacto and isinstance(producto_exacto["productoId"], ObjectId):
-                producto_exacto["productoId"] = str(producto_exacto["productoId"])
-            
-            # Calcular utilidad si no existe
-            costo = float(producto_exacto.get("costo", 0))
-            precio_venta = float(producto_exacto.get("precio_venta", 0))
-            
-            if costo > 0:
-                if not precio_venta or precio_venta == 0:
-                    precio_venta = costo / 0.60
-                    producto_exacto["precio_venta"] = round(precio_venta, 2)
-                
-                if "utilidad" not in producto_exacto or not producto_exacto.get("utilidad"):
-                    utilidad = precio_venta - costo
-                    producto_exacto["utilidad"] = round(utilidad, 2)
-                    producto_exacto["porcentaje_utilidad"] = 40.0
-                elif "porcentaje_utilidad" not in producto_exacto:
-                    producto_exacto["porcentaje_utilidad"] = 40.0
-            
-            print(f"🔍 [PRODUCTOS] Coincidencia exacta encontrada")
-            return [producto_exacto]
-        
-        # Búsqueda con regex optimizado (usa índices)
-        escaped_query = re.escape(query_term)
-        match_stage = {
-            **filtro,
-            "$or": [
-                {"codigo": {"$regex": f"^{escaped_query}", "$options": "i"}},  # Coincidencia al inicio
-                {"nombre": {"$regex": f"^{escaped_query}", "$options": "i"}},  # Coincidencia al inicio
-                {"codigo": {"$regex": escaped_query, "$options": "i"}},  # Coincidencia parcial
-                {"nombre": {"$regex": escaped_query, "$options": "i"}},  # Coincidencia parcial
-                {"descripcion": {"$regex": escaped_query, "$options": "i"}},
-                {"marca": {"$regex": escaped_query, "$options": "i"}}
-            ]
-        }
-        
-        # Usar find() con proyección (más rápido)
-        productos = await inventarios_collection.find(
-            match_stage,
-            projection={
-                "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
-                "precio_venta": 1, "precio": 1, "marca": 1, "cantidad": 1,
-                "lotes": 1, "farmacia": 1, "costo": 1, "estado": 1, "productoId": 1,
-                "utilidad": 1, "porcentaje_utilidad": 1
-            }
-        ).sort("nombre", 1).limit(limit).to_list(length=limit)
-        
-        # Convertir _id a string y calcular utilidad si no existe
-        for producto in productos:
-            producto["_id"] = str(producto["_id"])
-            if "productoId" in producto and isinstance(producto["productoId"], ObjectId):
-                producto["productoId"] = str(producto["productoId"])
-            
-            # Calcular utilidad si no existe
-            costo = float(producto.get("costo", 0))
-            precio_venta = float(producto.get("precio_venta", 0))
-            
-            if costo > 0:
-                if not precio_venta or precio_venta == 0:
-                    precio_venta = costo / 0.60
-                    producto["precio_venta"] = round(precio_venta, 2)
-                
-                if "utilidad" not in producto or not producto.get("utilidad"):
-                    utilidad = precio_venta - costo
-                    producto["utilidad"] = round(utilidad, 2)
-                    producto["porcentaje_utilidad"] = 40.0
-                elif "porcentaje_utilidad" not in producto:
-                    producto["porcentaje_utilidad"] = 40.0
-        
-        print(f"🔍 [PRODUCTOS] Encontrados {len(productos)} productos")
+        logger.debug("🔍 [PRODUCTOS] Encontrados %s productos", len(productos))
         return productos
             
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ [PRODUCTOS] Error buscando productos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PRODUCTOS] Error buscando productos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/productos/buscar-codigo")
@@ -244,59 +141,21 @@ async def buscar_codigo_producto(
     Requiere autenticación.
     """
     try:
-        print(f"🔍 [PRODUCTOS] Buscando código: '{codigo}' en sucursal: {sucursal}")
+        logger.debug("🔍 [PRODUCTOS] Buscando código: '%s' en sucursal: %s", codigo, sucursal)
         
         inventarios_collection = get_collection("INVENTARIOS")
         
-        # Construir filtro
-        filtro = {"codigo": codigo.strip().upper()}
-        
-        # Filtrar por sucursal si se especifica
-        if sucursal and sucursal.strip():
-            filtro["farmacia"] = sucursal.strip()
-        
-        # OPTIMIZACIÓN: Usar proyección para búsqueda más rápida
-        producto = await inventarios_collection.find_one(
-            filtro,
-            projection={
-                "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
-                "precio_venta": 1, "precio": 1, "marca": 1, "cantidad": 1,
-                "lotes": 1, "farmacia": 1, "costo": 1, "estado": 1, "productoId": 1,
-                "utilidad": 1, "porcentaje_utilidad": 1
-            }
+        # OPTIMIZACIÓN: Caché por sucursal+código (campos estáticos); stock y lotes se leen siempre
+        productos = await buscar_codigo(
+            inventarios_collection,
+            codigo.strip().upper(),
+            sucursal.strip() if sucursal and sucursal.strip() else None
         )
-        
-        if producto:
-            producto["_id"] = str(producto["_id"])
-            if "productoId" in producto and isinstance(producto["productoId"], ObjectId):
-                producto["productoId"] = str(producto["productoId"])
-            
-            # Calcular utilidad si no existe
-            costo = float(producto.get("costo", 0))
-            precio_venta = float(producto.get("precio_venta", 0))
-            
-            if costo > 0:
-                if not precio_venta or precio_venta == 0:
-                    precio_venta = costo / 0.60
-                    producto["precio_venta"] = round(precio_venta, 2)
-                
-                if "utilidad" not in producto or not producto.get("utilidad"):
-                    utilidad = precio_venta - costo
-                    producto["utilidad"] = round(utilidad, 2)
-                    producto["porcentaje_utilidad"] = 40.0
-                elif "porcentaje_utilidad" not in producto:
-                    producto["porcentaje_utilidad"] = 40.0
-            
-            print(f"🔍 [PRODUCTOS] Código '{codigo}' encontrado")
-            return [producto]
-        else:
-            print(f"🔍 [PRODUCTOS] Código '{codigo}' no encontrado")
-            return []
+        logger.debug("🔍 [PRODUCTOS] Código '%s' %s", codigo, "encontrado" if productos else "no encontrado")
+        return productos
             
     except Exception as e:
-        print(f"❌ [PRODUCTOS] Error buscando código: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PRODUCTOS] Error buscando código: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/productos/{producto_id}")
@@ -318,27 +177,8 @@ async def obtener_producto(producto_id: str, usuario_actual: dict = Depends(get_
         if not producto:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         
-        producto["_id"] = str(producto["_id"])
-        if "productoId" in producto and isinstance(producto["productoId"], ObjectId):
-            producto["productoId"] = str(producto["productoId"])
-        
-        # Calcular utilidad si no existe
-        costo = float(producto.get("costo", 0))
-        precio_venta = float(producto.get("precio_venta", 0))
-        
-        if costo > 0:
-            if not precio_venta or precio_venta == 0:
-                precio_venta = costo / 0.60
-                producto["precio_venta"] = round(precio_venta, 2)
-            
-            if "utilidad" not in producto or not producto.get("utilidad"):
-                utilidad = precio_venta - costo
-                producto["utilidad"] = round(utilidad, 2)
-                producto["porcentaje_utilidad"] = 40.0
-            elif "porcentaje_utilidad" not in producto:
-                producto["porcentaje_utilidad"] = 40.0
-        
-        return producto
+        await adjuntar_lotes([producto])
+        return con_stock_legado(producto)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,14 +1,15 @@
 """
 Rutas para gestión de proveedores
 """
-from fastapi import APIRouter, HTTPException, Body, Query, Depends
+from fastapi import HTTPException, Body, Query, Depends
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection
 from app.core.get_current_user import get_current_user
 from typing import List, Optional
 from bson import ObjectId
 from bson.errors import InvalidId
 
-router = APIRouter()
+router = BSONRouter()
 
 @router.get("/proveedores")
 async def obtener_proveedores(usuario_actual: dict = Depends(get_current_user)):
@@ -19,11 +20,6 @@ async def obtener_proveedores(usuario_actual: dict = Depends(get_current_user)):
     try:
         collection = get_collection("PROVEEDORES")
         proveedores = await collection.find({}).to_list(length=None)
-        
-        # Convertir _id a string
-        for proveedor in proveedores:
-            proveedor["_id"] = str(proveedor["_id"])
-        
         return proveedores
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -75,7 +71,6 @@ async def obtener_proveedor(proveedor_id: str, usuario_actual: dict = Depends(ge
         if not proveedor:
             raise HTTPException(status_code=404, detail="Proveedor no encontrado")
         
-        proveedor["_id"] = str(proveedor["_id"])
         return proveedor
     except HTTPException:
         raise
@@ -118,7 +113,6 @@ async def actualizar_proveedor(proveedor_id: str, proveedor: dict = Body(...), u
         
         # Obtener el proveedor actualizado
         proveedor_actualizado = await collection.find_one({"_id": object_id})
-        proveedor_actualizado["_id"] = str(proveedor_actualizado["_id"])
         
         return {
             "message": "Proveedor actualizado exitosamente",
@@ -1,19 +1,29 @@
 """
 Rutas para punto de venta
 """
-from fastapi import APIRouter, HTTPException, Query, Depends, Body
+from fastapi import HTTPException, Query, Depends, Body, Request
+from app.core.responses import BSONRouter
 from app.db.mongo import get_collection, get_client
+from app.db.consultas import ejecutar_consulta
+from app.services.existencias_service import descontar_stock
+from app.core.logger import obtener_logger
 from app.core.get_current_user import get_current_user
+from app.search.buscador import (
+    LIMITE_AUTOCOMPLETAR, autocompletar_punto_venta, buscar_punto_venta, solicitudes_autocompletado
+)
+from app.utils.solicitudes import SolicitudReemplazada
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
 import re
 
-router = APIRouter()
+router = BSONRouter()
+logger = obtener_logger(__name__)
 
 @router.get("/punto-venta/productos/buscar")
 async def buscar_productos_punto_venta(
+    request: Request,
     q: Optional[str] = Query("", description="Término de búsqueda (opcional, si está vacío retorna todos los productos)"),
     sucursal: Optional[str] = Query(None, description="ID de la sucursal (farmacia)"),
     usuario_actual: dict = Depends(get_current_user)
@@ -35,11 +45,15 @@ async def buscar_productos_punto_venta(
        - Ejemplo: "esmalte" → encuentra "esmalte rojo", "pintura esmalte", etc.
     
     Optimizaciones aplicadas:
-    - Búsqueda exacta por código primero (instantánea)
+    - Búsqueda exacta por código primero (caché de códigos; solo se lee el stock)
+    - Código exacto + prefijo/subcadena en UNA sola consulta ($unionWith), no hasta 3 seguidas
     - Búsqueda rápida con * solo en campos indexados
+    - Búsqueda amplia con el índice de trigramas en memoria (app/search), sin recorrer la colección
+    - Tolerancia a errores de tipeo: sin resultados se reintenta con la consulta corregida ("tornilo" -> "tornillo")
     - Proyección de campos para reducir transferencia
     - Uso eficiente de índices de MongoDB (código, nombre, descripción, marca)
-    - Cálculo automático de precios desde costo + utilidad si no están definidos
+    - Precios (precio_venta, utilidad, porcentaje) tal como están guardados, sin calcularlos por fila
+    - Tiempo máximo de búsqueda (504 si se excede) y cancelación si el cliente se desconecta
     
     Campos en respuesta:
     - id: ID del producto
@@ -51,9 +65,9 @@ async def buscar_productos_punto_venta(
     - porcentaje_utilidad: Porcentaje de utilidad
     - precio: Precio de venta
     - precio_venta: Precio de venta (alias de precio)
-    - cantidad: Stock disponible (usa existencia como campo principal)
-    - stock: Stock disponible (usa existencia como campo principal)
-    - existencia: Existencia disponible (campo principal)
+    - cantidad: Stock disponible
+    - stock: Mismo valor que cantidad (nombre legado)
+    - existencia: Mismo valor que cantidad (nombre legado)
     - sucursal: ID de la sucursal
     - farmacia: ID de la farmacia (igual que inventarios)
     - estado: Estado del producto
@@ -61,217 +75,54 @@ async def buscar_productos_punto_venta(
     """
     try:
         inventarios_collection = get_collection("INVENTARIOS")
+        sucursal = sucursal.strip() if sucursal and sucursal.strip() else None
         
-        # Construir filtro base
-        filtro = {"estado": {"$ne": "inactivo"}}
-        
-        # Filtrar por sucursal si se especifica
-        if sucursal and sucursal.strip():
-            filtro["farmacia"] = sucursal.strip()
-        
-        query_term = q.strip() if q and q.strip() else ""
-        
-        # Detectar modo de búsqueda: rápida (*) o amplia (sin *)
-        busqueda_rapida = query_term.endswith("*")
-        if busqueda_rapida:
-            # Remover el * del término
-            query_term = query_term[:-1].strip()
-        
-        # OPTIMIZACIÓN MÁXIMA: Búsqueda por código exacto primero (más rápida)
-        if query_term:
-            # 1. Intentar búsqueda exacta por código (MUY RÁPIDA con índice)
-            codigo_filtro = {**filtro, "codigo": query_term.upper()}
-            # OPTIMIZACIÓN: Proyección incluyendo todos los campos necesarios (igual que inventarios)
-            producto_exacto = await inventarios_collection.find_one(
-                codigo_filtro,
-                projection={
-                    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,  # Incluir descripción
-                    "precio_venta": 1, "precio": 1, "cantidad": 1, "existencia": 1, "stock": 1,
-                    "costo": 1, "utilidad": 1, "porcentaje_utilidad": 1,
-                    "farmacia": 1, "estado": 1, "marca": 1, "marca_producto": 1
-                }
-            )
-            
-            if producto_exacto:
-                # Calcular precios desde costo + utilidad si no están definidos
-                costo = float(producto_exacto.get("costo", 0))
-                precio_venta_actual = float(producto_exacto.get("precio_venta", 0))
-                utilidad_actual = producto_exacto.get("utilidad")
-                
-                # Si hay costo pero no precio_venta, calcular con 40% de utilidad
-                if costo > 0 and (not precio_venta_actual or precio_venta_actual == 0):
-                    precio_venta_actual = costo / 0.60
-                    utilidad_actual = precio_venta_actual - costo
-                
-                # Si hay precio_venta pero no utilidad, calcularla
-                elif precio_venta_actual > 0 and (not utilidad_actual or utilidad_actual == 0):
-                    if costo > 0:
-                        utilidad_actual = precio_venta_actual - costo
-                    else:
-                        utilidad_actual = 0
-                
-                # Obtener valores de stock (prioridad: existencia > cantidad > stock)
-                existencia = float(producto_exacto.get("existencia", 0))
-                cantidad = float(producto_exacto.get("cantidad", 0))
-                stock = float(producto_exacto.get("stock", 0))
-                
-                # Usar existencia como campo principal (igual que en verinventario)
-                if existencia > 0:
-                    stock_disponible = existencia
-                elif cantidad > 0:
-                    stock_disponible = cantidad
-                else:
-                    stock_disponible = stock if stock > 0 else 0
-                
-                resultado = {
-                    "id": str(producto_exacto["_id"]),
-                    "codigo": producto_exacto.get("codigo", ""),
-                    "nombre": producto_exacto.get("nombre", ""),
-                    "descripcion": producto_exacto.get("descripcion", ""),  # Incluir descripción
-                    "costo": round(costo, 2),
-                    "utilidad": round(utilidad_actual or 0, 2),
-                    "precio": round(precio_venta_actual, 2),
-                    "precio_venta": round(precio_venta_actual, 2),
-                    "cantidad": float(stock_disponible),  # Mostrar existencia como cantidad
-                    "stock": float(stock_disponible),     # Mostrar existencia como stock
-                    "existencia": float(stock_disponible), # Incluir existencia explícitamente
-                    "sucursal": producto_exacto.get("farmacia", sucursal or ""),
-                    "farmacia": producto_exacto.get("farmacia", sucursal or ""),  # Incluir farmacia también
-                    "estado": producto_exacto.get("estado", "activo"),
-                    "marca": producto_exacto.get("marca") or producto_exacto.get("marca_producto") or ""
-                }
-                
-                # Agregar porcentaje de utilidad si existe
-                if producto_exacto.get("porcentaje_utilidad"):
-                    resultado["porcentaje_utilidad"] = float(producto_exacto["porcentaje_utilidad"])
-                elif costo > 0 and utilidad_actual:
-                    resultado["porcentaje_utilidad"] = round((utilidad_actual / costo) * 100, 2)
-                
-                return [resultado]
-        
-        # 2. Si no hay término de búsqueda, retornar TODOS los productos de la sucursal
-        # IMPORTANTE: Esto permite que el frontend cargue todos los productos al abrir el módulo
-        if not query_term:
-            # OPTIMIZACIÓN: Proyección incluyendo todos los campos necesarios (igual que inventarios)
-            # Límite aumentado a 200 para mostrar más productos (puede ajustarse según necesidad)
-            productos = await inventarios_collection.find(
-                filtro,
-                projection={
-                    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,  # Incluir descripción
-                    "precio_venta": 1, "precio": 1, "cantidad": 1, "existencia": 1, "stock": 1,
-                    "costo": 1, "utilidad": 1, "porcentaje_utilidad": 1,
-                    "farmacia": 1, "estado": 1, "marca": 1, "marca_producto": 1
-                }
-            ).sort("nombre", 1).limit(200).to_list(length=200)
-            print(f"📋 [PUNTO_VENTA] Retornando TODOS los productos (sin búsqueda) - Total: {len(productos)}")
-        else:
-            # Escapar el término para regex
-            escaped_query = re.escape(query_term)
-            
-            if busqueda_rapida:
-                # BÚSQUEDA RÁPIDA: Solo coincidencias al INICIO en código y nombre (campos indexados)
-                # OPTIMIZACIÓN MÁXIMA: Priorizar código primero (índice más rápido)
-                match_stage = {
-                    **filtro,
-                    "$or": [
-                        {"codigo": {"$regex": f"^{escaped_query}", "$options": "i"}},  # Coincidencia al inicio en código (MÁS RÁPIDO)
-                        {"nombre": {"$regex": f"^{escaped_query}", "$options": "i"}}   # Coincidencia al inicio en nombre
-                    ]
-                }
-                print(f"⚡ [PUNTO_VENTA] Búsqueda RÁPIDA (con *): '{query_term}' - Solo código y nombre")
-            else:
-                # BÚSQUEDA AMPLIA: Busca en todos los campos pero prioriza código y nombre
-                # OPTIMIZACIÓN: Priorizar coincidencias al inicio primero
-                match_stage = {
-                    **filtro,
-                    "$or": [
-                        {"codigo": {"$regex": f"^{escaped_query}", "$options": "i"}},  # Coincidencia al inicio en código (MÁS RÁPIDO)
-                        {"nombre": {"$regex": f"^{escaped_query}", "$options": "i"}},  # Coincidencia al inicio en nombre
-                        {"codigo": {"$regex": escaped_query, "$options": "i"}},  # Coincidencia parcial en código
-                        {"nombre": {"$regex": escaped_query, "$options": "i"}},  # Coincidencia parcial en nombre
-                        {"descripcion": {"$regex": escaped_query, "$options": "i"}},  # Último recurso: descripción
-                        {"marca": {"$regex": escaped_query, "$options": "i"}}  # Último recurso: marca
-                    ]
-                }
-                print(f"🔍 [PUNTO_VENTA] Búsqueda AMPLIA (sin *): '{query_term}' - Todos los campos")
-            
-            # OPTIMIZACIÓN: Proyección incluyendo todos los campos necesarios (igual que inventarios)
-            productos = await inventarios_collection.find(
-                match_stage,
-                projection={
-                    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,  # Incluir descripción
-                    "precio_venta": 1, "precio": 1, "cantidad": 1, "existencia": 1, "stock": 1,
-                    "costo": 1, "utilidad": 1, "porcentaje_utilidad": 1,
-                    "farmacia": 1, "estado": 1, "marca": 1, "marca_producto": 1
-                }
-            ).sort("nombre", 1).limit(30).to_list(length=30)
-        
-        # Formatear resultados incluyendo costo y utilidad calculados
-        resultados = []
-        for producto in productos:
-            # Calcular precios desde costo + utilidad si no están definidos
-            costo = float(producto.get("costo", 0))
-            precio_venta_actual = float(producto.get("precio_venta", 0))
-            utilidad_actual = producto.get("utilidad")
-            
-            # Si hay costo pero no precio_venta, calcular con 40% de utilidad
-            if costo > 0 and (not precio_venta_actual or precio_venta_actual == 0):
-                precio_venta_actual = costo / 0.60
-                utilidad_actual = precio_venta_actual - costo
-            
-            # Si hay precio_venta pero no utilidad, calcularla
-            elif precio_venta_actual > 0 and (not utilidad_actual or utilidad_actual == 0):
-                if costo > 0:
-                    utilidad_actual = precio_venta_actual - costo
-                else:
-                    utilidad_actual = 0
-            
-            # Obtener valores de stock (prioridad: existencia > cantidad > stock)
-            existencia = float(producto.get("existencia", 0))
-            cantidad = float(producto.get("cantidad", 0))
-            stock = float(producto.get("stock", 0))
-            
-            # Usar existencia como campo principal (igual que en verinventario)
-            if existencia > 0:
-                stock_disponible = existencia
-            elif cantidad > 0:
-                stock_disponible = cantidad
-            else:
-                stock_disponible = stock if stock > 0 else 0
-            
-            resultado = {
-                "id": str(producto["_id"]),
-                "codigo": producto.get("codigo", ""),
-                "nombre": producto.get("nombre", ""),
-                "descripcion": producto.get("descripcion", ""),  # Incluir descripción
-                "costo": round(costo, 2),
-                "utilidad": round(utilidad_actual or 0, 2),
-                "precio": round(precio_venta_actual, 2),
-                "precio_venta": round(precio_venta_actual, 2),
-                "cantidad": float(stock_disponible),  # Mostrar existencia como cantidad
-                "stock": float(stock_disponible),     # Mostrar existencia como stock
-                "existencia": float(stock_disponible), # Incluir existencia explícitamente
-                "sucursal": producto.get("farmacia", sucursal or ""),
-                "farmacia": producto.get("farmacia", sucursal or ""),  # Incluir farmacia también
-                "estado": producto.get("estado", "activo"),
-                "marca": producto.get("marca") or producto.get("marca_producto") or ""
-            }
-            
-            # Agregar porcentaje de utilidad si existe o calcularlo
-            if producto.get("porcentaje_utilidad"):
-                resultado["porcentaje_utilidad"] = float(producto["porcentaje_utilidad"])
-            elif costo > 0 and utilidad_actual:
-                resultado["porcentaje_utilidad"] = round((utilidad_actual / costo) * 100, 2)
-            
-            resultados.append(resultado)
-        
+        # Código exacto -> prefijo (con *) o subcadena (sin *) en un solo aggregate (app/search/buscador.py)
+        resultados = await ejecutar_consulta("busqueda", buscar_punto_venta(inventarios_collection, q, sucursal), request)
+        logger.debug("🔍 [PUNTO_VENTA] Búsqueda '%s': %s resultados", q, len(resultados))
         return resultados
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ [PUNTO_VENTA] Error buscando productos: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/punto-venta/productos/autocomplete")
+async def autocompletar_productos_punto_venta(
+    request: Request,
+    q: str = Query("", description="Lo que el usuario lleva escrito"),
+    sucursal: Optional[str] = Query(None, description="ID de la sucursal (farmacia)"),
+    limite: int = Query(LIMITE_AUTOCOMPLETAR, ge=1, le=50, description="Cantidad máxima de sugerencias"),
+    secuencia: Optional[int] = Query(None, description="Número creciente por tecla; cancela las solicitudes anteriores del mismo usuario"),
+    usuario_actual: dict = Depends(get_current_user)
+):
+    """
+    Sugerencias mientras se escribe: productos activos cuyo nombre o código
+    EMPIEZA con el término (sin acentos ni mayúsculas), en orden alfabético.
+    
+    - Sale de un trie comprimido en memoria por farmacia (sin consultar Mongo)
+    - Con `secuencia`, una solicitud nueva del mismo usuario cancela la anterior
+      que siga en curso; la anterior responde 409 y el frontend la descarta
+    
+    Respuesta: {"secuencia": n, "resultados": [{"id", "codigo", "nombre"}]}
+    """
+    sucursal = sucursal.strip() if sucursal and sucursal.strip() else None
+    inventarios_collection = get_collection("INVENTARIOS")
+    try:
+        resultados = await ejecutar_consulta("busqueda", solicitudes_autocompletado.ejecutar(
+            usuario_actual.get("correo"),
+            secuencia,
+            autocompletar_punto_venta(inventarios_collection, q, sucursal, limite),
+        ), request)
+    except SolicitudReemplazada:
+        raise HTTPException(status_code=409, detail="Solicitud reemplazada por una más reciente")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ [PUNTO_VENTA] Error buscando productos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PUNTO_VENTA] Error autocompletando productos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    return {"secuencia": secuencia, "resultados": resultados}
 
 @router.post("/punto-venta/ventas")
 async def crear_venta(
@@ -284,7 +135,7 @@ async def crear_venta(
     Requiere autenticación.
     """
     try:
-        print(f"💰 [PUNTO_VENTA] Creando venta - Usuario: {usuario_actual.get('correo', 'unknown')}")
+        logger.debug("💰 [PUNTO_VENTA] Creando venta - Usuario: %s", usuario_actual.get('correo', 'unknown'))
         
         # Validar y procesar descuento_por_divisa
         descuento_por_divisa = venta_data.get("descuento_por_divisa", 0)
@@ -320,23 +171,23 @@ async def crear_venta(
         # Usar "productos" como campo estándar (compatibilidad con ambos)
         if productos_recibidos:
             venta_dict["productos"] = productos_recibidos
-            print(f"📦 [PUNTO_VENTA] Productos recibidos del frontend: {len(productos_recibidos)} items")
+            logger.debug("📦 [PUNTO_VENTA] Productos recibidos del frontend: %s items", len(productos_recibidos))
         elif items_recibidos:
             # Si viene como "items", convertir a "productos"
             venta_dict["productos"] = items_recibidos
-            print(f"📦 [PUNTO_VENTA] Items recibidos del frontend (convertidos a productos): {len(items_recibidos)} items")
+            logger.debug("📦 [PUNTO_VENTA] Items recibidos del frontend (convertidos a productos): %s items", len(items_recibidos))
         else:
-            print(f"⚠️ [PUNTO_VENTA] ADVERTENCIA: No se recibieron items ni productos del frontend")
-            print(f"   Campos recibidos: {list(venta_data.keys())}")
+            logger.warning("⚠️ [PUNTO_VENTA] ADVERTENCIA: No se recibieron items ni productos del frontend")
+            logger.debug("   Campos recibidos: %s", list(venta_data.keys()))
         
         # Log detallado de los productos recibidos
         productos_para_guardar = venta_dict.get("productos", [])
         if productos_para_guardar:
-            print(f"📦 [PUNTO_VENTA] Productos que se guardarán en la venta:")
+            logger.debug("📦 [PUNTO_VENTA] Productos que se guardarán en la venta:")
             for idx, prod in enumerate(productos_para_guardar[:5], 1):  # Mostrar primeros 5
-                print(f"   Producto {idx}: codigo={prod.get('codigo', 'N/A')}, nombre={prod.get('nombre', 'N/A')}, cantidad={prod.get('cantidad', 0)}")
+                logger.debug("   Producto %s: codigo=%s, nombre=%s, cantidad=%s", idx, prod.get('codigo', 'N/A'), prod.get('nombre', 'N/A'), prod.get('cantidad', 0))
             if len(productos_para_guardar) > 5:
-                print(f"   ... y {len(productos_para_guardar) - 5} productos más")
+                logger.debug("   ... y %s productos más", len(productos_para_guardar) - 5)
         
         # Agregar información de creación
         venta_dict["usuarioCreacion"] = usuario_actual.get("correo", "unknown")
@@ -348,7 +199,7 @@ async def crear_venta(
         # IMPORTANTE: Establecer estado como "procesada" EXACTAMENTE (no "confirmada" ni "impresa")
         # Este estado es crítico para que las ventas aparezcan en el resumen
         venta_dict["estado"] = "procesada"
-        print(f"📋 [PUNTO_VENTA] Estado de venta establecido como: 'procesada'")
+        logger.debug("📋 [PUNTO_VENTA] Estado de venta establecido como: 'procesada'")
         
         if not farmacia:
             raise HTTPException(status_code=400, detail="La venta debe tener una sucursal (sucursal o farmacia)")
@@ -390,7 +241,7 @@ async def crear_venta(
             numero_factura = f"FAC-{str(siguiente_numero).zfill(3)}"
             venta_dict["numeroFactura"] = numero_factura
             venta_dict["numero_factura"] = numero_factura  # Compatibilidad con ambos campos
-            print(f"📄 [PUNTO_VENTA] Número de factura generado: {numero_factura}")
+            logger.debug("📄 [PUNTO_VENTA] Número de factura generado: %s", numero_factura)
         
         # DESCONTAR STOCK DEL INVENTARIO Y GUARDAR VENTA CON TRANSACCIÓN (ATOMICIDAD)
         # IMPORTANTE: Preservar los productos recibidos del frontend
@@ -402,25 +253,25 @@ async def crear_venta(
             if items_recibidos:
                 productos = items_recibidos
                 venta_dict["productos"] = items_recibidos
-                print(f"📦 [PUNTO_VENTA] Productos encontrados en campo 'items', convertidos a 'productos': {len(productos)}")
+                logger.debug("📦 [PUNTO_VENTA] Productos encontrados en campo 'items', convertidos a 'productos': %s", len(productos))
             else:
-                print(f"⚠️ [PUNTO_VENTA] ADVERTENCIA: No se encontraron productos ni items en la venta")
-                print(f"   Campos recibidos: {list(venta_data.keys())}")
+                logger.warning("⚠️ [PUNTO_VENTA] ADVERTENCIA: No se encontraron productos ni items en la venta")
+                logger.debug("   Campos recibidos: %s", list(venta_data.keys()))
         
         costo_inventario_total = 0.0
         
-        print(f"📋 [PUNTO_VENTA] Datos de la venta:")
-        print(f"   - Farmacia/Sucursal: {farmacia}")
-        print(f"   - Fecha: {fecha_venta}")
-        print(f"   - Total productos: {len(productos)}")
-        print(f"   - Productos: {[{'id': p.get('productoId') or p.get('id'), 'codigo': p.get('codigo'), 'cantidad': p.get('cantidad')} for p in productos]}")
+        logger.debug("📋 [PUNTO_VENTA] Datos de la venta:")
+        logger.debug("   - Farmacia/Sucursal: %s", farmacia)
+        logger.debug("   - Fecha: %s", fecha_venta)
+        logger.debug("   - Total productos: %s", len(productos))
+        logger.debug("   - Productos: %s", [{'id': p.get('productoId') or p.get('id'), 'codigo': p.get('codigo'), 'cantidad': p.get('cantidad')} for p in productos])
         
         # Logs de depuración adicionales para verificar datos
         for idx, producto_venta in enumerate(productos):
             producto_id = producto_venta.get("productoId") or producto_venta.get("id")
             codigo = producto_venta.get("codigo", "N/A")
             cantidad = producto_venta.get("cantidad", 0)
-            print(f"   📦 Producto {idx + 1}: ID={producto_id}, Código={codigo}, Cantidad={cantidad}")
+            logger.debug("   📦 Producto %s: ID=%s, Código=%s, Cantidad=%s", idx + 1, producto_id, codigo, cantidad)
         
         # Usar transacción para asegurar atomicidad: si falla la venta, no se descuenta stock
         client = get_client()
@@ -430,7 +281,7 @@ async def crear_venta(
                 async with session.start_transaction():
                     # 1. Descontar stock del inventario (dentro de la transacción)
                     if productos:
-                        print(f"📦 [PUNTO_VENTA] Descontando stock de {len(productos)} productos (con transacción)...")
+                        logger.debug("📦 [PUNTO_VENTA] Descontando stock de %s productos (con transacción)...", len(productos))
                         for producto_venta in productos:
                             producto_id = producto_venta.get("productoId") or producto_venta.get("id")
                             codigo_producto = producto_venta.get("codigo") or producto_venta.get("codigoProducto")
@@ -438,8 +289,7 @@ async def crear_venta(
                             
                             # Validar que tengamos los datos necesarios
                             if not producto_id and not codigo_producto:
-                                print(f"❌ [PUNTO_VENTA] ERROR CRÍTICO: Producto sin ID ni código válido")
-                                print(f"   Datos del producto: {producto_venta}")
+                                logger.error("❌ [PUNTO_VENTA] ERROR CRÍTICO: Producto sin ID ni código válido: %s", producto_venta)
                                 await session.abort_transaction()
                                 raise HTTPException(
                                     status_code=400,
@@ -447,16 +297,16 @@ async def crear_venta(
                                 )
                             
                             if cantidad <= 0:
-                                print(f"⚠️ [PUNTO_VENTA] Producto con cantidad inválida: {cantidad}")
+                                logger.warning("⚠️ [PUNTO_VENTA] Producto con cantidad inválida: %s", cantidad)
                                 continue  # Saltar este producto pero continuar con los demás
                             
                             try:
-                                print(f"🔄 [PUNTO_VENTA] ===== INICIANDO DESCUENTO DE PRODUCTO =====")
-                                print(f"   ID recibido: {producto_id}")
-                                print(f"   Código recibido: {codigo_producto}")
-                                print(f"   Cantidad a descontar: {cantidad}")
-                                print(f"   Farmacia/Sucursal: {farmacia}")
-                                print(f"   Datos completos del producto: {producto_venta}")
+                                logger.debug("🔄 [PUNTO_VENTA] ===== INICIANDO DESCUENTO DE PRODUCTO =====")
+                                logger.debug("   ID recibido: %s", producto_id)
+                                logger.debug("   Código recibido: %s", codigo_producto)
+                                logger.debug("   Cantidad a descontar: %s", cantidad)
+                                logger.debug("   Farmacia/Sucursal: %s", farmacia)
+                                logger.debug("   Datos completos del producto: %s", producto_venta)
                                 
                                 costo = await descontar_stock_inventario_con_sesion(
                                     producto_id or codigo_producto,  # Usar código si no hay ID
@@ -466,25 +316,19 @@ async def crear_venta(
                                     codigo_producto
                                 )
                                 costo_inventario_total += costo
-                                print(f"✅ [PUNTO_VENTA] ===== PRODUCTO DESCONTADO EXITOSAMENTE =====")
-                                print(f"   ID: {producto_id}")
-                                print(f"   Código: {codigo_producto}")
-                                print(f"   Cantidad descontada: {cantidad}")
-                                print(f"   Costo: {costo}")
+                                logger.debug("✅ [PUNTO_VENTA] ===== PRODUCTO DESCONTADO EXITOSAMENTE =====")
+                                logger.debug("   ID: %s", producto_id)
+                                logger.debug("   Código: %s", codigo_producto)
+                                logger.debug("   Cantidad descontada: %s", cantidad)
+                                logger.debug("   Costo: %s", costo)
                             except HTTPException:
                                 # Re-lanzar HTTPException sin modificar
                                 raise
                             except Exception as e:
-                                print(f"❌ [PUNTO_VENTA] ===== ERROR DESCONTANDO STOCK =====")
-                                print(f"   ID: {producto_id}")
-                                print(f"   Código: {codigo_producto}")
-                                print(f"   Cantidad: {cantidad}")
-                                print(f"   Farmacia: {farmacia}")
-                                print(f"   Error: {str(e)}")
-                                print(f"   Tipo de error: {type(e).__name__}")
-                                import traceback
-                                print(f"   Traceback completo:")
-                                traceback.print_exc()
+                                logger.exception(
+                                    "❌ [PUNTO_VENTA] Error descontando stock: %s", e,
+                                    extra={"producto_id": producto_id, "codigo": codigo_producto, "cantidad": cantidad, "farmacia": farmacia}
+                                )
                                 # Abortar transacción si falla el descuento
                                 await session.abort_transaction()
                                 raise HTTPException(
@@ -502,40 +346,40 @@ async def crear_venta(
                     if "productos" not in venta_dict or not venta_dict.get("productos"):
                         # Si no están en venta_dict, usar la variable productos que ya procesamos
                         venta_dict["productos"] = productos
-                        print(f"📦 [PUNTO_VENTA] Productos restaurados en venta_dict antes de guardar: {len(productos)}")
+                        logger.debug("📦 [PUNTO_VENTA] Productos restaurados en venta_dict antes de guardar: %s", len(productos))
                     
                     productos_para_guardar = venta_dict.get('productos', [])
                     productos_count = len(productos_para_guardar)
                     numero_factura = venta_dict.get('numeroFactura') or venta_dict.get('numero_factura', 'N/A')
                     
-                    print(f"📋 [PUNTO_VENTA] Guardando venta:")
-                    print(f"   - Estado: '{venta_dict.get('estado')}' (debe ser 'procesada')")
-                    print(f"   - Número factura: {numero_factura}")
-                    print(f"   - Productos a guardar: {productos_count}")
-                    print(f"   - Sucursal/Farmacia: {farmacia}")
-                    print(f"   - Fecha: {fecha_venta}")
+                    logger.debug("📋 [PUNTO_VENTA] Guardando venta:")
+                    logger.debug("   - Estado: '%s' (debe ser 'procesada')", venta_dict.get('estado'))
+                    logger.debug("   - Número factura: %s", numero_factura)
+                    logger.debug("   - Productos a guardar: %s", productos_count)
+                    logger.debug("   - Sucursal/Farmacia: %s", farmacia)
+                    logger.debug("   - Fecha: %s", fecha_venta)
                     
                     # CRÍTICO: Verificar que los productos estén presentes
                     if productos_count == 0:
-                        print(f"⚠️ [PUNTO_VENTA] ADVERTENCIA: No hay productos en venta_dict antes de guardar")
-                        print(f"   Campos en venta_dict: {list(venta_dict.keys())}")
-                        print(f"   venta_dict.get('productos'): {venta_dict.get('productos')}")
-                        print(f"   venta_dict.get('items'): {venta_dict.get('items')}")
-                        print(f"   Variable productos (fuera de venta_dict): {len(productos)} items")
+                        logger.warning("⚠️ [PUNTO_VENTA] ADVERTENCIA: No hay productos en venta_dict antes de guardar")
+                        logger.debug("   Campos en venta_dict: %s", list(venta_dict.keys()))
+                        logger.debug("   venta_dict.get('productos'): %s", venta_dict.get('productos'))
+                        logger.debug("   venta_dict.get('items'): %s", venta_dict.get('items'))
+                        logger.debug("   Variable productos (fuera de venta_dict): %s items", len(productos))
                         # Intentar restaurar desde la variable productos
                         if productos:
                             venta_dict["productos"] = productos
                             productos_count = len(productos)
-                            print(f"📦 [PUNTO_VENTA] Productos restaurados desde variable: {productos_count}")
+                            logger.debug("📦 [PUNTO_VENTA] Productos restaurados desde variable: %s", productos_count)
                     else:
-                        print(f"✅ [PUNTO_VENTA] Productos confirmados antes de guardar: {productos_count}")
+                        logger.debug("✅ [PUNTO_VENTA] Productos confirmados antes de guardar: %s", productos_count)
                         # Mostrar resumen de productos
                         for idx, prod in enumerate(productos_para_guardar[:3], 1):
-                            print(f"      Producto {idx}: {prod.get('codigo', 'N/A')} - {prod.get('nombre', 'N/A')} x{prod.get('cantidad', 0)}")
+                            logger.debug("      Producto %s: %s - %s x%s", idx, prod.get('codigo', 'N/A'), prod.get('nombre', 'N/A'), prod.get('cantidad', 0))
                     
                     # Verificar que el estado sea exactamente "procesada"
                     if venta_dict.get("estado") != "procesada":
-                        print(f"❌ [PUNTO_VENTA] ERROR: Estado no es 'procesada': '{venta_dict.get('estado')}'")
+                        logger.error("❌ [PUNTO_VENTA] ERROR: Estado no es 'procesada': '%s'", venta_dict.get('estado'))
                         raise ValueError(f"Estado debe ser 'procesada', recibido: '{venta_dict.get('estado')}'")
                     
                     ventas_collection = get_collection("VENTAS")
@@ -548,38 +392,35 @@ async def crear_venta(
                     productos_guardados = venta_guardada.get("productos", []) if venta_guardada else []
                     productos_guardados_count = len(productos_guardados)
                     
-                    print(f"✅ [PUNTO_VENTA] Venta guardada con ID: {venta_id}")
-                    print(f"   - Estado guardado en BD: '{estado_guardado}' (debe ser 'procesada')")
-                    print(f"   - Número factura guardado: {venta_guardada.get('numeroFactura') or venta_guardada.get('numero_factura', 'N/A') if venta_guardada else 'N/A'}")
-                    print(f"   - Productos guardados en BD: {productos_guardados_count} (debe ser {productos_count})")
+                    logger.debug("✅ [PUNTO_VENTA] Venta guardada con ID: %s", venta_id)
+                    logger.debug("   - Estado guardado en BD: '%s' (debe ser 'procesada')", estado_guardado)
+                    logger.debug("   - Número factura guardado: %s", venta_guardada.get('numeroFactura') or venta_guardada.get('numero_factura', 'N/A') if venta_guardada else 'N/A')
+                    logger.debug("   - Productos guardados en BD: %s (debe ser %s)", productos_guardados_count, productos_count)
                     
                     if estado_guardado != "procesada":
-                        print(f"⚠️ [PUNTO_VENTA] ADVERTENCIA: Estado guardado no es 'procesada': '{estado_guardado}'")
+                        logger.warning("⚠️ [PUNTO_VENTA] ADVERTENCIA: Estado guardado no es 'procesada': '%s'", estado_guardado)
                     
                     if productos_guardados_count == 0:
-                        print(f"❌ [PUNTO_VENTA] ERROR CRÍTICO: Los productos NO se guardaron en la BD!")
-                        print(f"   Se intentaron guardar {productos_count} productos pero se guardaron {productos_guardados_count}")
-                        print(f"   Esto causará que la venta no aparezca en el resumen")
+                        logger.error("❌ [PUNTO_VENTA] ERROR CRÍTICO: Los productos NO se guardaron en la BD! Se intentaron guardar %s productos pero se guardaron %s", productos_count, productos_guardados_count)
                     elif productos_guardados_count != productos_count:
-                        print(f"⚠️ [PUNTO_VENTA] ADVERTENCIA: Cantidad de productos no coincide")
-                        print(f"   Esperados: {productos_count}, Guardados: {productos_guardados_count}")
+                        logger.warning("⚠️ [PUNTO_VENTA] ADVERTENCIA: Cantidad de productos no coincide. Esperados: %s, Guardados: %s", productos_count, productos_guardados_count)
                     
                     # 3. Si todo funciona, confirmar la transacción
-                    print(f"🔄 [PUNTO_VENTA] Confirmando transacción...")
+                    logger.debug("🔄 [PUNTO_VENTA] Confirmando transacción...")
                     await session.commit_transaction()
-                    print(f"✅ [PUNTO_VENTA] ===== TRANSACCIÓN COMPLETADA EXITOSAMENTE =====")
-                    print(f"   Venta ID: {venta_id}")
-                    print(f"   Total productos procesados: {len(productos)}")
-                    print(f"   Costo inventario total: {costo_inventario_total}")
-                    print(f"   Farmacia: {farmacia}")
-                    print(f"   Fecha: {fecha_venta}")
+                    logger.debug("✅ [PUNTO_VENTA] ===== TRANSACCIÓN COMPLETADA EXITOSAMENTE =====")
+                    logger.debug("   Venta ID: %s", venta_id)
+                    logger.debug("   Total productos procesados: %s", len(productos))
+                    logger.debug("   Costo inventario total: %s", costo_inventario_total)
+                    logger.debug("   Farmacia: %s", farmacia)
+                    logger.debug("   Fecha: %s", fecha_venta)
                     
             except HTTPException:
                 # Re-lanzar HTTPException sin modificar
                 raise
             except Exception as e:
                 # Si hay cualquier error, abortar la transacción
-                print(f"❌ [PUNTO_VENTA] Error en transacción, abortando: {e}")
+                logger.error("❌ [PUNTO_VENTA] Error en transacción, abortando: %s", e)
                 await session.abort_transaction()
                 raise HTTPException(
                     status_code=500,
@@ -611,9 +452,12 @@ async def crear_venta(
                     {"$set": {"totales": totales}}
                 )
         except Exception as e:
-            print(f"⚠️ [PUNTO_VENTA] Error actualizando resumen (no crítico): {e}")
+            logger.warning("⚠️ [PUNTO_VENTA] Error actualizando resumen (no crítico): %s", e)
         
-        print(f"✅ [PUNTO_VENTA] Venta creada: {venta_id} - Descuento por divisa: {descuento_por_divisa}% - Costo inventario: {costo_inventario_total}")
+        logger.info(
+            "✅ [PUNTO_VENTA] Venta creada: %s - Descuento por divisa: %s%% - Costo inventario: %s", venta_id, descuento_por_divisa, costo_inventario_total,
+            extra={"venta_id": venta_id, "farmacia": farmacia, "productos": len(productos)}
+        )
         
         # Asegurar que el estado esté en la respuesta
         venta_dict["estado"] = "procesada"
@@ -628,9 +472,7 @@ async def crear_venta(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [PUNTO_VENTA] Error creando venta: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PUNTO_VENTA] Error creando venta: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/punto-venta/ventas")
@@ -647,7 +489,7 @@ async def obtener_ventas(
     Requiere autenticación.
     """
     try:
-        print(f"📋 [PUNTO_VENTA] Obteniendo ventas - Sucursal: {sucursal}")
+        logger.debug("📋 [PUNTO_VENTA] Obteniendo ventas - Sucursal: %s", sucursal)
         
         ventas_collection = get_collection("VENTAS")
         filtro = {}
@@ -675,13 +517,11 @@ async def obtener_ventas(
             if "descuento_por_divisa" not in venta:
                 venta["descuento_por_divisa"] = 0
         
-        print(f"📋 [PUNTO_VENTA] Encontradas {len(ventas)} ventas")
+        logger.debug("📋 [PUNTO_VENTA] Encontradas %s ventas", len(ventas))
         return ventas
         
     except Exception as e:
-        print(f"❌ [PUNTO_VENTA] Error obteniendo ventas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PUNTO_VENTA] Error obteniendo ventas: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/punto-venta/ventas/usuario")
@@ -709,7 +549,7 @@ async def obtener_ventas_usuario(
     Requiere autenticación.
     """
     try:
-        print(f"📋 [PUNTO_VENTA] Obteniendo ventas - Sucursal: {sucursal}, Fecha inicio: {fecha_inicio}, Fecha fin: {fecha_fin}")
+        logger.debug("📋 [PUNTO_VENTA] Obteniendo ventas - Sucursal: %s, Fecha inicio: %s, Fecha fin: %s", sucursal, fecha_inicio, fecha_fin)
         
         ventas_collection = get_collection("VENTAS")
         clientes_collection = get_collection("CLIENTES")
@@ -724,18 +564,18 @@ async def obtener_ventas_usuario(
                 {"farmacia": sucursal.strip()}
             ]
         }
-        print(f"📋 [PUNTO_VENTA] Filtro aplicado: estado='procesada', sucursal={sucursal}")
+        logger.debug("📋 [PUNTO_VENTA] Filtro aplicado: estado='procesada', sucursal=%s", sucursal)
         
         # Filtrar por rango de fechas
         if fecha_inicio and fecha_fin:
             filtro["fecha"] = {"$gte": fecha_inicio, "$lte": fecha_fin}
-            print(f"📋 [PUNTO_VENTA] Filtro de fechas: {fecha_inicio} a {fecha_fin}")
+            logger.debug("📋 [PUNTO_VENTA] Filtro de fechas: %s a %s", fecha_inicio, fecha_fin)
         elif fecha_inicio:
             filtro["fecha"] = {"$gte": fecha_inicio}
-            print(f"📋 [PUNTO_VENTA] Filtro de fecha inicio: {fecha_inicio}")
+            logger.debug("📋 [PUNTO_VENTA] Filtro de fecha inicio: %s", fecha_inicio)
         elif fecha_fin:
             filtro["fecha"] = {"$lte": fecha_fin}
-            print(f"📋 [PUNTO_VENTA] Filtro de fecha fin: {fecha_fin}")
+            logger.debug("📋 [PUNTO_VENTA] Filtro de fecha fin: %s", fecha_fin)
         
         # DIAGNÓSTICO: Contar ventas totales y con estado "procesada"
         total_ventas = await ventas_collection.count_documents({})
@@ -748,19 +588,19 @@ async def obtener_ventas_usuario(
         })
         ventas_filtro = await ventas_collection.count_documents(filtro)
         
-        print(f"🔍 [PUNTO_VENTA] DIAGNÓSTICO:")
-        print(f"   - Total ventas en BD: {total_ventas}")
-        print(f"   - Ventas con estado 'procesada': {ventas_procesadas}")
-        print(f"   - Ventas de sucursal {sucursal}: {ventas_sucursal}")
-        print(f"   - Ventas que cumplen el filtro completo: {ventas_filtro}")
+        logger.debug("🔍 [PUNTO_VENTA] DIAGNÓSTICO:")
+        logger.debug("   - Total ventas en BD: %s", total_ventas)
+        logger.debug("   - Ventas con estado 'procesada': %s", ventas_procesadas)
+        logger.debug("   - Ventas de sucursal %s: %s", sucursal, ventas_sucursal)
+        logger.debug("   - Ventas que cumplen el filtro completo: %s", ventas_filtro)
         
         # Verificar estados distintos en la BD
         estados_distintos = await ventas_collection.distinct("estado")
-        print(f"   - Estados distintos en BD: {estados_distintos}")
+        logger.debug("   - Estados distintos en BD: %s", estados_distintos)
         
         # Si no hay ventas con el filtro, buscar sin filtro de estado para diagnóstico
         if ventas_filtro == 0:
-            print(f"⚠️ [PUNTO_VENTA] No se encontraron ventas con el filtro. Buscando sin filtro de estado...")
+            logger.warning("⚠️ [PUNTO_VENTA] No se encontraron ventas con el filtro. Buscando sin filtro de estado...")
             ventas_sin_estado = await ventas_collection.find({
                 "$or": [
                     {"sucursal": sucursal.strip()},
@@ -768,16 +608,16 @@ async def obtener_ventas_usuario(
                 ]
             }).limit(5).to_list(length=5)
             if ventas_sin_estado:
-                print(f"   - Se encontraron {len(ventas_sin_estado)} ventas de la sucursal (sin filtro de estado):")
+                logger.debug("   - Se encontraron %s ventas de la sucursal (sin filtro de estado):", len(ventas_sin_estado))
                 for v in ventas_sin_estado:
-                    print(f"     * ID: {v.get('_id')}, Estado: '{v.get('estado', 'N/A')}', Fecha: {v.get('fecha', 'N/A')}")
+                    logger.debug("     * ID: %s, Estado: '%s', Fecha: %s", v.get('_id'), v.get('estado', 'N/A'), v.get('fecha', 'N/A'))
         
         # Limitar resultados
         limit_val = min(limit or 100, 10000)  # Máximo 10000
         
         # Obtener ventas ordenadas por fecha descendente
         ventas = await ventas_collection.find(filtro).sort("fechaCreacion", -1).limit(limit_val).to_list(length=limit_val)
-        print(f"📋 [PUNTO_VENTA] Ventas encontradas con el filtro: {len(ventas)}")
+        logger.debug("📋 [PUNTO_VENTA] Ventas encontradas con el filtro: %s", len(ventas))
         
         # Formatear respuesta con items detallados
         resultados = []
@@ -834,7 +674,7 @@ async def obtener_ventas_usuario(
                             "direccion": cliente.get("direccion", "")
                         }
                 except (InvalidId, ValueError, Exception) as e:
-                    print(f"⚠️ [PUNTO_VENTA] Error obteniendo cliente {cliente_id}: {e}")
+                    logger.warning("⚠️ [PUNTO_VENTA] Error obteniendo cliente %s: %s", cliente_id, e)
             
             # Obtener información de la sucursal
             sucursal_info = {
@@ -863,13 +703,11 @@ async def obtener_ventas_usuario(
             
             resultados.append(venta_formateada)
         
-        print(f"📋 [PUNTO_VENTA] Retornando {len(resultados)} ventas con items detallados")
+        logger.debug("📋 [PUNTO_VENTA] Retornando %s ventas con items detallados", len(resultados))
         return resultados
         
     except Exception as e:
-        print(f"❌ [PUNTO_VENTA] Error obteniendo ventas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PUNTO_VENTA] Error obteniendo ventas: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/punto-venta/tasa-del-dia")
@@ -887,7 +725,7 @@ async def obtener_tasa_del_dia(
         if not fecha:
             fecha = datetime.now().strftime("%Y-%m-%d")
         
-        print(f"💱 [PUNTO_VENTA] Obteniendo tasa del día: {fecha}")
+        logger.debug("💱 [PUNTO_VENTA] Obteniendo tasa del día: %s", fecha)
         
         # Buscar en la colección de cuadres o tasas
         cuadres_collection = get_collection("CUADRES")
@@ -897,7 +735,7 @@ async def obtener_tasa_del_dia(
         
         if cuadre and "tasa" in cuadre:
             tasa = float(cuadre["tasa"])
-            print(f"💱 [PUNTO_VENTA] Tasa encontrada: {tasa} para fecha: {fecha}")
+            logger.debug("💱 [PUNTO_VENTA] Tasa encontrada: %s para fecha: %s", tasa, fecha)
             return {
                 "fecha": fecha,
                 "tasa": tasa
@@ -909,7 +747,7 @@ async def obtener_tasa_del_dia(
         
         if tasa_doc and "tasa" in tasa_doc:
             tasa = float(tasa_doc["tasa"])
-            print(f"💱 [PUNTO_VENTA] Tasa encontrada en colección TASAS: {tasa}")
+            logger.debug("💱 [PUNTO_VENTA] Tasa encontrada en colección TASAS: %s", tasa)
             return {
                 "fecha": fecha,
                 "tasa": tasa
@@ -924,7 +762,7 @@ async def obtener_tasa_del_dia(
         
         if ultima_tasa and "tasa" in ultima_tasa:
             tasa = float(ultima_tasa["tasa"])
-            print(f"💱 [PUNTO_VENTA] Usando última tasa conocida: {tasa} del día {ultima_tasa.get('dia', 'desconocido')}")
+            logger.debug("💱 [PUNTO_VENTA] Usando última tasa conocida: %s del día %s", tasa, ultima_tasa.get('dia', 'desconocido'))
             return {
                 "fecha": fecha,
                 "tasa": tasa,
@@ -932,7 +770,7 @@ async def obtener_tasa_del_dia(
             }
         
         # Si no hay ninguna tasa, retornar 1.0 por defecto
-        print(f"⚠️ [PUNTO_VENTA] No se encontró tasa, usando valor por defecto: 1.0")
+        logger.warning("⚠️ [PUNTO_VENTA] No se encontró tasa, usando valor por defecto: 1.0")
         return {
             "fecha": fecha,
             "tasa": 1.0,
@@ -940,9 +778,7 @@ async def obtener_tasa_del_dia(
         }
         
     except Exception as e:
-        print(f"❌ [PUNTO_VENTA] Error obteniendo tasa del día: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [PUNTO_VENTA] Error obteniendo tasa del día: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============================================================================
@@ -959,7 +795,8 @@ async def descontar_stock_inventario_con_sesion(
     """
     Descuenta stock del inventario usando FIFO para lotes (con sesión de transacción).
     Retorna el costo total descontado para calcular el costo de inventario.
-    IMPORTANTE: Esta función debe usarse dentro de una transacción para asegurar atomicidad.
+    El descuento es un solo find_one_and_update condicionado a que haya stock
+    (ver existencias_service.descontar_stock).
     
     Args:
         producto_id: ID del producto (puede ser ObjectId o código)
@@ -969,207 +806,12 @@ async def descontar_stock_inventario_con_sesion(
         codigo_producto: Código del producto (opcional, para búsqueda alternativa)
     """
     try:
-        inventarios_collection = get_collection("INVENTARIOS")
-        
-        producto = None
-        producto_object_id = None
-        
-        # Intentar buscar por ID primero
-        producto_object_id = None
-        if producto_id:
-            try:
-                producto_object_id = ObjectId(producto_id)
-                print(f"🔍 [INVENTARIO] Buscando producto por ID: {producto_id} en farmacia: {farmacia}")
-                producto = await inventarios_collection.find_one(
-                    {
-                        "_id": producto_object_id,
-                        "farmacia": farmacia
-                    },
-                    session=session
-                )
-                if producto:
-                    print(f"✅ [INVENTARIO] Producto encontrado por ID: {producto_id}")
-                    print(f"   Código del producto: {producto.get('codigo', 'N/A')}")
-                    print(f"   Nombre: {producto.get('nombre', 'N/A')}")
-                else:
-                    print(f"⚠️ [INVENTARIO] Producto con ID {producto_id} no encontrado en farmacia {farmacia}")
-                    # Buscar sin filtro de farmacia para debugging
-                    producto_debug = await inventarios_collection.find_one(
-                        {"_id": producto_object_id},
-                        session=session
-                    )
-                    if producto_debug:
-                        print(f"⚠️ [INVENTARIO] Producto existe pero en otra farmacia. Farmacia del producto: {producto_debug.get('farmacia')}, Farmacia buscada: {farmacia}")
-                    producto = None
-            except (InvalidId, ValueError) as e:
-                print(f"⚠️ [INVENTARIO] ID inválido '{producto_id}': {e}")
-                print(f"   Intentando buscar por código...")
-                producto_object_id = None
-                producto = None
-        else:
-            print(f"⚠️ [INVENTARIO] No se proporcionó producto_id, buscando solo por código")
-            producto = None
-        
-        # Si no se encontró por ID, intentar buscar por código
-        if not producto:
-            codigo_busqueda = codigo_producto or producto_id
-            print(f"🔍 [INVENTARIO] Buscando producto por código: '{codigo_busqueda}' en farmacia: '{farmacia}'")
-            
-            # Intentar búsqueda exacta primero (case insensitive)
-            filtro_exacto = {
-                "codigo": {"$regex": f"^{codigo_busqueda}$", "$options": "i"},
-                "farmacia": farmacia,
-                "estado": {"$ne": "inactivo"}
-            }
-            producto = await inventarios_collection.find_one(filtro_exacto, session=session)
-            
-            if producto:
-                producto_object_id = producto["_id"]
-                print(f"✅ [INVENTARIO] Producto encontrado por código (exacto): {codigo_busqueda}")
-            else:
-                # Intentar búsqueda sin filtro de estado (por si está inactivo pero necesitamos verlo)
-                filtro_sin_estado = {
-                    "codigo": {"$regex": f"^{codigo_busqueda}$", "$options": "i"},
-                    "farmacia": farmacia
-                }
-                producto = await inventarios_collection.find_one(filtro_sin_estado, session=session)
-                
-                if producto:
-                    print(f"⚠️ [INVENTARIO] Producto encontrado pero está inactivo: {codigo_busqueda}")
-                    raise ValueError(f"Producto encontrado pero está inactivo. ID: {producto_id}, Código: {codigo_busqueda}, Estado: {producto.get('estado')}")
-                else:
-                    # Buscar sin filtro de farmacia para debugging
-                    producto_debug = await inventarios_collection.find_one(
-                        {"codigo": {"$regex": f"^{codigo_busqueda}$", "$options": "i"}},
-                        session=session
-                    )
-                    if producto_debug:
-                        print(f"⚠️ [INVENTARIO] Producto existe pero en otra farmacia. Farmacia del producto: {producto_debug.get('farmacia')}, Farmacia buscada: {farmacia}")
-                    raise ValueError(f"Producto no encontrado. ID: {producto_id}, Código: {codigo_busqueda}, Farmacia: {farmacia}")
-        
-        # Validar stock disponible
-        # Prioridad: existencia > cantidad > stock (según instrucciones, el frontend muestra "Existencia")
-        existencia_actual = float(producto.get("existencia", 0))
-        cantidad_actual = float(producto.get("cantidad", 0))
-        stock_actual = float(producto.get("stock", 0))
-        
-        # Usar existencia como campo principal, si no existe usar cantidad
-        if existencia_actual > 0:
-            cantidad_disponible = existencia_actual
-        elif cantidad_actual > 0:
-            cantidad_disponible = cantidad_actual
-        else:
-            cantidad_disponible = stock_actual if stock_actual > 0 else 0
-        
-        print(f"📊 [INVENTARIO] Producto: {producto.get('codigo', 'N/A')} - {producto.get('nombre', 'N/A')}")
-        print(f"📊 [INVENTARIO] Valores actuales - Existencia: {existencia_actual}, Cantidad: {cantidad_actual}, Stock: {stock_actual}")
-        print(f"📊 [INVENTARIO] Cantidad disponible: {cantidad_disponible}")
-        print(f"📊 [INVENTARIO] Cantidad a descontar: {cantidad_vendida}")
-        print(f"📊 [INVENTARIO] Valores ANTES del descuento:")
-        print(f"      - existencia: {existencia_actual}")
-        print(f"      - cantidad: {cantidad_actual}")
-        print(f"      - stock: {stock_actual}")
-        
-        if cantidad_disponible < cantidad_vendida:
-            raise ValueError(f"Stock insuficiente. Disponible: {cantidad_disponible}, Requerido: {cantidad_vendida}")
-        
-        # Manejar lotes con FIFO
-        lotes = producto.get("lotes", [])
-        cantidad_restante = cantidad_vendida
-        costo_total = 0.0
-        
-        if lotes and len(lotes) > 0:
-            # Ordenar lotes por fecha (FIFO: primero los más antiguos)
-            lotes_ordenados = sorted(lotes, key=lambda x: x.get("fecha_vencimiento", "9999-12-31"))
-            
-            # Descontar de lotes
-            lotes_actualizados = []
-            for lote in lotes_ordenados:
-                if cantidad_restante <= 0:
-                    lotes_actualizados.append(lote)
-                    continue
-                
-                cantidad_lote = float(lote.get("cantidad", 0))
-                costo_lote = float(lote.get("costo", 0))
-                
-                if cantidad_lote <= cantidad_restante:
-                    # Descontar todo el lote
-                    costo_total += cantidad_lote * costo_lote
-                    cantidad_restante -= cantidad_lote
-                    # No agregar el lote a lotes_actualizados (se agotó)
-                else:
-                    # Descontar parcialmente del lote
-                    costo_total += cantidad_restante * costo_lote
-                    lote["cantidad"] = cantidad_lote - cantidad_restante
-                    lotes_actualizados.append(lote)
-                    cantidad_restante = 0
-            
-            # Actualizar producto con lotes actualizados
-            # IMPORTANTE: Descontar la misma cantidad de cantidad, existencia y stock
-            nueva_cantidad = cantidad_disponible - cantidad_vendida
-            update_data = {
-                "cantidad": nueva_cantidad,
-                "existencia": nueva_cantidad,  # Siempre actualizar existencia
-                "stock": nueva_cantidad,       # Siempre actualizar stock
-                "lotes": lotes_actualizados
-            }
-            
-            await inventarios_collection.update_one(
-                {"_id": producto_object_id},
-                {"$set": update_data},
-                session=session
-            )
-        else:
-            # Sin lotes: usar costo promedio
-            costo_promedio = float(producto.get("costo", 0))
-            costo_total = cantidad_vendida * costo_promedio
-            nueva_cantidad = cantidad_disponible - cantidad_vendida
-            
-            # IMPORTANTE: Descontar la misma cantidad de cantidad, existencia y stock
-            update_data = {
-                "cantidad": nueva_cantidad,
-                "existencia": nueva_cantidad,  # Siempre actualizar existencia
-                "stock": nueva_cantidad         # Siempre actualizar stock
-            }
-            
-            await inventarios_collection.update_one(
-                {"_id": producto_object_id},
-                {"$set": update_data},
-                session=session
-            )
-        
-        # Verificar que la actualización se realizó correctamente
-        producto_actualizado = await inventarios_collection.find_one(
-            {"_id": producto_object_id},
-            session=session
-        )
-        
-        if producto_actualizado:
-            existencia_final = float(producto_actualizado.get("existencia", 0))
-            cantidad_final = float(producto_actualizado.get("cantidad", 0))
-            stock_final = float(producto_actualizado.get("stock", 0))
-            
-            print(f"✅ [INVENTARIO] Stock descontado exitosamente: {producto.get('codigo', producto_id)} - {cantidad_vendida} unidades, Costo: {costo_total:.2f}")
-            print(f"📊 [INVENTARIO] Valores DESPUÉS del descuento (verificados en BD):")
-            print(f"      - existencia: {existencia_final} (esperado: {nueva_cantidad})")
-            print(f"      - cantidad: {cantidad_final} (esperado: {nueva_cantidad})")
-            print(f"      - stock: {stock_final} (esperado: {nueva_cantidad})")
-            
-            # Verificar que los valores coincidan
-            if abs(existencia_final - nueva_cantidad) > 0.01 or abs(cantidad_final - nueva_cantidad) > 0.01 or abs(stock_final - nueva_cantidad) > 0.01:
-                print(f"⚠️ [INVENTARIO] ADVERTENCIA: Los valores actualizados no coinciden con los esperados!")
-        else:
-            print(f"⚠️ [INVENTARIO] ADVERTENCIA: No se pudo verificar el producto actualizado")
-        
-        return costo_total
-        
+        return await descontar_stock(producto_id, cantidad_vendida, farmacia, session=session, codigo_producto=codigo_producto)
     except ValueError:
         # Re-lanzar ValueError sin modificar
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIO] Error descontando stock: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIO] Error descontando stock: %s", e)
         raise ValueError(f"Error descontando stock: {str(e)}")
 
 async def descontar_stock_inventario(producto_id: str, cantidad_vendida: float, farmacia: str, codigo_producto: Optional[str] = None):
@@ -1179,128 +821,11 @@ async def descontar_stock_inventario(producto_id: str, cantidad_vendida: float,
     NOTA: Esta función NO usa transacciones. Usar descontar_stock_inventario_con_sesion si necesitas atomicidad.
     """
     try:
-        inventarios_collection = get_collection("INVENTARIOS")
-        
-        producto = None
-        producto_object_id = None
-        
-        # Intentar buscar por ID primero
-        try:
-            producto_object_id = ObjectId(producto_id)
-            producto = await inventarios_collection.find_one({
-                "_id": producto_object_id,
-                "farmacia": farmacia
-            })
-            if producto:
-                print(f"✅ [INVENTARIO] Producto encontrado por ID: {producto_id}")
-        except (InvalidId, ValueError):
-            print(f"⚠️ [INVENTARIO] ID inválido, intentando buscar por código: {producto_id}")
-            producto_object_id = None
-        
-        # Si no se encontró por ID, intentar buscar por código
-        if not producto:
-            codigo_busqueda = codigo_producto or producto_id
-            filtro = {
-                "codigo": codigo_busqueda,
-                "farmacia": farmacia,
-                "estado": {"$ne": "inactivo"}
-            }
-            producto = await inventarios_collection.find_one(filtro)
-            
-            if producto:
-                producto_object_id = producto["_id"]
-                print(f"✅ [INVENTARIO] Producto encontrado por código: {codigo_busqueda}")
-            else:
-                raise ValueError(f"Producto no encontrado. ID: {producto_id}, Código: {codigo_busqueda}, Farmacia: {farmacia}")
-        
-        # Validar stock disponible
-        # Prioridad: existencia > cantidad > stock (según instrucciones, el frontend muestra "Existencia")
-        existencia_actual = float(producto.get("existencia", 0))
-        cantidad_actual = float(producto.get("cantidad", 0))
-        stock_actual = float(producto.get("stock", 0))
-        
-        # Usar existencia como campo principal, si no existe usar cantidad
-        if existencia_actual > 0:
-            cantidad_disponible = existencia_actual
-        elif cantidad_actual > 0:
-            cantidad_disponible = cantidad_actual
-        else:
-            cantidad_disponible = stock_actual if stock_actual > 0 else 0
-        
-        if cantidad_disponible < cantidad_vendida:
-            raise ValueError(f"Stock insuficiente. Disponible: {cantidad_disponible}, Requerido: {cantidad_vendida}")
-        
-        # Manejar lotes con FIFO
-        lotes = producto.get("lotes", [])
-        cantidad_restante = cantidad_vendida
-        costo_total = 0.0
-        
-        if lotes and len(lotes) > 0:
-            # Ordenar lotes por fecha (FIFO: primero los más antiguos)
-            lotes_ordenados = sorted(lotes, key=lambda x: x.get("fecha_vencimiento", "9999-12-31"))
-            
-            # Descontar de lotes
-            lotes_actualizados = []
-            for lote in lotes_ordenados:
-                if cantidad_restante <= 0:
-                    lotes_actualizados.append(lote)
-                    continue
-                
-                cantidad_lote = float(lote.get("cantidad", 0))
-                costo_lote = float(lote.get("costo", 0))
-                
-                if cantidad_lote <= cantidad_restante:
-                    # Descontar todo el lote
-                    costo_total += cantidad_lote * costo_lote
-                    cantidad_restante -= cantidad_lote
-                else:
-                    # Descontar parcialmente del lote
-                    costo_total += cantidad_restante * costo_lote
-                    lote["cantidad"] = cantidad_lote - cantidad_restante
-                    lotes_actualizados.append(lote)
-                    cantidad_restante = 0
-            
-            # Actualizar producto con lotes actualizados
-            # IMPORTANTE: Descontar la misma cantidad de cantidad, existencia y stock
-            nueva_cantidad = cantidad_disponible - cantidad_vendida
-            update_data = {
-                "cantidad": nueva_cantidad,
-                "existencia": nueva_cantidad,  # Siempre actualizar existencia
-                "stock": nueva_cantidad,       # Siempre actualizar stock
-                "lotes": lotes_actualizados
-            }
-            
-            await inventarios_collection.update_one(
-                {"_id": producto_object_id},
-                {"$set": update_data}
-            )
-        else:
-            # Sin lotes: usar costo promedio
-            costo_promedio = float(producto.get("costo", 0))
-            costo_total = cantidad_vendida * costo_promedio
-            nueva_cantidad = cantidad_disponible - cantidad_vendida
-            
-            # IMPORTANTE: Descontar la misma cantidad de cantidad, existencia y stock
-            update_data = {
-                "cantidad": nueva_cantidad,
-                "existencia": nueva_cantidad,  # Siempre actualizar existencia
-                "stock": nueva_cantidad         # Siempre actualizar stock
-            }
-            
-            await inventarios_collection.update_one(
-                {"_id": producto_object_id},
-                {"$set": update_data}
-            )
-        
-        print(f"✅ [INVENTARIO] Stock descontado: {producto.get('codigo', producto_id)} - {cantidad_vendida} unidades, Costo: {costo_total:.2f}")
-        return costo_total
-        
+        return await descontar_stock(producto_id, cantidad_vendida, farmacia, codigo_producto=codigo_producto)
     except ValueError:
         raise
     except Exception as e:
-        print(f"❌ [INVENTARIO] Error descontando stock: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [INVENTARIO] Error descontando stock: %s", e)
         raise
 
 async def obtener_tipo_metodo_banco(banco_id: str) -> str:
@@ -1322,7 +847,7 @@ async def obtener_tipo_metodo_banco(banco_id: str) -> str:
             return banco.get("tipo_metodo") or banco.get("tipoMetodo")
         return None
     except Exception as e:
-        print(f"⚠️ [BANCOS] Error obteniendo tipo_metodo: {e}")
+        logger.warning("⚠️ [BANCOS] Error obteniendo tipo_metodo: %s", e)
         return None
 
 def mapear_tipo_pago(tipo: str, banco_id: Optional[str] = None, tipo_metodo: Optional[str] = None) -> str:
@@ -1377,7 +902,7 @@ async def actualizar_resumen_ventas(venta_data: dict, farmacia: str, fecha: str)
         # Obtener pagos de la venta
         pagos = venta_data.get("pagos", [])
         if not pagos:
-            print("⚠️ [RESUMEN] Venta sin pagos, no se actualiza resumen")
+            logger.warning("⚠️ [RESUMEN] Venta sin pagos, no se actualiza resumen")
             return
         
         # Obtener tipo_metodo de bancos si es necesario
@@ -1423,7 +948,7 @@ async def actualizar_resumen_ventas(venta_data: dict, farmacia: str, fecha: str)
             if tipo_mapeado in totales:
                 totales[tipo_mapeado] += monto
             else:
-                print(f"⚠️ [RESUMEN] Tipo de pago desconocido: {tipo_mapeado}")
+                logger.warning("⚠️ [RESUMEN] Tipo de pago desconocido: %s", tipo_mapeado)
         
         # Calcular costo de inventario (se calculará después de descontar stock)
         # Calcular venta neta (total de ventas - devoluciones)
@@ -1447,20 +972,19 @@ async def actualizar_resumen_ventas(venta_data: dict, farmacia: str, fecha: str)
                 {"_id": resumen_existente["_id"]},
                 {"$set": resumen}
             )
-            print(f"✅ [RESUMEN] Resumen actualizado: {farmacia} - {fecha}")
+            logger.debug("✅ [RESUMEN] Resumen actualizado: %s - %s", farmacia, fecha)
         else:
             resumen["fechaCreacion"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             await resumen_collection.insert_one(resumen)
-            print(f"✅ [RESUMEN] Resumen creado: {farmacia} - {fecha}")
+            logger.debug("✅ [RESUMEN] Resumen creado: %s - %s", farmacia, fecha)
         
     except Exception as e:
-        print(f"❌ [RESUMEN] Error actualizando resumen: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [RESUMEN] Error actualizando resumen: %s", e)
         # No lanzar excepción para no fallar la venta
 
 @router.get("/punto-venta/ventas/resumen")
 async def obtener_resumen_ventas(
+    request: Request,
     fecha_inicio: str = Query(..., description="Fecha de inicio en formato YYYY-MM-DD"),
     fecha_fin: str = Query(..., description="Fecha de fin en formato YYYY-MM-DD"),
     usuario_actual: dict = Depends(get_current_user)
@@ -1493,15 +1017,16 @@ async def obtener_resumen_ventas(
     }
     """
     try:
-        print(f"📊 [RESUMEN] Obteniendo resumen de ventas: {fecha_inicio} a {fecha_fin}")
+        logger.debug("📊 [RESUMEN] Obteniendo resumen de ventas: %s a %s", fecha_inicio, fecha_fin)
         
         resumen_collection = get_collection("RESUMEN_VENTAS")
         ventas_collection = get_collection("VENTAS")
         
         # Buscar todos los resúmenes en el rango de fechas
-        resumenes = await resumen_collection.find({
+        cursor = resumen_collection.find({
             "fecha": {"$gte": fecha_inicio, "$lte": fecha_fin}
-        }).to_list(length=None)
+        })
+        resumenes = await ejecutar_consulta("reporte", cursor.to_list(length=None), request, cursor)
         
         # Agrupar por sucursal
         ventas_por_sucursal = {}
@@ -1594,15 +1119,15 @@ async def obtener_resumen_ventas(
             for key in sucursal_data["desglose_bs"]:
                 sucursal_data["desglose_bs"][key] = round(sucursal_data["desglose_bs"][key], 2)
         
-        print(f"✅ [RESUMEN] Resumen generado para {len(ventas_por_sucursal)} sucursales")
+        logger.debug("✅ [RESUMEN] Resumen generado para %s sucursales", len(ventas_por_sucursal))
         
         return {
             "ventas_por_sucursal": ventas_por_sucursal
         }
             
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ [RESUMEN] Error obteniendo resumen: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [RESUMEN] Error obteniendo resumen: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
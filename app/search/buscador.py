@@ -0,0 +1,286 @@
+"""
+Motor de búsqueda de productos compartido por las rutas de búsqueda.
+
+Una búsqueda se planifica como una lista de niveles (exacto por código ->
+prefijo -> subcadena) y se ejecuta en UN solo aggregate: el primer nivel es
+el pipeline base y los demás se agregan con $unionWith. Cada nivel usa su
+propio índice, su propio $sort/$limit (corte temprano: deja de leer cuando
+tiene suficientes resultados) y marca sus documentos con _nivel, así que el
+orden final y las exclusiones se resuelven aquí sin más viajes a Mongo.
+
+Antes cada ruta hacía hasta 3 consultas secuenciales (código, prefijo,
+regex); ahora es 1 (o solo la lectura de stock si el código está en la
+caché de códigos). El nivel de subcadena usa el índice de trigramas en
+memoria cuando está listo ({_id: {$in: ids}}) y el $regex si no. Ese $regex
+sin ancla recorre la colección, así que no va en el mismo aggregate que el
+código exacto: primero se busca el código y solo si no existe se ejecuta
+(2 consultas en ese caso, 1 cuando el código existe).
+
+Si el punto de venta no encuentra nada, la consulta se corrige con el
+corrector ortográfico del índice ("tornilo" -> "tornillo") y se reintenta
+una sola vez por las palabras corregidas (campo tokens).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from app.search.cache_codigos import PROYECCION_ESTATICA, cache_codigos
+from app.search.formato import formatear_modal_inventario, formatear_punto_venta
+from app.search.indice_productos import indice_productos
+from app.search.normalizacion import filtro_prefijo, normalizar_texto
+from app.services.lotes_service import adjuntar_lotes
+from app.utils.solicitudes import CoordinadorSolicitudes
+import re
+
+# Campos que necesita el punto de venta (igual que inventarios)
+PROYECCION_PUNTO_VENTA = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
+    "precio_venta": 1, "precio": 1, "cantidad": 1,
+    "costo": 1, "utilidad": 1, "porcentaje_utilidad": 1,
+    "farmacia": 1, "estado": 1, "marca": 1, "marca_producto": 1
+}
+PROYECCION_PRODUCTOS = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
+    "precio_venta": 1, "precio": 1, "marca": 1, "cantidad": 1,
+    "farmacia": 1, "costo": 1, "estado": 1, "productoId": 1,
+    "utilidad": 1, "porcentaje_utilidad": 1
+}
+# PROYECCIÓN MÍNIMA del modal de carga masiva ("cantidad" para mostrar existencia actualizada)
+PROYECCION_MODAL = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1,
+    "cantidad": 1, "costo": 1, "precio_venta": 1, "precio": 1,
+    "farmacia": 1, "marca": 1, "utilidad": 1, "porcentaje_utilidad": 1
+}
+PROYECCION_AUTOCOMPLETAR = {"_id": 1, "codigo": 1, "nombre": 1}
+LIMITE_PUNTO_VENTA = 30
+LIMITE_SIN_TERMINO = 200
+LIMITE_AUTOCOMPLETAR = 10
+
+# Una búsqueda de autocompletar en curso por usuario (las anteriores se cancelan)
+solicitudes_autocompletado = CoordinadorSolicitudes()
+
+
+@dataclass
+class Nivel:
+    """
+    Una consulta del plan: filtro + orden + límite (ids fija el orden del índice
+    en memoria). indexado=False si no usa índice (el $regex de subcadena).
+    """
+    nombre: str
+    filtro: dict
+    limite: int
+    orden: Optional[str] = "nombre"
+    ids: Optional[List[Any]] = None
+    indexado: bool = True
+
+
+def _filtro_base(farmacia: Optional[str], solo_activos: bool) -> dict:
+    filtro = {"estado": {"$ne": "inactivo"}} if solo_activos else {}
+    if farmacia:
+        filtro["farmacia"] = farmacia
+    return filtro
+
+
+def nivel_exacto(filtro: dict, codigo: str) -> Nivel:
+    return Nivel("exacto", {**filtro, "codigo": codigo}, 1, orden=None)
+
+
+def nivel_prefijo(filtro: dict, termino: str, campos: Sequence[str], limite: int) -> Nivel:
+    """Regex anclada sobre los campos normalizados (usa sus índices)."""
+    if len(campos) == 1:
+        # Un solo campo: el índice ya entrega los documentos en orden, sin ordenar en memoria
+        return Nivel("prefijo", {**filtro, **filtro_prefijo(campos[0], termino)}, limite, orden=campos[0])
+    return Nivel("prefijo", {**filtro, "$or": [filtro_prefijo(campo, termino) for campo in campos]}, limite)
+
+
+def nivel_subcadena(filtro: dict, termino: str, campos: Sequence[str], limite: int, solo_activos: bool) -> Optional[Nivel]:
+    """
+    Coincidencia parcial en `campos`. Con el índice de trigramas listo (solo indexa
+    productos activos) es un $in de _ids ya rankeados; None si no hay coincidencias.
+    """
+    if solo_activos:
+        ids = indice_productos.buscar(termino, farmacia=filtro.get("farmacia"), limite=limite, campos=campos)
+        if ids is not None:
+            if not ids:
+                return None
+            return Nivel("subcadena", {**filtro, "_id": {"$in": ids}}, limite, orden=None, ids=ids)
+    escapado = re.escape(termino)
+    return Nivel(
+        "subcadena",
+        {**filtro, "$or": [{campo: {"$regex": escapado, "$options": "i"}} for campo in campos]},
+        limite,
+        indexado=False,
+    )
+
+
+def _pipeline(nivel: Nivel, indice: int, proyeccion: dict) -> List[dict]:
+    etapas = [{"$match": nivel.filtro}]
+    if nivel.orden:
+        etapas.append({"$sort": {nivel.orden: 1}})
+    etapas += [{"$limit": nivel.limite}, {"$project": proyeccion}, {"$set": {"_nivel": indice}}]
+    return etapas
+
+
+async def ejecutar_niveles(coleccion, niveles: Sequence[Nivel], proyeccion: dict) -> Dict[str, List[dict]]:
+    """Ejecuta todos los niveles en un solo aggregate y retorna {nombre del nivel: documentos}."""
+    resultados: Dict[str, List[dict]] = {nivel.nombre: [] for nivel in niveles}
+    if not niveles:
+        return resultados
+    pipeline = _pipeline(niveles[0], 0, proyeccion)
+    for indice, nivel in enumerate(niveles[1:], start=1):
+        pipeline.append({"$unionWith": {"coll": coleccion.name, "pipeline": _pipeline(nivel, indice, proyeccion)}})
+    limite_total = sum(nivel.limite for nivel in niveles)
+    for doc in await coleccion.aggregate(pipeline).to_list(length=limite_total):
+        resultados[niveles[doc.pop("_nivel")].nombre].append(doc)
+    for nivel in niveles:
+        if nivel.ids is not None:
+            posicion = {_id: i for i, _id in enumerate(nivel.ids)}
+            resultados[nivel.nombre].sort(key=lambda doc: posicion[doc["_id"]])
+    return resultados
+
+
+def _recortar(producto: dict, proyeccion: dict) -> dict:
+    return {campo: producto[campo] for campo in proyeccion if campo in producto}
+
+
+async def _buscar_con_exacto(
+    coleccion,
+    codigo: str,
+    farmacia: Optional[str],
+    proyeccion: dict,
+    solo_activos: bool,
+    niveles: List[Nivel],
+) -> Dict[str, List[dict]]:
+    """
+    Nivel exacto + `niveles` en un aggregate. Si el código está en la caché de
+    códigos se responde con ella (solo lee el stock) y no se consulta lo demás.
+    Si algún nivel no usa índice, primero se consulta solo el código exacto y
+    los demás niveles únicamente cuando no existe.
+    """
+    if cache_codigos.contiene(farmacia, codigo):
+        producto = await cache_codigos.buscar(coleccion, codigo, farmacia, proyeccion, solo_activos=solo_activos)
+        if producto:
+            return {"exacto": [producto]}
+    filtro = _filtro_base(farmacia, solo_activos)
+    # El nivel exacto trae también los campos estáticos para alimentar la caché
+    proyeccion_exacto = {**PROYECCION_ESTATICA, **proyeccion}
+    exacto = nivel_exacto(filtro, codigo)
+    if all(nivel.indexado for nivel in niveles):
+        resultados = await ejecutar_niveles(coleccion, [exacto, *niveles], proyeccion_exacto)
+    else:
+        # Corte temprano: el $regex (recorre la colección) solo si el código no existe
+        resultados = await ejecutar_niveles(coleccion, [exacto], proyeccion_exacto)
+        if not resultados["exacto"]:
+            resultados.update(await ejecutar_niveles(coleccion, niveles, proyeccion))
+    if resultados["exacto"]:
+        cache_codigos.guardar(farmacia, codigo, resultados["exacto"][0])
+    return {nombre: [_recortar(doc, proyeccion) for doc in docs] for nombre, docs in resultados.items()}
+
+
+# -- Búsquedas por endpoint ------------------------------------------------
+
+async def buscar_punto_venta(coleccion, q: Optional[str], sucursal: Optional[str]) -> List[dict]:
+    """
+    /punto-venta/productos/buscar. "term*" = búsqueda rápida por prefijo en código
+    y nombre; sin * = búsqueda amplia en código, nombre, descripción y marca. Una
+    coincidencia exacta de código se retorna sola. Sin término: los primeros 200.
+    Sin resultados se reintenta con la consulta corregida.
+    """
+    filtro = _filtro_base(sucursal, solo_activos=True)
+    termino = q.strip() if q and q.strip() else ""
+    busqueda_rapida = termino.endswith("*")
+    if busqueda_rapida:
+        termino = termino[:-1].strip()
+
+    if not termino:
+        productos = await coleccion.find(filtro, projection=PROYECCION_PUNTO_VENTA).sort("nombre", 1).limit(
+            LIMITE_SIN_TERMINO
+        ).to_list(length=LIMITE_SIN_TERMINO)
+        return [formatear_punto_venta(producto, sucursal) for producto in productos]
+
+    if busqueda_rapida:
+        siguiente = nivel_prefijo(filtro, termino, ("codigo_norm", "nombre_norm"), LIMITE_PUNTO_VENTA)
+    else:
+        siguiente = nivel_subcadena(filtro, termino, ("codigo", "nombre", "descripcion", "marca"), LIMITE_PUNTO_VENTA, solo_activos=True)
+    resultados = await _buscar_con_exacto(
+        coleccion, termino.upper(), sucursal, PROYECCION_PUNTO_VENTA, True, [siguiente] if siguiente else []
+    )
+    if resultados["exacto"]:
+        return [formatear_punto_venta(resultados["exacto"][0], sucursal)]
+    productos = resultados.get("prefijo") or resultados.get("subcadena") or []
+    if not productos:
+        productos = await _buscar_corregido(coleccion, filtro, termino, sucursal)
+    return [formatear_punto_venta(producto, sucursal) for producto in productos]
+
+
+async def _buscar_corregido(coleccion, filtro: dict, termino: str, sucursal: Optional[str]) -> List[dict]:
+    """Reintento tolerante a errores de tipeo: productos con todas las palabras corregidas."""
+    corregidas = indice_productos.corregir(termino, farmacia=sucursal)
+    if not corregidas:
+        return []
+    nivel = Nivel("corregido", {**filtro, "tokens": {"$all": corregidas}}, LIMITE_PUNTO_VENTA)
+    return (await ejecutar_niveles(coleccion, [nivel], PROYECCION_PUNTO_VENTA))["corregido"]
+
+
+async def autocompletar_punto_venta(coleccion, q: str, sucursal: Optional[str], limite: int) -> List[dict]:
+    """
+    /punto-venta/productos/autocomplete: productos activos cuyo nombre o código
+    empieza con el término. Sale del trie en memoria; si el índice no está listo,
+    de los campos normalizados en Mongo (misma coincidencia, orden por nombre).
+    Un término vacío (o que queda vacío al normalizarlo) no sugiere nada.
+    """
+    if not normalizar_texto(q):
+        return []
+    productos = indice_productos.autocompletar(q, farmacia=sucursal, limite=limite)
+    if productos is None:
+        nivel = nivel_prefijo(_filtro_base(sucursal, solo_activos=True), q, ("codigo_norm", "nombre_norm"), limite)
+        productos = (await ejecutar_niveles(coleccion, [nivel], PROYECCION_AUTOCOMPLETAR))["prefijo"]
+    return [
+        {"id": str(producto["_id"]), "codigo": producto.get("codigo", ""), "nombre": producto.get("nombre", "")}
+        for producto in productos
+    ]
+
+
+def estadisticas_autocompletado() -> dict:
+    return solicitudes_autocompletado.stats()
+
+
+async def buscar_catalogo(coleccion, q: str, farmacia: Optional[str], limite: int) -> List[dict]:
+    """/productos/buscar: código exacto o coincidencia parcial en código, nombre, descripción y marca (incluye inactivos)."""
+    siguiente = nivel_subcadena(_filtro_base(farmacia, False), q, ("codigo", "nombre", "descripcion", "marca"), limite, solo_activos=False)
+    resultados = await _buscar_con_exacto(coleccion, q.upper(), farmacia, PROYECCION_PRODUCTOS, False, [siguiente])
+    productos = resultados["exacto"][:1] or resultados["subcadena"]
+    # Los lotes están en su colección: una consulta para todos los resultados
+    return await adjuntar_lotes(productos)
+
+
+async def buscar_codigo(coleccion, codigo: str, sucursal: Optional[str]) -> List[dict]:
+    """/productos/buscar-codigo: solo el código exacto (caché de códigos)."""
+    producto = await cache_codigos.buscar(coleccion, codigo, sucursal, PROYECCION_PRODUCTOS)
+    if not producto:
+        return []
+    return await adjuntar_lotes([producto])
+
+
+async def buscar_modal_inventario(coleccion, q: str, farmacia: Optional[str], limite: int) -> List[dict]:
+    """
+    /inventarios/buscar: primero el código exacto (o si no, el primer nombre que
+    empiece con el término) y después las coincidencias parciales en código,
+    nombre y descripción, sin repetirlo. Solo productos activos.
+    """
+    filtro = _filtro_base(farmacia, solo_activos=True)
+    niveles = [
+        nivel_exacto(filtro, q.upper()),
+        nivel_prefijo(filtro, q, ("nombre_norm",), 1),
+    ]
+    subcadena = nivel_subcadena(filtro, q, ("codigo", "nombre", "descripcion"), limite, solo_activos=True)
+    if subcadena:
+        niveles.append(subcadena)
+    resultados = await ejecutar_niveles(coleccion, niveles, PROYECCION_MODAL)
+
+    primero = (resultados["exacto"] or resultados["prefijo"] or [None])[0]
+    productos = [primero] if primero else []
+    for producto in resultados.get("subcadena", []):
+        if len(productos) >= limite:
+            break
+        if not primero or producto["_id"] != primero["_id"]:
+            productos.append(producto)
+    return [formatear_modal_inventario(producto) for producto in productos]
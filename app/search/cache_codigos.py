@@ -0,0 +1,124 @@
+"""
+Caché de productos por (farmacia, código) para la búsqueda exacta por código,
+que es la consulta más frecuente del punto de venta (escáner en caja).
+
+Solo se guardan los campos estáticos (nombre, marca, precio, costo...). Los
+volátiles (cantidad, lotes) se leen siempre de Mongo: el stock con una
+consulta cubierta por farmacia_codigo_cantidad_index, sin leer el documento. Las rutas que editan precios o productos llaman a invalidar().
+"""
+from typing import Any, Iterable, Optional
+from pymongo.errors import OperationFailure
+from app.core.config import PRODUCT_CACHE_TTL_SECONDS, PRODUCT_CACHE_MAX_ENTRIES
+from app.core.logger import obtener_logger
+from app.utils.ttl_cache import TTLCache
+
+logger = obtener_logger(__name__)
+
+PROYECCION_ESTATICA = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1, "marca": 1, "marca_producto": 1,
+    "precio_venta": 1, "precio": 1, "costo": 1, "utilidad": 1, "porcentaje_utilidad": 1,
+    "farmacia": 1, "estado": 1, "productoId": 1,
+}
+CAMPOS_STOCK = ("cantidad",)
+INDICE_STOCK = "farmacia_codigo_cantidad_index"
+# Claves del índice que cubre la lectura de stock (create_indexes.py)
+CLAVES_INDICE_STOCK = [("farmacia", 1), ("codigo", 1), ("_id", 1), ("cantidad", 1)]
+
+
+class CacheCodigos:
+    """TTLCache de campos estáticos + lectura en vivo de los campos volátiles."""
+
+    def __init__(self, maxsize: int = PRODUCT_CACHE_MAX_ENTRIES, ttl: float = PRODUCT_CACHE_TTL_SECONDS):
+        self.habilitado = maxsize > 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._usar_hint = True
+        self.lecturas_stock = 0
+
+    async def buscar(
+        self,
+        coleccion,
+        codigo: str,
+        farmacia: Optional[str],
+        proyeccion: dict,
+        solo_activos: bool = False,
+    ) -> Optional[dict]:
+        """
+        Equivale a find_one({"codigo": codigo, "farmacia": farmacia, ...}, projection=proyeccion).
+        Sin farmacia (o con la caché deshabilitada) hace exactamente esa consulta.
+        """
+        filtro = {"codigo": codigo}
+        if farmacia:
+            filtro["farmacia"] = farmacia
+        if solo_activos:
+            filtro["estado"] = {"$ne": "inactivo"}
+        if not farmacia or not self.habilitado:
+            return await coleccion.find_one(filtro, projection=proyeccion)
+
+        vivos = [campo for campo in proyeccion if campo not in PROYECCION_ESTATICA]
+        clave = (farmacia, codigo)
+        estatico = self._cache.get(clave)
+        if estatico is not None and not (solo_activos and estatico.get("estado") == "inactivo"):
+            actual = await self._leer_vivos(coleccion, estatico, vivos)
+            if actual is not None:
+                return _recortar({**estatico, **actual}, proyeccion)
+            # Ya no existe con ese código: se descarta y se consulta completo
+            self._cache.invalidate(clave)
+
+        producto = await coleccion.find_one(filtro, projection={**PROYECCION_ESTATICA, **{campo: 1 for campo in vivos}})
+        if producto is None:
+            return None
+        self.guardar(farmacia, codigo, producto)
+        return _recortar(producto, proyeccion)
+
+    def contiene(self, farmacia: Optional[str], codigo: str) -> bool:
+        return bool(farmacia) and self.habilitado and (farmacia, codigo) in self._cache
+
+    def guardar(self, farmacia: Optional[str], codigo: str, producto: dict) -> None:
+        """Guarda los campos estáticos de un producto ya leído por otra consulta."""
+        if farmacia and self.habilitado and producto.get("codigo") == codigo:
+            self._cache.set((farmacia, codigo), {campo: producto[campo] for campo in PROYECCION_ESTATICA if campo in producto})
+
+    async def _leer_vivos(self, coleccion, estatico: dict, vivos: list) -> Optional[dict]:
+        self.lecturas_stock += 1
+        filtro = {"farmacia": estatico.get("farmacia"), "codigo": estatico.get("codigo"), "_id": estatico["_id"]}
+        # Sin campos volátiles igual se confirma que el producto sigue existiendo
+        proyeccion = {"_id": 0, **{campo: 1 for campo in vivos}} if vivos else {"_id": 1}
+        if self._usar_hint and all(campo in CAMPOS_STOCK for campo in vivos):
+            try:
+                actual = await coleccion.find_one(filtro, projection=proyeccion, hint=INDICE_STOCK)
+            except OperationFailure as e:
+                # Sin el índice (create_indexes.py no se ejecutó): se sigue sin hint
+                logger.warning("⚠️ [CACHE_CODIGOS] Índice %s no disponible, se lee el documento: %s", INDICE_STOCK, e)
+                self._usar_hint = False
+                actual = await coleccion.find_one(filtro, projection=proyeccion)
+        else:
+            actual = await coleccion.find_one(filtro, projection=proyeccion)
+        if actual is None:
+            return None
+        # En una consulta cubierta los campos ausentes vuelven como null
+        return {campo: valor for campo, valor in actual.items() if valor is not None}
+
+    def invalidar(self, farmacia: Any, codigo: Any) -> None:
+        if farmacia and codigo:
+            self._cache.invalidate((farmacia, codigo))
+
+    def invalidar_productos(self, *productos: Optional[dict]) -> None:
+        """Invalida por los documentos (antes y/o después de editarlos)."""
+        for producto in productos:
+            if producto:
+                self.invalidar(producto.get("farmacia"), producto.get("codigo"))
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "habilitado": self.habilitado, "lecturas_stock": self.lecturas_stock}
+
+
+def _recortar(producto: dict, proyeccion: Iterable[str]) -> dict:
+    """Solo los campos pedidos (la respuesta queda igual que con find_one + projection)."""
+    return {campo: producto[campo] for campo in proyeccion if campo in producto}
+
+
+cache_codigos = CacheCodigos()
+
+
+def estadisticas_cache_codigos() -> dict:
+    return cache_codigos.stats()
@@ -0,0 +1,154 @@
+"""
+Corrector ortográfico en memoria para la búsqueda del punto de venta
+(algoritmo de borrado simétrico, estilo SymSpell).
+
+Por cada palabra de los nombres y marcas de una farmacia se guardan sus
+"borrados": las variantes con hasta 2 letras eliminadas del prefijo. Una
+palabra mal escrita ("tornilo", "silicom") comparte algún borrado con la
+correcta, así que los candidatos salen de unas pocas búsquedas en un dict y
+solo a esos se les calcula la distancia de edición. No se consulta Mongo.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from app.search.normalizacion import tokens_busqueda
+
+DISTANCIA_MAXIMA = 2
+# Solo se generan borrados sobre este prefijo (acota memoria; la distancia se verifica completa)
+LONGITUD_PREFIJO = 7
+# Palabras más cortas no se corrigen (con 2 ediciones casi cualquier cosa coincide)
+LONGITUD_MINIMA_PALABRA = 3
+
+
+def _borrados(palabra: str, distancia: int) -> Set[str]:
+    """La palabra y todas sus variantes con hasta `distancia` letras eliminadas."""
+    resultado = {palabra}
+    actuales = {palabra}
+    for _ in range(distancia):
+        siguientes = set()
+        for texto in actuales:
+            if len(texto) > 1:
+                for i in range(len(texto)):
+                    siguientes.add(texto[:i] + texto[i + 1:])
+        resultado |= siguientes
+        actuales = siguientes
+    return resultado
+
+
+def distancia_edicion(a: str, b: str, maxima: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein restringida (inserción, borrado, sustitución y
+    transposición de letras vecinas). Retorna maxima + 1 apenas la supera.
+    """
+    if abs(len(a) - len(b)) > maxima:
+        return maxima + 1
+    anterior_previa: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior_previa[j - 2] + 1)
+        if min(actual) > maxima:
+            return maxima + 1
+        anterior_previa, anterior = anterior, actual
+    return anterior[-1]
+
+
+def distancia_permitida(palabra: str) -> int:
+    """Las palabras cortas admiten 1 error; las de 5 letras o más, DISTANCIA_MAXIMA."""
+    return 1 if len(palabra) <= 4 else DISTANCIA_MAXIMA
+
+
+def _corregible(palabra: str) -> bool:
+    # Medidas y códigos ("1/2", "3mm", "tor001") no se corrigen
+    return len(palabra) >= LONGITUD_MINIMA_PALABRA and palabra.isalpha()
+
+
+class CorrectorOrtografico:
+    """Diccionario de palabras de una farmacia (con frecuencia) y su índice de borrados."""
+
+    def __init__(self):
+        self._frecuencias: Dict[str, int] = {}
+        self._borrados: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._frecuencias)
+
+    def __contains__(self, palabra: str) -> bool:
+        return palabra in self._frecuencias
+
+    def agregar(self, palabras: Iterable[str]) -> None:
+        for palabra in palabras:
+            if not _corregible(palabra):
+                continue
+            if palabra in self._frecuencias:
+                self._frecuencias[palabra] += 1
+                continue
+            self._frecuencias[palabra] = 1
+            for borrado in _borrados(palabra[:LONGITUD_PREFIJO], DISTANCIA_MAXIMA):
+                self._borrados.setdefault(borrado, []).append(palabra)
+
+    def quitar(self, palabras: Iterable[str]) -> None:
+        for palabra in palabras:
+            frecuencia = self._frecuencias.get(palabra)
+            if frecuencia is None:
+                continue
+            if frecuencia > 1:
+                self._frecuencias[palabra] = frecuencia - 1
+                continue
+            del self._frecuencias[palabra]
+            for borrado in _borrados(palabra[:LONGITUD_PREFIJO], DISTANCIA_MAXIMA):
+                lista = self._borrados.get(borrado)
+                if lista is not None:
+                    lista.remove(palabra)
+                    if not lista:
+                        del self._borrados[borrado]
+
+    def candidato(self, palabra: str) -> Optional[Tuple[int, int, str]]:
+        """
+        Mejor corrección de una palabra normalizada como (distancia, -frecuencia,
+        palabra): menor distancia y, a igual distancia, la más frecuente. La propia
+        palabra (distancia 0) si existe; None si no hay ninguna a distancia permitida.
+        """
+        frecuencia = self._frecuencias.get(palabra)
+        if frecuencia is not None:
+            return (0, -frecuencia, palabra)
+        if not _corregible(palabra):
+            return None
+        maxima = distancia_permitida(palabra)
+        mejor = None
+        vistos = set()
+        for borrado in _borrados(palabra[:LONGITUD_PREFIJO], maxima):
+            for sugerencia in self._borrados.get(borrado, ()):
+                if sugerencia in vistos:
+                    continue
+                vistos.add(sugerencia)
+                distancia = distancia_edicion(palabra, sugerencia, maxima)
+                if distancia <= maxima:
+                    opcion = (distancia, -self._frecuencias[sugerencia], sugerencia)
+                    if mejor is None or opcion < mejor:
+                        mejor = opcion
+        return mejor
+
+
+def corregir_consulta(consulta: str, correctores: Sequence[CorrectorOrtografico]) -> Optional[List[str]]:
+    """
+    Palabras de la consulta con cada palabra desconocida reemplazada por su mejor
+    corrección (entre todos los `correctores`). None si no se corrigió nada o si
+    alguna palabra no tiene corrección: en ambos casos no hay nada que reintentar.
+    """
+    palabras = tokens_busqueda(consulta)
+    corregidas = []
+    cambio = False
+    for palabra in palabras:
+        if not _corregible(palabra):
+            corregidas.append(palabra)
+            continue
+        opciones = [opcion for opcion in (corrector.candidato(palabra) for corrector in correctores) if opcion]
+        if not opciones:
+            return None
+        corregida = min(opciones)[2]
+        cambio = cambio or corregida != palabra
+        corregidas.append(corregida)
+    return corregidas if cambio else None
@@ -0,0 +1,104 @@
+"""
+Formato de los productos que devuelven las búsquedas.
+
+Cada endpoint conserva la forma de respuesta que ya consume el frontend
+(punto de venta, modal de carga masiva, productos). Los precios se guardan ya
+calculados al escribir (app/services/precios_service.py); aquí solo se leen.
+"""
+from typing import Optional
+
+# El stock se guarda solo en "cantidad" (migrar_stock.py). Los nombres
+# anteriores se siguen devolviendo, calculados a partir de cantidad
+CAMPOS_STOCK_LEGADO = ("existencia", "stock")
+
+
+def stock_disponible(producto: dict) -> float:
+    """Stock del producto (campo canónico cantidad)."""
+    return float(producto.get("cantidad") or 0)
+
+
+def con_stock_legado(producto: dict) -> dict:
+    """Documento completo de INVENTARIOS con existencia y stock iguales a cantidad (respuestas de siempre)."""
+    if producto and "cantidad" in producto:
+        for campo in CAMPOS_STOCK_LEGADO:
+            producto[campo] = producto["cantidad"]
+    return producto
+
+
+def normalizar_stock(data: dict) -> dict:
+    """
+    Datos a guardar en INVENTARIOS: si el cliente manda existencia o stock (y no
+    cantidad) se guardan como cantidad; los campos legados nunca se escriben.
+    """
+    for campo in CAMPOS_STOCK_LEGADO:
+        valor = data.pop(campo, None)
+        if valor is not None and "cantidad" not in data:
+            data["cantidad"] = valor
+    return data
+
+
+def precios_guardados(producto: dict) -> dict:
+    """Costo y precios guardados del producto, tal cual (precio es el nombre anterior de precio_venta)."""
+    precio_venta = float(producto.get("precio_venta") or producto.get("precio") or 0)
+    return {
+        "costo": round(float(producto.get("costo") or 0), 2),
+        "precio_venta": precio_venta,
+        "precio": precio_venta,
+        "utilidad": float(producto.get("utilidad") or 0),
+        "porcentaje_utilidad": float(producto.get("porcentaje_utilidad") or 0),
+    }
+
+
+def formatear_punto_venta(producto: dict, sucursal: Optional[str] = None) -> dict:
+    """Producto tal como lo muestra el punto de venta (precios guardados y stock en los tres nombres)."""
+    disponible = stock_disponible(producto)
+    return {
+        "id": str(producto["_id"]),
+        "codigo": producto.get("codigo", ""),
+        "nombre": producto.get("nombre", ""),
+        "descripcion": producto.get("descripcion", ""),
+        **precios_guardados(producto),
+        "cantidad": disponible,
+        "stock": disponible,       # Nombres legados, mismo valor
+        "existencia": disponible,
+        "sucursal": producto.get("farmacia", sucursal or ""),
+        "farmacia": producto.get("farmacia", sucursal or ""),
+        "estado": producto.get("estado", "activo"),
+        "marca": producto.get("marca") or producto.get("marca_producto") or ""
+    }
+
+
+def formatear_modal_inventario(producto: dict) -> dict:
+    """Campos mínimos del modal de carga masiva (cantidad exacta, sin redondeo)."""
+    producto_id = str(producto["_id"])
+    return {
+        "id": producto_id,
+        "_id": producto_id,
+        "codigo": producto.get("codigo", ""),
+        "nombre": producto.get("nombre", ""),
+        "descripcion": producto.get("descripcion", ""),
+        "marca": producto.get("marca", ""),
+        "cantidad": float(producto.get("cantidad", 0)),  # Valor exacto sin redondeo
+        **precios_guardados(producto),
+        "farmacia": producto.get("farmacia", "")
+    }
+
+
+def formatear_item_inventario(inv: dict) -> dict:
+    """Item de los listados /inventarios/items (mismo stock que el punto de venta)."""
+    inv_id = str(inv["_id"])
+    disponible = stock_disponible(inv)
+    return {
+        "_id": inv_id,
+        "id": inv_id,
+        "codigo": inv.get("codigo", ""),
+        "nombre": inv.get("nombre", ""),
+        "descripcion": inv.get("descripcion", ""),
+        "marca": inv.get("marca", ""),
+        "cantidad": disponible,
+        "existencia": disponible,    # Nombres legados, mismo valor
+        "stock": disponible,
+        **precios_guardados(inv),
+        "farmacia": inv.get("farmacia", ""),
+        "estado": inv.get("estado", "activo")
+    }
@@ -0,0 +1,338 @@
+"""
+Índice de búsqueda de productos por farmacia (trigramas en memoria).
+
+Se construye al iniciar la app leyendo INVENTARIOS y se mantiene al día de dos
+formas: las rutas que escriben productos llaman a actualizar_documento /
+eliminar / refrescar, y si el servidor lo permite (replica set, Atlas) un
+change stream aplica los cambios hechos por otros procesos o scripts.
+
+Mientras no está listo (o si está deshabilitado con SEARCH_INDEX_ENABLED)
+buscar() retorna None y las rutas usan la consulta $regex de siempre.
+
+Junto a los trigramas se mantiene, por farmacia, un CorrectorOrtografico con
+las palabras de nombres y marcas (consultas mal escritas) y un TrieComprimido
+de nombres y códigos (autocompletar).
+"""
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from pymongo.errors import OperationFailure, PyMongoError
+from app.core.config import SEARCH_INDEX_ENABLED, SEARCH_INDEX_CHANGE_STREAM
+from app.core.logger import obtener_logger
+from app.db.mongo import get_collection
+from app.search.correccion import CorrectorOrtografico, corregir_consulta
+from app.search.normalizacion import normalizar_texto, tokens_busqueda
+from app.search.trie import TrieComprimido
+from app.search.trigramas import CAMPOS, LONGITUD_MINIMA, IndiceTrigramas
+
+logger = obtener_logger(__name__)
+
+PROYECCION_INDICE = {"_id": 1, "farmacia": 1, "estado": 1, "codigo": 1, "nombre": 1, "descripcion": 1, "marca": 1, "marca_producto": 1}
+# Cambios en estos campos obligan a reindexar el producto (los de stock/precio no)
+CAMPOS_INDEXADOS = {"farmacia", "estado", "codigo", "nombre", "descripcion", "marca", "marca_producto"}
+_TAMANO_LOTE_CARGA = 5_000
+# Cada cuántos documentos la carga cede el event loop para no frenar los requests
+_DOCUMENTOS_POR_PAUSA = 1_000
+# Errores de Mongo que indican que el servidor no soporta change streams (standalone)
+_CODIGOS_SIN_CHANGE_STREAM = {40573, 40324}
+
+
+class IndiceProductos:
+    """Un IndiceTrigramas, un CorrectorOrtografico y un TrieComprimido por farmacia más la lógica de carga y actualización."""
+
+    def __init__(self):
+        self.indices: Dict[str, IndiceTrigramas] = {}
+        self.correctores: Dict[str, CorrectorOrtografico] = {}
+        self.tries: Dict[str, TrieComprimido] = {}
+        self._farmacia_de: Dict[Any, str] = {}
+        self.listo = False
+        self._cargando = False
+        self._pendientes: Set[Any] = set()
+        self._tareas: List[asyncio.Task] = []
+        self.carga_ms = 0.0
+        self.busquedas = 0
+        self.busquedas_sin_indice = 0
+        self.correcciones = 0
+        self.autocompletados = 0
+        self.cambios_aplicados = 0
+        self.change_stream_activo = False
+
+    # -- Escritura --------------------------------------------------------
+
+    def _agregar(self, doc: dict) -> None:
+        _id = doc["_id"]
+        farmacia = doc.get("farmacia")
+        if not farmacia or doc.get("estado") == "inactivo":
+            self._quitar(_id)
+            return
+        self._quitar(_id)
+        indice = self.indices.get(farmacia)
+        if indice is None:
+            indice = self.indices[farmacia] = IndiceTrigramas()
+            self.correctores[farmacia] = CorrectorOrtografico()
+            self.tries[farmacia] = TrieComprimido()
+        marca = doc.get("marca") or doc.get("marca_producto") or ""
+        indice.agregar(_id, doc.get("codigo", ""), doc.get("nombre", ""), doc.get("descripcion", ""), marca)
+        self.correctores[farmacia].agregar(tokens_busqueda(doc.get("nombre", ""), marca))
+        codigo, nombre = indice.textos(_id)[:2]
+        # El mismo valor (código y nombre originales, para mostrar) bajo ambas claves
+        valor = (doc.get("codigo", ""), doc.get("nombre", ""))
+        trie = self.tries[farmacia]
+        trie.agregar(codigo, _id, valor)
+        trie.agregar(nombre, _id, valor)
+        self._farmacia_de[_id] = farmacia
+
+    def _quitar(self, _id: Any) -> None:
+        farmacia = self._farmacia_de.pop(_id, None)
+        if farmacia is not None:
+            indice = self.indices[farmacia]
+            textos = indice.textos(_id)
+            if textos is not None:
+                # Las mismas palabras que se agregaron (textos ya normalizados: nombre y marca)
+                self.correctores[farmacia].quitar(tokens_busqueda(textos[1], textos[3]))
+                self.tries[farmacia].eliminar(textos[0], _id)
+                self.tries[farmacia].eliminar(textos[1], _id)
+            indice.eliminar(_id)
+
+    def actualizar_documento(self, doc: Optional[dict]) -> None:
+        """Aplica un documento de INVENTARIOS ya leído/insertado (debe traer _id)."""
+        if not doc or "_id" not in doc:
+            return
+        if self._cargando:
+            self._pendientes.add(doc["_id"])
+        elif self.listo:
+            self._agregar(doc)
+            self.cambios_aplicados += 1
+
+    def eliminar(self, _id: Any) -> None:
+        if self._cargando:
+            self._pendientes.add(_id)
+        elif self.listo:
+            self._quitar(_id)
+            self.cambios_aplicados += 1
+
+    async def refrescar(self, *ids: Any) -> None:
+        """Vuelve a leer los productos indicados (tras un update parcial) y los reindexa."""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return
+        if self._cargando:
+            self._pendientes.update(ids)
+            return
+        if not self.listo:
+            return
+        documentos = await get_collection("INVENTARIOS").find(
+            {"_id": {"$in": ids}}, projection=PROYECCION_INDICE
+        ).to_list(length=len(ids))
+        encontrados = {doc["_id"] for doc in documentos}
+        for doc in documentos:
+            self._agregar(doc)
+        for _id in ids:
+            if _id not in encontrados:
+                self._quitar(_id)
+        self.cambios_aplicados += len(ids)
+
+    # -- Lectura ----------------------------------------------------------
+
+    def buscar(
+        self,
+        consulta: str,
+        farmacia: Optional[str] = None,
+        limite: int = 30,
+        campos: Iterable[str] = CAMPOS,
+        excluir: Iterable[Any] = (),
+    ) -> Optional[List[Any]]:
+        """
+        _ids de los productos activos que contienen la consulta (ordenados por tipo
+        de coincidencia y nombre). Sin farmacia busca en todas. Retorna None si el
+        índice no está listo o la consulta es muy corta: el llamador usa Mongo.
+        """
+        normalizada = normalizar_texto(consulta)
+        if not self.listo or len(normalizada) < LONGITUD_MINIMA:
+            self.busquedas_sin_indice += 1
+            return None
+        self.busquedas += 1
+        campos = tuple(campos)
+        excluir = tuple(excluir)
+        if farmacia:
+            indices = [self.indices[farmacia]] if farmacia in self.indices else []
+        else:
+            indices = list(self.indices.values())
+        resultados = [
+            indice.buscar(normalizada, limite=limite, campos=campos, excluir=excluir, normalizada=True)
+            for indice in indices
+        ]
+        return [_id for _, _, _id in heapq.nsmallest(limite, (r for lista in resultados for r in lista))]
+
+    def corregir(self, consulta: str, farmacia: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Palabras de la consulta con las mal escritas corregidas (hasta 2 ediciones)
+        según los nombres y marcas de la farmacia (sin farmacia, de todas). None si
+        el índice no está listo o no hay nada que corregir.
+        """
+        if not self.listo:
+            return None
+        if farmacia:
+            correctores = [self.correctores[farmacia]] if farmacia in self.correctores else []
+        else:
+            correctores = list(self.correctores.values())
+        corregidas = corregir_consulta(consulta, correctores)
+        if corregidas is not None:
+            self.correcciones += 1
+        return corregidas
+
+    def autocompletar(self, prefijo: str, farmacia: Optional[str] = None, limite: int = 10) -> Optional[List[dict]]:
+        """
+        Hasta `limite` productos activos cuyo nombre o código empieza con el prefijo
+        ({"_id", "codigo", "nombre"}), en orden alfabético de la clave que coincide;
+        sin farmacia se mezclan los tries de todas en ese mismo orden. [] si el
+        prefijo queda vacío al normalizarlo. None si el índice no está listo.
+        """
+        if not self.listo:
+            return None
+        self.autocompletados += 1
+        normalizado = normalizar_texto(prefijo)
+        if not normalizado:
+            return []
+        if farmacia:
+            tries = [self.tries[farmacia]] if farmacia in self.tries else []
+        else:
+            tries = list(self.tries.values())
+        resultados = []
+        vistos = set()
+        # Cada trie entrega sus claves ya ordenadas: heapq.merge las intercala sin recorrerlos completos
+        for _, _id, (codigo, nombre) in heapq.merge(*(trie.iterar(normalizado) for trie in tries), key=lambda r: r[0]):
+            if _id in vistos:
+                continue
+            vistos.add(_id)
+            resultados.append({"_id": _id, "codigo": codigo, "nombre": nombre})
+            if len(resultados) >= limite:
+                break
+        return resultados
+
+    # -- Carga y change stream -------------------------------------------
+
+    async def cargar(self) -> None:
+        """Construye el índice completo desde INVENTARIOS (productos activos)."""
+        self._cargando = True
+        self.listo = False
+        self._pendientes.clear()
+        inicio = time.perf_counter()
+        anteriores = self.indices, self.correctores, self.tries, self._farmacia_de
+        self.indices, self.correctores, self.tries, self._farmacia_de = {}, {}, {}, {}
+        try:
+            cursor = get_collection("INVENTARIOS").find(
+                {"estado": {"$ne": "inactivo"}}, projection=PROYECCION_INDICE
+            ).batch_size(_TAMANO_LOTE_CARGA)
+            cargados = 0
+            async for doc in cursor:
+                self._agregar(doc)
+                cargados += 1
+                if cargados % _DOCUMENTOS_POR_PAUSA == 0:
+                    await asyncio.sleep(0)
+        except BaseException:
+            self.indices, self.correctores, self.tries, self._farmacia_de = anteriores
+            self._cargando = False
+            raise
+        self._cargando = False
+        self.listo = True
+        self.carga_ms = (time.perf_counter() - inicio) * 1000
+        pendientes, self._pendientes = list(self._pendientes), set()
+        await self.refrescar(*pendientes)
+        logger.info(
+            "🔎 [BUSQUEDA] Índice de productos listo: %s productos en %s farmacias (%.0f ms)",
+            len(self._farmacia_de), len(self.indices), self.carga_ms,
+        )
+
+    async def _aplicar_cambio(self, cambio: dict) -> None:
+        operacion = cambio["operationType"]
+        _id = cambio["documentKey"]["_id"]
+        if operacion == "delete":
+            self.eliminar(_id)
+        elif operacion == "update":
+            descripcion = cambio.get("updateDescription") or {}
+            modificados = set(descripcion.get("updatedFields") or {}) | set(descripcion.get("removedFields") or [])
+            if {campo.split(".")[0] for campo in modificados} & CAMPOS_INDEXADOS:
+                await self.refrescar(_id)
+        elif cambio.get("fullDocument"):
+            self.actualizar_documento(cambio["fullDocument"])
+
+    async def escuchar_cambios(self) -> None:
+        """Aplica los cambios de INVENTARIOS vía change stream; termina si el servidor no los soporta."""
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        token = None
+        espera = 1.0
+        while True:
+            try:
+                async with get_collection("INVENTARIOS").watch(pipeline, resume_after=token) as stream:
+                    self.change_stream_activo = True
+                    espera = 1.0
+                    async for cambio in stream:
+                        token = stream.resume_token
+                        await self._aplicar_cambio(cambio)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _CODIGOS_SIN_CHANGE_STREAM:
+                    self.change_stream_activo = False
+                    logger.info("ℹ️ [BUSQUEDA] Change streams no disponibles (%s); el índice se actualiza solo desde las rutas", e.code)
+                    return
+                logger.warning("⚠️ [BUSQUEDA] Change stream interrumpido: %s", e)
+            except PyMongoError as e:
+                logger.warning("⚠️ [BUSQUEDA] Change stream interrumpido: %s", e)
+            self.change_stream_activo = False
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 60)
+
+    async def _iniciar(self) -> None:
+        try:
+            await self.cargar()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("❌ [BUSQUEDA] No se pudo construir el índice de productos: %s", e)
+            return
+        if SEARCH_INDEX_CHANGE_STREAM:
+            await self.escuchar_cambios()
+
+    def iniciar(self) -> None:
+        """Carga el índice en segundo plano (la app atiende requests mientras tanto)."""
+        if SEARCH_INDEX_ENABLED and not self._tareas:
+            self._tareas.append(asyncio.create_task(self._iniciar()))
+
+    async def detener(self) -> None:
+        for tarea in self._tareas:
+            tarea.cancel()
+        for tarea in self._tareas:
+            try:
+                await tarea
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tareas.clear()
+        self.change_stream_activo = False
+
+    def stats(self) -> dict:
+        return {
+            "habilitado": SEARCH_INDEX_ENABLED,
+            "listo": self.listo,
+            "productos": len(self._farmacia_de),
+            "farmacias": len(self.indices),
+            "trigramas": sum(indice.cantidad_trigramas for indice in self.indices.values()),
+            "palabras_corrector": sum(len(corrector) for corrector in self.correctores.values()),
+            "claves_autocompletar": sum(len(trie) for trie in self.tries.values()),
+            "carga_ms": round(self.carga_ms, 1),
+            "busquedas": self.busquedas,
+            "busquedas_sin_indice": self.busquedas_sin_indice,
+            "correcciones": self.correcciones,
+            "autocompletados": self.autocompletados,
+            "cambios_aplicados": self.cambios_aplicados,
+            "change_stream_activo": self.change_stream_activo,
+        }
+
+
+indice_productos = IndiceProductos()
+
+
+def estadisticas_indice_productos() -> dict:
+    return indice_productos.stats()
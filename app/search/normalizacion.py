@@ -0,0 +1,59 @@
+"""
+Normalización de texto para búsquedas: minúsculas, sin acentos y con los
+espacios colapsados. Se usa igual al indexar y al consultar.
+"""
+import re
+import unicodedata
+from typing import Any
+
+# Marcas diacríticas combinables (acentos, diéresis, tilde de la ñ) tras NFKD
+_DIACRITICOS = re.compile("[\u0300-\u036f]")
+
+
+def normalizar_texto(texto: Any) -> str:
+    """'  Válvula  de PASO ' -> 'valvula de paso' (la ñ queda como n)."""
+    if texto is None:
+        return ""
+    texto = str(texto)
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    if not texto.isascii():
+        texto = _DIACRITICOS.sub("", texto)
+    return " ".join(texto.split())
+
+
+# Campos persistidos en INVENTARIOS para búsquedas por prefijo con índice
+CAMPOS_NORMALIZADOS = ("codigo_norm", "nombre_norm", "tokens")
+# Campos de los que dependen los normalizados (si cambia alguno hay que recalcular)
+CAMPOS_ORIGEN = ("codigo", "nombre", "marca", "marca_producto")
+_PUNTUACION = ",.;:()[]\"'"
+
+
+def tokens_busqueda(*textos: Any) -> list:
+    """Palabras normalizadas y sin repetir de los textos, en orden de aparición."""
+    tokens = []
+    for texto in textos:
+        for palabra in normalizar_texto(texto).split():
+            palabra = palabra.strip(_PUNTUACION)
+            if palabra and palabra not in tokens:
+                tokens.append(palabra)
+    return tokens
+
+
+def claves_busqueda(producto: dict) -> dict:
+    """nombre_norm, codigo_norm y tokens (código, nombre y marca) de un producto de INVENTARIOS."""
+    marca = producto.get("marca") or producto.get("marca_producto") or ""
+    return {
+        "codigo_norm": normalizar_texto(producto.get("codigo")),
+        "nombre_norm": normalizar_texto(producto.get("nombre")),
+        "tokens": tokens_busqueda(producto.get("codigo"), producto.get("nombre"), marca),
+    }
+
+
+def filtro_prefijo(campo: str, consulta: str) -> dict:
+    """
+    Regex anclada y sensible a mayúsculas sobre un campo normalizado: a diferencia
+    de $options "i", Mongo la resuelve como un rango del índice.
+    """
+    return {campo: {"$regex": f"^{re.escape(normalizar_texto(consulta))}"}}
@@ -0,0 +1,177 @@
+"""
+Trie comprimido (radix tree) para autocompletar por prefijo.
+
+Cada arista guarda un tramo de texto en vez de una sola letra, así un
+catálogo de nombres con prefijos comunes ("tornillo ...", "tornillo
+galvanizado ...") ocupa un nodo por bifurcación y no uno por carácter. Cada
+nodo donde termina una clave guarda los pares (_id, valor) de los productos
+con esa clave; completar() recorre el subárbol del prefijo en orden
+alfabético y se detiene al juntar `limite` productos distintos. iterar()
+entrega el mismo recorrido con la clave de cada producto, para mezclar en
+orden los resultados de varios tries (uno por farmacia).
+
+Las hojas (la mayoría de los nodos) no tienen dict de hijos y los valores van
+en una lista corta: con 100k productos (código y nombre) la diferencia con
+dicts por nodo son unos 20 MB.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class _Nodo:
+    __slots__ = ("etiqueta", "hijos", "valores")
+
+    def __init__(self, etiqueta: str = ""):
+        self.etiqueta = etiqueta
+        self.hijos: Optional[Dict[str, "_Nodo"]] = None
+        self.valores: Optional[List[Tuple[Any, Any]]] = None
+
+    def hijo(self, letra: str) -> Optional["_Nodo"]:
+        return self.hijos.get(letra) if self.hijos else None
+
+    def poner_hijo(self, nodo: "_Nodo") -> None:
+        if self.hijos is None:
+            self.hijos = {}
+        self.hijos[nodo.etiqueta[0]] = nodo
+
+
+def _prefijo_comun(a: str, b: str) -> int:
+    limite = min(len(a), len(b))
+    i = 0
+    while i < limite and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TrieComprimido:
+    """Claves de texto (ya normalizadas) -> productos, con búsqueda por prefijo."""
+
+    def __init__(self):
+        self._raiz = _Nodo()
+        self._raiz.hijos = {}
+        self._claves = 0
+
+    def __len__(self) -> int:
+        """Cantidad de claves distintas."""
+        return self._claves
+
+    def agregar(self, clave: str, _id: Any, valor: Any = None) -> None:
+        if not clave:
+            return
+        nodo = self._raiz
+        resto = clave
+        while resto:
+            hijo = nodo.hijo(resto[0])
+            if hijo is None:
+                hijo = _Nodo(resto)
+                nodo.poner_hijo(hijo)
+                nodo, resto = hijo, ""
+                break
+            comun = _prefijo_comun(resto, hijo.etiqueta)
+            if comun < len(hijo.etiqueta):
+                # Partir la arista: el tramo común queda como nodo intermedio
+                intermedio = _Nodo(hijo.etiqueta[:comun])
+                hijo.etiqueta = hijo.etiqueta[comun:]
+                intermedio.poner_hijo(hijo)
+                nodo.poner_hijo(intermedio)
+                hijo = intermedio
+            nodo, resto = hijo, resto[comun:]
+        if nodo.valores is None:
+            nodo.valores = []
+            self._claves += 1
+        for i, (existente, _) in enumerate(nodo.valores):
+            if existente == _id:
+                nodo.valores[i] = (_id, valor)
+                return
+        nodo.valores.append((_id, valor))
+
+    def eliminar(self, clave: str, _id: Any) -> bool:
+        camino: List[Tuple[_Nodo, _Nodo]] = []
+        nodo = self._raiz
+        resto = clave
+        while resto:
+            hijo = nodo.hijo(resto[0])
+            if hijo is None or not resto.startswith(hijo.etiqueta):
+                return False
+            camino.append((nodo, hijo))
+            nodo, resto = hijo, resto[len(hijo.etiqueta):]
+        restantes = [par for par in nodo.valores or () if par[0] != _id]
+        if nodo.valores is None or len(restantes) == len(nodo.valores):
+            return False
+        if restantes:
+            nodo.valores = restantes
+            return True
+        nodo.valores = None
+        self._claves -= 1
+        # Compactar: quitar nodos vacíos y fusionar los que quedan con un solo hijo
+        for padre, hijo in reversed(camino):
+            if hijo.valores is not None:
+                break
+            if not hijo.hijos:
+                del padre.hijos[hijo.etiqueta[0]]
+                if not padre.hijos and padre is not self._raiz:
+                    padre.hijos = None
+                continue
+            if len(hijo.hijos) == 1:
+                (nieto,) = hijo.hijos.values()
+                nieto.etiqueta = hijo.etiqueta + nieto.etiqueta
+                padre.poner_hijo(nieto)
+            break
+        return True
+
+    def _buscar_nodo(self, prefijo: str) -> Tuple[Optional[_Nodo], str]:
+        """Nodo del subárbol que coincide con el prefijo y su clave completa."""
+        nodo = self._raiz
+        clave = ""
+        resto = prefijo
+        while resto:
+            hijo = nodo.hijo(resto[0])
+            if hijo is None:
+                return None, ""
+            if resto.startswith(hijo.etiqueta):
+                nodo, resto = hijo, resto[len(hijo.etiqueta):]
+                clave += hijo.etiqueta
+            elif hijo.etiqueta.startswith(resto):
+                # El prefijo termina a mitad de la arista: todo el subárbol coincide
+                return hijo, clave + hijo.etiqueta
+            else:
+                return None, ""
+        return nodo, clave
+
+    def _recorrer(self, nodo: _Nodo, clave: str) -> Iterator[Tuple[str, List[Tuple[Any, Any]]]]:
+        pila = [(nodo, clave)]
+        while pila:
+            actual, clave = pila.pop()
+            if actual.valores:
+                yield clave, actual.valores
+            if actual.hijos:
+                # Invertido para que la pila entregue los hijos en orden alfabético
+                pila.extend(
+                    (actual.hijos[letra], clave + actual.hijos[letra].etiqueta)
+                    for letra in sorted(actual.hijos, reverse=True)
+                )
+
+    def iterar(self, prefijo: str) -> Iterator[Tuple[str, Any, Any]]:
+        """(clave, _id, valor) de las claves que empiezan con `prefijo`, en orden alfabético (puede repetir productos)."""
+        nodo, clave = self._buscar_nodo(prefijo)
+        if nodo is None:
+            return
+        for clave, valores in self._recorrer(nodo, clave):
+            for _id, valor in valores:
+                yield clave, _id, valor
+
+    def completar(self, prefijo: str, limite: int = 10) -> List[Tuple[Any, Any]]:
+        """
+        Hasta `limite` pares (_id, valor) cuyas claves empiezan con `prefijo`: primero
+        la clave exacta y después en orden alfabético, sin repetir productos.
+        """
+        if limite <= 0:
+            return []
+        resultados: List[Tuple[Any, Any]] = []
+        vistos = set()
+        for _, _id, valor in self.iterar(prefijo):
+            if _id not in vistos:
+                vistos.add(_id)
+                resultados.append((_id, valor))
+                if len(resultados) >= limite:
+                    break
+        return resultados
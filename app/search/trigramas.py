@@ -0,0 +1,182 @@
+"""
+Índice de trigramas en memoria para búsquedas por subcadena.
+
+Cada producto se guarda con sus textos normalizados (código, nombre,
+descripción, marca) y un id interno entero. Las listas de postings son
+arrays de enteros (4 bytes por entrada) para que 100k productos quepan en
+pocas decenas de MB.
+
+Para buscar se toma la lista del trigrama menos frecuente de la consulta y
+se verifica la subcadena en cada candidato, así el resultado es exactamente
+el mismo que el de un $regex sin anclar (sin distinguir mayúsculas ni
+acentos). Al eliminar o reemplazar un producto su id interno queda muerto;
+la búsqueda limpia las listas que recorre y, cuando los muertos superan a los
+vivos, el índice se compacta completo (ids renumerados y listas sin muertos),
+así la memoria queda acotada aunque cada actualización reemplace el producto.
+"""
+import heapq
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from app.search.normalizacion import normalizar_texto
+
+CAMPOS = ("codigo", "nombre", "descripcion", "marca")
+LONGITUD_MINIMA = 3
+# Ids muertos tolerados antes de compactar (además de superar a los vivos)
+MUERTOS_MINIMO_COMPACTAR = 1024
+
+# Rango de cada tipo de coincidencia (menor = mejor), mismo orden de prioridad
+# que el $or de la búsqueda amplia del punto de venta
+_RANGOS_SUBCADENA = ((2, 0), (3, 1), (4, 2), (5, 3))
+
+
+def trigramas(texto: str) -> Set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _rango(textos: Tuple[str, ...], consulta: str, campos: Sequence[int]) -> Optional[int]:
+    if 0 in campos and textos[0].startswith(consulta):
+        return 0
+    if 1 in campos and textos[1].startswith(consulta):
+        return 1
+    for rango, indice in _RANGOS_SUBCADENA:
+        if indice in campos and consulta in textos[indice]:
+            return rango
+    return None
+
+
+class IndiceTrigramas:
+    """Índice de una farmacia: _id del producto -> textos normalizados + postings por trigrama."""
+
+    def __init__(self):
+        self._ids: List[Any] = []
+        self._textos: List[Optional[Tuple[str, ...]]] = []
+        self._por_id: Dict[Any, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._muertos = 0
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def __contains__(self, _id: Any) -> bool:
+        return _id in self._por_id
+
+    @property
+    def cantidad_trigramas(self) -> int:
+        return len(self._postings)
+
+    @property
+    def cantidad_postings(self) -> int:
+        return sum(len(lista) for lista in self._postings.values())
+
+    def agregar(self, _id: Any, codigo: Any = "", nombre: Any = "", descripcion: Any = "", marca: Any = "") -> None:
+        """Agrega o reemplaza un producto."""
+        if _id in self._por_id:
+            self.eliminar(_id)
+        textos = tuple(normalizar_texto(valor) for valor in (codigo, nombre, descripcion, marca))
+        interno = len(self._ids)
+        self._ids.append(_id)
+        self._textos.append(textos)
+        self._por_id[_id] = interno
+        claves = set()
+        for texto in textos:
+            claves.update(trigramas(texto))
+        postings = self._postings
+        for clave in claves:
+            lista = postings.get(clave)
+            if lista is None:
+                postings[clave] = array("i", (interno,))
+            else:
+                lista.append(interno)
+
+    def textos(self, _id: Any) -> Optional[Tuple[str, ...]]:
+        """Textos normalizados (código, nombre, descripción, marca) de un producto indexado."""
+        interno = self._por_id.get(_id)
+        return None if interno is None else self._textos[interno]
+
+    def eliminar(self, _id: Any) -> bool:
+        interno = self._por_id.pop(_id, None)
+        if interno is None:
+            return False
+        self._ids[interno] = None
+        self._textos[interno] = None
+        self._muertos += 1
+        if self._muertos >= MUERTOS_MINIMO_COMPACTAR and self._muertos > len(self._por_id):
+            self._compactar()
+        return True
+
+    def _compactar(self) -> None:
+        """Renumera los ids vivos y quita los muertos de todas las listas (costo amortizado por eliminación)."""
+        nuevos = array("i", [-1]) * len(self._textos)
+        ids: List[Any] = []
+        textos: List[Optional[Tuple[str, ...]]] = []
+        for interno, texto in enumerate(self._textos):
+            if texto is not None:
+                nuevos[interno] = len(ids)
+                ids.append(self._ids[interno])
+                textos.append(texto)
+        postings = {}
+        for clave, lista in self._postings.items():
+            # El mapeo conserva el orden, las listas siguen ordenadas
+            vivos = array("i", (nuevos[interno] for interno in lista if nuevos[interno] >= 0))
+            if vivos:
+                postings[clave] = vivos
+        self._ids = ids
+        self._textos = textos
+        self._por_id = {_id: interno for interno, _id in enumerate(ids)}
+        self._postings = postings
+        self._muertos = 0
+
+    def buscar(
+        self,
+        consulta: str,
+        limite: int = 30,
+        campos: Iterable[str] = CAMPOS,
+        excluir: Iterable[Any] = (),
+        normalizada: bool = False,
+    ) -> Optional[List[Tuple[int, str, Any]]]:
+        """
+        Retorna hasta `limite` tuplas (rango, nombre normalizado, _id) ordenadas por
+        tipo de coincidencia y luego por nombre. None si la consulta es muy corta
+        para usar trigramas (el llamador debe buscar de otra forma).
+        """
+        consulta = consulta if normalizada else normalizar_texto(consulta)
+        if len(consulta) < LONGITUD_MINIMA:
+            return None
+
+        listas = []
+        for clave in trigramas(consulta):
+            lista = self._postings.get(clave)
+            if lista is None:
+                return []
+            listas.append((len(lista), clave, lista))
+        _, clave, menor = min(listas)
+
+        indices_campos = tuple(CAMPOS.index(campo) for campo in campos)
+        excluidos = {self._por_id[_id] for _id in excluir if _id in self._por_id}
+        textos = self._textos
+        candidatos = []
+        muertos = 0
+        for interno in menor:
+            texto = textos[interno]
+            if texto is None:
+                muertos += 1
+                continue
+            if interno in excluidos:
+                continue
+            rango = _rango(texto, consulta, indices_campos)
+            if rango is not None:
+                candidatos.append((rango, texto[1], interno))
+
+        if muertos:
+            self._limpiar(clave, menor)
+
+        ids = self._ids
+        return [(rango, nombre, ids[interno]) for rango, nombre, interno in heapq.nsmallest(limite, candidatos)]
+
+    def _limpiar(self, clave: str, lista: array) -> None:
+        textos = self._textos
+        vivos = array("i", (interno for interno in lista if textos[interno] is not None))
+        if vivos:
+            self._postings[clave] = vivos
+        else:
+            del self._postings[clave]
@@ -1,14 +1,13 @@
-from app.db.mongo import db
+from app.db.mongo import get_collection
 from app.models.example_model import Example
 
-collection = db["examples"]
+def _collection():
+    return get_collection("examples")
 
 async def create_example(example: Example):
-    result = await collection.insert_one(example.dict())
+    result = await _collection().insert_one(example.dict())
     return str(result.inserted_id)
 
 async def get_all_examples():
-    docs = await collection.find().to_list(100)
-    for doc in docs:
-        doc["_id"] = str(doc["_id"])
+    docs = await _collection().find().to_list(100)
     return docs
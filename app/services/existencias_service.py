@@ -0,0 +1,310 @@
+"""
+Movimientos de existencia en INVENTARIOS.
+
+Carga masiva (/inventarios/cargar-existencia) en tres viajes a Mongo sin
+importar la cantidad de líneas: un find con $in para leer los productos, un
+bulk_write sin orden con una operación por producto ($inc de la cantidad y
+$set de costo/precios) y otro find con $in para devolver las filas
+actualizadas. El costo promedio ponderado y los precios se calculan en
+memoria, línea por línea y en el orden recibido: si un producto aparece dos
+veces, la segunda línea parte de la cantidad y el costo que dejó la primera,
+igual que cuando cada línea se escribía por separado.
+
+Descuento por venta (descontar_stock): un solo find_one_and_update con la
+condición de stock suficiente en el filtro ({"cantidad": {"$gte": ...}}) y un
+$inc negativo; después, solo si el producto tiene lotes_activos, los lotes se
+consumen FEFO en la colección LOTES (lotes_service.consumir_fefo). Un producto
+que todavía tiene el arreglo embebido (migrar_lotes.py no lo procesó) lo pasa
+a LOTES en su primera venta. Dos ventas simultáneas del mismo producto no se
+pisan y ninguna deja el stock en negativo. Las lecturas de diagnóstico (stock
+insuficiente, producto inactivo o inexistente) solo se hacen cuando la
+actualización no encuentra el producto.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.logger import obtener_logger
+from app.db.mongo import get_collection
+from app.db.sincronizacion import marca_actualizacion
+from app.search.cache_codigos import cache_codigos
+from app.search.formato import stock_disponible
+from app.services.lotes_service import CAMPO_LOTES_ACTIVOS, consumir_fefo, migrar_lotes_embebidos
+from app.services.precios_service import CAMPOS_PRECIO, calcular_precios
+
+logger = obtener_logger(__name__)
+
+PROYECCION_LECTURA = {"farmacia": 1, "cantidad": 1, "costo": 1, "nombre": 1}
+PROYECCION_RESPUESTA = {
+    "codigo": 1, "nombre": 1, "descripcion": 1, "marca": 1, "cantidad": 1, "costo": 1,
+    "precio_venta": 1, "precio": 1, "utilidad": 1, "porcentaje_utilidad": 1, "farmacia": 1, "estado": 1,
+}
+# "lotes" solo existe en los productos sin migrar (arreglo embebido)
+PROYECCION_DESCUENTO = {"codigo": 1, "nombre": 1, "cantidad": 1, "costo": 1, CAMPO_LOTES_ACTIVOS: 1, "lotes": 1}
+PROYECCION_DIAGNOSTICO = {"farmacia": 1, "estado": 1, "cantidad": 1}
+
+
+def calcular_carga(cantidad_actual: float, costo_actual: float, producto_carga: dict) -> Dict[str, float]:
+    """
+    Nueva cantidad, costo promedio ponderado (sin redondear) y precios finales
+    de una línea de carga. Los precios enviados en la línea tienen prioridad.
+    """
+    cantidad_a_sumar = float(producto_carga.get("cantidad", 0))
+    cantidad_nueva = cantidad_actual + cantidad_a_sumar
+
+    # Obtener nuevo costo (si viene en la carga, usarlo; sino usar el actual)
+    nuevo_costo_unitario = float(producto_carga.get("costo", costo_actual))
+    if nuevo_costo_unitario <= 0:
+        nuevo_costo_unitario = costo_actual
+
+    # Calcular costo promedio ponderado
+    if cantidad_actual > 0 and nuevo_costo_unitario != costo_actual:
+        costo_total_actual = cantidad_actual * costo_actual
+        costo_total_nuevo = cantidad_a_sumar * nuevo_costo_unitario
+        costo_promedio = (costo_total_actual + costo_total_nuevo) / cantidad_nueva
+    else:
+        costo_promedio = nuevo_costo_unitario if nuevo_costo_unitario > 0 else costo_actual
+
+    # Precios finales (precio_venta, utilidad y porcentaje) con las reglas de precios_service
+    precios = calcular_precios(
+        costo_promedio,
+        producto_carga.get("precio_venta"),
+        producto_carga.get("utilidad"),
+        producto_carga.get("porcentaje_utilidad"),
+    )
+    return {"cantidad_nueva": cantidad_nueva, "costo": costo_promedio, **precios}
+
+
+def _validar_linea(producto_carga: dict) -> Tuple[ObjectId, float]:
+    producto_id = producto_carga.get("producto_id")
+    if not producto_id:
+        raise ValueError("El campo 'producto_id' es requerido")
+
+    cantidad_a_sumar = float(producto_carga.get("cantidad", 0))
+    if cantidad_a_sumar <= 0:
+        raise ValueError("La cantidad debe ser mayor a 0")
+
+    try:
+        return ObjectId(producto_id), cantidad_a_sumar
+    except (InvalidId, ValueError, TypeError):
+        raise ValueError(f"ID de producto inválido: {producto_id}")
+
+
+def _formatear(producto: dict, producto_id: Any, linea: dict) -> dict:
+    precio = float(producto.get("precio_venta") or producto.get("precio", 0))
+    return {
+        "id": producto_id,
+        "_id": producto_id,
+        "codigo": producto.get("codigo", ""),
+        "nombre": producto.get("nombre", ""),
+        "descripcion": producto.get("descripcion", ""),
+        "marca": producto.get("marca", ""),
+        "cantidad": float(producto.get("cantidad", 0)),
+        "costo": round(float(producto.get("costo", 0)), 2),
+        "precio_venta": precio,
+        "precio": precio,
+        "utilidad": float(producto.get("utilidad", 0)),
+        "porcentaje_utilidad": float(producto.get("porcentaje_utilidad", 0)),
+        "farmacia": producto.get("farmacia", ""),
+        "estado": producto.get("estado", "activo"),
+        # Información adicional para el frontend
+        "cantidad_anterior": linea["cantidad_anterior"],
+        "cantidad_suma": linea["cantidad_suma"],
+        "cantidad_nueva": linea["cantidad_nueva"],
+    }
+
+
+async def cargar_existencia(
+    farmacia: str,
+    productos: List[dict],
+    usuario_correo: str,
+    fecha_actual: str,
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Suma las cantidades de `productos` (líneas del body de cargar-existencia) y
+    actualiza costo promedio y precios. Retorna (exitosos, errores) en el orden
+    de las líneas; cada error es {"producto_id", "error"} como antes.
+    """
+    collection = get_collection("INVENTARIOS")
+    errores: Dict[int, str] = {}
+    validas: Dict[int, Tuple[ObjectId, float]] = {}
+
+    for i, producto_carga in enumerate(productos):
+        try:
+            validas[i] = _validar_linea(producto_carga)
+        except Exception as e:
+            errores[i] = str(e)
+
+    # 1) Todos los productos en una consulta
+    ids = list({oid for oid, _ in validas.values()})
+    actuales = {}
+    if ids:
+        documentos = await collection.find({"_id": {"$in": ids}}, projection=PROYECCION_LECTURA).to_list(length=len(ids))
+        actuales = {doc["_id"]: doc for doc in documentos}
+
+    # 2) Cálculo en memoria, en el orden de las líneas
+    estado: Dict[ObjectId, Dict[str, Any]] = {}
+    lineas: Dict[int, Dict[str, Any]] = {}
+    for i, (oid, cantidad_a_sumar) in validas.items():
+        try:
+            producto_actual = actuales.get(oid)
+            if not producto_actual:
+                raise ValueError(f"Producto no encontrado: {productos[i].get('producto_id')}")
+            if producto_actual.get("farmacia") != farmacia:
+                raise ValueError(f"El producto no pertenece a la farmacia {farmacia}")
+
+            previo = estado.get(oid)
+            cantidad_actual = previo["cantidad"] if previo else float(producto_actual.get("cantidad", 0))
+            costo_actual = previo["costo_redondeado"] if previo else float(producto_actual.get("costo", 0))
+            calculo = calcular_carga(cantidad_actual, costo_actual, productos[i])
+
+            estado[oid] = {
+                "cantidad": calculo["cantidad_nueva"],
+                "costo_redondeado": round(calculo["costo"], 2),
+                "suma": (previo["suma"] if previo else 0) + cantidad_a_sumar,
+                "calculo": calculo,
+                "lineas": (previo["lineas"] if previo else []) + [i],
+            }
+            lineas[i] = {"cantidad_anterior": cantidad_actual, "cantidad_suma": cantidad_a_sumar, "cantidad_nueva": calculo["cantidad_nueva"], "calculo": calculo}
+        except Exception as e:
+            errores[i] = str(e)
+
+    # 3) Una operación por producto, todas en un bulk_write sin orden
+    orden = list(estado)
+    operaciones = []
+    for oid in orden:
+        calculo = estado[oid]["calculo"]
+        operaciones.append(UpdateOne(
+            {"_id": oid, "farmacia": farmacia},
+            {
+                # $inc: una venta simultánea no se pierde
+                "$inc": {"cantidad": estado[oid]["suma"]},
+                "$set": {
+                    "costo": round(calculo["costo"], 2),
+                    **{campo: calculo[campo] for campo in CAMPOS_PRECIO},
+                    "fechaActualizacion": fecha_actual,
+                    "usuarioActualizacion": usuario_correo,
+                    **marca_actualizacion(),
+                },
+            },
+        ))
+    if operaciones:
+        try:
+            await collection.bulk_write(operaciones, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                oid = orden[error["index"]]
+                for i in estado.pop(oid)["lineas"]:
+                    errores[i] = error.get("errmsg", "Error escribiendo el producto")
+                    lineas.pop(i, None)
+
+    # 4) Filas actualizadas en una consulta
+    actualizados = {}
+    if estado:
+        documentos = await collection.find({"_id": {"$in": list(estado)}}, projection=PROYECCION_RESPUESTA).to_list(length=len(estado))
+        actualizados = {doc["_id"]: doc for doc in documentos}
+        cache_codigos.invalidar_productos(*documentos)
+
+    exitosos = []
+    for i in sorted(lineas):
+        oid = validas[i][0]
+        producto = actualizados.get(oid, {})
+        if i != estado[oid]["lineas"][-1]:
+            # Producto repetido: las líneas anteriores muestran cómo quedó el producto después de ellas
+            calculo = lineas[i]["calculo"]
+            producto = {
+                **producto,
+                "cantidad": calculo["cantidad_nueva"],
+                "costo": calculo["costo"],
+                **{campo: calculo[campo] for campo in CAMPOS_PRECIO},
+            }
+        exitosos.append(_formatear(producto, productos[i].get("producto_id"), lineas[i]))
+        logger.debug("✅ [INVENTARIOS] Existencia cargada: %s - %s + %s = %s", actuales[oid].get("nombre", ""), lineas[i]["cantidad_anterior"], lineas[i]["cantidad_suma"], lineas[i]["cantidad_nueva"])
+    for i in sorted(errores):
+        logger.error("❌ [INVENTARIOS] Error cargando existencia para producto %s: %s", productos[i].get("producto_id", "unknown"), errores[i])
+
+    return exitosos, [
+        {"producto_id": productos[i].get("producto_id", "unknown"), "error": errores[i]}
+        for i in sorted(errores)
+    ]
+
+
+def _filtro_codigo(codigo: Any, farmacia: str) -> dict:
+    return {"codigo": {"$regex": f"^{codigo}$", "$options": "i"}, "farmacia": farmacia}
+
+
+async def _validar_stock(collection, filtro: dict, cantidad: float, session) -> None:
+    """La actualización no encontró el producto: si existe, fue por stock y se lanza el error de siempre."""
+    producto = await collection.find_one(filtro, projection=PROYECCION_DIAGNOSTICO, session=session)
+    if producto:
+        raise ValueError(f"Stock insuficiente. Disponible: {stock_disponible(producto)}, Requerido: {cantidad}")
+
+
+async def descontar_stock(
+    producto_id: Any,
+    cantidad: float,
+    farmacia: str,
+    session=None,
+    codigo_producto: Optional[str] = None,
+) -> float:
+    """
+    Descuenta `cantidad` del producto (por _id y, si no está, por código exacto
+    sin distinguir mayúsculas entre los no inactivos) en un solo viaje a Mongo,
+    más uno por lote que consuma si el producto tiene lotes. Retorna el costo de lo descontado: por lotes
+    FEFO y, lo que no cubran los lotes, a costo del producto. Lanza ValueError
+    con los mensajes de siempre (stock insuficiente, producto inactivo o no
+    encontrado).
+    """
+    collection = get_collection("INVENTARIOS")
+    con_stock = {"cantidad": {"$gte": cantidad}}
+    descuento = {"$inc": {"cantidad": -cantidad}, "$set": marca_actualizacion()}
+    producto = None
+
+    # Intentar por ID primero
+    producto_object_id = None
+    if producto_id:
+        try:
+            producto_object_id = ObjectId(producto_id)
+        except (InvalidId, ValueError, TypeError) as e:
+            logger.warning("⚠️ [INVENTARIO] ID inválido '%s': %s. Buscando por código", producto_id, e)
+    if producto_object_id:
+        filtro_id = {"_id": producto_object_id, "farmacia": farmacia}
+        producto = await collection.find_one_and_update(
+            {**filtro_id, **con_stock}, descuento,
+            projection=PROYECCION_DESCUENTO, return_document=ReturnDocument.AFTER, session=session
+        )
+        if producto is None:
+            await _validar_stock(collection, filtro_id, cantidad, session)
+            logger.warning("⚠️ [INVENTARIO] Producto con ID %s no encontrado en farmacia %s", producto_id, farmacia)
+
+    # Si no se encontró por ID, buscar por código
+    if producto is None:
+        codigo_busqueda = codigo_producto or producto_id
+        filtro_codigo = _filtro_codigo(codigo_busqueda, farmacia)
+        activo = {**filtro_codigo, "estado": {"$ne": "inactivo"}}
+        producto = await collection.find_one_and_update(
+            {**activo, **con_stock}, descuento,
+            projection=PROYECCION_DESCUENTO, return_document=ReturnDocument.AFTER, session=session
+        )
+        if producto is None:
+            await _validar_stock(collection, activo, cantidad, session)
+            inactivo = await collection.find_one(filtro_codigo, projection=PROYECCION_DIAGNOSTICO, session=session)
+            if inactivo:
+                logger.warning("⚠️ [INVENTARIO] Producto encontrado pero está inactivo: %s", codigo_busqueda)
+                raise ValueError(f"Producto encontrado pero está inactivo. ID: {producto_id}, Código: {codigo_busqueda}, Estado: {inactivo.get('estado')}")
+            raise ValueError(f"Producto no encontrado. ID: {producto_id}, Código: {codigo_busqueda}, Farmacia: {farmacia}")
+
+    if "lotes" in producto:
+        producto[CAMPO_LOTES_ACTIVOS] = await migrar_lotes_embebidos(producto, session=session)
+    costo_lotes, sin_lote = 0.0, cantidad
+    if producto.get(CAMPO_LOTES_ACTIVOS):
+        costo_lotes, sin_lote = await consumir_fefo(producto["_id"], cantidad, session=session)
+    # Sin lotes (o sin lotes suficientes): usar costo promedio
+    costo_total = costo_lotes + sin_lote * float(producto.get("costo", 0))
+
+    logger.info(
+        "✅ [INVENTARIO] Stock descontado: %s - %s unidades (quedan %s), Costo: %.2f",
+        producto.get("codigo", producto_id), cantidad, stock_disponible(producto), costo_total
+    )
+    return costo_total
@@ -0,0 +1,222 @@
+"""
+Lotes de los productos en su propia colección (LOTES), un documento por lote:
+{producto_id, farmacia, lote, cantidad, costo, fecha_vencimiento, ...}.
+
+Antes eran un arreglo dentro del producto y cada venta reescribía el arreglo
+completo. Ahora la venta consume FEFO (primero el que vence antes) con un
+find_one_and_update por lote que toca, en el orden del índice
+producto_fefo_index; los lotes que se agotan se borran, igual que antes se
+quitaban del arreglo. El reporte de lotes por vencer recorre
+farmacia_vencimiento_index.
+
+El producto guarda en lotes_activos cuántos lotes con existencia tiene en
+LOTES (lo mantienen reemplazar_lotes, consumir_fefo y migrar_lotes.py). La
+venta lo recibe en el mismo find_one_and_update que descuenta el stock y, si
+es 0 (la mayoría de los productos de ferretería no maneja lotes), no consulta
+LOTES: sigue siendo un solo viaje a Mongo.
+
+fecha_vencimiento es texto "YYYY-MM-DD"; los lotes sin fecha se guardan con
+SIN_VENCIMIENTO para que queden al final del orden, como en el arreglo.
+
+migrar_lotes.py pasa los arreglos existentes a LOTES; los índices los crea
+create_indexes.py. Entre el despliegue y la migración, LOTES manda sobre el
+arreglo: un PATCH con "lotes" quita el arreglo del producto, la primera venta
+de un producto sin migrar pasa su arreglo a LOTES (migrar_lotes_embebidos) y
+las lecturas devuelven el arreglo mientras siga en el producto.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+from app.db.mongo import get_collection
+
+COLECCION_LOTES = "LOTES"
+CAMPO_LOTES_ACTIVOS = "lotes_activos"
+SIN_VENCIMIENTO = "9999-12-31"
+ORDEN_FEFO = [("fecha_vencimiento", 1), ("_id", 1)]
+# Todos los campos del lote como estaban en el arreglo (más producto_id para agruparlos)
+PROYECCION_LOTE = {"_id": 0, "farmacia": 0}
+PROYECCION_REPORTE = {"_id": 0, "producto_id": 1, "lote": 1, "cantidad": 1, "costo": 1, "fecha_vencimiento": 1}
+
+
+def documento_lote(producto: dict, lote: dict) -> dict:
+    """Documento de LOTES para un lote (en el formato del arreglo embebido) del producto."""
+    vencimiento = lote.get("fecha_vencimiento")
+    if isinstance(vencimiento, (datetime, date)):
+        vencimiento = vencimiento.strftime("%Y-%m-%d")
+    return {
+        **{campo: valor for campo, valor in lote.items() if campo != "_id"},
+        "producto_id": producto["_id"],
+        "farmacia": producto.get("farmacia"),
+        "cantidad": float(lote.get("cantidad") or 0),
+        "costo": float(lote.get("costo") or 0),
+        "fecha_vencimiento": vencimiento or SIN_VENCIMIENTO,
+    }
+
+
+def contar_activos(documentos: List[dict]) -> int:
+    """Lotes con existencia entre los documentos de LOTES (valor de lotes_activos)."""
+    return sum(1 for documento in documentos if documento["cantidad"] > 0)
+
+
+def _formatear_lote(lote: dict) -> dict:
+    """Lote como estaba en el arreglo embebido (sin fecha_vencimiento si no tenía)."""
+    lote.pop("producto_id", None)
+    if lote.get("fecha_vencimiento") == SIN_VENCIMIENTO:
+        del lote["fecha_vencimiento"]
+    return lote
+
+
+async def consumir_fefo(producto_id: Any, cantidad: float, session=None) -> Tuple[float, float]:
+    """
+    Descuenta `cantidad` de los lotes del producto, empezando por el que vence
+    primero. Cada lote se descuenta con su propia actualización atómica, así dos
+    ventas simultáneas nunca toman las mismas unidades. Retorna (costo de lo
+    descontado de lotes, cantidad que no alcanzó a cubrirse con lotes). Los
+    lotes agotados se borran y se restan de lotes_activos del producto.
+    """
+    lotes = get_collection(COLECCION_LOTES)
+    restante = cantidad
+    costo_total = 0.0
+    agotados = []
+    while restante > 0:
+        # Documento anterior: cuánto tenía el lote y a qué costo
+        lote = await lotes.find_one_and_update(
+            {"producto_id": producto_id, "cantidad": {"$gt": 0}},
+            [{"$set": {"cantidad": {"$max": [{"$subtract": ["$cantidad", restante]}, 0]}}}],
+            sort=ORDEN_FEFO, projection={"cantidad": 1, "costo": 1}, session=session
+        )
+        if lote is None:
+            break
+        cantidad_lote = float(lote["cantidad"])
+        tomado = min(cantidad_lote, restante)
+        costo_total += tomado * float(lote.get("costo", 0))
+        restante -= tomado
+        if tomado >= cantidad_lote:
+            agotados.append(lote["_id"])
+    if agotados:
+        borrados = await lotes.delete_many({"_id": {"$in": agotados}, "cantidad": {"$lte": 0}}, session=session)
+        if borrados.deleted_count:
+            await get_collection("INVENTARIOS").update_one(
+                {"_id": producto_id},
+                [{"$set": {CAMPO_LOTES_ACTIVOS: {"$max": [
+                    {"$subtract": [{"$ifNull": [f"${CAMPO_LOTES_ACTIVOS}", 0]}, borrados.deleted_count]}, 0,
+                ]}}}],
+                session=session
+            )
+    return costo_total, restante
+
+
+async def migrar_lotes_embebidos(producto: dict, session=None) -> int:
+    """
+    Pasa a LOTES el arreglo "lotes" de un producto que migrar_lotes.py todavía
+    no procesó y retorna su lotes_activos. Quitar el arreglo es la reserva:
+    solo quien lo quita inserta, y no se insertan si el producto ya tiene
+    lotes en LOTES (el script o un PATCH llegaron antes).
+    """
+    inventarios = get_collection("INVENTARIOS")
+    lotes = get_collection(COLECCION_LOTES)
+    reservado = await inventarios.find_one_and_update(
+        {"_id": producto["_id"], "lotes": {"$exists": True}}, {"$unset": {"lotes": ""}},
+        projection={"farmacia": 1, "lotes": 1}, session=session
+    )
+    if reservado is not None and not await lotes.find_one({"producto_id": producto["_id"]}, projection={"_id": 1}, session=session):
+        documentos = [documento_lote(reservado, lote) for lote in reservado.get("lotes") or [] if isinstance(lote, dict)]
+        if documentos:
+            await lotes.insert_many(documentos, session=session)
+    activos = await lotes.count_documents({"producto_id": producto["_id"], "cantidad": {"$gt": 0}}, session=session)
+    if reservado is not None:
+        await inventarios.update_one({"_id": producto["_id"]}, {"$set": {CAMPO_LOTES_ACTIVOS: activos}}, session=session)
+    return activos
+
+
+async def adjuntar_lotes(productos: List[dict]) -> List[dict]:
+    """
+    Agrega a cada producto su arreglo "lotes" (en orden FEFO), como lo
+    devolvían las rutas cuando estaban embebidos. Una consulta para todos. Un
+    producto que todavía no se migró conserva su arreglo embebido.
+    """
+    ids = [producto["_id"] for producto in productos if producto and "_id" in producto]
+    if not ids:
+        return productos
+    por_producto: Dict[Any, List[dict]] = defaultdict(list)
+    documentos = await get_collection(COLECCION_LOTES).find(
+        {"producto_id": {"$in": ids}}, projection=PROYECCION_LOTE
+    ).sort([("producto_id", 1), *ORDEN_FEFO]).to_list(length=None)
+    for lote in documentos:
+        por_producto[lote["producto_id"]].append(_formatear_lote(lote))
+    for producto in productos:
+        if producto and "_id" in producto:
+            embebidos = producto.get("lotes") if isinstance(producto.get("lotes"), list) else []
+            producto["lotes"] = por_producto.get(producto["_id"]) or embebidos
+    return productos
+
+
+async def reemplazar_lotes(producto: dict, lotes: List[dict], session=None) -> None:
+    """Reemplaza todos los lotes del producto (PATCH con "lotes", como cuando se guardaba el arreglo)."""
+    coleccion = get_collection(COLECCION_LOTES)
+    await coleccion.delete_many({"producto_id": producto["_id"]}, session=session)
+    documentos = [documento_lote(producto, lote) for lote in lotes or [] if isinstance(lote, dict)]
+    if documentos:
+        await coleccion.insert_many(documentos, session=session)
+    # Sin el arreglo embebido migrar_lotes.py no vuelve a escribir los lotes anteriores
+    await get_collection("INVENTARIOS").update_one(
+        {"_id": producto["_id"]},
+        {"$set": {CAMPO_LOTES_ACTIVOS: contar_activos(documentos)}, "$unset": {"lotes": ""}},
+        session=session
+    )
+
+
+async def eliminar_lotes(producto_id: Any) -> None:
+    """Borra los lotes de un producto eliminado de INVENTARIOS."""
+    await get_collection(COLECCION_LOTES).delete_many({"producto_id": producto_id})
+
+
+def _dias_restantes(vencimiento: str, hoy: date) -> Optional[int]:
+    try:
+        return (date.fromisoformat(vencimiento[:10]) - hoy).days
+    except (TypeError, ValueError):
+        return None
+
+
+async def lotes_por_vencer(farmacia: str, dias: int, limite: int) -> List[dict]:
+    """
+    Lotes con existencia de `farmacia` que vencen en los próximos `dias` días
+    (incluye los ya vencidos), del más próximo al más lejano, con el código y
+    nombre del producto.
+    """
+    hoy = datetime.now(pytz.timezone("America/Caracas")).date()
+    # Límite exclusivo al día siguiente: también entran las fechas con hora ("YYYY-MM-DDTHH:MM")
+    hasta = (hoy + timedelta(days=dias + 1)).isoformat()
+    lotes = await get_collection(COLECCION_LOTES).find(
+        {"farmacia": farmacia, "fecha_vencimiento": {"$lt": hasta}, "cantidad": {"$gt": 0}},
+        projection=PROYECCION_REPORTE
+    ).sort(ORDEN_FEFO).limit(limite).to_list(length=limite)
+
+    ids = list({lote["producto_id"] for lote in lotes})
+    productos = {}
+    if ids:
+        documentos = await get_collection("INVENTARIOS").find(
+            {"_id": {"$in": ids}}, projection={"codigo": 1, "nombre": 1}
+        ).to_list(length=len(ids))
+        productos = {doc["_id"]: doc for doc in documentos}
+
+    resultado = []
+    for lote in lotes:
+        producto = productos.get(lote["producto_id"], {})
+        dias_restantes = _dias_restantes(lote["fecha_vencimiento"], hoy)
+        cantidad = float(lote.get("cantidad", 0))
+        costo = float(lote.get("costo", 0))
+        resultado.append({
+            "producto_id": str(lote["producto_id"]),
+            "codigo": producto.get("codigo", ""),
+            "nombre": producto.get("nombre", ""),
+            "lote": lote.get("lote", ""),
+            "fecha_vencimiento": lote["fecha_vencimiento"],
+            "dias_restantes": dias_restantes,
+            "vencido": dias_restantes is not None and dias_restantes < 0,
+            "cantidad": cantidad,
+            "costo": round(costo, 2),
+            "valor": round(cantidad * costo, 2),
+        })
+    return resultado
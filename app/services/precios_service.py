@@ -0,0 +1,175 @@
+"""
+Precio de venta, utilidad y porcentaje de utilidad de los productos de
+INVENTARIOS, calculados una sola vez al escribir.
+
+Antes cada lectura (listados, búsquedas, punto de venta) rehacía
+precio_venta = costo / 0.60 y la utilidad por fila, con reglas un poco
+distintas en cada ruta. Ahora todas las escrituras (crear producto, PATCH,
+cargar existencia, compras) guardan los valores finales ya redondeados con
+calcular_precios y las lecturas los devuelven tal cual.
+
+Reglas, en orden:
+1. Si viene precio_venta (> 0): utilidad = precio_venta - costo.
+2. Si viene utilidad (> 0): precio_venta = costo + utilidad.
+3. Si hay costo: precio_venta = costo / (1 - porcentaje / 100), con el
+   porcentaje enviado o 40%.
+El porcentaje enviado se respeta; si no viene se calcula sobre el costo.
+
+PIPELINE_PRECIOS aplica las mismas reglas del lado del servidor a los
+productos ya guardados (actualizar_utilidad_productos.py).
+"""
+from typing import Any, Dict, Optional
+
+PORCENTAJE_UTILIDAD_DEFECTO = 40.0
+CAMPOS_PRECIO = ("precio_venta", "precio", "utilidad", "porcentaje_utilidad")
+
+
+def _numero(valor: Any) -> float:
+    """float() del valor: null o no numérico cuenta como 0"""
+    try:
+        return float(valor or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def precio_enviado(datos: dict) -> Any:
+    """precio_venta si es mayor a 0; si no, el nombre anterior "precio" (misma regla que PIPELINE_PRECIOS)."""
+    precio_venta = datos.get("precio_venta")
+    return precio_venta if _numero(precio_venta) > 0 else datos.get("precio")
+
+
+def calcular_precios(
+    costo: Any,
+    precio_venta: Any = None,
+    utilidad: Any = None,
+    porcentaje_utilidad: Any = None,
+) -> Dict[str, float]:
+    """
+    Campos de precio a guardar en el producto (precio_venta, precio, utilidad,
+    porcentaje_utilidad), redondeados a 2 decimales. "precio" es el nombre
+    anterior de precio_venta y se guarda con el mismo valor.
+    """
+    costo = _numero(costo)
+    precio_venta = round(_numero(precio_venta), 2)
+    utilidad = _numero(utilidad)
+    try:
+        porcentaje: Optional[float] = float(porcentaje_utilidad)
+    except (TypeError, ValueError):
+        porcentaje = None
+
+    if precio_venta <= 0 and utilidad > 0:
+        precio_venta = round(costo + utilidad, 2)
+        porcentaje = None
+    elif precio_venta <= 0 and costo > 0:
+        if porcentaje is None or not 0 < porcentaje < 100:
+            porcentaje = PORCENTAJE_UTILIDAD_DEFECTO
+        precio_venta = round(costo / (1 - porcentaje / 100), 2)
+    if precio_venta <= 0:
+        return {campo: 0.0 for campo in CAMPOS_PRECIO}
+
+    # La utilidad siempre sale del precio ya redondeado (sin costo no hay utilidad)
+    utilidad = round(precio_venta - costo, 2) if costo > 0 else 0.0
+    if porcentaje is None:
+        porcentaje = utilidad / costo * 100 if costo > 0 else 0.0
+    return {
+        "precio_venta": precio_venta,
+        "precio": precio_venta,
+        "utilidad": utilidad,
+        "porcentaje_utilidad": round(porcentaje, 2),
+    }
+
+
+def aplicar_precios(data: dict, actual: Optional[dict] = None) -> dict:
+    """
+    Completa `data` (campos a guardar en INVENTARIOS) con los precios finales.
+    En una actualización parcial, `actual` es el producto guardado: si data no
+    trae ningún precio se recalculan los guardados; si trae costo sin precio,
+    el precio sale del porcentaje (no se conserva el anterior).
+    """
+    actual = actual or {}
+    costo = data["costo"] if "costo" in data else actual.get("costo")
+    if any(campo in data for campo in ("costo", *CAMPOS_PRECIO)):
+        precio_venta = precio_enviado(data)
+        utilidad = data.get("utilidad")
+        porcentaje = data.get("porcentaje_utilidad")
+    else:
+        precio_venta = precio_enviado(actual)
+        utilidad = actual.get("utilidad")
+        porcentaje = actual.get("porcentaje_utilidad")
+    data.update(calcular_precios(costo, precio_venta, utilidad, porcentaje))
+    return data
+
+
+def _campo(nombre: str, defecto: Any = 0) -> dict:
+    """float() del campo en agregación: null, ausente o no numérico cuenta como `defecto`"""
+    return {"$convert": {"input": f"${nombre}", "to": "double", "onError": defecto, "onNull": defecto}}
+
+
+# calcular_precios(costo, precio_enviado(producto), utilidad, porcentaje_utilidad)
+# como expresión de agregación, para update_many con pipeline
+_PRECIOS_GUARDADOS = {"$let": {
+    "vars": {
+        "costo": _campo("costo"),
+        "precio_venta": {"$round": [{"$cond": [{"$gt": [_campo("precio_venta"), 0]}, _campo("precio_venta"), _campo("precio")]}, 2]},
+        "utilidad": _campo("utilidad"),
+        # Como float() en Python: "40" vale, lo no numérico es "sin porcentaje"
+        "porcentaje": _campo("porcentaje_utilidad", None),
+    },
+    "in": {"$let": {
+        "vars": {"porcentaje_defecto": {"$cond": [
+            {"$and": [{"$gt": ["$$porcentaje", 0]}, {"$lt": ["$$porcentaje", 100]}]},
+            "$$porcentaje", PORCENTAJE_UTILIDAD_DEFECTO,
+        ]}},
+        "in": {"$let": {
+            "vars": {
+                "precio_final": {"$switch": {"branches": [
+                    {"case": {"$gt": ["$$precio_venta", 0]}, "then": "$$precio_venta"},
+                    {"case": {"$gt": ["$$utilidad", 0]}, "then": {"$round": [{"$add": ["$$costo", "$$utilidad"]}, 2]}},
+                    {"case": {"$gt": ["$$costo", 0]}, "then": {"$round": [
+                        {"$divide": ["$$costo", {"$subtract": [1, {"$divide": ["$$porcentaje_defecto", 100]}]}]}, 2,
+                    ]}},
+                ], "default": 0.0}},
+                "porcentaje_final": {"$switch": {"branches": [
+                    {"case": {"$gt": ["$$precio_venta", 0]}, "then": "$$porcentaje"},
+                    {"case": {"$gt": ["$$utilidad", 0]}, "then": None},
+                ], "default": "$$porcentaje_defecto"}},
+            },
+            "in": {"$let": {
+                "vars": {"utilidad_final": {"$cond": [
+                    {"$gt": ["$$costo", 0]}, {"$round": [{"$subtract": ["$$precio_final", "$$costo"]}, 2]}, 0.0,
+                ]}},
+                "in": {"$cond": [
+                    {"$gt": ["$$precio_final", 0]},
+                    {
+                        "precio_venta": "$$precio_final",
+                        "precio": "$$precio_final",
+                        "utilidad": "$$utilidad_final",
+                        "porcentaje_utilidad": {"$ifNull": [
+                            {"$round": ["$$porcentaje_final", 2]},
+                            {"$cond": [
+                                {"$gt": ["$$costo", 0]},
+                                {"$round": [{"$multiply": [{"$divide": ["$$utilidad_final", "$$costo"]}, 100]}, 2]},
+                                0.0,
+                            ]},
+                        ]},
+                    },
+                    {campo: 0.0 for campo in CAMPOS_PRECIO},
+                ]},
+            }},
+        }},
+    }},
+}}
+
+# updatedAt ($$NOW) solo en los productos cuyo precio cambia: las terminales
+# del punto de venta vuelven a descargar únicamente esos (app/db/sincronizacion.py)
+PIPELINE_PRECIOS = [
+    {"$set": {"_precios": _PRECIOS_GUARDADOS}},
+    {"$set": {
+        **{campo: f"$_precios.{campo}" for campo in CAMPOS_PRECIO},
+        "updatedAt": {"$cond": [
+            {"$and": [{"$eq": [f"$_precios.{campo}", f"${campo}"]} for campo in CAMPOS_PRECIO]},
+            "$updatedAt", "$$NOW",
+        ]},
+    }},
+    {"$unset": "_precios"},
+]
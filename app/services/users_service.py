@@ -1,6 +1,9 @@
-from app.core.auth import verificar_contraseña
+from app.core.auth import verificar_contraseña_async
 from app.db.mongo import get_collection
 from app.core.jwt import crear_token_jwt
+from app.core.logger import obtener_logger
+
+logger = obtener_logger(__name__)
 
 async def autenticar_usuario(correo: str, contraseña: str):
     try:
@@ -10,32 +13,27 @@ async def autenticar_usuario(correo: str, contraseña: str):
         users = get_collection("USUARIOS")
         usuario = await users.find_one({"correo": correo})
         
-        print(f"[AUTH] Buscando usuario: {correo}")
-        print(f"[AUTH] Usuario encontrado: {usuario is not None}")
+        logger.debug("🔍 [AUTH] Buscando usuario: %s - encontrado: %s", correo, usuario is not None)
         
         if not usuario:
-            print(f"[AUTH] Usuario no encontrado: {correo}")
+            logger.info("⚠️ [AUTH] Usuario no encontrado: %s", correo)
             return None
         
         if "contraseña" not in usuario:
-            print(f"[AUTH] Usuario no tiene contraseña almacenada")
+            logger.warning("⚠️ [AUTH] Usuario sin contraseña almacenada: %s", correo)
             return None
         
         # Verificar contraseña
-        print(f"[AUTH] Verificando contraseña...")
-        contraseña_valida = verificar_contraseña(contraseña, usuario["contraseña"])
-        print(f"[AUTH] Contraseña válida: {contraseña_valida}")
+        contraseña_valida = await verificar_contraseña_async(contraseña, usuario["contraseña"])
         
         if not contraseña_valida:
-            print(f"[AUTH] Contraseña incorrecta para usuario: {correo}")
+            logger.info("⚠️ [AUTH] Contraseña incorrecta para usuario: %s", correo)
             return None
         
-        print(f"[AUTH] Autenticación exitosa para: {correo}")
+        logger.info("✅ [AUTH] Autenticación exitosa para: %s", correo)
         return usuario
     except Exception as e:
-        print(f"[AUTH] Error en autenticar_usuario: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [AUTH] Error en autenticar_usuario: %s", e)
         return None
 
 # Ejemplo de login_y_token
@@ -47,16 +45,13 @@ async def login_y_token(correo, contraseña, return_user=False):
         
         from app.core.config import SECRET_KEY
         if not SECRET_KEY:
-            print("ERROR: SECRET_KEY no está configurada")
+            logger.error("❌ [AUTH] SECRET_KEY no está configurada")
             return None
         
         token = crear_token_jwt({"sub": usuario["correo"]})
-        print(f"token:{token}")
         if return_user:
             return usuario, token
         return token
     except Exception as e:
-        print(f"Error en login_y_token: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ [AUTH] Error en login_y_token: %s", e)
         return None
@@ -0,0 +1,5 @@
+import os
+
+# app.core.config exige estas variables al importarse
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
@@ -0,0 +1,81 @@
+import asyncio
+from app.search.buscador import Nivel, _buscar_con_exacto, ejecutar_niveles, nivel_exacto, nivel_prefijo, nivel_subcadena
+
+class CursorFalso:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+class ColeccionFalsa:
+    """aggregate mínimo: registra el pipeline y devuelve documentos ya marcados con _nivel (una lista por llamada)."""
+
+    name = "INVENTARIOS"
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        docs = self.respuestas.pop(0) if len(self.respuestas) > 1 else self.respuestas[0]
+        return CursorFalso([dict(doc) for doc in docs])
+
+PROYECCION = {"_id": 1, "codigo": 1, "nombre": 1}
+
+def test_un_solo_aggregate_con_union_por_nivel():
+    coleccion = ColeccionFalsa([
+        {"_id": 1, "codigo": "ABC", "_nivel": 0},
+        {"_id": 7, "nombre": "Clavo", "_nivel": 2},
+        {"_id": 2, "nombre": "Abrazadera", "_nivel": 1},
+        {"_id": 5, "nombre": "Cable", "_nivel": 2},
+    ])
+    filtro = {"farmacia": "01"}
+    niveles = [
+        nivel_exacto(filtro, "ABC"),
+        nivel_prefijo(filtro, "ab", ("nombre_norm",), 5),
+        Nivel("subcadena", {**filtro, "_id": {"$in": [5, 7]}}, 5, orden=None, ids=[5, 7]),
+    ]
+    resultados = asyncio.run(ejecutar_niveles(coleccion, niveles, PROYECCION))
+
+    assert len(coleccion.pipelines) == 1
+    pipeline = coleccion.pipelines[0]
+    assert pipeline[0] == {"$match": {"farmacia": "01", "codigo": "ABC"}}
+    # el nivel exacto no ordena: limit 1 directo sobre el índice farmacia+codigo
+    assert [list(etapa)[0] for etapa in pipeline] == ["$match", "$limit", "$project", "$set", "$unionWith", "$unionWith"]
+    prefijo = pipeline[4]["$unionWith"]
+    assert prefijo["coll"] == "INVENTARIOS"
+    assert prefijo["pipeline"][1] == {"$sort": {"nombre_norm": 1}}
+    assert prefijo["pipeline"][0]["$match"]["nombre_norm"] == {"$regex": "^ab"}
+
+    assert resultados["exacto"] == [{"_id": 1, "codigo": "ABC"}]
+    assert [doc["_id"] for doc in resultados["prefijo"]] == [2]
+    # los ids del índice de trigramas conservan su ranking
+    assert [doc["_id"] for doc in resultados["subcadena"]] == [5, 7]
+
+def test_regex_solo_si_el_codigo_no_existe():
+    filtro = {"farmacia": "01"}
+    regex = nivel_subcadena(filtro, "abc", ("codigo", "nombre"), 5, solo_activos=False)
+    assert regex.indexado is False
+
+    coleccion = ColeccionFalsa([{"_id": 1, "codigo": "ABC", "nombre": "Abrazadera", "_nivel": 0}])
+    resultados = asyncio.run(_buscar_con_exacto(coleccion, "ABC", None, PROYECCION, False, [regex]))
+    assert resultados == {"exacto": [{"_id": 1, "codigo": "ABC", "nombre": "Abrazadera"}]}
+    # el código existe: una sola consulta y sin el $regex que recorre la colección
+    assert len(coleccion.pipelines) == 1
+    assert "$regex" not in str(coleccion.pipelines[0])
+
+    coleccion = ColeccionFalsa([], [{"_id": 7, "codigo": "X-ABC", "nombre": "Clavo", "_nivel": 0}])
+    resultados = asyncio.run(_buscar_con_exacto(coleccion, "ABC", None, PROYECCION, False, [regex]))
+    assert resultados == {"exacto": [], "subcadena": [{"_id": 7, "codigo": "X-ABC", "nombre": "Clavo"}]}
+    assert len(coleccion.pipelines) == 2
+    assert "$regex" in str(coleccion.pipelines[1]) and "$unionWith" not in str(coleccion.pipelines[1])
+
+def test_niveles_con_indice_van_en_el_mismo_aggregate():
+    filtro = {"farmacia": "01"}
+    prefijo = nivel_prefijo(filtro, "abc", ("codigo_norm", "nombre_norm"), 5)
+    coleccion = ColeccionFalsa([{"_id": 2, "codigo": "ABC-1", "_nivel": 1}])
+    resultados = asyncio.run(_buscar_con_exacto(coleccion, "ABC", None, PROYECCION, False, [prefijo]))
+    assert resultados == {"exacto": [], "prefijo": [{"_id": 2, "codigo": "ABC-1"}]}
+    assert len(coleccion.pipelines) == 1 and "$unionWith" in str(coleccion.pipelines[0])
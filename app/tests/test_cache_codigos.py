@@ -0,0 +1,58 @@
+import asyncio
+from bson import ObjectId
+from app.search.cache_codigos import CacheCodigos
+
+ID = ObjectId("65f0c0ffee00000000000001")
+
+class ColeccionFalsa:
+    """find_one mínimo sobre un documento, registrando las consultas."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.consultas = []
+
+    async def find_one(self, filtro, projection=None, hint=None):
+        self.consultas.append((filtro, projection, hint))
+        if self.doc is None or any(self.doc.get(k) != v for k, v in filtro.items() if not isinstance(v, dict)):
+            return None
+        if isinstance(filtro.get("estado"), dict) and self.doc.get("estado") == "inactivo":
+            return None
+        campos = [k for k, v in projection.items() if v]
+        resultado = {k: self.doc.get(k) for k in campos}
+        if projection.get("_id", 1):
+            resultado["_id"] = self.doc["_id"]
+        return resultado
+
+PROYECCION = {"_id": 1, "codigo": 1, "nombre": 1, "precio_venta": 1, "cantidad": 1}
+
+def test_hit_lee_solo_el_stock_en_vivo():
+    coleccion = ColeccionFalsa({"_id": ID, "codigo": "ABC", "farmacia": "01", "nombre": "Martillo", "precio_venta": 10.0, "cantidad": 5})
+    cache = CacheCodigos(maxsize=10, ttl=60)
+    assert asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION))["cantidad"] == 5
+
+    coleccion.doc.update(cantidad=3, precio_venta=99.0)
+    producto = asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION))
+    # el precio sale de la caché y el stock de la consulta cubierta
+    assert producto == {"_id": ID, "codigo": "ABC", "nombre": "Martillo", "precio_venta": 10.0, "cantidad": 3}
+    filtro, proyeccion, hint = coleccion.consultas[-1]
+    assert filtro == {"farmacia": "01", "codigo": "ABC", "_id": ID}
+    assert proyeccion == {"_id": 0, "cantidad": 1} and hint == "farmacia_codigo_cantidad_index"
+
+    cache.invalidar("01", "ABC")
+    assert asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION))["precio_venta"] == 99.0
+
+def test_eliminado_inactivo_y_sin_farmacia():
+    coleccion = ColeccionFalsa({"_id": ID, "codigo": "ABC", "farmacia": "01", "nombre": "Martillo", "estado": "activo"})
+    cache = CacheCodigos(maxsize=10, ttl=60)
+    asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION, solo_activos=True))
+    coleccion.doc = None
+    assert asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION)) is None
+    assert cache.stats()["entradas"] == 0
+
+    coleccion.doc = {"_id": ID, "codigo": "ABC", "farmacia": "01", "estado": "inactivo"}
+    assert asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION)) is not None
+    assert asyncio.run(cache.buscar(coleccion, "ABC", "01", PROYECCION, solo_activos=True)) is None
+
+    # sin farmacia no se usa la caché
+    asyncio.run(cache.buscar(coleccion, "ABC", None, PROYECCION))
+    assert coleccion.consultas[-1][0] == {"codigo": "ABC"}
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from pymongo import _csot
+from pymongo.errors import ExecutionTimeout
+from app.db import consultas
+from app.db.consultas import ClienteDesconectado, ConsultaExcedioTiempo, ejecutar_consulta
+
+class RequestFalso:
+    def __init__(self, desconectar_tras: int):
+        self.consultas = 0
+        self.desconectar_tras = desconectar_tras
+
+    async def is_disconnected(self):
+        self.consultas += 1
+        return self.consultas > self.desconectar_tras
+
+class CursorFalso:
+    cerrado = False
+
+    async def close(self):
+        self.cerrado = True
+
+def contador(nombre, clase):
+    return consultas.estadisticas_consultas()[nombre][clase]
+
+def test_aplica_el_tiempo_maximo_de_la_clase():
+    async def operacion():
+        return _csot.get_timeout()
+
+    resultado = asyncio.run(ejecutar_consulta("busqueda", operacion(), RequestFalso(desconectar_tras=100)))
+    assert resultado == consultas.PRESUPUESTOS_MS["busqueda"] / 1000
+
+def test_consulta_cortada_por_tiempo():
+    async def operacion():
+        raise ExecutionTimeout("operation exceeded time limit", 50)
+
+    antes = contador("cortadas_por_tiempo", "listado")
+    with pytest.raises(ConsultaExcedioTiempo) as error:
+        asyncio.run(ejecutar_consulta("listado", operacion()))
+    assert error.value.status_code == 504
+    assert contador("cortadas_por_tiempo", "listado") == antes + 1
+
+def test_cliente_desconectado_cancela_y_cierra_el_cursor(monkeypatch):
+    monkeypatch.setattr(consultas, "INTERVALO_DESCONEXION", 0.001)
+    cancelada = []
+
+    async def operacion():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelada.append(True)
+            raise
+
+    async def escenario():
+        cursor = CursorFalso()
+        with pytest.raises(ClienteDesconectado):
+            await ejecutar_consulta("reporte", operacion(), RequestFalso(desconectar_tras=2), cursor)
+        await asyncio.sleep(0)
+        return cursor.cerrado
+
+    antes = contador("canceladas_por_desconexion", "reporte")
+    assert asyncio.run(escenario()) is True
+    assert cancelada == [True]
+    assert contador("canceladas_por_desconexion", "reporte") == antes + 1
@@ -0,0 +1,37 @@
+from app.search.correccion import CorrectorOrtografico, corregir_consulta, distancia_edicion
+from app.search.normalizacion import tokens_busqueda
+
+def crear_corrector():
+    corrector = CorrectorOrtografico()
+    for nombre in ("TORNILLO GALVANIZADO 1/2", "TORNILLO DE ACERO", "SILICON TRANSPARENTE", "MARTILLO DE UÑA", "TORNADO"):
+        corrector.agregar(tokens_busqueda(nombre))
+    return corrector
+
+def test_distancia_edicion():
+    assert distancia_edicion("tornilo", "tornillo", 2) == 1
+    assert distancia_edicion("silcion", "silicon", 2) == 1  # transposición
+    assert distancia_edicion("martillo", "tornillo", 2) == 3
+
+def test_corrige_palabras_mal_escritas():
+    corrector = crear_corrector()
+    assert corregir_consulta("tornilo", [corrector]) == ["tornillo"]
+    assert corregir_consulta("Silicom transparete", [corrector]) == ["silicon", "transparente"]
+    # medidas y palabras cortas se mantienen tal cual
+    assert corregir_consulta("tornilo 1/2", [corrector]) == ["tornillo", "1/2"]
+    # a igual distancia gana la palabra más frecuente
+    assert corrector.candidato("tornllo")[2] == "tornillo"
+
+def test_sin_cambios_o_sin_correccion():
+    corrector = crear_corrector()
+    assert corregir_consulta("tornillo acero", [corrector]) is None
+    assert corregir_consulta("tornilo xyzxyz", [corrector]) is None
+    # palabras cortas: solo 1 error permitido ("uxx" está a 2 de "una")
+    assert corrector.candidato("uxx") is None
+
+def test_quitar_palabras():
+    corrector = crear_corrector()
+    corrector.quitar(tokens_busqueda("SILICON TRANSPARENTE"))
+    assert "silicon" not in corrector
+    assert corregir_consulta("silicom", [corrector]) is None
+    corrector.quitar(tokens_busqueda("TORNILLO DE ACERO"))
+    assert corregir_consulta("tornilo", [corrector]) == ["tornillo"]
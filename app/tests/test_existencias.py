@@ -0,0 +1,284 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.services import existencias_service, lotes_service
+from app.services.existencias_service import calcular_carga, cargar_existencia, descontar_stock
+from app.services.lotes_service import SIN_VENCIMIENTO, _formatear_lote, consumir_fefo, contar_activos, documento_lote
+from app.search.formato import con_stock_legado, formatear_item_inventario, normalizar_stock
+
+class CursorFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length):
+        return self.documentos
+
+class ColeccionFalsa:
+    def __init__(self, documentos, falla=()):
+        self.documentos = {d["_id"]: d for d in documentos}
+        self.llamadas = []
+        self.falla = set(falla)
+
+    def find(self, filtro, projection=None):
+        self.llamadas.append("find")
+        return CursorFalso([dict(self.documentos[i]) for i in filtro["_id"]["$in"] if i in self.documentos])
+
+    async def bulk_write(self, operaciones, ordered=True):
+        self.llamadas.append("bulk_write")
+        errores = []
+        for indice, op in enumerate(operaciones):
+            doc = self.documentos[op._filter["_id"]]
+            if doc["_id"] in self.falla:
+                errores.append({"index": indice, "errmsg": "Cannot apply $inc to a value of non-numeric type"})
+                continue
+            doc["cantidad"] = doc.get("cantidad", 0) + op._doc["$inc"]["cantidad"]
+            doc.update(op._doc["$set"])
+        if errores:
+            raise BulkWriteError({"writeErrors": errores})
+
+def cargar(monkeypatch, documentos, lineas, falla=()):
+    coleccion = ColeccionFalsa(documentos, falla)
+    monkeypatch.setattr(existencias_service, "get_collection", lambda nombre: coleccion)
+    exitosos, errores = asyncio.run(cargar_existencia("01", lineas, "test@x.com", "2026-01-01"))
+    return coleccion, exitosos, errores
+
+def test_costo_promedio_ponderado():
+    calculo = calcular_carga(10, 4.0, {"cantidad": 10, "costo": 6.0})
+    assert calculo["cantidad_nueva"] == 20
+    assert calculo["costo"] == 5.0
+    # Precios finales, redondeados como se guardan
+    assert calculo["precio_venta"] == calculo["precio"] == round(5.0 / 0.6, 2)
+    assert calcular_carga(10, 4.0, {"cantidad": 1, "precio_venta": 9})["utilidad"] == round(9 - (40 + 4) / 11, 2)
+
+def test_tres_consultas_para_muchas_lineas(monkeypatch):
+    documentos = [{"_id": ObjectId(), "farmacia": "01", "cantidad": 5, "costo": 2.0} for _ in range(300)]
+    lineas = [{"producto_id": str(d["_id"]), "cantidad": 1} for d in documentos]
+    coleccion, exitosos, errores = cargar(monkeypatch, documentos, lineas)
+    assert coleccion.llamadas == ["find", "bulk_write", "find"]
+    assert len(exitosos) == 300 and errores == []
+    assert all(d["cantidad"] == 6 for d in coleccion.documentos.values())
+
+def test_errores_por_linea_y_producto_repetido(monkeypatch):
+    a, b, c = (ObjectId() for _ in range(3))
+    documentos = [
+        {"_id": a, "farmacia": "01", "cantidad": 10, "costo": 4.0},
+        {"_id": b, "farmacia": "02", "cantidad": 1, "costo": 1.0},
+        {"_id": c, "farmacia": "01", "cantidad": 0, "costo": 1.0},
+    ]
+    lineas = [
+        {"producto_id": str(a), "cantidad": 10, "costo": 6.0},
+        {"producto_id": "malo", "cantidad": 1},
+        {"producto_id": str(b), "cantidad": 1},
+        {"producto_id": str(a), "cantidad": 5, "costo": 5.0},
+        {"producto_id": str(a), "cantidad": 0},
+        {"producto_id": str(c), "cantidad": 1},
+    ]
+    coleccion, exitosos, errores = cargar(monkeypatch, documentos, lineas, falla={c})
+    assert [(e["producto_id"], e["error"]) for e in errores] == [
+        ("malo", "ID de producto inválido: malo"),
+        (str(b), "El producto no pertenece a la farmacia 01"),
+        (str(a), "La cantidad debe ser mayor a 0"),
+        (str(c), "Cannot apply $inc to a value of non-numeric type"),
+    ]
+    assert [(e["cantidad_anterior"], e["cantidad_nueva"], e["costo"]) for e in exitosos] == [(10, 20, 5.0), (20, 25, 5.0)]
+    assert coleccion.documentos[a]["cantidad"] == 25
+
+class Borrados:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+class ColeccionLotes:
+    """LOTES en memoria: find_one_and_update con el pipeline de consumir_fefo (update_one es el lotes_activos de INVENTARIOS)."""
+    def __init__(self, lotes, lotes_activos=None):
+        self.lotes = lotes
+        self.lotes_activos = contar_activos(lotes) if lotes_activos is None else lotes_activos
+        self.llamadas = []
+
+    async def find_one_and_update(self, filtro, pipeline, sort=None, projection=None, session=None):
+        self.llamadas.append("find_one_and_update")
+        candidatos = [l for l in self.lotes if l["producto_id"] == filtro["producto_id"] and l["cantidad"] > 0]
+        if not candidatos:
+            return None
+        lote = min(candidatos, key=lambda l: tuple(l[campo] for campo, _ in sort))
+        anterior = dict(lote)
+        restante = pipeline[0]["$set"]["cantidad"]["$max"][0]["$subtract"][1]
+        lote["cantidad"] = max(lote["cantidad"] - restante, 0)
+        return anterior
+
+    async def delete_many(self, filtro, session=None):
+        self.llamadas.append("delete_many")
+        antes = len(self.lotes)
+        if "producto_id" in filtro:
+            self.lotes[:] = [l for l in self.lotes if l["producto_id"] != filtro["producto_id"]]
+        else:
+            self.lotes[:] = [l for l in self.lotes if not (l["_id"] in filtro["_id"]["$in"] and l["cantidad"] <= 0)]
+        return Borrados(antes - len(self.lotes))
+
+    async def insert_many(self, documentos, session=None):
+        self.llamadas.append("insert_many")
+        self.lotes.extend({"_id": ObjectId(), **documento} for documento in documentos)
+
+    async def find_one(self, filtro, projection=None, session=None):
+        return next((l for l in self.lotes if l["producto_id"] == filtro["producto_id"]), None)
+
+    async def count_documents(self, filtro, session=None):
+        return contar_activos([l for l in self.lotes if l["producto_id"] == filtro["producto_id"]])
+
+    def find(self, filtro, projection=None):
+        return CursorFalso([{**l} for l in self.lotes if l["producto_id"] in filtro["producto_id"]["$in"]])
+
+    async def update_one(self, filtro, actualizacion, session=None):
+        self.llamadas.append("update_one")
+        if isinstance(actualizacion, dict):
+            self.lotes_activos = actualizacion["$set"]["lotes_activos"]
+            return
+        borrados = actualizacion[0]["$set"]["lotes_activos"]["$max"][0]["$subtract"][1]
+        self.lotes_activos = max(self.lotes_activos - borrados, 0)
+
+def test_consumir_fefo_por_vencimiento(monkeypatch):
+    oid = ObjectId()
+    producto = {"_id": oid, "farmacia": "01"}
+    lotes = [
+        {**documento_lote(producto, {"lote": "sin_fecha", "cantidad": 5, "costo": 9.0}), "_id": 1},
+        {**documento_lote(producto, {"lote": "B", "cantidad": 3, "costo": 2.0, "fecha_vencimiento": "2026-06-01"}), "_id": 2},
+        {**documento_lote(producto, {"lote": "A", "cantidad": 2, "costo": 1.0, "fecha_vencimiento": "2026-01-01"}), "_id": 3},
+    ]
+    coleccion = ColeccionLotes(lotes)
+    monkeypatch.setattr(lotes_service, "get_collection", lambda nombre: coleccion)
+
+    assert asyncio.run(consumir_fefo(oid, 4)) == (2 * 1.0 + 2 * 2.0, 0)
+    assert [(l["lote"], l["cantidad"]) for l in lotes] == [("sin_fecha", 5), ("B", 1)]
+    assert coleccion.llamadas == ["find_one_and_update", "find_one_and_update", "delete_many", "update_one"]
+    # el lote agotado se resta del contador del producto
+    assert coleccion.lotes_activos == 2
+
+    # Lo que no cubren los lotes se devuelve para costearlo al costo del producto
+    assert asyncio.run(consumir_fefo(oid, 10)) == (1 * 2.0 + 5 * 9.0, 4)
+    assert lotes == [] and coleccion.lotes_activos == 0
+
+def test_reemplazar_lotes_guarda_lotes_activos(monkeypatch):
+    producto = {"_id": ObjectId(), "farmacia": "01"}
+    coleccion = ColeccionLotes([{**documento_lote(producto, {"lote": "viejo", "cantidad": 1}), "_id": 1}])
+    monkeypatch.setattr(lotes_service, "get_collection", lambda nombre: coleccion)
+
+    asyncio.run(lotes_service.reemplazar_lotes(producto, [{"lote": "A", "cantidad": 3}, {"lote": "B", "cantidad": 0}]))
+    assert [l["lote"] for l in coleccion.lotes] == ["A", "B"]
+    # el lote sin existencia no cuenta: la venta solo consulta LOTES si hay alguno con cantidad
+    assert coleccion.lotes_activos == 1
+    asyncio.run(lotes_service.reemplazar_lotes(producto, []))
+    assert coleccion.lotes == [] and coleccion.lotes_activos == 0
+
+def test_lote_sin_vencimiento_queda_al_final():
+    documento = documento_lote({"_id": 7, "farmacia": "01"}, {"lote": "X", "cantidad": "2"})
+    assert documento["fecha_vencimiento"] == SIN_VENCIMIENTO and documento["cantidad"] == 2.0
+    del documento["farmacia"]
+    assert _formatear_lote(documento) == {"lote": "X", "cantidad": 2.0, "costo": 0.0}
+
+class ColeccionDescuento:
+    def __init__(self, actualizado, diagnostico=None):
+        self.actualizado = actualizado
+        self.diagnostico = diagnostico
+        self.llamadas = []
+
+    async def find_one_and_update(self, filtro, actualizacion, projection=None, return_document=None, session=None):
+        self.llamadas.append(("find_one_and_update", filtro, actualizacion, return_document))
+        return self.actualizado
+
+    async def find_one(self, filtro, projection=None, session=None):
+        self.llamadas.append(("find_one", filtro, None, None))
+        return self.diagnostico
+
+def descontar(monkeypatch, coleccion, producto_id, cantidad, lotes=()):
+    coleccion_lotes = ColeccionLotes(list(lotes))
+    monkeypatch.setattr(existencias_service, "get_collection", lambda nombre: coleccion)
+    monkeypatch.setattr(lotes_service, "get_collection", lambda nombre: coleccion_lotes)
+    return asyncio.run(descontar_stock(producto_id, cantidad, "01")), coleccion_lotes
+
+def test_descuento_en_un_viaje(monkeypatch):
+    oid = ObjectId()
+    lotes = [{"_id": 1, "producto_id": oid, "cantidad": 1.0, "costo": 3.0, "fecha_vencimiento": "2026-01-01"}]
+    coleccion = ColeccionDescuento({"_id": oid, "cantidad": 4, "costo": 10.0, "lotes_activos": 1})
+    costo, coleccion_lotes = descontar(monkeypatch, coleccion, str(oid), 2, lotes)
+    assert costo == 3.0 + 10.0 and coleccion_lotes.llamadas[0] == "find_one_and_update"
+    [(operacion, filtro, actualizacion, retorno)] = coleccion.llamadas
+    assert filtro == {"_id": oid, "farmacia": "01", "cantidad": {"$gte": 2}} and retorno == ReturnDocument.AFTER
+    assert actualizacion["$inc"] == {"cantidad": -2}
+
+    # Sin lotes_activos (o en 0) no se consulta LOTES: un solo viaje
+    for producto in ({"_id": oid, "cantidad": 4, "costo": 10.0}, {"_id": oid, "cantidad": 4, "costo": 10.0, "lotes_activos": 0}):
+        costo, coleccion_lotes = descontar(monkeypatch, ColeccionDescuento(producto), str(oid), 2, lotes)
+        assert costo == 20.0 and coleccion_lotes.llamadas == []
+
+class ProductoSinMigrar:
+    """INVENTARIOS con un producto que todavía tiene el arreglo embebido."""
+    def __init__(self, producto):
+        self.producto = producto
+
+    async def find_one_and_update(self, filtro, actualizacion, projection=None, session=None):
+        if "lotes" not in self.producto:
+            return None
+        anterior = dict(self.producto)
+        del self.producto["lotes"]
+        return anterior
+
+    async def update_one(self, filtro, actualizacion, session=None):
+        if isinstance(actualizacion, dict):
+            self.producto.update(actualizacion["$set"])
+            return
+        borrados = actualizacion[0]["$set"]["lotes_activos"]["$max"][0]["$subtract"][1]
+        self.producto["lotes_activos"] = max(self.producto["lotes_activos"] - borrados, 0)
+
+def test_venta_de_producto_sin_migrar_pasa_sus_lotes(monkeypatch):
+    oid = ObjectId()
+    embebidos = [
+        {"lote": "B", "cantidad": 3, "costo": 2.0, "fecha_vencimiento": "2026-06-01"},
+        {"lote": "A", "cantidad": 1, "costo": 1.0, "fecha_vencimiento": "2026-01-01"},
+    ]
+    inventario = ProductoSinMigrar({"_id": oid, "farmacia": "01", "lotes": list(embebidos)})
+    coleccion_lotes = ColeccionLotes([], lotes_activos=0)
+    monkeypatch.setattr(existencias_service, "get_collection", lambda nombre: ColeccionDescuento(
+        {"_id": oid, "cantidad": 4, "costo": 10.0, "lotes": embebidos}
+    ))
+    monkeypatch.setattr(lotes_service, "get_collection", lambda nombre: inventario if nombre == "INVENTARIOS" else coleccion_lotes)
+
+    # La venta consume los lotes del arreglo (FEFO) en vez de costear todo a costo promedio
+    assert asyncio.run(descontar_stock(str(oid), 2, "01")) == 1 * 1.0 + 1 * 2.0
+    assert "lotes" not in inventario.producto and inventario.producto["lotes_activos"] == 1
+    assert [(l["lote"], l["cantidad"]) for l in coleccion_lotes.lotes] == [("B", 2)]
+
+    # Otra venta con el arreglo ya quitado (llegó tarde a la reserva) no vuelve a insertarlos
+    assert asyncio.run(lotes_service.migrar_lotes_embebidos({"_id": oid})) == 1
+    assert len(coleccion_lotes.lotes) == 1
+
+def test_lecturas_conservan_el_arreglo_sin_migrar(monkeypatch):
+    migrado, sin_migrar = ObjectId(), ObjectId()
+    coleccion = ColeccionLotes([{**documento_lote({"_id": migrado, "farmacia": "01"}, {"lote": "A", "cantidad": 1}), "_id": 1}])
+    monkeypatch.setattr(lotes_service, "get_collection", lambda nombre: coleccion)
+    productos = asyncio.run(lotes_service.adjuntar_lotes([
+        {"_id": migrado}, {"_id": sin_migrar, "lotes": [{"lote": "X", "cantidad": 2}]}, {"_id": ObjectId()},
+    ]))
+    assert [[l["lote"] for l in producto["lotes"]] for producto in productos] == [["A"], ["X"], []]
+
+def test_descuento_sin_stock_o_inexistente(monkeypatch):
+    oid = ObjectId()
+    coleccion = ColeccionDescuento(None, {"_id": oid, "cantidad": 2})
+    with pytest.raises(ValueError, match=r"Stock insuficiente. Disponible: 2.0, Requerido: 5"):
+        descontar(monkeypatch, coleccion, str(oid), 5)
+    assert [llamada[0] for llamada in coleccion.llamadas] == ["find_one_and_update", "find_one"]
+
+    coleccion = ColeccionDescuento(None)
+    with pytest.raises(ValueError, match="Producto no encontrado. ID: ABC-1, Código: ABC-1, Farmacia: 01"):
+        descontar(monkeypatch, coleccion, "ABC-1", 1)
+    assert coleccion.llamadas[0][1]["estado"] == {"$ne": "inactivo"}
+
+def test_stock_en_un_solo_campo():
+    assert normalizar_stock({"existencia": 4, "stock": 9, "costo": 1.0}) == {"cantidad": 4, "costo": 1.0}
+    assert normalizar_stock({"cantidad": 2, "existencia": 4}) == {"cantidad": 2}
+    assert con_stock_legado({"_id": 1, "cantidad": 7})["existencia"] == 7
+    item = formatear_item_inventario({"_id": ObjectId(), "cantidad": 3})
+    assert item["cantidad"] == item["existencia"] == item["stock"] == 3.0
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from bson import ObjectId
+from app.db.exportacion import fragmentos_json
+
+class CursorFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.cerrado = False
+
+    def __aiter__(self):
+        return self._iterar()
+
+    async def _iterar(self):
+        for documento in self.documentos:
+            yield documento
+
+    async def close(self):
+        self.cerrado = True
+
+def exportar(documentos, formato, tamano_fragmento=64):
+    cursor = CursorFalso(documentos)
+
+    async def juntar():
+        return [f async for f in fragmentos_json(cursor, lambda d: {"id": d["_id"], "nombre": d["nombre"]}, formato, tamano_fragmento)]
+
+    return asyncio.run(juntar()), cursor
+
+def test_ndjson_por_fragmentos():
+    documentos = [{"_id": ObjectId(), "nombre": f"PRODUCTO {i}"} for i in range(20)]
+    fragmentos, cursor = exportar(documentos, "ndjson")
+    assert len(fragmentos) > 1
+    lineas = b"".join(fragmentos).decode().splitlines()
+    assert [json.loads(l)["id"] for l in lineas] == [str(d["_id"]) for d in documentos]
+    assert cursor.cerrado
+
+def test_array_json():
+    documentos = [{"_id": ObjectId(), "nombre": f"P{i}"} for i in range(20)]
+    fragmentos, _ = exportar(documentos, "json")
+    assert [d["nombre"] for d in json.loads(b"".join(fragmentos))] == [d["nombre"] for d in documentos]
+    assert json.loads(b"".join(exportar([], "json")[0])) == []
+
+def test_cierra_el_cursor_si_se_corta():
+    cursor = CursorFalso([{"_id": i, "nombre": "X" * 100} for i in range(10)])
+
+    async def cortar():
+        generador = fragmentos_json(cursor, lambda d: d, "ndjson", 64)
+        await generador.__anext__()
+        await generador.aclose()
+
+    asyncio.run(cortar())
+    assert cursor.cerrado
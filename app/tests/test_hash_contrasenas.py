@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core import auth
+from app.core.auth import estadisticas_hash_contraseñas, hashear_contraseña_async, verificar_contraseña_async
+
+def test_hash_fuera_del_event_loop(monkeypatch):
+    hilos = []
+    original = auth.hashear_contraseña
+
+    def hashear(password):
+        hilos.append(threading.current_thread().name)
+        return original(password)
+
+    async def probar():
+        hilo_loop = threading.current_thread().name
+        monkeypatch.setattr(auth, "_hash_limiter", asyncio.Semaphore(2))
+        monkeypatch.setattr(auth, "hashear_contraseña", hashear)
+        hash_ = await hashear_contraseña_async("clave-segura")
+        assert hilos[0].startswith("bcrypt") and hilos[0] != hilo_loop
+        assert await verificar_contraseña_async("clave-segura", hash_)
+        assert not await verificar_contraseña_async("otra", hash_)
+
+    asyncio.run(probar())
+
+def test_semaforo_limita_verificaciones(monkeypatch):
+    activas = {"ahora": 0, "max": 0}
+    candado = threading.Lock()
+
+    def verificar(plain, hashed):
+        with candado:
+            activas["ahora"] += 1
+            activas["max"] = max(activas["max"], activas["ahora"])
+        time.sleep(0.05)
+        with candado:
+            activas["ahora"] -= 1
+        return True
+
+    async def probar():
+        # Más hilos que el límite: lo que acota la concurrencia es el semáforo
+        monkeypatch.setattr(auth, "_hash_executor", ThreadPoolExecutor(max_workers=6))
+        monkeypatch.setattr(auth, "_hash_limiter", asyncio.Semaphore(2))
+        monkeypatch.setattr(auth, "verificar_contraseña", verificar)
+        completadas = estadisticas_hash_contraseñas()["completadas"]
+        latido = []
+
+        async def marcar():
+            # El event loop sigue atendiendo mientras bcrypt trabaja
+            for _ in range(5):
+                latido.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        resultados = await asyncio.gather(*[verificar_contraseña_async("x", "y") for _ in range(6)], marcar())
+        assert all(resultados[:6])
+        assert len(latido) == 5
+        assert estadisticas_hash_contraseñas()["completadas"] == completadas + 6
+
+    asyncio.run(probar())
+    assert activas["max"] == 2
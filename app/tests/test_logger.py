@@ -0,0 +1,19 @@
+import io
+from app.core import logger as modulo_logger
+from app.core.logger import _SalidaSinFlush, configurar_logging, detener_logging
+
+def test_flush_con_stdout_cerrado():
+    stream = io.StringIO()
+    salida = _SalidaSinFlush(stream)
+    stream.close()
+    salida.flush_real()
+
+def test_detener_logging_idempotente():
+    configurar_logging()
+    detener_logging()
+    detener_logging()
+    assert modulo_logger._listener is None
+    # Un nuevo arranque de la app vuelve a iniciar el hilo escritor
+    configurar_logging()
+    assert modulo_logger._listener is not None
+    detener_logging()
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import MetricsMiddleware, renderizar_prometheus, registro
+from app.db.monitoring import ComandosListener
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/inventarios/{id}/items")
+async def items(id: str):
+    return {"id": id}
+
+listener = ComandosListener()
+
+@app.get("/compras")
+async def compras():
+    # Simula los eventos que pymongo emite desde el hilo del executor de Motor
+    evento = SimpleNamespace(command_name="find", duration_micros=1500)
+    for _ in range(3):
+        await asyncio.to_thread(listener.succeeded, evento)
+    return []
+
+client = TestClient(app)
+
+def test_metricas_usan_plantilla_de_ruta():
+    client.get("/inventarios/abc/items")
+    client.get("/inventarios/def/items")
+    client.get("/no-existe")
+
+    texto = renderizar_prometheus({"cache_usuarios": {"hits": 3, "nombre": "x"}})
+    assert 'http_requests_total{method="GET",route="/inventarios/{id}/items",status="200"} 2' in texto
+    assert 'route="__sin_ruta__",status="404"' in texto
+    assert "/inventarios/abc/items" not in texto
+    assert 'http_request_duration_seconds_count{method="GET",route="/inventarios/{id}/items"} 2' in texto
+    assert "yorbis_cache_usuarios_hits 3" in texto
+    assert registro.en_curso == 0
+
+def test_comandos_mongo_por_request():
+    response = client.get("/compras")
+    assert response.headers["server-timing"].startswith('db;dur=4.5;desc="3 comandos"')
+    assert listener.stats()["por_comando"] == {"find": 3}
+    texto = renderizar_prometheus()
+    assert 'http_request_db_commands_sum{method="GET",route="/compras"} 3' in texto
@@ -0,0 +1,28 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.middleware import URLNormalizeMiddleware, normalizar_path
+
+app = FastAPI()
+app.add_middleware(URLNormalizeMiddleware)
+
+@app.get("/inventarios/items")
+async def items(request: Request):
+    return {"path": request.url.path, "q": request.url.query}
+
+client = TestClient(app)
+
+def test_normalizar_path():
+    assert normalizar_path("/") == "/"
+    assert normalizar_path("//") == "/"
+    assert normalizar_path("/inventarios//items/") == "/inventarios/items"
+    assert normalizar_path("/inventarios/items") == "/inventarios/items"
+
+def test_middleware_normaliza_dobles_barras():
+    response = client.get("/inventarios//items/?farmacia=01")
+    assert response.status_code == 200
+    assert response.json() == {"path": "/inventarios/items", "q": "farmacia=01"}
+
+def test_middleware_camino_rapido():
+    response = client.get("/inventarios/items")
+    assert response.status_code == 200
+    assert response.json()["path"] == "/inventarios/items"
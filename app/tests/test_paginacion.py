@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.db.paginacion import CursorInvalido, codificar_cursor, decodificar_cursor, filtro_despues_de, pagina_por_cursor
+
+class CursorFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.orden = None
+        self.limite = None
+
+    def sort(self, orden):
+        self.orden = orden
+        return self
+
+    def limit(self, limite):
+        self.limite = limite
+        return self
+
+    async def to_list(self, length):
+        return self.documentos[:length]
+
+class ColeccionFalsa:
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.filtros = []
+
+    def find(self, filtro, projection=None):
+        self.filtros.append(filtro)
+        self.cursor = CursorFalso(self.documentos)
+        return self.cursor
+
+def test_cursor_ida_y_vuelta():
+    _id = ObjectId()
+    assert decodificar_cursor(codificar_cursor({"_id": _id, "nombre": "TORNILLO Ñ"})) == ("TORNILLO Ñ", _id)
+    assert decodificar_cursor(codificar_cursor({"_id": _id})) == (None, _id)
+
+@pytest.mark.parametrize("cursor", ["no-es-un-cursor", "AAAA", "!!"])
+def test_cursor_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decodificar_cursor(cursor)
+
+def test_filtro_despues_de():
+    _id = ObjectId()
+    assert filtro_despues_de("CLAVO", _id) == {
+        "nombre": {"$gte": "CLAVO"},
+        "$or": [{"nombre": {"$gt": "CLAVO"}}, {"_id": {"$gt": _id}}],
+    }
+    assert filtro_despues_de(None, _id)["$or"][1] == {"nombre": {"$type": "string"}}
+
+def test_pagina_con_siguiente():
+    documentos = [{"_id": ObjectId(), "nombre": f"P{i}"} for i in range(4)]
+    coleccion = ColeccionFalsa(documentos)
+    items, siguiente = asyncio.run(pagina_por_cursor(coleccion, {"farmacia": "01"}, {}, 3, ""))
+    assert items == documentos[:3]
+    assert coleccion.cursor.limite == 4
+    assert decodificar_cursor(siguiente) == ("P2", documentos[2]["_id"])
+
+    items, siguiente = asyncio.run(pagina_por_cursor(coleccion, {"farmacia": "01"}, {}, 3, siguiente))
+    assert coleccion.filtros[-1]["$and"][0] == {"farmacia": "01"}
+
+def test_ultima_pagina_sin_siguiente():
+    coleccion = ColeccionFalsa([{"_id": ObjectId(), "nombre": "A"}])
+    items, siguiente = asyncio.run(pagina_por_cursor(coleccion, {}, {}, 3))
+    assert len(items) == 1 and siguiente is None
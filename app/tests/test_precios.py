@@ -0,0 +1,133 @@
+from app.services.precios_service import CAMPOS_PRECIO, PIPELINE_PRECIOS, aplicar_precios, calcular_precios, precio_enviado
+from app.search.formato import formatear_punto_venta
+
+def test_reglas_de_precio():
+    assert calcular_precios(60) == {"precio_venta": 100.0, "precio": 100.0, "utilidad": 40.0, "porcentaje_utilidad": 40.0}
+    assert calcular_precios(10, porcentaje_utilidad=50)["precio_venta"] == 20.0
+    # Precio explícito: la utilidad sale del precio y el porcentaje sobre el costo
+    assert calcular_precios(8, precio_venta="10") == {"precio_venta": 10.0, "precio": 10.0, "utilidad": 2.0, "porcentaje_utilidad": 25.0}
+    assert calcular_precios(8, utilidad=4)["precio_venta"] == 12.0
+    assert calcular_precios(0) == {"precio_venta": 0.0, "precio": 0.0, "utilidad": 0.0, "porcentaje_utilidad": 0.0}
+    # Volver a calcular con lo guardado no cambia nada
+    guardado = calcular_precios(3.33, utilidad=1.005)
+    assert calcular_precios(3.33, guardado["precio_venta"], guardado["utilidad"], guardado["porcentaje_utilidad"]) == guardado
+
+def test_patch_recalcula_desde_lo_guardado():
+    actual = {"costo": 6.0, "precio_venta": 10.0, "utilidad": 4.0, "porcentaje_utilidad": 40.0}
+    # Cambia el costo sin precio: 40% sobre el costo nuevo
+    assert aplicar_precios({"costo": 12.0}, actual)["precio_venta"] == 20.0
+    # Cambia solo el precio: utilidad y porcentaje sobre el costo guardado
+    assert aplicar_precios({"precio_venta": 9.0}, actual)["porcentaje_utilidad"] == 50.0
+    # Sin precios en el PATCH se conservan los guardados
+    assert aplicar_precios({"nombre": "X"}, actual)["precio_venta"] == 10.0
+    # precio_venta no positivo: vale el nombre anterior "precio", igual que el pipeline
+    assert aplicar_precios({"precio_venta": -5, "precio": 12}, actual)["precio_venta"] == 12.0
+
+def test_lecturas_devuelven_lo_guardado():
+    producto = {"_id": 1, "costo": 6.0, "precio": 7.5, "utilidad": 1.5, "porcentaje_utilidad": 25.0}
+    resultado = formatear_punto_venta(producto)
+    assert resultado["precio_venta"] == resultado["precio"] == 7.5
+    assert (resultado["utilidad"], resultado["porcentaje_utilidad"]) == (1.5, 25.0)
+
+# Evaluador mínimo de los operadores de agregación que usa PIPELINE_PRECIOS
+# ($round como round() de Python; el servidor redondea igual salvo empates exactos de medio centavo)
+_FALTA = object()
+
+def _evaluar(expresion, doc, variables):
+    if isinstance(expresion, str) and expresion.startswith("$$"):
+        return "ahora" if expresion == "$$NOW" else variables[expresion[2:]]
+    if isinstance(expresion, str) and expresion.startswith("$"):
+        valor = doc
+        for parte in expresion[1:].split("."):
+            valor = valor.get(parte, _FALTA) if isinstance(valor, dict) else _FALTA
+        return valor
+    if isinstance(expresion, list):
+        return [_evaluar(e, doc, variables) for e in expresion]
+    if not isinstance(expresion, dict):
+        return expresion
+    if not (len(expresion) == 1 and next(iter(expresion)).startswith("$")):
+        return {clave: _evaluar(valor, doc, variables) for clave, valor in expresion.items()}
+    operador, args = next(iter(expresion.items()))
+    if operador == "$let":
+        nuevas = {**variables, **{k: _evaluar(v, doc, variables) for k, v in args["vars"].items()}}
+        return _evaluar(args["in"], doc, nuevas)
+    if operador == "$switch":
+        for rama in args["branches"]:
+            if _evaluar(rama["case"], doc, variables):
+                return _evaluar(rama["then"], doc, variables)
+        return _evaluar(args["default"], doc, variables)
+    if operador == "$cond":
+        condicion, si, no = args
+        return _evaluar(si if _evaluar(condicion, doc, variables) else no, doc, variables)
+    if operador == "$convert":
+        valor = _evaluar(args["input"], doc, variables)
+        if valor is None or valor is _FALTA:
+            return args["onNull"]
+        try:
+            return float(valor)
+        except (TypeError, ValueError):
+            return args["onError"]
+    valores = [None if v is _FALTA else v for v in _evaluar(args, doc, variables)]
+    if operador == "$ifNull":
+        return valores[1] if valores[0] is None else valores[0]
+    if operador == "$round":
+        return None if valores[0] is None else round(valores[0], valores[1])
+    if operador == "$and":
+        return all(valores)
+    if operador == "$eq":
+        return valores[0] == valores[1]
+    if operador in ("$gt", "$lt"):
+        # null es menor que cualquier número
+        a, b = [(0, 0) if v is None else (1, v) for v in valores]
+        return a > b if operador == "$gt" else a < b
+    a, b = valores
+    return {"$add": lambda: a + b, "$subtract": lambda: a - b, "$multiply": lambda: a * b, "$divide": lambda: a / b}[operador]()
+
+def _aplicar_pipeline(doc):
+    doc = dict(doc)
+    for etapa in PIPELINE_PRECIOS:
+        if "$set" in etapa:
+            nuevos = {campo: _evaluar(valor, doc, {}) for campo, valor in etapa["$set"].items()}
+            doc.update({campo: valor for campo, valor in nuevos.items() if valor is not _FALTA})
+        else:
+            doc.pop(etapa["$unset"])
+    return doc
+
+CASOS = [
+    {},
+    {"costo": 60},
+    {"costo": "60"},
+    {"costo": 10, "porcentaje_utilidad": 50},
+    {"costo": 10, "porcentaje_utilidad": "50"},
+    {"costo": 10, "porcentaje_utilidad": "abc"},
+    {"costo": 10, "porcentaje_utilidad": 150},
+    {"costo": 8, "precio_venta": 10},
+    {"costo": 8, "precio_venta": 10, "porcentaje_utilidad": "30"},
+    {"costo": 8, "precio_venta": -5, "precio": 12},
+    {"costo": 8, "precio_venta": 0, "precio": 12},
+    {"costo": 8, "precio_venta": "x", "precio": 12},
+    {"costo": 8, "precio": 9.999},
+    {"costo": 8, "utilidad": 4},
+    {"costo": 0, "utilidad": 4},
+    {"costo": -3, "utilidad": 1},
+    {"costo": 0, "precio_venta": 5},
+    {"costo": None, "precio_venta": None, "utilidad": None, "porcentaje_utilidad": None},
+    {"costo": 3.33, "utilidad": 1.005, "porcentaje_utilidad": 40},
+    {"costo": 12.345, "precio_venta": 0.004},
+]
+
+def _desde_python(doc):
+    return calcular_precios(doc.get("costo"), precio_enviado(doc), doc.get("utilidad"), doc.get("porcentaje_utilidad"))
+
+def test_pipeline_igual_a_calcular_precios():
+    for caso in CASOS:
+        resultado = _aplicar_pipeline({**caso, "updatedAt": "antes"})
+        assert {campo: resultado[campo] for campo in CAMPOS_PRECIO} == _desde_python(caso), caso
+        # Una segunda pasada no cambia nada ni marca updatedAt
+        resultado["updatedAt"] = "antes"
+        assert _aplicar_pipeline(resultado) == resultado, caso
+
+def test_pipeline_marca_updated_at_solo_si_cambia():
+    assert _aplicar_pipeline({"costo": 60, "updatedAt": "antes"})["updatedAt"] == "ahora"
+    guardado = {"costo": 60, **calcular_precios(60), "updatedAt": "antes"}
+    assert _aplicar_pipeline(guardado)["updatedAt"] == "antes"
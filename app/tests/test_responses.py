@@ -0,0 +1,39 @@
+from datetime import datetime
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.core.responses import BSONJSONResponse, BSONRouter
+
+ID = ObjectId("65f0c0ffee00000000000001")
+
+router = BSONRouter()
+
+@router.get("/inventarios")
+async def inventarios():
+    return [{"_id": ID, "fecha": datetime(2024, 1, 2, 3, 4, 5), "precio": Decimal128("12.50"), "lotes": [{"productoId": ID}]}]
+
+@router.post("/inventarios", status_code=201)
+async def crear():
+    return {"_id": ID}
+
+@router.get("/inventarios/error")
+async def error():
+    raise HTTPException(status_code=404, detail="No encontrado")
+
+app = FastAPI(default_response_class=BSONJSONResponse)
+app.include_router(router)
+client = TestClient(app)
+
+def test_documentos_bson_crudos():
+    response = client.get("/inventarios")
+    assert response.status_code == 200
+    assert response.json() == [{
+        "_id": str(ID), "fecha": "2024-01-02T03:04:05", "precio": 12.5, "lotes": [{"productoId": str(ID)}]
+    }]
+
+def test_status_code_y_excepciones():
+    assert client.post("/inventarios").status_code == 201
+    response = client.get("/inventarios/error")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No encontrado"}
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import timedelta
+import pytest
+from bson import ObjectId
+from app.db import sincronizacion
+from app.db.sincronizacion import (
+    TokenInvalido, TokenVencido, ahora_utc, cambios_desde, codificar_token, decodificar_token, filtro_despues_de,
+)
+
+class CursorFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def sort(self, orden):
+        return self
+
+    def limit(self, limite):
+        self.limite = limite
+        return self
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.documentos[:length]]
+
+class ColeccionFalsa:
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.filtros = []
+
+    def find(self, filtro, projection=None):
+        self.filtros.append(filtro)
+        return CursorFalso(self.documentos)
+
+def usar_colecciones(monkeypatch, productos, eliminados):
+    colecciones = {"INVENTARIOS": ColeccionFalsa(productos), "INVENTARIOS_ELIMINADOS": ColeccionFalsa(eliminados)}
+    monkeypatch.setattr(sincronizacion, "get_collection", colecciones.__getitem__)
+    return colecciones
+
+def test_token_ida_y_vuelta():
+    ahora, _id = ahora_utc().replace(microsecond=0), ObjectId()
+    assert decodificar_token(codificar_token(ahora, _id, ahora)) == (ahora, _id, ahora)
+    assert decodificar_token(codificar_token(None, _id, ahora)) == (None, _id, ahora)
+
+@pytest.mark.parametrize("token", ["basura", "AAAA", codificar_token(None, None, ahora_utc())])
+def test_token_invalido(token):
+    with pytest.raises(TokenInvalido):
+        decodificar_token(token)
+
+def test_filtro_despues_de():
+    ahora, _id = ahora_utc(), ObjectId()
+    assert filtro_despues_de(ahora, None) == {"updatedAt": {"$gt": ahora}}
+    assert filtro_despues_de(ahora, _id)["$or"] == [{"updatedAt": {"$gt": ahora}}, {"_id": {"$gt": _id}}]
+    assert filtro_despues_de(None, _id)["$or"][1] == {"updatedAt": {"$type": "date"}}
+
+def test_cambios_mezcla_productos_y_eliminados(monkeypatch):
+    base = ahora_utc().replace(microsecond=0) - timedelta(minutes=10)
+    a, b, c, d = (ObjectId() for _ in range(4))
+    productos = [
+        {"_id": a, "nombre": "A", "estado": "activo", "updatedAt": base},
+        {"_id": c, "nombre": "C", "estado": "inactivo", "updatedAt": base + timedelta(seconds=2)},
+        {"_id": d, "nombre": "D", "estado": "activo", "updatedAt": base + timedelta(seconds=3)},
+    ]
+    usar_colecciones(monkeypatch, productos, [{"_id": b, "farmacia": "01", "updatedAt": base + timedelta(seconds=1)}])
+
+    resultado = asyncio.run(cambios_desde("01", None, 3))
+    assert [p["nombre"] for p in resultado["productos"]] == ["A"]
+    assert resultado["eliminados"] == [str(b), str(c)]
+    assert resultado["hay_mas"]
+    posicion, _id, _ = decodificar_token(resultado["token"])
+    assert (posicion, _id) == (base + timedelta(seconds=2), c)
+
+def test_al_dia_el_token_avanza_al_horizonte(monkeypatch):
+    colecciones = usar_colecciones(monkeypatch, [], [])
+    resultado = asyncio.run(cambios_desde("01", None, 100))
+    assert resultado == {"productos": [], "eliminados": [], "token": resultado["token"], "hay_mas": False}
+    posicion, _id, emitido = decodificar_token(resultado["token"])
+    assert _id is None and posicion == emitido <= ahora_utc() - timedelta(seconds=sincronizacion.SYNC_MARGEN_SEGUNDOS)
+
+    asyncio.run(cambios_desde("01", resultado["token"], 100))
+    assert colecciones["INVENTARIOS"].filtros[-1]["$and"][-1] == {"updatedAt": {"$gt": posicion}}
+
+def test_token_vencido(monkeypatch):
+    usar_colecciones(monkeypatch, [], [])
+    viejo = ahora_utc() - timedelta(days=sincronizacion.SYNC_RETENCION_ELIMINADOS_DIAS + 1)
+    with pytest.raises(TokenVencido):
+        asyncio.run(cambios_desde("01", codificar_token(viejo, None, viejo), 100))
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from app.search.buscador import autocompletar_punto_venta
+from app.search.indice_productos import IndiceProductos
+from app.search.trie import TrieComprimido
+from app.utils.solicitudes import CoordinadorSolicitudes, SolicitudReemplazada
+
+def crear_trie():
+    trie = TrieComprimido()
+    for _id, clave in enumerate(["tornillo galvanizado", "tornillo", "tornado", "tor001", "martillo"], start=1):
+        trie.agregar(clave, _id, clave.upper())
+    return trie
+
+def test_completar_en_orden_con_exacta_primero():
+    trie = crear_trie()
+    assert [_id for _id, _ in trie.completar("tor")] == [4, 3, 2, 1]
+    # el prefijo termina a mitad de una arista
+    assert [_id for _id, _ in trie.completar("tornil")] == [2, 1]
+    assert trie.completar("tornillo", limite=1) == [(2, "TORNILLO")]
+    assert trie.completar("x") == [] and len(trie) == 5
+
+def test_eliminar_compacta_y_no_repite_productos():
+    trie = crear_trie()
+    assert trie.eliminar("tornillo", 2) is True
+    assert trie.eliminar("tornillo", 2) is False
+    assert [_id for _id, _ in trie.completar("torn")] == [3, 1]
+    trie.eliminar("tornado", 3)
+    trie.eliminar("tornillo galvanizado", 1)
+    assert [_id for _id, _ in trie.completar("t")] == [4]
+    # mismo producto bajo dos claves (código y nombre)
+    trie.agregar("mar001", 5, "MARTILLO")
+    assert trie.completar("m") == [(5, "MARTILLO")]
+
+def test_iterar_entrega_la_clave_en_orden():
+    trie = crear_trie()
+    assert [clave for clave, _, _ in trie.iterar("torn")] == ["tornado", "tornillo", "tornillo galvanizado"]
+    assert list(trie.iterar("tornil"))[0] == ("tornillo", 2, "TORNILLO")
+
+def crear_indice():
+    indice = IndiceProductos()
+    indice.listo = True
+    for _id, farmacia, codigo, nombre in [
+        (1, "02", "B-1", "Tornillo"), (2, "01", "A-9", "Tornado"), (3, "02", "C-3", "Tuerca"), (4, "01", "T-1", "Taladro"),
+    ]:
+        indice._agregar({"_id": _id, "farmacia": farmacia, "codigo": codigo, "nombre": nombre})
+    return indice
+
+def test_autocompletar_sin_farmacia_mezcla_en_orden():
+    indice = crear_indice()
+    # Las claves de todas las farmacias intercaladas en orden alfabético, no farmacia por farmacia
+    assert [p["_id"] for p in indice.autocompletar("t")] == [4, 2, 1, 3]
+    assert [p["_id"] for p in indice.autocompletar("t", limite=2)] == [4, 2]
+    assert [p["_id"] for p in indice.autocompletar("t", farmacia="02")] == [1, 3]
+
+class ColeccionSinUso:
+    def aggregate(self, pipeline):
+        raise AssertionError("no debe consultar Mongo")
+
+def test_autocompletar_termino_vacio_igual_con_y_sin_indice():
+    indice = crear_indice()
+    assert indice.autocompletar("  ") == []
+    # Sin índice listo tampoco se consulta Mongo por un término vacío
+    for termino in ("", "  "):
+        assert asyncio.run(autocompletar_punto_venta(ColeccionSinUso(), termino, None, 10)) == []
+
+def test_coordinador_cancela_la_solicitud_anterior():
+    async def escenario():
+        coordinador = CoordinadorSolicitudes()
+
+        async def lenta():
+            await asyncio.sleep(10)
+
+        async def rapida(valor):
+            return valor
+
+        anterior = asyncio.ensure_future(coordinador.ejecutar("ana", 1, lenta()))
+        await asyncio.sleep(0)
+        assert await coordinador.ejecutar("ana", 2, rapida("ok")) == "ok"
+        with pytest.raises(SolicitudReemplazada):
+            await anterior
+        # otro usuario no se ve afectado y sin secuencia no se coordina
+        assert await coordinador.ejecutar("luis", 1, rapida(1)) == 1
+        assert await coordinador.ejecutar("ana", None, rapida(2)) == 2
+        return coordinador.stats()
+
+    assert asyncio.run(escenario()) == {"en_curso": 0, "ejecutadas": 3, "canceladas": 1, "rechazadas": 0}
+
+def test_coordinador_rechaza_secuencia_vieja():
+    async def escenario():
+        coordinador = CoordinadorSolicitudes()
+        nueva = asyncio.ensure_future(coordinador.ejecutar("ana", 5, asyncio.sleep(0.01, "nueva")))
+        await asyncio.sleep(0)
+        with pytest.raises(SolicitudReemplazada):
+            await coordinador.ejecutar("ana", 4, asyncio.sleep(0, "vieja"))
+        return await nueva, coordinador.rechazadas
+
+    assert asyncio.run(escenario()) == ("nueva", 1)
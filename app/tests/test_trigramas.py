@@ -0,0 +1,75 @@
+from app.search.normalizacion import claves_busqueda, filtro_prefijo, normalizar_texto
+from app.search import trigramas as trigramas_modulo
+from app.search.trigramas import IndiceTrigramas
+
+def crear_indice():
+    indice = IndiceTrigramas()
+    indice.agregar(1, "TOR001", "TORNILLO GALVANIZADO 1/2", "Tornillo de acero", "Truper")
+    indice.agregar(2, "CLA002", "CLAVO DE ACERO", "Clavo para tornillería", "Stanley")
+    indice.agregar(3, "MAR003", "MARTILLO", "Martillo de uña", "Tornado")
+    indice.agregar(4, "TOR004", "ARANDELA", "Arandela plana", "Truper")
+    return indice
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Válvula   DE Presión ") == "valvula de presion"
+    assert normalizar_texto(None) == ""
+
+def test_rango_por_tipo_de_coincidencia():
+    resultados = crear_indice().buscar("tor")
+    # código con prefijo (desempate por nombre), luego descripción y marca
+    assert [r[2] for r in resultados] == [4, 1, 2, 3]
+
+def test_sin_acentos_ni_mayusculas_y_sin_falsos_positivos():
+    indice = crear_indice()
+    indice.agregar(5, "VAL005", "VÁLVULA DE PRESIÓN")
+    assert [r[2] for r in indice.buscar("valvula")] == [5]
+    assert [r[2] for r in indice.buscar("Presión")] == [5]
+    # todos los trigramas existen pero no como subcadena continua
+    assert indice.buscar("torn de") == []
+
+def test_reemplazar_eliminar_y_excluir():
+    indice = crear_indice()
+    indice.agregar(3, "MAR003", "MARTILLO", "", "")
+    assert 3 not in [r[2] for r in indice.buscar("tornado")]
+    assert indice.eliminar(1) is True
+    assert indice.eliminar(1) is False
+    assert [r[2] for r in indice.buscar("tor")] == [4, 2]
+    assert [r[2] for r in indice.buscar("tor", excluir=[4])] == [2]
+    assert len(indice) == 3
+
+def test_consulta_corta_y_campos():
+    indice = crear_indice()
+    assert indice.buscar("to") is None
+    assert [r[2] for r in indice.buscar("tor", campos=("codigo", "nombre"))] == [4, 1]
+    assert len(indice.buscar("tor", limite=2)) == 2
+
+def test_claves_busqueda_y_filtro_prefijo():
+    claves = claves_busqueda({"codigo": "TOR-01", "nombre": "Tornillo  GALVANIZADO, 1/2", "marca_producto": "Trúper"})
+    assert claves == {
+        "codigo_norm": "tor-01",
+        "nombre_norm": "tornillo galvanizado, 1/2",
+        "tokens": ["tor-01", "tornillo", "galvanizado", "1/2", "truper"],
+    }
+    # anclada y sin $options: Mongo la resuelve como rango del índice
+    assert filtro_prefijo("nombre_norm", "Válvula (1") == {"nombre_norm": {"$regex": "^valvula\\ \\(1"}}
+
+def test_reemplazos_no_crecen_sin_limite(monkeypatch):
+    monkeypatch.setattr(trigramas_modulo, "MUERTOS_MINIMO_COMPACTAR", 16)
+    indice = crear_indice()
+    productos = [(i, f"COD{i:04d}", f"PRODUCTO NUMERO {i}", "Tornillo de acero", "Truper") for i in range(10, 60)]
+    for producto in productos:
+        indice.agregar(*producto)
+    postings_iniciales = indice.cantidad_postings
+    # Cada compra, PATCH o cambio del change stream reemplaza el producto
+    for vuelta in range(200):
+        for producto in productos:
+            indice.agregar(*producto)
+        indice.eliminar(productos[vuelta % len(productos)][0])
+        indice.agregar(*productos[vuelta % len(productos)])
+        # Muertos acotados por los vivos: a lo sumo el doble de ids y de postings
+        assert len(indice._ids) <= 2 * len(indice) + 1
+        assert indice.cantidad_postings <= 2 * postings_iniciales + 64
+    assert len(indice) == 54
+    # Las búsquedas siguen viendo exactamente los vivos
+    assert [r[2] for r in indice.buscar("producto numero 1", limite=100)] == [10] + list(range(11, 20))
+    assert indice.buscar("tor")[0][2] == 4
@@ -0,0 +1,30 @@
+import time
+from app.utils.ttl_cache import TTLCache
+
+def test_ttl_cache_hits_y_misses():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", {"correo": "a"})
+    assert cache.get("a") == {"correo": "a"}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_ttl_cache_desaloja_lru():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expira_e_invalida():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    cache.set("b", 2)
+    assert cache.invalidate("b") is True
+    assert cache.get("b") is None
@@ -0,0 +1,73 @@
+"""
+Cancelación de solicitudes obsoletas por cliente.
+
+El frontend busca en cada tecla; si el usuario ya escribió otra letra, la
+búsqueda anterior no sirve. El cliente envía un número de secuencia creciente
+y aquí se conserva solo la solicitud en curso más reciente por clave
+(usuario): una nueva cancela a la anterior y una que llega después de otra
+más nueva se rechaza sin ejecutarse.
+
+Solo se compara contra solicitudes en curso, así que si el cliente reinicia
+su secuencia (recarga la página) no queda bloqueado.
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional, Set, Tuple
+
+
+class SolicitudReemplazada(Exception):
+    """La solicitud fue cancelada (o rechazada) porque llegó una más reciente del mismo cliente."""
+
+
+class CoordinadorSolicitudes:
+    """Una tarea en curso por clave; se usa desde el event loop, sin locks."""
+
+    def __init__(self):
+        self._en_curso: Dict[Hashable, Tuple[int, asyncio.Task]] = {}
+        self._reemplazadas: Set[asyncio.Task] = set()
+        self.ejecutadas = 0
+        self.canceladas = 0
+        self.rechazadas = 0
+
+    async def ejecutar(self, clave: Hashable, secuencia: Optional[int], corutina: Awaitable) -> Any:
+        """
+        Ejecuta `corutina` como la solicitud `secuencia` de `clave`. Lanza
+        SolicitudReemplazada si otra más reciente la cancela o ya está en curso.
+        Sin secuencia se ejecuta sin coordinar.
+        """
+        if secuencia is None:
+            return await corutina
+
+        anterior = self._en_curso.get(clave)
+        if anterior is not None:
+            secuencia_anterior, tarea_anterior = anterior
+            if secuencia < secuencia_anterior:
+                corutina.close()
+                self.rechazadas += 1
+                raise SolicitudReemplazada()
+            self._reemplazadas.add(tarea_anterior)
+            tarea_anterior.cancel()
+            self.canceladas += 1
+
+        tarea = asyncio.ensure_future(corutina)
+        self._en_curso[clave] = (secuencia, tarea)
+        self.ejecutadas += 1
+        try:
+            return await tarea
+        except asyncio.CancelledError:
+            if tarea in self._reemplazadas:
+                raise SolicitudReemplazada() from None
+            # Se canceló el request mismo (cliente desconectado): no dejar la tarea viva
+            tarea.cancel()
+            raise
+        finally:
+            self._reemplazadas.discard(tarea)
+            if self._en_curso.get(clave, (None, None))[1] is tarea:
+                del self._en_curso[clave]
+
+    def stats(self) -> dict:
+        return {
+            "en_curso": len(self._en_curso),
+            "ejecutadas": self.ejecutadas,
+            "canceladas": self.canceladas,
+            "rechazadas": self.rechazadas,
+        }
@@ -0,0 +1,76 @@
+"""
+Caché en memoria con expiración por tiempo (TTL) y desalojo LRU.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché LRU con tiempo de vida por entrada.
+    Se usa desde el event loop (un solo hilo), por eso no necesita locks.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = float(ttl)
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            self.misses += 1
+            return default
+
+        expira, valor = entrada
+        if expira <= time.monotonic():
+            # Entrada vencida: se elimina y cuenta como fallo
+            del self._datos[clave]
+            self.misses += 1
+            return default
+
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> None:
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._datos[clave] = (expira, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.maxsize:
+            self._datos.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, clave: Hashable) -> bool:
+        if self._datos.pop(clave, None) is not None:
+            self.invalidations += 1
+            return True
+        return False
+
+    def clear(self) -> None:
+        self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def __contains__(self, clave: Hashable) -> bool:
+        entrada = self._datos.get(clave)
+        return entrada is not None and entrada[0] > time.monotonic()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.maxsize,
+            "ttl_segundos": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidaciones": self.invalidations,
+        }
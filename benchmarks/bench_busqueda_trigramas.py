@@ -0,0 +1,96 @@
+"""
+Benchmark del índice de trigramas de app/search contra un recorrido lineal.
+
+Construye el índice con el catálogo sintético de benchmarks/dataset.py (una
+sola farmacia) y mide tiempo de construcción, memoria retenida (tracemalloc)
+y p50/p99 de búsqueda para consultas de distinta selectividad. La línea base
+es recorrer todos los productos comprobando la subcadena, que es lo que hace
+Mongo con un $regex sin anclar cuando no puede usar índices.
+
+Uso:
+    python -m benchmarks.bench_busqueda_trigramas [--productos 100000] [--repeticiones 200]
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.dataset import Escala, GeneradorDatos
+from app.search.normalizacion import normalizar_texto
+from app.search.trigramas import CAMPOS, IndiceTrigramas, _rango
+
+CONSULTAS = ("tornillo", "acero inox", "PVC", "válvula", "1/2", "truper", "BIS000123", "zzzz")
+
+
+def generar_productos(productos: int, semilla: int) -> list:
+    generador = GeneradorDatos(Escala(farmacias=1, productos=productos), semilla=semilla)
+    return [
+        {"_id": i, "codigo": p["codigo"], "nombre": p["nombre"], "descripcion": p["descripcion"], "marca": p["marca"]}
+        for i, p in enumerate(generador.catalogo)
+    ]
+
+
+def construir(productos: list) -> IndiceTrigramas:
+    indice = IndiceTrigramas()
+    for p in productos:
+        indice.agregar(p["_id"], p["codigo"], p["nombre"], p["descripcion"], p["marca"])
+    return indice
+
+
+def recorrido_lineal(textos: list, consulta: str, limite: int = 30) -> list:
+    consulta = normalizar_texto(consulta)
+    campos = tuple(range(len(CAMPOS)))
+    candidatos = []
+    for _id, texto in textos:
+        rango = _rango(texto, consulta, campos)
+        if rango is not None:
+            candidatos.append((rango, texto[1], _id))
+    candidatos.sort()
+    return candidatos[:limite]
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "p50_ms": round(statistics.median(tiempos), 3),
+        "p99_ms": round(tiempos[max(0, int(len(tiempos) * 0.99) - 1)], 3),
+    }
+
+
+def main(productos: int, repeticiones: int, semilla: int):
+    catalogo = generar_productos(productos, semilla)
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    indice = construir(catalogo)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+    memoria_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+
+    print(f"Índice de {len(indice)} productos: {indice.cantidad_trigramas} trigramas, "
+          f"construcción {construccion_ms:.0f} ms, memoria {memoria_mb:.1f} MB")
+
+    textos = [(p["_id"], tuple(normalizar_texto(p[c]) for c in CAMPOS)) for p in catalogo]
+    print(f"\n{'consulta':<12} {'coincid.':>8} {'índice p50':>11} {'p99':>8} {'lineal p50':>11} {'p99':>8}")
+    for consulta in CONSULTAS:
+        esperado = recorrido_lineal(textos, consulta)
+        assert indice.buscar(consulta) == esperado, consulta
+        coincidencias = len(recorrido_lineal(textos, consulta, limite=len(textos)))
+        r_indice = medir(lambda: indice.buscar(consulta), repeticiones)
+        r_lineal = medir(lambda: recorrido_lineal(textos, consulta), max(5, repeticiones // 20))
+        print(f"{consulta:<12} {coincidencias:>8} {r_indice['p50_ms']:>8} ms {r_indice['p99_ms']:>5} ms "
+              f"{r_lineal['p50_ms']:>8} ms {r_lineal['p99_ms']:>5} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    main(args.productos, args.repeticiones, args.semilla)
@@ -0,0 +1,318 @@
+"""
+Suite de benchmarks de endpoints: corre la app real (FastAPI en proceso, vía
+httpx.ASGITransport) contra un mongod local y mide por endpoint latencia
+p50/p95/p99, requests/s y comandos a Mongo por request (del header
+Server-Timing que agrega MetricsMiddleware).
+
+Antes de medir siembra una base dedicada (--db, por defecto yorbis_bench) con
+el generador determinista de benchmarks.dataset. Nunca toca la base configurada
+en .env. Con --sin-sembrar mide sobre una base ya generada (por ejemplo, a
+mayor escala con python -m benchmarks.dataset).
+
+POST /punto-venta/ventas usa transacciones: el mongod debe ser un replica set
+(basta uno de un solo nodo):
+
+    mongod --replSet rs0 --dbpath /tmp/mongo-bench --port 27017
+    mongosh --eval 'rs.initiate()'
+
+Uso:
+    python -m benchmarks.bench_endpoints [--mongo-uri mongodb://localhost:27017/?directConnection=true]
+        [--requests 200] [--concurrencia 8] [--productos 35000] [--escala 1] [--sin-sembrar]
+        [--solo buscar_pos,compras]
+        [--salida benchmarks/resultados/base.json] [--comparar benchmarks/resultados/base.json]
+
+Los resultados se guardan en JSON (por defecto benchmarks/resultados/<fecha>-<commit>.json)
+para comparar corridas con --comparar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.dataset import Escala, GeneradorDatos, escribir
+
+DIRECTORIO_RESULTADOS = Path(__file__).parent / "resultados"
+FARMACIA = "01"
+CORREO_BENCH = "bench@yorbis.local"
+TERMINOS_BUSQUEDA = ["tornillo", "martillo", "pintura", "tubo", "llave", "cable", "brocha", "clavo", "cemento", "esmalte"]
+_SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) comandos"')
+
+
+# ---------------------------------------------------------------------------
+# Datos
+# ---------------------------------------------------------------------------
+
+def escala_benchmark(productos: int, factor: float) -> Escala:
+    """Escala por defecto de la suite: más chica que la de benchmarks.dataset para sembrar en segundos."""
+    return Escala(productos=productos, meses=3, ventas_por_dia=20, compras_por_mes=10, movimientos_por_banco=200).escalar(factor)
+
+
+async def sembrar_datos(db, escala: Escala, semilla: int, sembrar: bool = True) -> dict:
+    """
+    Escribe el conjunto sintético de benchmarks.dataset (salvo con sembrar=False, para
+    medir sobre una base ya generada a otra escala) y agrega el usuario del benchmark.
+    Retorna los datos que necesitan los escenarios (productos con stock, rango de fechas).
+    """
+    generador = GeneradorDatos(escala, semilla=semilla)
+    if sembrar:
+        await escribir(db, generador)
+    await db["USUARIOS"].update_one(
+        {"correo": CORREO_BENCH},
+        {"$set": {"nombre": "Benchmark", "permisos": [], "farmacias": {FARMACIA: "Sucursal 01"}}},
+        upsert=True,
+    )
+    con_stock = await db["INVENTARIOS"].find(
+        {"farmacia": FARMACIA, "estado": "activo", "cantidad": {"$gte": 20}},
+        {"codigo": 1},
+    ).limit(2_000).to_list(length=None)
+    return {
+        "productos": [(str(p["_id"]), p["codigo"]) for p in con_stock],
+        "fecha_inicio": generador.inicio.strftime("%Y-%m-%d"),
+        "fecha_fin": (generador.inicio + timedelta(days=29)).strftime("%Y-%m-%d"),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Escenarios
+# ---------------------------------------------------------------------------
+
+def escenarios(datos: dict, aleatorio: random.Random) -> Dict[str, Callable[[], Tuple[str, str, Optional[dict]]]]:
+    """Cada escenario genera (método, url, body) para un request."""
+    productos = datos["productos"]
+
+    def buscar_pos():
+        return "GET", f"/punto-venta/productos/buscar?q={aleatorio.choice(TERMINOS_BUSQUEDA)}&sucursal={FARMACIA}", None
+
+    def inventario_items():
+        return "GET", f"/inventarios/items?farmacia={FARMACIA}&limit=50&skip={aleatorio.randrange(0, 500, 50)}", None
+
+    def inventario_buscar():
+        return "GET", f"/inventarios/buscar?q={aleatorio.choice(TERMINOS_BUSQUEDA)}&farmacia={FARMACIA}", None
+
+    def crear_venta():
+        producto_id, codigo = aleatorio.choice(productos)
+        body = {
+            "sucursal": FARMACIA,
+            "productos": [{"productoId": producto_id, "codigo": codigo, "cantidad": 1, "precio_unitario": 10.0, "subtotal": 10.0}],
+            "total": 10.0,
+            "metodos_pago": [{"tipo": "efectivo", "monto": 10.0}],
+        }
+        return "POST", "/punto-venta/ventas", body
+
+    def compras():
+        return "GET", f"/compras?farmacia={FARMACIA}&fecha_inicio={datos['fecha_inicio']}&fecha_fin={datos['fecha_fin']}", None
+
+    def comisiones():
+        return "GET", f"/comisiones?startDate={datos['fecha_inicio']}&endDate={datos['fecha_fin']}", None
+
+    return {
+        "buscar_pos": buscar_pos,
+        "inventario_items": inventario_items,
+        "inventario_buscar": inventario_buscar,
+        "crear_venta": crear_venta,
+        "compras": compras,
+        "comisiones": comisiones,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def _percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def _resumen(latencias: List[float], comandos: List[int], db_ms: List[float], errores: int, duracion: float) -> dict:
+    latencias = sorted(latencias)
+    comandos = sorted(comandos)
+    return {
+        "requests": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 1) if duracion else 0.0,
+        "p50_ms": round(_percentil(latencias, 50), 2),
+        "p95_ms": round(_percentil(latencias, 95), 2),
+        "p99_ms": round(_percentil(latencias, 99), 2),
+        "comandos_mongo_promedio": round(statistics.fmean(comandos), 2) if comandos else 0.0,
+        "comandos_mongo_max": comandos[-1] if comandos else 0,
+        "db_ms_p50": round(_percentil(sorted(db_ms), 50), 2),
+    }
+
+
+async def medir_escenario(client, generar, requests: int, concurrencia: int, calentamiento: int) -> dict:
+    latencias: List[float] = []
+    comandos: List[int] = []
+    db_ms: List[float] = []
+    errores = 0
+    ejemplo_error = None
+
+    async def uno(registrar: bool):
+        nonlocal errores, ejemplo_error
+        metodo, url, body = generar()
+        inicio = time.perf_counter()
+        respuesta = await client.request(metodo, url, json=body)
+        latencia = (time.perf_counter() - inicio) * 1000
+        if not registrar:
+            return
+        if respuesta.status_code >= 400:
+            errores += 1
+            ejemplo_error = ejemplo_error or f"{respuesta.status_code} {respuesta.text[:200]}"
+            return
+        latencias.append(latencia)
+        coincidencia = _SERVER_TIMING.search(respuesta.headers.get("server-timing", ""))
+        if coincidencia:
+            db_ms.append(float(coincidencia.group(1)))
+            comandos.append(int(coincidencia.group(2)))
+
+    for _ in range(calentamiento):
+        await uno(registrar=False)
+
+    pendientes = iter(range(requests))
+
+    async def trabajador():
+        for _ in pendientes:
+            await uno(registrar=True)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    resumen = _resumen(latencias, comandos, db_ms, errores, duracion)
+    if ejemplo_error:
+        resumen["ejemplo_error"] = ejemplo_error
+    return resumen
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "desconocido"
+
+
+def imprimir_tabla(resultados: Dict[str, dict], base: Optional[Dict[str, dict]] = None):
+    print(f"{'endpoint':<18} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'cmd/req':>8} {'errores':>8}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<18} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['comandos_mongo_promedio']:>8} {r['errores']:>8}")
+        anterior = (base or {}).get(nombre)
+        if anterior:
+            deltas = []
+            for clave in ("rps", "p50_ms", "p95_ms", "p99_ms", "comandos_mongo_promedio"):
+                if anterior.get(clave):
+                    deltas.append(f"{clave} {(r[clave] - anterior[clave]) / anterior[clave] * 100:+.1f}%")
+            if deltas:
+                print(f"{'':<18} vs base: {', '.join(deltas)}")
+        if r.get("ejemplo_error"):
+            print(f"{'':<18} error: {r['ejemplo_error']}")
+
+
+async def correr(args) -> dict:
+    # La app lee la configuración al importarse: se apunta a la base de benchmark antes
+    os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["DATABASE_NAME"] = args.db
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import httpx
+    from app.core.jwt import crear_token_jwt
+    from app.db.mongo import get_database
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        db = get_database()
+        try:
+            version = (await db.client.server_info()).get("version", "?")
+        except Exception as e:
+            raise SystemExit(f"No se pudo conectar a {args.mongo_uri}: {e}")
+        escala = escala_benchmark(args.productos, args.escala)
+        if not args.sin_sembrar:
+            print(f"Sembrando {args.db} (mongod {version}): {escala}")
+        datos = await sembrar_datos(db, escala, args.semilla, sembrar=not args.sin_sembrar)
+        if not datos["productos"]:
+            raise SystemExit(f"No hay productos con stock en la farmacia {FARMACIA} de {args.db}")
+
+        aleatorio = random.Random(args.semilla)
+        disponibles = escenarios(datos, aleatorio)
+        seleccion = [n.strip() for n in args.solo.split(",")] if args.solo else list(disponibles)
+        desconocidos = [n for n in seleccion if n not in disponibles]
+        if desconocidos:
+            raise SystemExit(f"Escenarios desconocidos: {desconocidos}. Disponibles: {list(disponibles)}")
+
+        headers = {"Authorization": f"Bearer {crear_token_jwt({'sub': CORREO_BENCH})}"}
+        transport = httpx.ASGITransport(app=app)
+        resultados = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=60) as client:
+            for nombre in seleccion:
+                print(f"  midiendo {nombre}...")
+                resultados[nombre] = await medir_escenario(client, disponibles[nombre], args.requests, args.concurrencia, args.calentamiento)
+
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_actual(),
+            "mongod": version,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": {
+                "productos": args.productos,
+                "escala": args.escala,
+                "sin_sembrar": args.sin_sembrar,
+                "requests": args.requests,
+                "concurrencia": args.concurrencia,
+                "calentamiento": args.calentamiento,
+                "semilla": args.semilla,
+            },
+        },
+        "resultados": resultados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017/?directConnection=true"))
+    parser.add_argument("--db", default="yorbis_bench")
+    parser.add_argument("--productos", type=int, default=35_000, help="Filas de INVENTARIOS (entre las 7 farmacias)")
+    parser.add_argument("--escala", type=float, default=1.0, help="Factor de escala del conjunto sintético (ver benchmarks.dataset)")
+    parser.add_argument("--sin-sembrar", action="store_true", help="Usar los datos ya cargados en --db (ej: generados con benchmarks.dataset)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests medidos por endpoint")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--solo", default="", help="Escenarios separados por coma (por defecto todos)")
+    parser.add_argument("--salida", default="", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", default="", help="JSON de una corrida anterior para mostrar la diferencia")
+    args = parser.parse_args()
+
+    if args.db in ("", "ferreteria_los_puentes"):
+        raise SystemExit("Use una base dedicada para el benchmark (--db): los datos se borran y se vuelven a sembrar")
+
+    reporte = asyncio.run(correr(args))
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)["resultados"]
+    print()
+    imprimir_tabla(reporte["resultados"], base)
+
+    salida = Path(args.salida) if args.salida else DIRECTORIO_RESULTADOS / f"{datetime.now():%Y%m%d-%H%M%S}-{reporte['meta']['commit']}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(reporte, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
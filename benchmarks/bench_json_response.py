@@ -0,0 +1,142 @@
+"""
+Benchmark de serialización de una respuesta de /inventarios con 500 filas.
+
+Antes:   el handler convierte _id/productoId a str a mano y FastAPI pasa el
+         resultado por jsonable_encoder + json.dumps (JSONResponse).
+Después: el handler devuelve los documentos crudos y BSONJSONResponse
+         (orjson + tipos BSON) los serializa en un solo paso.
+
+Se miden dos niveles: solo la serialización, y el request completo a través
+de FastAPI (httpx.ASGITransport, sin MongoDB).
+
+Uso:
+    python -m benchmarks.bench_json_response [--filas 500] [--repeticiones 200]
+"""
+import argparse
+import asyncio
+import copy
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import BSONJSONResponse, BSONRouter
+
+
+def generar_inventario(filas: int, semilla: int = 42) -> list:
+    aleatorio = random.Random(semilla)
+    base = datetime(2024, 1, 1)
+    documentos = []
+    for i in range(filas):
+        costo = round(aleatorio.uniform(1, 200), 2)
+        documentos.append({
+            "_id": ObjectId(),
+            "productoId": ObjectId(),
+            "codigo": f"COD-{i:05d}",
+            "nombre": f"Producto {i} tornillo galvanizado {aleatorio.randint(1, 99)} mm",
+            "descripcion": "Artículo de ferretería",
+            "marca": aleatorio.choice(["Truper", "Stanley", "Bosch", "Genérico"]),
+            "farmacia": "01",
+            "estado": "activo",
+            "costo": costo,
+            "precio_venta": round(costo / 0.60, 2),
+            "utilidad": round(costo / 0.60 - costo, 2),
+            "porcentaje_utilidad": 40.0,
+            "cantidad": aleatorio.randint(0, 500),
+            "existencia": aleatorio.randint(0, 500),
+            "precio_lista": Decimal128(str(round(costo * 1.1, 2))),
+            "fechaCreacion": base + timedelta(days=i % 365),
+            "lotes": [
+                {"lote": f"L{i}-{j}", "cantidad": aleatorio.randint(1, 50), "fecha_vencimiento": base + timedelta(days=400 + j)}
+                for j in range(2)
+            ],
+        })
+    return documentos
+
+
+def convertir_a_mano(documentos: list) -> list:
+    """Lo que hacían los handlers antes de devolver la lista."""
+    for inv in documentos:
+        inv["_id"] = str(inv["_id"])
+        if "productoId" in inv and isinstance(inv["productoId"], ObjectId):
+            inv["productoId"] = str(inv["productoId"])
+        inv["precio_lista"] = float(inv["precio_lista"].to_decimal())
+    return documentos
+
+
+def serializar_antes(documentos: list) -> bytes:
+    return JSONResponse(jsonable_encoder(convertir_a_mano(documentos))).body
+
+
+def serializar_despues(documentos: list) -> bytes:
+    return BSONJSONResponse(documentos).body
+
+
+def medir(funcion, repeticiones: int, preparar) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        datos = preparar()
+        inicio = time.perf_counter()
+        funcion(datos)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {"p50_ms": round(statistics.median(tiempos), 3), "p95_ms": round(tiempos[int(len(tiempos) * 0.95) - 1], 3)}
+
+
+def crear_app(documentos: list, despues: bool) -> FastAPI:
+    app = FastAPI(default_response_class=BSONJSONResponse if despues else JSONResponse)
+    router = BSONRouter() if despues else APIRouter()
+
+    @router.get("/inventarios")
+    async def listar_inventarios():
+        datos = copy.deepcopy(documentos)
+        return datos if despues else convertir_a_mano(datos)
+
+    app.include_router(router)
+    return app
+
+
+async def medir_app(app: FastAPI, repeticiones: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    tiempos = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(10):
+            await client.get("/inventarios")
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            respuesta = await client.get("/inventarios")
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            assert respuesta.status_code == 200
+    tiempos.sort()
+    return {"p50_ms": round(statistics.median(tiempos), 3), "p95_ms": round(tiempos[int(len(tiempos) * 0.95) - 1], 3)}
+
+
+def main(filas: int, repeticiones: int):
+    documentos = generar_inventario(filas)
+    preparar = lambda: copy.deepcopy(documentos)
+
+    assert len(serializar_antes(preparar())) > 0 and len(serializar_despues(preparar())) > 0
+    print(f"Serialización de {filas} filas ({repeticiones} repeticiones)")
+    for nombre, funcion in (("antes (str + jsonable_encoder)", serializar_antes), ("después (orjson BSON)", serializar_despues)):
+        r = medir(funcion, repeticiones, preparar)
+        print(f"  {nombre:<34} p50 {r['p50_ms']:>8} ms   p95 {r['p95_ms']:>8} ms")
+
+    print(f"\nGET /inventarios completo vía FastAPI ({filas} filas; incluye copiar los documentos)")
+    for nombre, despues in (("antes", False), ("después", True)):
+        r = asyncio.run(medir_app(crear_app(documentos, despues), repeticiones))
+        print(f"  {nombre:<34} p50 {r['p50_ms']:>8} ms   p95 {r['p95_ms']:>8} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+    main(args.filas, args.repeticiones)
@@ -0,0 +1,133 @@
+"""
+Benchmark del costo de logging por venta: print() síncrono contra el logger
+estructurado con cola (app/core/logger.py).
+
+Reproduce la secuencia de mensajes que crear_venta y
+descontar_stock_inventario_con_sesion emitían por cada venta (cabecera,
+bloque por producto con el dict completo, verificación y cierre) y mide la
+latencia por venta en el event loop. stdout se redirige a un pipe con un
+lector en otro hilo, con line buffering (igual que PYTHONUNBUFFERED=1 en Render).
+
+Uso:
+    python -m benchmarks.bench_logging_venta [--ventas 2000] [--productos 5] [--pausa-ms 1]
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+from app.core import logger as logger_app
+
+
+def _producto(i: int) -> dict:
+    return {
+        "productoId": f"65f0c0ffee{i:014d}",
+        "codigo": f"COD-{i:05d}",
+        "nombre": f"Producto de prueba {i}",
+        "cantidad": 2,
+        "precio_unitario": 12.5,
+        "subtotal": 25.0,
+        "descuento": 0,
+    }
+
+
+def venta_con_print(productos: list):
+    print(f"💰 [PUNTO_VENTA] Creando venta - Usuario: cajero@ferreteria.com")
+    print(f"📦 [PUNTO_VENTA] Productos recibidos del frontend: {len(productos)} items")
+    print(f"📋 [PUNTO_VENTA] Datos de la venta:")
+    print(f"   - Productos: {[{'id': p.get('productoId'), 'codigo': p.get('codigo'), 'cantidad': p.get('cantidad')} for p in productos]}")
+    for p in productos:
+        print(f"🔄 [PUNTO_VENTA] ===== INICIANDO DESCUENTO DE PRODUCTO =====")
+        print(f"   ID recibido: {p['productoId']}")
+        print(f"   Datos completos del producto: {p}")
+        print(f"🔍 [INVENTARIO] Buscando producto por ID: {p['productoId']} en farmacia: 01")
+        print(f"📊 [INVENTARIO] Valores actuales - Existencia: 10, Cantidad: 10, Stock: 10")
+        print(f"✅ [INVENTARIO] Stock descontado exitosamente: {p['codigo']} - 2 unidades, Costo: {7.5:.2f}")
+        print(f"📊 [INVENTARIO] Valores DESPUÉS del descuento (verificados en BD):")
+        print(f"✅ [PUNTO_VENTA] ===== PRODUCTO DESCONTADO EXITOSAMENTE =====")
+    print(f"✅ [PUNTO_VENTA] ===== TRANSACCIÓN COMPLETADA EXITOSAMENTE =====")
+    print(f"✅ [PUNTO_VENTA] Venta creada: 65f0 - Descuento por divisa: 0% - Costo inventario: 37.5")
+
+
+def venta_con_logger(productos: list, logger: logging.Logger):
+    logger.debug("💰 [PUNTO_VENTA] Creando venta - Usuario: %s", "cajero@ferreteria.com")
+    logger.debug("📦 [PUNTO_VENTA] Productos recibidos del frontend: %s items", len(productos))
+    logger.debug("📋 [PUNTO_VENTA] Datos de la venta:")
+    logger.debug("   - Productos: %s", [{'id': p.get('productoId'), 'codigo': p.get('codigo'), 'cantidad': p.get('cantidad')} for p in productos])
+    for p in productos:
+        logger.debug("🔄 [PUNTO_VENTA] ===== INICIANDO DESCUENTO DE PRODUCTO =====")
+        logger.debug("   ID recibido: %s", p['productoId'])
+        logger.debug("   Datos completos del producto: %s", p)
+        logger.debug("🔍 [INVENTARIO] Buscando producto por ID: %s en farmacia: %s", p['productoId'], "01")
+        logger.debug("📊 [INVENTARIO] Valores actuales - Existencia: %s, Cantidad: %s, Stock: %s", 10, 10, 10)
+        logger.info("✅ [INVENTARIO] Stock descontado exitosamente: %s - %s unidades, Costo: %.2f", p['codigo'], 2, 7.5)
+        logger.debug("📊 [INVENTARIO] Valores DESPUÉS del descuento (verificados en BD):")
+        logger.debug("✅ [PUNTO_VENTA] ===== PRODUCTO DESCONTADO EXITOSAMENTE =====")
+    logger.debug("✅ [PUNTO_VENTA] ===== TRANSACCIÓN COMPLETADA EXITOSAMENTE =====")
+    logger.info("✅ [PUNTO_VENTA] Venta creada: %s - Descuento por divisa: %s%% - Costo inventario: %s", "65f0", 0, 37.5, extra={"venta_id": "65f0"})
+
+
+def _stdout_a_pipe():
+    """Redirige sys.stdout a un pipe consumido por otro hilo (como la consola de un contenedor)."""
+    lectura, escritura = os.pipe()
+
+    def consumir():
+        with os.fdopen(lectura, "rb") as f:
+            while f.read(65536):
+                pass
+
+    threading.Thread(target=consumir, daemon=True).start()
+    original = sys.stdout
+    sys.stdout = io.TextIOWrapper(os.fdopen(escritura, "wb"), encoding="utf-8", line_buffering=True)
+    return original
+
+
+def medir(nombre: str, funcion, ventas: int, productos: list, pausa_ms: float) -> dict:
+    latencias = []
+    for _ in range(ventas):
+        inicio = time.perf_counter()
+        funcion(productos)
+        latencias.append((time.perf_counter() - inicio) * 1_000_000)
+        # Tiempo entre ventas (en producción el loop atiende I/O entre una y otra)
+        if pausa_ms:
+            time.sleep(pausa_ms / 1000)
+    latencias.sort()
+    return {
+        "variante": nombre,
+        "p50_us": round(statistics.median(latencias), 1),
+        "p99_us": round(latencias[int(len(latencias) * 0.99) - 1], 1),
+        "promedio_us": round(statistics.fmean(latencias), 1),
+    }
+
+
+def main(ventas: int, n_productos: int, pausa_ms: float):
+    productos = [_producto(i) for i in range(n_productos)]
+    original = _stdout_a_pipe()
+    resultados = [medir("print()", venta_con_print, ventas, productos, pausa_ms)]
+
+    for nivel in ("INFO", "DEBUG"):
+        logger_app.detener_logging()
+        logger_app.LOG_LEVEL = nivel
+        logger_app.configurar_logging()
+        logger = logger_app.obtener_logger("app.routes.punto_venta")
+        resultados.append(medir(f"logger (nivel {nivel})", lambda p: venta_con_logger(p, logger), ventas, productos, pausa_ms))
+    logger_app.detener_logging()
+
+    sys.stdout.flush()
+    sys.stdout = original
+    print(f"{ventas} ventas x {n_productos} productos, pausa {pausa_ms} ms (latencia de logging por venta)")
+    for r in resultados:
+        print(f"  {r['variante']:<22} p50 {r['p50_us']:>8} µs   p99 {r['p99_us']:>8} µs   promedio {r['promedio_us']:>8} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ventas", type=int, default=2000)
+    parser.add_argument("--productos", type=int, default=5)
+    parser.add_argument("--pausa-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.ventas, args.productos, args.pausa_ms)
@@ -0,0 +1,142 @@
+"""
+Benchmark de la paginación de /inventarios/items: skip/limit contra cursor
+(keyset sobre nombre + _id, app/db/paginacion.py).
+
+Siembra una farmacia con --productos filas de INVENTARIOS (generador de
+benchmarks.dataset, con los mismos índices que create_indexes.py) en un
+mongod local y mide para varias páginas el p50/p99 de cada forma de pedirla,
+más las entradas de índice y documentos que Mongo examinó (explain). Con skip
+el costo crece con el número de página; con cursor debe ser constante.
+
+Uso:
+    python -m benchmarks.bench_paginacion [--mongo-uri mongodb://localhost:27017/?directConnection=true]
+        [--productos 200000] [--limite 50] [--paginas 1,10,50,200] [--repeticiones 50] [--sin-sembrar]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.paginacion import ORDEN_CURSOR, codificar_cursor, decodificar_cursor, filtro_despues_de, pagina_por_cursor
+from benchmarks.dataset import INDICES_INVENTARIOS, Escala, GeneradorDatos
+
+FARMACIA = "01"
+FILTRO = {"farmacia": FARMACIA, "estado": {"$ne": "inactivo"}}
+# Misma proyección que /inventarios/items
+PROYECCION = {
+    "_id": 1, "codigo": 1, "nombre": 1, "descripcion": 1, "precio_venta": 1, "precio": 1, "marca": 1,
+    "cantidad": 1, "farmacia": 1, "costo": 1, "estado": 1,
+    "utilidad": 1, "porcentaje_utilidad": 1,
+}
+
+
+async def sembrar(coleccion, productos: int, semilla: int) -> None:
+    generador = GeneradorDatos(Escala(farmacias=1, productos=productos), semilla=semilla)
+    await coleccion.drop()
+    inicio = time.perf_counter()
+    lote = []
+    for documento in generador.inventarios():
+        lote.append(documento)
+        if len(lote) == 5_000:
+            await coleccion.insert_many(lote, ordered=False)
+            lote = []
+    if lote:
+        await coleccion.insert_many(lote, ordered=False)
+    for claves, nombre in INDICES_INVENTARIOS:
+        await coleccion.create_index(claves, name=nombre)
+    print(f"Sembrados {productos} productos en {time.perf_counter() - inicio:.1f} s")
+
+
+def _pagina_skip(coleccion, pagina: int, limite: int):
+    # Igual que la paginación antigua de la ruta
+    return coleccion.find(FILTRO, projection=PROYECCION).sort("nombre", 1).skip((pagina - 1) * limite).limit(limite)
+
+
+async def cursor_de_pagina(coleccion, pagina: int, limite: int) -> Optional[str]:
+    """El next_cursor que el cliente tendría al pedir `pagina` (None para la primera)."""
+    if pagina == 1:
+        return None
+    anterior = await coleccion.find(FILTRO, projection={"nombre": 1}).sort(ORDEN_CURSOR).skip((pagina - 1) * limite - 1).limit(1).to_list(length=1)
+    return codificar_cursor(anterior[0]) if anterior else None
+
+
+async def medir(funcion, repeticiones: int) -> Dict[str, float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p99_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))], 2),
+    }
+
+
+def _examinados(explain: dict) -> str:
+    estadisticas = explain.get("executionStats", {})
+    return f"{estadisticas.get('totalKeysExamined', '?')}/{estadisticas.get('totalDocsExamined', '?')}"
+
+
+async def correr(args) -> None:
+    client = AsyncIOMotorClient(args.mongo_uri)
+    coleccion = client[args.db]["INVENTARIOS"]
+    try:
+        version = (await client.server_info()).get("version", "?")
+    except Exception as e:
+        raise SystemExit(f"No se pudo conectar a {args.mongo_uri}: {e}")
+    if not args.sin_sembrar:
+        print(f"Sembrando {args.db}.INVENTARIOS (mongod {version})...")
+        await sembrar(coleccion, args.productos, args.semilla)
+
+    paginas = [int(p) for p in args.paginas.split(",") if p.strip()]
+    print(f"\nlímite {args.limite}, {args.repeticiones} repeticiones; examinados = claves de índice/documentos")
+    print(f"{'página':>7} {'skip p50':>10} {'p99':>8} {'examinados':>14} {'cursor p50':>11} {'p99':>8} {'examinados':>14}")
+    for pagina in paginas:
+        cursor = await cursor_de_pagina(coleccion, pagina, args.limite)
+        if pagina > 1 and cursor is None:
+            print(f"{pagina:>7} (no hay tantas páginas)")
+            continue
+
+        async def con_skip():
+            await _pagina_skip(coleccion, pagina, args.limite).to_list(length=args.limite)
+
+        async def con_cursor():
+            await pagina_por_cursor(coleccion, FILTRO, PROYECCION, args.limite, cursor)
+
+        skip = await medir(con_skip, args.repeticiones)
+        keyset = await medir(con_cursor, args.repeticiones)
+        explain_skip = await _pagina_skip(coleccion, pagina, args.limite).explain()
+        filtro_cursor = FILTRO
+        if cursor:
+            filtro_cursor = {"$and": [FILTRO, filtro_despues_de(*decodificar_cursor(cursor))]}
+        explain_cursor = await coleccion.find(filtro_cursor, projection=PROYECCION).sort(ORDEN_CURSOR).limit(args.limite + 1).explain()
+        print(
+            f"{pagina:>7} {skip['p50_ms']:>7} ms {skip['p99_ms']:>5} ms {_examinados(explain_skip):>14} "
+            f"{keyset['p50_ms']:>8} ms {keyset['p99_ms']:>5} ms {_examinados(explain_cursor):>14}"
+        )
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017/?directConnection=true"))
+    parser.add_argument("--db", default="yorbis_bench_paginacion")
+    parser.add_argument("--productos", type=int, default=200_000, help="Filas de INVENTARIOS de la farmacia")
+    parser.add_argument("--limite", type=int, default=50)
+    parser.add_argument("--paginas", default="1,10,50,200")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--sin-sembrar", action="store_true", help="Usar los datos ya cargados en --db")
+    args = parser.parse_args()
+    if args.db in ("", "ferreteria_los_puentes"):
+        raise SystemExit("Use una base dedicada para el benchmark (--db): los datos se borran y se vuelven a sembrar")
+    asyncio.run(correr(args))
+
+
+if __name__ == "__main__":
+    main()
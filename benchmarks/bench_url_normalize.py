@@ -0,0 +1,89 @@
+"""
+Benchmark de URLNormalizeMiddleware: versión anterior (BaseHTTPMiddleware)
+contra la versión ASGI pura de app/core/middleware.py.
+
+Monta una app mínima (sin MongoDB) y mide requests por segundo en proceso
+usando httpx.ASGITransport, para aislar el costo del middleware.
+
+Uso:
+    python -m benchmarks.bench_url_normalize [--requests 5000]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import re
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.middleware import URLNormalizeMiddleware
+
+
+class URLNormalizeMiddlewareAnterior(BaseHTTPMiddleware):
+    """Copia de la implementación anterior, solo para comparar."""
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        normalized_path = re.sub(r'/+', '/', path)
+        if normalized_path != '/' and normalized_path.endswith('/'):
+            normalized_path = normalized_path.rstrip('/')
+        if normalized_path != path:
+            request.scope["path"] = normalized_path
+            request.scope["raw_path"] = normalized_path.encode()
+        return await call_next(request)
+
+
+def crear_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/inventarios/items")
+    async def items():
+        return {"ok": True}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def medir(app: FastAPI, path: str, total: int, concurrencia: int = 50) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Calentamiento
+        for _ in range(50):
+            await client.get(path)
+
+        pendientes = iter(range(total))
+
+        async def trabajador():
+            for _ in pendientes:
+                await client.get(path)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        return total / (time.perf_counter() - inicio)
+
+
+async def main(total: int):
+    variantes = [
+        ("sin middleware", None),
+        ("anterior (BaseHTTPMiddleware)", URLNormalizeMiddlewareAnterior),
+        ("ASGI puro", URLNormalizeMiddleware),
+    ]
+    for path in ("/inventarios/items", "/inventarios//items/"):
+        print(f"\nPath: {path}  ({total} requests)")
+        for nombre, middleware in variantes:
+            if middleware is None and "//" in path:
+                continue
+            # Mejor de 3 rondas; se silencia el log de normalización mientras se mide
+            with contextlib.redirect_stdout(io.StringIO()):
+                rps = max([await medir(crear_app(middleware), path, total) for _ in range(3)])
+            print(f"  {nombre:<32} {rps:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
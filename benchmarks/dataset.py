@@ -0,0 +1,487 @@
+"""
+Generador determinista de datos sintéticos para pruebas de escala.
+
+Escribe INVENTARIOS, LOTES, VENTAS (con pagos), COMPRAS (con productos y
+pagos embebidos), BANCOS (con arreglos largos de movimientos), PROVEEDORES,
+CAJERO y CUADRES-01..NN con una distribución parecida a la real:
+
+- Pocos SKUs concentran la mayoría de las ventas (distribución de Zipf).
+- Nombres de cola larga combinando tipo, material, medida, detalle y marca,
+  con texto en español con acentos.
+- Inserciones en lotes con insert_many(ordered=False).
+
+La misma semilla y escala producen siempre los mismos documentos; cada
+colección usa su propio generador aleatorio, así que cambiar la escala de una
+no altera las demás.
+
+Uso:
+    python -m benchmarks.dataset --db yorbis_escala --escala 1
+    python -m benchmarks.dataset --db yorbis_escala --productos 500000 --meses 12 --ventas-por-dia 300
+
+--escala multiplica productos, ventas, compras y movimientos a la vez, para
+buscar el tamaño de datos en el que cada endpoint deja de escalar.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import os
+import random
+import time
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from bson import ObjectId
+
+from app.search.normalizacion import claves_busqueda
+from app.services.precios_service import calcular_precios
+
+TAMANO_LOTE = 2_000
+
+TIPOS = [
+    "tornillo", "tuerca", "arandela", "clavo", "perno", "martillo", "destornillador", "llave ajustable",
+    "alicate", "serrucho", "pintura", "esmalte", "brocha", "rodillo", "thinner", "cemento", "cal",
+    "cable", "tubo", "codo", "unión", "válvula", "grifo", "candado", "bisagra", "cerradura", "lija",
+    "silicón", "pegamento", "taladro", "broca", "disco de corte", "manguera", "enchufe", "interruptor",
+    "bombillo", "cinta métrica", "nivel", "escalera", "carretilla", "pala", "machete", "guante",
+]
+MATERIALES = [
+    "acero inoxidable", "galvanizado", "PVC", "cobre", "bronce", "aluminio", "madera", "plástico",
+    "hierro", "goma", "fibra de vidrio", "cerámica", "látex", "acrílico", "eléctrico", "hidráulico",
+]
+MEDIDAS = ['1/4"', '3/8"', '1/2"', '3/4"', '1"', '2"', "6 mm", "8 mm", "10 mm", "12 mm", "1 galón", "1/4 galón", "1 kg", "5 kg", "3 m", "10 m"]
+DETALLES = ["", "", "", "reforzado", "térmico", "anticorrosión", "para intemperie", "de unión", "cabeza hexagonal", "con mango ergonómico", "extra fuerte", "económico", "profesional", "niño"]
+MARCAS = ["Truper", "Pretul", "Stanley", "Bosch", "Black & Decker", "Tigre", "Pavco", "Montana", "Sherwin", "Vencerámica", "Genérico"]
+TIPOS_PAGO_VENTA = [("efectivo_usd", 0.30), ("pago_movil", 0.25), ("punto_debito", 0.20), ("efectivo_bs", 0.10), ("zelle", 0.10), ("punto_credito", 0.05)]
+TIPOS_MOVIMIENTO = ["deposito", "ingreso", "abono", "pago_recibido", "retiro", "pago", "pago_compra", "gasto"]
+
+
+@dataclass
+class Escala:
+    """Tamaños del conjunto de datos (ventas/compras/cajeros son por farmacia)."""
+
+    farmacias: int = 7
+    productos: int = 50_000
+    meses: int = 6
+    ventas_por_dia: int = 120
+    compras_por_mes: int = 30
+    proveedores: int = 80
+    bancos: int = 6
+    movimientos_por_banco: int = 2_000
+    cajeros: int = 4
+    zipf: float = 1.1
+
+    def escalar(self, factor: float) -> "Escala":
+        if factor == 1:
+            return self
+        return replace(
+            self,
+            productos=max(1, int(self.productos * factor)),
+            ventas_por_dia=max(1, int(self.ventas_por_dia * factor)),
+            compras_por_mes=max(1, int(self.compras_por_mes * factor)),
+            movimientos_por_banco=max(1, int(self.movimientos_por_banco * factor)),
+        )
+
+
+def id_farmacia(indice: int) -> str:
+    return f"{indice + 1:02d}"
+
+
+def _object_id(aleatorio: random.Random) -> ObjectId:
+    return ObjectId(aleatorio.getrandbits(96).to_bytes(12, "big"))
+
+
+def id_inventario(farmacia: str, sku: int) -> ObjectId:
+    """_id fijo de la fila de INVENTARIOS de un SKU en una farmacia (las ventas lo referencian)."""
+    return ObjectId(f"{int(farmacia):04x}{sku:020x}")
+
+
+def _fecha(dia: datetime) -> str:
+    return dia.strftime("%Y-%m-%d")
+
+
+def _fecha_hora(dia: datetime, segundos: int) -> str:
+    return (dia + timedelta(seconds=segundos)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _SelectorZipf:
+    """Elige índices 0..n-1 con probabilidad ~ 1/(rango^s): pocos SKUs muy vendidos."""
+
+    def __init__(self, n: int, s: float, aleatorio: random.Random):
+        self.aleatorio = aleatorio
+        self.acumulado = list(itertools.accumulate(1 / (rango ** s) for rango in range(1, n + 1)))
+        # El ranking no sigue el orden del catálogo: los SKUs "calientes" quedan repartidos
+        self.orden = list(range(n))
+        aleatorio.shuffle(self.orden)
+
+    def elegir(self) -> int:
+        valor = self.aleatorio.random() * self.acumulado[-1]
+        return self.orden[bisect.bisect_left(self.acumulado, valor)]
+
+
+class GeneradorDatos:
+    """
+    Genera los documentos de cada colección como iteradores (no se mantiene todo
+    en memoria). Las colecciones se generan en orden y comparten el catálogo.
+    """
+
+    def __init__(self, escala: Escala, semilla: int = 42, inicio: datetime = datetime(2024, 1, 1)):
+        self.escala = escala
+        self.semilla = semilla
+        self.inicio = inicio
+        self.dias = escala.meses * 30
+        aleatorio = random.Random(semilla)
+        self.farmacias = [id_farmacia(i) for i in range(escala.farmacias)]
+        self.skus = max(1, escala.productos // escala.farmacias)
+        self.catalogo = [self._producto_catalogo(i, aleatorio) for i in range(self.skus)]
+        self.proveedor_ids = [ObjectId(f"{i + 1:024x}") for i in range(escala.proveedores)]
+        self.cajeros = {
+            farmacia: [f"CAJ-{farmacia}-{j + 1}" for j in range(escala.cajeros)] for farmacia in self.farmacias
+        }
+
+    def _aleatorio(self, *clave) -> random.Random:
+        return random.Random(f"{self.semilla}:{':'.join(map(str, clave))}")
+
+    def _producto_catalogo(self, i: int, aleatorio: random.Random) -> dict:
+        tipo = aleatorio.choice(TIPOS)
+        material = aleatorio.choice(MATERIALES)
+        medida = aleatorio.choice(MEDIDAS)
+        detalle = aleatorio.choice(DETALLES)
+        marca = aleatorio.choice(MARCAS)
+        nombre = " ".join(p for p in (tipo, material, medida, detalle) if p).upper()
+        costo = round(aleatorio.lognormvariate(1.5, 1.0), 2)
+        return {
+            "codigo": f"{tipo[:3].upper()}{i:06d}",
+            "nombre": nombre,
+            "descripcion": " ".join(p for p in (tipo.capitalize(), "de", material, medida, detalle) if p) + f", marca {marca}. Ideal para construcción y mantenimiento del hogar.",
+            "marca": marca,
+            "costo": max(costo, 0.05),
+        }
+
+    # -- INVENTARIOS -------------------------------------------------------
+
+    def _inventarios_con_lotes(self) -> Iterator[Tuple[List[dict], dict]]:
+        producto_claves = [claves_busqueda(producto) for producto in self.catalogo]
+        for farmacia in self.farmacias:
+            aleatorio = self._aleatorio("INVENTARIOS", farmacia)
+            for sku, producto in enumerate(self.catalogo):
+                lotes = []
+                for n in range(aleatorio.choice((0, 0, 1, 1, 2, 3))):
+                    vencimiento = self.inicio + timedelta(days=aleatorio.randint(30, 900))
+                    lotes.append({
+                        "lote": f"L{farmacia}{sku:06d}-{n + 1}",
+                        "cantidad": aleatorio.randint(1, 120),
+                        "costo": round(producto["costo"] * aleatorio.uniform(0.9, 1.1), 2),
+                        "fecha_vencimiento": _fecha(vencimiento),
+                    })
+                cantidad = sum(l["cantidad"] for l in lotes) if lotes else aleatorio.randint(0, 300)
+                creado = aleatorio.randint(0, 86_400 * 30)
+                yield lotes, {
+                    "_id": id_inventario(farmacia, sku),
+                    **producto,
+                    "farmacia": farmacia,
+                    "estado": "inactivo" if aleatorio.random() < 0.03 else "activo",
+                    **calcular_precios(producto["costo"]),
+                    "cantidad": cantidad,
+                    "lotes_activos": len(lotes),
+                    "fechaCreacion": _fecha_hora(self.inicio, creado),
+                    "updatedAt": self.inicio + timedelta(seconds=creado),
+                    **producto_claves[sku],
+                }
+
+    def inventarios(self) -> Iterator[dict]:
+        for _, producto in self._inventarios_con_lotes():
+            yield producto
+
+    def lotes(self) -> Iterator[dict]:
+        """Un documento de LOTES por lote (app/services/lotes_service.py), con el mismo aleatorio que inventarios()."""
+        for lotes, producto in self._inventarios_con_lotes():
+            for lote in lotes:
+                yield {**lote, "producto_id": producto["_id"], "farmacia": producto["farmacia"]}
+
+    # -- VENTAS ------------------------------------------------------------
+
+    def ventas(self) -> Iterator[dict]:
+        for farmacia in self.farmacias:
+            aleatorio = self._aleatorio("VENTAS", farmacia)
+            zipf = _SelectorZipf(self.skus, self.escala.zipf, aleatorio)
+            tipos, pesos = zip(*TIPOS_PAGO_VENTA)
+            factura = 0
+            for d in range(self.dias):
+                dia = self.inicio + timedelta(days=d)
+                # Más ventas los fines de semana y días con ruido
+                cantidad = int(self.escala.ventas_por_dia * (1.3 if dia.weekday() >= 5 else 1.0) * aleatorio.uniform(0.7, 1.3))
+                for _ in range(cantidad):
+                    factura += 1
+                    productos = []
+                    for _ in range(aleatorio.choice((1, 1, 1, 2, 2, 3, 4, 6))):
+                        sku = zipf.elegir()
+                        producto = self.catalogo[sku]
+                        unidades = aleatorio.choice((1, 1, 1, 2, 3, 5, 10))
+                        precio = round(producto["costo"] / 0.60, 2)
+                        productos.append({
+                            "productoId": str(id_inventario(farmacia, sku)),
+                            "codigo": producto["codigo"],
+                            "nombre": producto["nombre"],
+                            "cantidad": unidades,
+                            "precio_unitario": precio,
+                            "subtotal": round(precio * unidades, 2),
+                        })
+                    total = round(sum(p["subtotal"] for p in productos), 2)
+                    pagos = [{"tipo": aleatorio.choices(tipos, pesos)[0], "monto": total}]
+                    if total > 50 and aleatorio.random() < 0.2:
+                        # Pago mixto
+                        parte = round(total * aleatorio.uniform(0.2, 0.8), 2)
+                        pagos = [{"tipo": pagos[0]["tipo"], "monto": parte}, {"tipo": aleatorio.choices(tipos, pesos)[0], "monto": round(total - parte, 2)}]
+                    yield {
+                        "sucursal": farmacia,
+                        "farmacia": farmacia,
+                        "fecha": _fecha(dia),
+                        "fechaCreacion": _fecha_hora(dia, aleatorio.randint(8 * 3600, 19 * 3600)),
+                        "numeroFactura": f"FAC-{factura:06d}",
+                        "numero_factura": f"FAC-{factura:06d}",
+                        "cajero": aleatorio.choice(self.cajeros[farmacia]),
+                        "productos": productos,
+                        "pagos": pagos,
+                        "total": total,
+                        "descuento_por_divisa": aleatorio.choice((0, 0, 0, 5, 10)),
+                        "estado": "procesada",
+                        "usuarioCreacion": f"cajero{farmacia}@ferreteria.com",
+                    }
+
+    # -- COMPRAS -----------------------------------------------------------
+
+    def compras(self) -> Iterator[dict]:
+        for farmacia in self.farmacias:
+            aleatorio = self._aleatorio("COMPRAS", farmacia)
+            for mes in range(self.escala.meses):
+                for _ in range(self.escala.compras_por_mes):
+                    dia = self.inicio + timedelta(days=mes * 30 + aleatorio.randrange(30))
+                    productos = []
+                    for sku in aleatorio.sample(range(self.skus), k=min(self.skus, aleatorio.randint(3, 40))):
+                        producto = self.catalogo[sku]
+                        unidades = aleatorio.randint(6, 200)
+                        productos.append({
+                            "codigo": producto["codigo"],
+                            "nombre": producto["nombre"],
+                            "cantidad": unidades,
+                            "precioUnitario": producto["costo"],
+                            "precioTotal": round(producto["costo"] * unidades, 2),
+                            "fecha_vencimiento": _fecha(dia + timedelta(days=aleatorio.randint(180, 720))),
+                        })
+                    total = round(sum(p["precioTotal"] for p in productos), 2)
+                    pagos = []
+                    abonado = 0.0
+                    for n in range(aleatorio.choice((0, 1, 1, 2, 3))):
+                        monto = round(min(total - abonado, total * aleatorio.uniform(0.2, 0.6)), 2)
+                        if monto <= 0:
+                            break
+                        abonado += monto
+                        pagos.append({"_id": _object_id(aleatorio), "monto": monto, "fecha": _fecha(dia + timedelta(days=7 * (n + 1))), "metodo": "transferencia"})
+                    yield {
+                        "farmacia": farmacia,
+                        "proveedorId": aleatorio.choice(self.proveedor_ids),
+                        "fecha": _fecha(dia),
+                        "numeroFactura": f"P{farmacia}-{mes:02d}-{aleatorio.randint(1, 99999):05d}",
+                        "productos": productos,
+                        "total": total,
+                        "pagos": pagos,
+                        "montoAbonado": round(abonado, 2),
+                        "estado": "pagada" if abonado >= total else "pendiente",
+                        "fechaCreacion": _fecha_hora(dia, aleatorio.randint(8 * 3600, 17 * 3600)),
+                    }
+
+    # -- BANCOS ------------------------------------------------------------
+
+    def bancos(self) -> Iterator[dict]:
+        aleatorio = self._aleatorio("BANCOS")
+        for b in range(self.escala.bancos):
+            saldo = round(aleatorio.uniform(1_000, 20_000), 2)
+            movimientos = []
+            for m in range(self.escala.movimientos_por_banco):
+                tipo = aleatorio.choice(TIPOS_MOVIMIENTO)
+                monto = round(aleatorio.lognormvariate(4, 1.2), 2)
+                entrada = tipo in ("deposito", "ingreso", "abono", "pago_recibido")
+                if not entrada and monto > saldo:
+                    tipo, entrada = "deposito", True
+                nuevo = round(saldo + monto if entrada else saldo - monto, 2)
+                dia = self.inicio + timedelta(days=m * self.dias // max(self.escala.movimientos_por_banco, 1))
+                movimientos.append({
+                    "tipo": tipo,
+                    "monto": monto,
+                    "fecha": _fecha(dia),
+                    "referencia": f"{aleatorio.randint(0, 10**8):08d}",
+                    "descripcion": f"{tipo.replace('_', ' ').capitalize()} {m + 1}",
+                    "notas": "",
+                    "usuario": "admin@ferreteria.com",
+                    "fechaCreacion": _fecha_hora(dia, aleatorio.randint(0, 86_399)),
+                    "saldo_anterior": saldo,
+                    "saldo_nuevo": nuevo,
+                })
+                saldo = nuevo
+            yield {
+                "nombre": f"Banco {b + 1}",
+                "numero_cuenta": f"0102{aleatorio.randint(0, 10**16):016d}",
+                "tipo_metodo": aleatorio.choice(("pago_movil", "punto_debito", "transferencia", "zelle")),
+                "saldo": saldo,
+                "movimientos": movimientos,
+                "fechaCreacion": _fecha_hora(self.inicio, 0),
+            }
+
+    # -- PROVEEDORES / CAJERO / CUADRES -------------------------------------
+
+    def proveedores(self) -> Iterator[dict]:
+        aleatorio = self._aleatorio("PROVEEDORES")
+        for i, _id in enumerate(self.proveedor_ids):
+            yield {
+                "_id": _id,
+                "nombre": f"{aleatorio.choice(MARCAS)} Distribuciones {i + 1}",
+                "rif": f"J-{aleatorio.randint(10**7, 10**8 - 1)}-{aleatorio.randint(0, 9)}",
+                "telefono": f"0414-{aleatorio.randint(0, 9_999_999):07d}",
+                "dias_credito": aleatorio.choice((0, 15, 30, 45)),
+            }
+
+    def cajeros_docs(self) -> Iterator[dict]:
+        aleatorio = self._aleatorio("CAJERO")
+        for farmacia, ids in self.cajeros.items():
+            for cajero_id in ids:
+                yield {
+                    "ID": cajero_id,
+                    "NOMBRE": f"Cajero {cajero_id[-1]} Sucursal {farmacia}",
+                    "FARMACIAS": {farmacia: f"Sucursal {farmacia}"},
+                    "comision": aleatorio.choice((1.0, 1.5, 2.0)),
+                    "tipocomision": ["Turno"],
+                    "estado": "activo",
+                }
+
+    def cuadres(self, farmacia: str) -> Iterator[dict]:
+        aleatorio = self._aleatorio("CUADRES", farmacia)
+        for d in range(self.dias):
+            dia = self.inicio + timedelta(days=d)
+            tasa = round(36 + d * 0.05, 2)
+            for turno in (1, 2, 3):
+                total_bs = round(aleatorio.uniform(0.2, 0.5) * self.escala.ventas_por_dia * 30 * tasa, 2)
+                yield {
+                    "dia": _fecha(dia),
+                    "turno": turno,
+                    "cajeroId": aleatorio.choice(self.cajeros[farmacia]),
+                    "estado": "verified" if aleatorio.random() < 0.95 else "wait",
+                    "totalCajaSistemaBs": total_bs,
+                    "tasa": tasa,
+                    "sobranteUsd": round(aleatorio.uniform(0, 5), 2) if aleatorio.random() < 0.2 else 0,
+                    "faltanteUsd": round(aleatorio.uniform(0, 5), 2) if aleatorio.random() < 0.1 else 0,
+                }
+
+    def colecciones(self) -> Dict[str, Iterable[dict]]:
+        """Colección -> iterador de documentos, en el orden en que se escriben."""
+        salida = {
+            "PROVEEDORES": self.proveedores(),
+            "CAJERO": self.cajeros_docs(),
+            "INVENTARIOS": self.inventarios(),
+            "LOTES": self.lotes(),
+            "COMPRAS": self.compras(),
+            "VENTAS": self.ventas(),
+            "BANCOS": self.bancos(),
+        }
+        for farmacia in self.farmacias:
+            salida[f"CUADRES-{farmacia}"] = self.cuadres(farmacia)
+        return salida
+
+
+# Mismos índices de INVENTARIOS que crea create_indexes.py en producción
+INDICES_INVENTARIOS = [
+    ([("farmacia", 1), ("estado", 1)], "farmacia_estado_index"),
+    ([("codigo", 1)], "codigo_index"),
+    ([("nombre", 1)], "nombre_index"),
+    ([("farmacia", 1), ("nombre", 1)], "farmacia_nombre_index"),
+    ([("farmacia", 1), ("codigo", 1)], "farmacia_codigo_index"),
+    ([("estado", 1), ("nombre", 1)], "estado_nombre_index"),
+    ([("farmacia", 1), ("estado", 1), ("nombre", 1)], "farmacia_estado_nombre_index"),
+    ([("farmacia", 1), ("codigo_norm", 1)], "farmacia_codigo_norm_index"),
+    ([("farmacia", 1), ("nombre_norm", 1)], "farmacia_nombre_norm_index"),
+    ([("farmacia", 1), ("tokens", 1)], "farmacia_tokens_index"),
+    ([("farmacia", 1), ("codigo", 1), ("_id", 1), ("cantidad", 1)], "farmacia_codigo_cantidad_index"),
+    ([("farmacia", 1), ("nombre", 1), ("_id", 1), ("estado", 1)], "farmacia_nombre_id_estado_index"),
+    ([("farmacia", 1), ("updatedAt", 1), ("_id", 1)], "farmacia_updatedAt_id_index"),
+]
+INDICES_LOTES = [
+    ([("producto_id", 1), ("fecha_vencimiento", 1), ("_id", 1)], "producto_fefo_index"),
+    ([("farmacia", 1), ("fecha_vencimiento", 1), ("_id", 1)], "farmacia_vencimiento_index"),
+]
+
+
+def _en_lotes(documentos: Iterable[dict], tamano: int) -> Iterator[List[dict]]:
+    iterador = iter(documentos)
+    while True:
+        lote = list(itertools.islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+async def escribir(db, generador: GeneradorDatos, tamano_lote: int = TAMANO_LOTE, reemplazar: bool = True) -> Dict[str, int]:
+    """Escribe todas las colecciones con insert_many(ordered=False). Retorna documentos por colección."""
+    totales: Dict[str, int] = {}
+    for nombre, documentos in generador.colecciones().items():
+        coleccion = db[nombre]
+        if reemplazar:
+            await coleccion.drop()
+        inicio = time.perf_counter()
+        total = 0
+        for lote in _en_lotes(documentos, tamano_lote):
+            await coleccion.insert_many(lote, ordered=False)
+            total += len(lote)
+        totales[nombre] = total
+        duracion = time.perf_counter() - inicio
+        print(f"  {nombre:<14} {total:>9} docs  {duracion:6.1f} s  ({total / duracion if duracion else 0:,.0f} docs/s)")
+
+    for claves, nombre in INDICES_INVENTARIOS:
+        await db["INVENTARIOS"].create_index(claves, name=nombre)
+    for claves, nombre in INDICES_LOTES:
+        await db["LOTES"].create_index(claves, name=nombre)
+    return totales
+
+
+def _argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017/?directConnection=true"))
+    parser.add_argument("--db", default="yorbis_escala")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica productos, ventas, compras y movimientos")
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--solo-contar", action="store_true", help="Genera los documentos y muestra cuántos hay, sin escribir")
+    for campo in fields(Escala):
+        parser.add_argument(f"--{campo.name.replace('_', '-')}", type=type(campo.default), default=None)
+    return parser.parse_args()
+
+
+async def main():
+    args = _argumentos()
+    escala = Escala(**{
+        campo.name: getattr(args, campo.name) for campo in fields(Escala) if getattr(args, campo.name) is not None
+    }).escalar(args.escala)
+    generador = GeneradorDatos(escala, semilla=args.semilla)
+    print(f"Escala: {escala}")
+
+    if args.solo_contar:
+        for nombre, documentos in generador.colecciones().items():
+            print(f"  {nombre:<14} {sum(1 for _ in documentos):>9} docs")
+        return
+
+    if args.db == "ferreteria_los_puentes":
+        raise SystemExit("Use una base dedicada (--db): las colecciones se borran antes de escribir")
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_uri)
+    try:
+        inicio = time.perf_counter()
+        totales = await escribir(client[args.db], generador, args.tamano_lote)
+        print(f"Listo: {sum(totales.values()):,} documentos en {time.perf_counter() - inicio:.1f} s ({args.db})")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
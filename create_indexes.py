@@ -14,6 +14,7 @@ load_dotenv()
 # Obtener variables de entorno directamente (sin depender de config.py)
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = os.getenv("DATABASE_NAME") or "ferreteria_los_puentes"
+SYNC_RETENCION_ELIMINADOS_DIAS = int(os.getenv("SYNC_RETENCION_ELIMINADOS_DIAS") or 30)
 
 # Si no está configurada, usar la URI por defecto (para desarrollo)
 if not MONGO_URI:
@@ -127,6 +128,94 @@ async def create_indexes():
         except Exception as e:
             print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
         
+        # 10-12. Indices sobre las claves de busqueda normalizadas (nombre_norm, codigo_norm, tokens)
+        # Las busquedas por prefijo usan regex anclada SIN "i" sobre estos campos, que si usa el indice
+        # (migrar_claves_busqueda.py completa los productos existentes)
+        for campos, nombre_indice in (
+            ([("farmacia", 1), ("codigo_norm", 1)], "farmacia_codigo_norm_index"),
+            ([("farmacia", 1), ("nombre_norm", 1)], "farmacia_nombre_norm_index"),
+            ([("farmacia", 1), ("tokens", 1)], "farmacia_tokens_index"),
+        ):
+            print(f"Creando indice {nombre_indice}...")
+            try:
+                await inventarios_collection.create_index(campos, name=nombre_indice, background=True)
+                print(f"   OK: Indice {nombre_indice} creado")
+            except Exception as e:
+                print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        
+        # 13. Indice que CUBRE la lectura de stock del cache de codigos (app/search/cache_codigos.py):
+        # farmacia + codigo + _id -> cantidad sin leer el documento
+        print("Creando indice farmacia_codigo_cantidad_index...")
+        try:
+            await inventarios_collection.create_index([
+                ("farmacia", 1),
+                ("codigo", 1),
+                ("_id", 1),
+                ("cantidad", 1)
+            ], name="farmacia_codigo_cantidad_index", background=True)
+            print("   OK: Indice farmacia_codigo_cantidad_index creado")
+        except Exception as e:
+            print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        
+        # El indice anterior tambien cubria existencia y stock, que ya no se guardan (migrar_stock.py)
+        if "farmacia_codigo_stock_index" in await inventarios_collection.index_information():
+            await inventarios_collection.drop_index("farmacia_codigo_stock_index")
+            print("   OK: Indice farmacia_codigo_stock_index eliminado")
+        
+        # 14. Indice para la paginacion por cursor de /inventarios/items (app/db/paginacion.py):
+        # farmacia + (nombre, _id) en orden, con estado al final para filtrar inactivos sin leer el documento.
+        # El indice 8 no sirve para esto: estado $ne "inactivo" son dos rangos y Mongo ordena en memoria
+        print("Creando indice farmacia_nombre_id_estado_index...")
+        try:
+            await inventarios_collection.create_index([
+                ("farmacia", 1),
+                ("nombre", 1),
+                ("_id", 1),
+                ("estado", 1)
+            ], name="farmacia_nombre_id_estado_index", background=True)
+            print("   OK: Indice farmacia_nombre_id_estado_index creado")
+        except Exception as e:
+            print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        
+        # 15. Sincronizacion incremental de /inventarios/cambios (app/db/sincronizacion.py):
+        # cambios de una farmacia en orden (updatedAt, _id), en INVENTARIOS y en las lapidas de eliminados.
+        # Los eliminados se borran solos (TTL) despues de SYNC_RETENCION_ELIMINADOS_DIAS
+        print("Creando indices farmacia_updatedAt_id_index...")
+        eliminados_collection = db["INVENTARIOS_ELIMINADOS"]
+        for coleccion in (inventarios_collection, eliminados_collection):
+            try:
+                await coleccion.create_index([
+                    ("farmacia", 1),
+                    ("updatedAt", 1),
+                    ("_id", 1)
+                ], name="farmacia_updatedAt_id_index", background=True)
+                print(f"   OK: Indice farmacia_updatedAt_id_index creado en {coleccion.name}")
+            except Exception as e:
+                print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        try:
+            await eliminados_collection.create_index(
+                [("updatedAt", 1)],
+                name="updatedAt_ttl_index",
+                expireAfterSeconds=SYNC_RETENCION_ELIMINADOS_DIAS * 24 * 3600
+            )
+            print(f"   OK: Indice updatedAt_ttl_index creado ({SYNC_RETENCION_ELIMINADOS_DIAS} dias)")
+        except Exception as e:
+            print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        
+        # 16. Lotes en su propia coleccion (app/services/lotes_service.py):
+        # consumo FEFO por producto y reporte de lotes por vencer por farmacia, ambos en orden de vencimiento
+        print("Creando indices de LOTES...")
+        lotes_collection = db["LOTES"]
+        for campos, nombre_indice in [
+            ([("producto_id", 1), ("fecha_vencimiento", 1), ("_id", 1)], "producto_fefo_index"),
+            ([("farmacia", 1), ("fecha_vencimiento", 1), ("_id", 1)], "farmacia_vencimiento_index"),
+        ]:
+            try:
+                await lotes_collection.create_index(campos, name=nombre_indice, background=True)
+                print(f"   OK: Indice {nombre_indice} creado")
+            except Exception as e:
+                print(f"   ADVERTENCIA: Error creando indice (puede que ya exista): {e}")
+        
         # Listar todos los indices creados
         print("\nIndices existentes en la coleccion INVENTARIOS:")
         indexes = await inventarios_collection.list_indexes().to_list(length=None)
@@ -0,0 +1,92 @@
+"""
+Script para completar las claves de búsqueda normalizadas de INVENTARIOS
+(nombre_norm, codigo_norm y tokens: minúsculas y sin acentos).
+
+Las rutas ya las mantienen al crear/editar productos; este script las agrega
+a los productos existentes con bulk_write por lotes. Por defecto solo procesa
+los productos que no las tienen; con --todos las recalcula todas.
+
+Después ejecutar create_indexes.py para crear los índices sobre estos campos.
+
+Uso:
+    python migrar_claves_busqueda.py [--todos] [--lote 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+import certifi
+
+from app.search.normalizacion import CAMPOS_ORIGEN, claves_busqueda
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Obtener variables de entorno
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("DATABASE_NAME") or "ferreteria_los_puentes"
+
+# Sin MONGO_URI no se adivina a qué base conectarse: el script escribe en INVENTARIOS
+if not MONGO_URI:
+    sys.exit("❌ Falta MONGO_URI (variable de entorno o .env)")
+
+async def migrar_claves_busqueda(todos: bool, tamano_lote: int):
+    """Agrega nombre_norm, codigo_norm y tokens a los productos de INVENTARIOS"""
+    print("🔄 Completando claves de búsqueda normalizadas en INVENTARIOS...")
+
+    client = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where())
+    db = client[DATABASE_NAME or "ferreteria_los_puentes"]
+    inventarios_collection = db["INVENTARIOS"]
+
+    try:
+        filtro = {} if todos else {"nombre_norm": {"$exists": False}}
+        total = await inventarios_collection.count_documents(filtro)
+        print(f"📦 Productos a procesar: {total}")
+
+        inicio = time.perf_counter()
+        procesados = 0
+        modificados = 0
+        operaciones = []
+
+        # Solo se leen los campos de origen; las escrituras van en lotes (1 round trip por lote)
+        cursor = inventarios_collection.find(filtro, projection={campo: 1 for campo in CAMPOS_ORIGEN}).batch_size(tamano_lote)
+        async for producto in cursor:
+            operaciones.append(UpdateOne({"_id": producto["_id"]}, {"$set": claves_busqueda(producto)}))
+            if len(operaciones) >= tamano_lote:
+                resultado = await inventarios_collection.bulk_write(operaciones, ordered=False)
+                modificados += resultado.modified_count
+                procesados += len(operaciones)
+                operaciones = []
+                print(f"  ✅ {procesados}/{total} productos")
+
+        if operaciones:
+            resultado = await inventarios_collection.bulk_write(operaciones, ordered=False)
+            modificados += resultado.modified_count
+            procesados += len(operaciones)
+
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN:")
+        print(f"{'='*60}")
+        print(f"  Productos procesados: {procesados}")
+        print(f"  ✅ Productos modificados: {modificados}")
+        print(f"  ⏱  Tiempo: {time.perf_counter() - inicio:.1f} s")
+        print(f"{'='*60}\n")
+        print("Siguiente paso: python create_indexes.py (índices sobre nombre_norm, codigo_norm y tokens)")
+
+    except Exception as e:
+        print(f"❌ Error migrando claves de búsqueda: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--todos", action="store_true", help="Recalcular también los productos que ya tienen las claves")
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(migrar_claves_busqueda(args.todos, args.lote))
@@ -0,0 +1,127 @@
+"""
+Script para pasar los lotes embebidos de INVENTARIOS (arreglo "lotes") a la
+colección LOTES, un documento por lote (app/services/lotes_service.py).
+
+La venta consume los lotes desde LOTES y las rutas los leen de ahí. Orden:
+create_indexes.py (índices producto_fefo_index y farmacia_vencimiento_index de
+LOTES), despliegue y después este script. Mientras tanto LOTES manda sobre el
+arreglo: un PATCH con "lotes" quita el arreglo del producto y la primera venta
+de un producto sin migrar pasa su arreglo a LOTES
+(lotes_service.migrar_lotes_embebidos), así que aquí no se vuelven a escribir.
+
+Por cada lote de productos que todavía tienen el arreglo: si el producto ya
+tiene documentos en LOTES (PATCH, venta o una ejecución interrumpida) se
+conservan esos; si no, se insertan los del arreglo. En ambos casos se quita el
+arreglo y se guarda en lotes_activos cuántos lotes con existencia tiene (la
+venta no consulta LOTES si es 0). Se puede volver a ejecutar sin duplicar
+lotes.
+
+Uso:
+    python migrar_lotes.py [--lote 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+import certifi
+
+from app.services.lotes_service import CAMPO_LOTES_ACTIVOS, COLECCION_LOTES, contar_activos, documento_lote
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Obtener variables de entorno
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("DATABASE_NAME") or "ferreteria_los_puentes"
+
+# Sin MONGO_URI no se adivina a qué base conectarse: el script escribe en INVENTARIOS
+if not MONGO_URI:
+    sys.exit("❌ Falta MONGO_URI (variable de entorno o .env)")
+
+async def migrar_lotes(tamano_lote: int):
+    """Mueve el arreglo lotes de cada producto de INVENTARIOS a la colección LOTES"""
+    print("🔄 Pasando lotes embebidos a la colección LOTES...")
+
+    client = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where())
+    db = client[DATABASE_NAME or "ferreteria_los_puentes"]
+    inventarios_collection = db["INVENTARIOS"]
+    lotes_collection = db[COLECCION_LOTES]
+
+    async def procesar(productos):
+        ids = [producto["_id"] for producto in productos]
+        # Lotes con existencia de los productos que ya están en LOTES: esos no se reemplazan
+        existentes = {
+            grupo["_id"]: grupo["activos"]
+            async for grupo in lotes_collection.aggregate([
+                {"$match": {"producto_id": {"$in": ids}}},
+                {"$group": {"_id": "$producto_id", "activos": {"$sum": {"$cond": [{"$gt": ["$cantidad", 0]}, 1, 0]}}}},
+            ])
+        }
+        por_producto = {
+            producto["_id"]: [documento_lote(producto, lote) for lote in (producto.get("lotes") or []) if isinstance(lote, dict)]
+            for producto in productos
+            if producto["_id"] not in existentes
+        }
+        documentos = [documento for lotes in por_producto.values() for documento in lotes]
+        if documentos:
+            await lotes_collection.insert_many(documentos, ordered=False)
+        activos = {**existentes, **{_id: contar_activos(lotes) for _id, lotes in por_producto.items()}}
+        await inventarios_collection.bulk_write([
+            UpdateOne({"_id": _id}, {"$unset": {"lotes": ""}, "$set": {CAMPO_LOTES_ACTIVOS: activos[_id]}})
+            for _id in ids
+        ], ordered=False)
+        return len(documentos), len(existentes)
+
+    try:
+        filtro = {"lotes": {"$exists": True}}
+        total = await inventarios_collection.count_documents(filtro)
+        print(f"📦 Productos a procesar: {total}")
+
+        inicio = time.perf_counter()
+        procesados = 0
+        lotes_creados = 0
+        ya_en_lotes = 0
+        productos = []
+
+        cursor = inventarios_collection.find(filtro, projection={"farmacia": 1, "lotes": 1}).batch_size(tamano_lote)
+        async for producto in cursor:
+            productos.append(producto)
+            if len(productos) >= tamano_lote:
+                creados, existentes = await procesar(productos)
+                lotes_creados += creados
+                ya_en_lotes += existentes
+                procesados += len(productos)
+                productos = []
+                print(f"  ✅ {procesados}/{total} productos")
+
+        if productos:
+            creados, existentes = await procesar(productos)
+            lotes_creados += creados
+            ya_en_lotes += existentes
+            procesados += len(productos)
+
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN:")
+        print(f"{'='*60}")
+        print(f"  Productos procesados: {procesados}")
+        print(f"  ✅ Lotes creados en {COLECCION_LOTES}: {lotes_creados}")
+        print(f"  ✓ Productos que ya tenían lotes en {COLECCION_LOTES} (se conservaron): {ya_en_lotes}")
+        print(f"  ⏱  Tiempo: {time.perf_counter() - inicio:.1f} s")
+        print(f"{'='*60}\n")
+
+    except Exception as e:
+        print(f"❌ Error migrando lotes: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(migrar_lotes(args.lote))
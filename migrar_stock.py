@@ -0,0 +1,101 @@
+"""
+Script para dejar el stock de INVENTARIOS en un solo campo: cantidad.
+
+Antes cada escritura mantenía cantidad, existencia y stock, y cada lectura
+elegía con la prioridad existencia > cantidad > stock (el primero mayor que 0).
+No todas las escrituras tocaban los tres campos (cargar-existencia y compras
+solo sumaban a cantidad), así que se desincronizaban. Este script resuelve esa
+prioridad una sola vez, la guarda en cantidad y borra existencia y stock, en
+una sola actualización del lado del servidor, sin leer los documentos.
+
+Las respuestas siguen trayendo existencia y stock, calculados desde cantidad
+(app/search/formato.py). El valor que ve el frontend no cambia, por eso no se
+toca updatedAt.
+
+Ejecutarlo antes de desplegar la versión que solo lee cantidad y otra vez
+después (las escrituras de la versión anterior vuelven a poner existencia y
+stock); es idempotente. Después ejecutar create_indexes.py
+(farmacia_codigo_cantidad_index reemplaza a farmacia_codigo_stock_index).
+
+Uso:
+    python migrar_stock.py
+"""
+import asyncio
+import os
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+import certifi
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Obtener variables de entorno
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("DATABASE_NAME") or "ferreteria_los_puentes"
+
+# Sin MONGO_URI no se adivina a qué base conectarse: el script escribe en INVENTARIOS
+if not MONGO_URI:
+    sys.exit("❌ Falta MONGO_URI (variable de entorno o .env)")
+
+
+def numero(campo):
+    """float() del campo: null, ausente o no numérico cuenta como 0"""
+    return {"$convert": {"input": f"${campo}", "to": "double", "onError": 0, "onNull": 0}}
+
+
+# La prioridad que aplicaban las lecturas: existencia, si es 0 cantidad y luego stock
+STOCK_RESUELTO = {"$switch": {
+    "branches": [
+        {"case": {"$gt": [numero("existencia"), 0]}, "then": numero("existencia")},
+        {"case": {"$gt": [numero("cantidad"), 0]}, "then": numero("cantidad")},
+        {"case": {"$gt": [numero("stock"), 0]}, "then": numero("stock")},
+    ],
+    "default": 0,
+}}
+
+async def migrar_stock():
+    """Guarda el stock resuelto en cantidad y elimina existencia y stock de INVENTARIOS"""
+    print("🔄 Unificando existencia/cantidad/stock en cantidad...")
+    client = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where())
+    db = client[DATABASE_NAME or "ferreteria_los_puentes"]
+    inventarios_collection = db["INVENTARIOS"]
+
+    try:
+        filtro = {"$or": [
+            {"existencia": {"$exists": True}},
+            {"stock": {"$exists": True}},
+            {"cantidad": {"$not": {"$type": "number"}}},
+        ]}
+        total = await inventarios_collection.count_documents(filtro)
+        desincronizados = await inventarios_collection.count_documents(
+            {"$and": [filtro, {"$expr": {"$ne": [STOCK_RESUELTO, "$cantidad"]}}]}
+        )
+        print(f"📦 Productos a procesar: {total}")
+        print(f"⚠️  Productos cuya cantidad guardada no era la que se mostraba: {desincronizados}")
+
+        inicio = time.perf_counter()
+        resultado = await inventarios_collection.update_many(filtro, [
+            {"$set": {"cantidad": STOCK_RESUELTO}},
+            {"$unset": ["existencia", "stock"]},
+        ])
+
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN:")
+        print(f"{'='*60}")
+        print(f"  Productos procesados: {resultado.matched_count}")
+        print(f"  ✅ Productos modificados: {resultado.modified_count}")
+        print(f"  ⏱  Tiempo: {time.perf_counter() - inicio:.1f} s")
+        print(f"{'='*60}\n")
+        print("Siguiente paso: python create_indexes.py (índice farmacia_codigo_cantidad_index)")
+
+    except Exception as e:
+        print(f"❌ Error migrando stock: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrar_stock())
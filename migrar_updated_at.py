@@ -0,0 +1,73 @@
+"""
+Script para completar updatedAt (fecha BSON) en los productos de INVENTARIOS
+que no lo tienen.
+
+Las rutas lo ponen en cada escritura desde que existe /inventarios/cambios
+(app/db/sincronizacion.py); los productos anteriores quedan sin él. Se usa la
+fecha de creación del ObjectId (el texto fechaActualizacion no tiene zona
+horaria), en una sola actualización del lado del servidor, sin leer los
+documentos.
+
+Las terminales que ya tengan un token no reciben estos productos como cambios:
+la primera sincronización (sin token) sí los trae todos.
+
+Después ejecutar create_indexes.py (índice farmacia_updatedAt_id_index).
+
+Uso:
+    python migrar_updated_at.py
+"""
+import asyncio
+import os
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+import certifi
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Obtener variables de entorno
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("DATABASE_NAME") or "ferreteria_los_puentes"
+
+# Sin MONGO_URI no se adivina a qué base conectarse: el script escribe en INVENTARIOS
+if not MONGO_URI:
+    sys.exit("❌ Falta MONGO_URI (variable de entorno o .env)")
+
+async def migrar_updated_at():
+    """Agrega updatedAt a los productos de INVENTARIOS que no lo tienen"""
+    print("🔄 Completando updatedAt en INVENTARIOS...")
+    client = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where())
+    db = client[DATABASE_NAME or "ferreteria_los_puentes"]
+    inventarios_collection = db["INVENTARIOS"]
+
+    try:
+        filtro = {"updatedAt": {"$not": {"$type": "date"}}}
+        total = await inventarios_collection.count_documents(filtro)
+        print(f"📦 Productos a procesar: {total}")
+
+        inicio = time.perf_counter()
+        # Pipeline de actualización: fecha del ObjectId, o la hora actual si el _id no es un ObjectId
+        resultado = await inventarios_collection.update_many(filtro, [
+            {"$set": {"updatedAt": {"$convert": {"input": "$_id", "to": "date", "onError": "$$NOW"}}}}
+        ])
+
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN:")
+        print(f"{'='*60}")
+        print(f"  Productos procesados: {resultado.matched_count}")
+        print(f"  ✅ Productos modificados: {resultado.modified_count}")
+        print(f"  ⏱  Tiempo: {time.perf_counter() - inicio:.1f} s")
+        print(f"{'='*60}\n")
+        print("Siguiente paso: python create_indexes.py (índice farmacia_updatedAt_id_index)")
+
+    except Exception as e:
+        print(f"❌ Error migrando updatedAt: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrar_updated_at())
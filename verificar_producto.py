@@ -62,25 +62,14 @@ async def verificar_producto(codigo: str):
         # Información de stock/existencia
         print("\nINFORMACION DE STOCK/EXISTENCIA:")
         cantidad = producto.get("cantidad", 0)
-        existencia = producto.get("existencia", 0)
-        stock = producto.get("stock", 0)
-        
         print(f"   Cantidad: {cantidad}")
-        print(f"   Existencia: {existencia}")
-        print(f"   Stock: {stock}")
-        
-        # Determinar valor principal según lógica del sistema
-        if existencia > 0:
-            valor_principal = existencia
-            campo_principal = "existencia"
-        elif cantidad > 0:
-            valor_principal = cantidad
-            campo_principal = "cantidad"
-        else:
-            valor_principal = stock if stock > 0 else 0
-            campo_principal = "stock"
         
-        print(f"\n   >>> Valor principal (usado por el sistema): {valor_principal} (campo: {campo_principal})")
+        # existencia y stock ya no se guardan (migrar_stock.py): si aparecen, falta migrar este producto
+        for campo in ("existencia", "stock"):
+            if campo in producto:
+                print(f"   {campo.capitalize()}: {producto[campo]}  (campo legado, ejecutar migrar_stock.py)")
+        
+        print(f"\n   >>> Valor usado por el sistema: {cantidad} (campo: cantidad)")
         
         # Información de precios
         print("\nINFORMACION DE PRECIOS:")